@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """Book controller functions"""
+from applications.zcomx.modules.book_marks import book_mark_store
 from applications.zcomx.modules.books import Book
-from applications.zcomx.modules.zco import Zco
 
 
 def book():
@@ -36,6 +36,8 @@ def set_book_mark():
 
     """
     response.generic_patterns = ['json']
+    # Book marks are not stored in the session, release the session lock.
+    session.forget(response)
 
     def do_error(msg=None):
         """Error handler."""
@@ -63,9 +65,9 @@ def set_book_mark():
     if not book_record:
         return do_error('Book not found, id: {i}.'.format(i=book_id))
 
-    book_marks = Zco().book_marks
-    book_marks[book_id] = page_no
-    Zco().book_marks = book_marks
+    store = book_mark_store()
+    if store:
+        store.set(book_id, page_no)
 
     return {'status': 'ok'}
 
@@ -5,16 +5,15 @@ Controllers related to downloads.
 import json
 from applications.zcomx.modules.books import (
     Book,
-    cbz_url,
     downloadable as downable_books,
-    formatted_name,
-    magnet_uri,
-    torrent_url as book_torrent_url,
 )
 from applications.zcomx.modules.creators import (
     Creator,
     downloadable as downable_creators,
-    torrent_url as creator_torrent_url,
+)
+from applications.zcomx.modules.download_catalogs import (
+    DownloadCatalog,
+    as_json,
 )
 from applications.zcomx.modules.events import (
     DownloadClick,
@@ -63,74 +62,57 @@ def downloadable_books():
     """Ajax callback to get downloadable books.
 
     request.args(0): int, id of creator.
+
+    The precomputed catalog file is served if available.
     """
 
     def do_error(msg):
         """Error handler."""
         return json.dumps({'status': 'error', 'msg': msg})
 
+    catalog = DownloadCatalog()
+    if request.args:
+        cached = catalog.load_books(request.args[0])
+        if cached is not None:
+            return cached
+
     creator = None
     if request.args:
         try:
             creator = Creator.from_id(int(request.args[0]))
-        except LookupError:
+        except (LookupError, ValueError):
             LOG.error('Creator not found, id: %s', request.args[0])
 
     if not creator:
         return do_error('Unable to get list of books.')
 
-    book_data = []
-    for book in downable_books(creator_id=creator.id, orderby=db.book.name):
-        # pylint: disable=broad-except
-        try:
-            book_data.append(
-                {
-                    'id': book.id,
-                    'title': formatted_name(
-                        book,
-                        include_publication_year=(book.release_date != None)
-                    ),
-                    'torrent_url': book_torrent_url(book, extension=False),
-                    'magnet_uri': magnet_uri(book),
-                    'cbz_url': cbz_url(book, extension=False),
-                }
-            )
-        except Exception:
-            continue
-
+    book_data = catalog.books(creator)
     if not book_data:
         return do_error('Unable to get list of books.')
 
-    return json.dumps({
-        'books': book_data,
-        'status': 'ok',
-    })
+    return as_json('books', book_data)
 
 
 def downloadable_creators():
-    """Ajax callback to get downloadable creators."""
+    """Ajax callback to get downloadable creators.
+
+    The precomputed catalog file is served if available.
+    """
 
     def do_error(msg):
         """Error handler."""
         return json.dumps({'status': 'error', 'msg': msg})
 
-    creator_data = []
-    for creator in downable_creators(orderby=db.creator.name_for_search):
-        creator_data.append(
-            {
-                'id': creator.id,
-                'name': creator.name,
-                'torrent_url': creator_torrent_url(creator, extension=False),
-            }
-        )
+    catalog = DownloadCatalog()
+    cached = catalog.load_creators()
+    if cached is not None:
+        return cached
 
+    creator_data = catalog.creators()
     if not creator_data:
         return do_error('Unable to get list of creators.')
 
-    return json.dumps({
-        'creators': creator_data,
-        'status': 'ok',
-    })
+    return as_json('creators', creator_data)
 
 
 def index():
@@ -49,6 +49,7 @@ from applications.zcomx.modules.image.validators import InvalidImageError
 from applications.zcomx.modules.images import (
     CreatorImgTag,
     ResizeImgIndicia,
+    image_url,
     on_delete_image,
     store,
 )
@@ -66,6 +67,9 @@ from applications.zcomx.modules.job_queuers import (
     ReverseFileshareBookQueuer,
     ReverseSetBookCompletedQueuer,
     queue_create_sitemap,
+    queue_creator_grid,
+    queue_download_catalog,
+    queue_search_index,
     queue_search_prefetch,
 )
 from applications.zcomx.modules.links import (
@@ -82,6 +86,7 @@ from applications.zcomx.modules.search import (
 )
 from applications.zcomx.modules.shell_utils import TemporaryDirectory
 from applications.zcomx.modules.stickon.validators import as_per_type
+from applications.zcomx.modules.url_names import URL_NAME_CACHE
 from applications.zcomx.modules.utils import (
     default_record,
     move_record,
@@ -273,6 +278,9 @@ def book_crud():
             return {'status': 'error', 'msg': str(err)}
 
         if book and book.id:
+            queue_creator_grid(creator_id=book.creator_id)
+            # A creator is autocompleted once they have a book.
+            queue_search_prefetch(creator_ids=[book.creator_id])
             return {
                 'id': book.id,
                 'status': 'ok',
@@ -352,7 +360,12 @@ def book_crud():
         except SyntaxError as err:
             return {'status': 'error', 'msg': str(err)}
 
-        queue_search_prefetch()
+        if request.vars.name in name_fields():
+            URL_NAME_CACHE.invalidate('book', book.id)
+            queue_download_catalog(creator_id=book.creator_id)
+        queue_search_prefetch(
+            book_ids=[book.id], creator_ids=[book.creator_id])
+        queue_search_index(book_ids=[book.id])
         queue_create_sitemap()
 
         numbers = \
@@ -743,7 +756,9 @@ def book_post_upload_session():
     # are taken out of search results. Ending the Upload session may make the
     # book active and thus searchable. A search prefetch will make the book
     # searchable if applicable.
-    queue_search_prefetch()
+    queue_search_prefetch(
+        book_ids=[book.id], creator_ids=[book.creator_id])
+    queue_search_index(book_ids=[book.id])
 
     # Step 7:  Trigger optimization of book images
     AllSizesImages.from_names(images(book)).optimize()
@@ -1059,12 +1074,7 @@ def indicia_preview_urls():
     for orientation in list(urls.keys()):
         field = 'indicia_{o}'.format(o=orientation)
         if creator[field]:
-            urls[orientation] = URL(
-                c='images',
-                f='download',
-                args=creator[field],
-                vars={'size': 'web'},
-            )
+            urls[orientation] = image_url(creator[field], size='web')
         else:
             # Use generic images if creator indicias not set.
             urls[orientation] = URL(
@@ -1503,6 +1513,7 @@ def metadata_crud():
         meta.update()
         book = Book.from_updated(
             book, dict(publication_year=meta.publication_year()))
+        queue_search_index(book_ids=[book.id])
         return {'status': 'ok'}
     return do_error('Invalid data provided')
 
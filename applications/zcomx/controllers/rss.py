@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 """RSS controller functions"""
 import functools
+import time
 import traceback
 from gluon.storage import Storage
+from gluon.utils import unlocalised_http_header_date
 from applications.zcomx.modules.books import (
     Book,
     rss_url as book_rss_url,
@@ -12,6 +14,7 @@ from applications.zcomx.modules.creators import (
     rss_url as creator_rss_url,
     url as creator_url,
 )
+from applications.zcomx.modules.downloaders import is_not_modified
 from applications.zcomx.modules.rss import channel_from_type
 from applications.zcomx.modules.zco import (
     BOOK_STATUS_ACTIVE,
@@ -19,6 +22,26 @@ from applications.zcomx.modules.zco import (
 )
 
 
+def _feed(rss_channel):
+    """Return the feed of a channel, honouring conditional requests.
+
+    Args:
+        rss_channel: BaseRSSChannel subclass instance
+
+    Raises:
+        HTTP(304) if the client copy of the feed is current.
+    """
+    etag, last_modified = rss_channel.validators()
+    headers = {'ETag': 'W/' + etag}
+    if last_modified:
+        headers['Last-Modified'] = unlocalised_http_header_date(
+            time.gmtime(last_modified))
+    response.headers.update(headers)
+    if is_not_modified(request, etag, last_modified):
+        raise HTTP(304, **headers)
+    return rss_channel.cached_feed(etag=etag)
+
+
 def modal():
     """Controller for rss modal.
 
@@ -167,7 +190,7 @@ def route():
     if rss_type == 'all':
         rss_channel = channel_from_type('all')
         response.view = 'rss/feed.rss'
-        return rss_channel.feed()
+        return _feed(rss_channel)
 
     extension = '.rss'
     if rss_type == 'creator':
@@ -182,7 +205,7 @@ def route():
 
         rss_channel = channel_from_type('creator', record_id=creator.id)
         response.view = 'rss/feed.rss'
-        return rss_channel.feed()
+        return _feed(rss_channel)
 
     if rss_type == 'book':
         if rss_name.endswith(extension):
@@ -196,7 +219,7 @@ def route():
 
         rss_channel = channel_from_type('book', record_id=book.id)
         response.view = 'rss/feed.rss'
-        return rss_channel.feed()
+        return _feed(rss_channel)
 
     return page_not_found()
 
@@ -21,14 +21,14 @@ def autocomplete():
 
     request.args(0): string, table, one of 'book' or 'creator'
     request.vars.q: string, the query keywords.
-        Returns all records if q is Falsy.
+        Returns the first records if q is Falsy.
     """
     response.generic_patterns = ['json']
     completer_class = autocompleter_class(request.args(0))
     if not completer_class:
         return dict(results=[])
     completer = completer_class(keyword=request.vars.q)
-    return dict(results=completer.search())
+    return dict(results=completer.indexed_search())
 
 
 def autocomplete_selected():
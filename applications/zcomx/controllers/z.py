@@ -13,6 +13,7 @@ from applications.zcomx.modules.creators import (
     Creator,
     url as creator_url,
 )
+from applications.zcomx.modules.fragment_caches import FragmentCache
 from applications.zcomx.modules.search import Grid
 from applications.zcomx.modules.stickon.tools import ExposeImproved
 from applications.zcomx.modules.utils import (
@@ -37,7 +38,10 @@ def _search_results(request, response, orderby):
 
     icons = {'list': 'th-list', 'tile': 'th-large'}
 
-    grid = Grid.class_factory(orderby or 'completed')
+    # The rendered grid is the same for all anonymous visitors.
+    fragment_cache = FragmentCache() if not auth.user_id else None
+    grid = Grid.class_factory(
+        orderby or 'completed', fragment_cache=fragment_cache)
 
     return dict(
         grid=grid,
@@ -213,6 +213,20 @@ db.define_table(
         writable=False,
         readable=False,
     ),
+    Field(
+        'rating_count',
+        'integer',
+        default=0,
+        writable=False,
+        readable=False,
+    ),
+    Field(
+        'rating_total',
+        'double',
+        default=0,
+        writable=False,
+        readable=False,
+    ),
     Field('downloads', 'integer', default=0),
     Field(
         'background_colour',
@@ -275,6 +289,52 @@ db.define_table(
     format='%(name)s',
 )
 
+db.define_table(
+    'book_daily_rollup',
+    Field(
+        'book_id',
+        'integer',
+    ),
+    Field(
+        'creator_id',
+        'integer',
+    ),
+    Field('day', 'date'),
+    Field(
+        'views',
+        'integer',
+        default=0,
+    ),
+    Field(
+        'downloads',
+        'integer',
+        default=0,
+    ),
+    Field(
+        'contributions',
+        'integer',
+        default=0,
+    ),
+    Field(
+        'contribution_amount',
+        'double',
+        default=0,
+    ),
+)
+
+db.define_table(
+    'book_mark',
+    Field(
+        'auth_user_id',
+        'integer',
+    ),
+    Field(
+        'book_id',
+        'integer',
+    ),
+    Field('page_no', 'integer'),
+)
+
 book_page_common_fields = db.Table(
     db,
     'book_page_common_fields',
@@ -538,6 +598,36 @@ db.define_table(
     ),
 )
 
+# creator_grid holds the per creator totals of the cartoonists grid. It is
+# refreshed from the book records, see modules/creator_grids.py.
+db.define_table(
+    'creator_grid',
+    Field(
+        'creator_id',
+        'integer',
+    ),
+    Field(
+        'completed',
+        'integer',
+        default=0,
+    ),
+    Field(
+        'ongoing',
+        'integer',
+        default=0,
+    ),
+    Field(
+        'downloads',
+        'integer',
+        default=0,
+    ),
+    Field(
+        'views',
+        'integer',
+        default=0,
+    ),
+)
+
 db.define_table(
     'derivative',
     Field(
@@ -615,6 +705,23 @@ db.define_table(
     ),
 )
 
+# download_click_daily_rollup counts the loggable download clicks per
+# record and day, see modules/rollups.py.
+db.define_table(
+    'download_click_daily_rollup',
+    Field('record_table'),
+    Field(
+        'record_id',
+        'integer',
+    ),
+    Field('day', 'date'),
+    Field(
+        'clicks',
+        'integer',
+        default=0,
+    ),
+)
+
 
 """
 job_common_fields         # Jobs are added to a queue and processed in order.
@@ -977,6 +1084,16 @@ db.define_table(
     Field('amount', 'double'),
 )
 
+db.define_table(
+    'rollup_mark',
+    Field('name'),
+    Field(
+        'last_id',
+        'integer',
+        default=0,
+    ),
+)
+
 db.define_table(
     'tentative_activity_log',
     Field(
@@ -1082,16 +1199,3 @@ db.rating.book_id.requires = IS_IN_DB(
     zero=None
 )
 
-#
-# Views
-# Define views after tables so migrate updates tables first.
-#
-db.define_table(
-    'creator_grid_v',
-    Field('creator_id', 'id'),
-    Field('completed', 'integer'),
-    Field('ongoing', 'integer'),
-    Field('downloads', 'integer'),
-    Field('views', 'integer'),
-    migrate=False,
-)
@@ -4,6 +4,7 @@
 Classes and functions related to activity logs
 """
 import datetime
+import itertools
 from functools import reduce
 from gluon import *
 from applications.zcomx.modules.book_pages import (
@@ -19,6 +20,7 @@ from applications.zcomx.modules.records import Record
 LOG = current.app.logger
 
 MINIMUM_AGE_TO_LOG_IN_SECONDS = 4 * 60 * 60       # 4 hours
+PROCESS_BATCH_SIZE = 500                          # books per transaction
 
 
 class ActivityLogMixin():
@@ -145,12 +147,7 @@ class BaseTentativeLogSet():
         if not self.tentative_records:
             return
 
-        by_age = sorted(
-            self.tentative_records,
-            key=lambda k: k.time_stamp,
-            reverse=True
-        )
-        return by_age[0]
+        return max(self.tentative_records, key=lambda k: k.time_stamp)
 
 
 class CompletedTentativeLogSet(BaseTentativeLogSet):
@@ -324,3 +321,112 @@ class UploadActivityLogger():
             logs.append(TentativeActivityLog.from_add(data))
 
         return logs
+
+
+def log_tentative_records(tentative_record_sets):
+    """Create activity_log records from sets of tentative_activity_log
+    records and delete the tentative records, in one transaction.
+
+    Args:
+        tentative_record_sets: list of lists of TentativeActivityLog
+            instances, one list per book.
+
+    Returns:
+        integer, number of activity_log records created.
+    """
+    db = current.app.db
+    activity_logs = []
+    tentative_ids = []
+    for tentative_records in tentative_record_sets:
+        log_sets = [
+            PageAddedTentativeLogSet(
+                [x for x in tentative_records if x.action == 'page added']),
+            CompletedTentativeLogSet(
+                [x for x in tentative_records if x.action == 'completed']),
+        ]
+        for log_set in log_sets:
+            activity_log = log_set.as_activity_log()
+            if activity_log:
+                activity_logs.append(activity_log.as_dict())
+        tentative_ids.extend([x.id for x in tentative_records])
+
+    if activity_logs:
+        db.activity_log.bulk_insert(activity_logs)
+    if tentative_ids:
+        query = (db.tentative_activity_log.id.belongs(tentative_ids))
+        db(query).delete()
+    db.commit()
+    LOG.debug(
+        'Books: %s, tentative logs deleted: %s, activity logs created: %s',
+        len(tentative_record_sets), len(tentative_ids), len(activity_logs)
+    )
+    return len(activity_logs)
+
+
+def process_tentative_logs(
+        minimum_age=MINIMUM_AGE_TO_LOG_IN_SECONDS,
+        batch_size=PROCESS_BATCH_SIZE,
+        as_of=None):
+    """Create activity_log records from tentative_activity_log records in a
+    single pass.
+
+    All tentative records are loaded with one select and grouped by book.
+    The tentative records of a book are converted once the youngest has the
+    minimum age. Books are processed in batches, one transaction per batch.
+
+    Args:
+        minimum_age: integer, minimum age in seconds of the youngest
+            tentative record of a book for the book to be processed.
+        batch_size: integer, number of books processed per transaction.
+        as_of: datetime.datetime instance, the time to determine ages
+            of. Default: datetime.datetime.now()
+
+    Returns:
+        integer, number of activity_log records created.
+    """
+    if as_of is None:
+        as_of = datetime.datetime.now()
+
+    created = 0
+    batch = []
+    for book_id, tentative_records in tentative_logs_by_book():
+        # Records are ordered by time_stamp, the youngest is last.
+        age = tentative_records[-1].age(as_of=as_of)
+        if age.total_seconds() < minimum_age:
+            LOG.debug('Tentative log records too young, book_id: %s', book_id)
+            continue
+        batch.append(tentative_records)
+        if len(batch) >= batch_size:
+            created += log_tentative_records(batch)
+            batch = []
+
+    if batch:
+        created += log_tentative_records(batch)
+    return created
+
+
+def tentative_logs_by_book(tentative_log_class=TentativeActivityLog):
+    """Generator of tentative_activity_log records grouped by book.
+
+    The records are loaded with a single select ordered by book_id and
+    time_stamp.
+
+    Args:
+        tentative_log_class: class used to create the log instances.
+
+    Yields:
+        tuple, (book_id, list of tentative_log_class instances ordered by
+            time_stamp)
+    """
+    db = current.app.db
+    rows = db(db.tentative_activity_log).select(
+        orderby=[
+            db.tentative_activity_log.book_id,
+            db.tentative_activity_log.time_stamp,
+            db.tentative_activity_log.id,
+        ],
+        cacheable=True,
+    )
+    records = (tentative_log_class(r.as_dict()) for r in rows)
+    for book_id, group in itertools.groupby(records, key=lambda x: x.book_id):
+        yield book_id, list(group)
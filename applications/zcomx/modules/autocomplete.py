@@ -3,10 +3,12 @@
 """
 Classes and functions related to autocompletion.
 """
+import bisect
+import copy
 import functools
+import gzip
 import json
 import os
-import shutil
 from pydal.validators import urlify
 from gluon import *
 from applications.zcomx.modules.books import (
@@ -14,35 +16,43 @@ from applications.zcomx.modules.books import (
     formatted_name as formatted_book_name,
 )
 from applications.zcomx.modules.creators import Creator
-from applications.zcomx.modules.shell_utils import TemporaryDirectory
+from applications.zcomx.modules.files import write_atomic
 from applications.zcomx.modules.zco import BOOK_STATUS_ACTIVE
 
+LOG = current.app.logger
+
+MAX_RESULTS = 20
+
+# Prefix indexes by prefetch file name, {filename: (file signature, index)}
+_PREFIX_INDEXES = {}
+
 
 class BaseAutocompleter():
     """Base class representing a autocompleter"""
 
-    def __init__(self, table, keyword=''):
+    def __init__(self, table, keyword='', record_ids=None):
         """Constructor
 
         Args:
             table: gluon.dal.Table instance, eg db.book
             keyword: string, keyword text to filter results on
+            record_ids: list of integers, if not None, results are limited
+                to records with these ids.
         """
         self.table = table
         self.keyword = keyword
+        self.record_ids = record_ids
 
     def dump(self, output):
         """Dump search results to file.
 
+        A gzip compressed copy, output + '.gz', is written as well so it can
+        be served as is.
+
         Args:
             output: string, name of output file.
         """
-        items = self.search()
-        with TemporaryDirectory() as tmp_dir:
-            out_file = os.path.join(tmp_dir, 'output.json')
-            with open(out_file, 'w', encoding='utf-8') as outfile:
-                outfile.write(json.dumps(items))
-            shutil.move(out_file, output)
+        write_dump(output, self.search())
 
     def filters(self):
         """Define query filters.
@@ -54,6 +64,8 @@ class BaseAutocompleter():
         if self.keyword:
             url_kw = urlify(self.keyword)
             queries.append((self.search_field().contains(url_kw)))
+        if self.record_ids is not None:
+            queries.append((self.id_field().belongs(self.record_ids)))
         return queries
 
     def formatted_value(self, record_id):
@@ -72,6 +84,24 @@ class BaseAutocompleter():
         """
         return self.table['id']
 
+    def indexed_search(self, limit=MAX_RESULTS):
+        """Return search results using the prefix index of the prefetch file.
+
+        Falls back to search() if the prefetch file is not available.
+
+        Args:
+            limit: integer, maximum number of results returned. If None,
+                all results are returned.
+
+        Returns:
+            list of dicts, see row_to_json
+        """
+        index = prefix_index(self.prefetch_filename())
+        if index is None:
+            results = self.search()
+            return results[:limit] if limit is not None else results
+        return index.search(self.keyword, limit=limit)
+
     def left_join(self):
         """Dal expression to use for left join in results query.
 
@@ -88,6 +118,19 @@ class BaseAutocompleter():
         """
         return self.table['name_for_search']
 
+    def prefetch_filename(self):
+        """Return the name of the prefetch json file for the table.
+
+        Returns:
+            string, name of file including path.
+        """
+        return os.path.join(
+            current.request.folder,
+            'static',
+            'data',
+            '{t}s.json'.format(t=str(self.table))
+        )
+
     def row_to_json(self, row):
         """Return the row formatted for json.
 
@@ -129,13 +172,42 @@ class BaseAutocompleter():
         """
         return self.table['name_for_search']
 
+    def update(self, output):
+        """Update the items of record_ids in a dump file.
+
+        Items of records no longer in search results are removed, others are
+        replaced and new ones are added. Items are ordered as in a full dump,
+        by orderby(). If the dump file cannot be read, all search results are
+        dumped.
+
+        Args:
+            output: string, name of output file.
+        """
+        completer = copy.copy(self)
+        completer.record_ids = None
+        try:
+            with open(output, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        except (IOError, OSError, ValueError) as err:
+            LOG.error('Unable to read %s, dumping all: %s', output, err)
+            completer.dump(output)
+            return
+
+        record_ids = set(self.record_ids or [])
+        items = {x['id']: x for x in existing if x['id'] not in record_ids}
+        items.update({x['id']: x for x in self.search()})
+
+        # Only ids are selected, the items are not formatted again.
+        ordered_ids = [x.id for x in completer.search_rows()]
+        write_dump(output, [items[x] for x in ordered_ids if x in items])
+
 
 class BookAutocompleter(BaseAutocompleter):
     """Class representing a book autocompleter"""
 
-    def __init__(self, keyword=''):
+    def __init__(self, keyword='', record_ids=None):
         db = current.app.db
-        super().__init__(db.book, keyword=keyword)
+        super().__init__(db.book, keyword=keyword, record_ids=record_ids)
 
     def filters(self):
         db = current.app.db
@@ -154,9 +226,9 @@ class BookAutocompleter(BaseAutocompleter):
 class CreatorAutocompleter(BaseAutocompleter):
     """Class representing a creator autocompleter"""
 
-    def __init__(self, keyword=''):
+    def __init__(self, keyword='', record_ids=None):
         db = current.app.db
-        super().__init__(db.creator, keyword=keyword)
+        super().__init__(db.creator, keyword=keyword, record_ids=record_ids)
 
     def filters(self):
         db = current.app.db
@@ -175,6 +247,66 @@ class CreatorAutocompleter(BaseAutocompleter):
         return [db.book.on(db.book.creator_id == db.creator.id)]
 
 
+class PrefixIndex():
+    """Class representing an in-memory index of autocomplete items.
+
+    Every suffix of the search name of every item is kept in a sorted list
+    so items containing a keyword are found with a binary search. This
+    matches the LIKE '%keyword%' filter of the autocompleters.
+    """
+
+    def __init__(self, items):
+        """Constructor
+
+        Args:
+            items: list of dicts, as returned by BaseAutocompleter.search().
+                Results are returned in the order of the items.
+        """
+        self.items = list(items)
+        suffixes = []
+        for position, item in enumerate(self.items):
+            name = urlify(str(item['value']))
+            suffixes.extend((name[x:], position) for x in range(len(name)))
+        suffixes.sort()
+        self._suffixes = [x[0] for x in suffixes]
+        self._positions = [x[1] for x in suffixes]
+
+    @classmethod
+    def from_file(cls, filename):
+        """Create an index from a prefetch json file.
+
+        Args:
+            filename: string, name of file including path.
+
+        Returns:
+            PrefixIndex instance
+        """
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def search(self, keyword, limit=None):
+        """Return the items matching a keyword.
+
+        Args:
+            keyword: string, keyword text to filter results on
+            limit: integer, maximum number of results returned. If None,
+                all results are returned.
+
+        Returns:
+            list of dicts
+        """
+        url_kw = urlify(keyword) if keyword else ''
+        if not url_kw:
+            return self.items[:limit] if limit is not None else self.items
+
+        start = bisect.bisect_left(self._suffixes, url_kw)
+        end = bisect.bisect_left(self._suffixes, url_kw + chr(0x10ffff))
+        positions = sorted(set(self._positions[start:end]))
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.items[x] for x in positions]
+
+
 def autocompleter_class(table):
     """Return BaseAutocompleter subclass for the table."""
     if table == 'book':
@@ -182,3 +314,52 @@ def autocompleter_class(table):
     if table == 'creator':
         return CreatorAutocompleter
     return None
+
+
+def prefix_index(filename):
+    """Return the prefix index for a prefetch json file.
+
+    Indexes are kept in memory and reloaded when the file changes.
+
+    Args:
+        filename: string, name of file including path.
+
+    Returns:
+        PrefixIndex instance, None if the file is not available.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _PREFIX_INDEXES.get(filename)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    try:
+        index = PrefixIndex.from_file(filename)
+    except (IOError, OSError, ValueError) as err:
+        LOG.error('Unable to load prefetch file %s: %s', filename, err)
+        return None
+    _PREFIX_INDEXES[filename] = (signature, index)
+    return index
+
+
+def write_dump(output, items):
+    """Write autocomplete items to a dump file.
+
+    The file, and a gzip compressed copy, output + '.gz', are written
+    atomically.
+
+    Args:
+        output: string, name of output file.
+        items: list of dicts, see BaseAutocompleter.row_to_json
+    """
+    content = json.dumps(items)
+    write_atomic(output, content)
+    write_atomic(
+        output + '.gz',
+        gzip.compress(content.encode('utf-8')),
+        mode='wb'
+    )
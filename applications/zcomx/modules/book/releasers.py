@@ -12,6 +12,8 @@ from applications.zcomx.modules.books import (
     images as book_images,
 )
 from applications.zcomx.modules.creators import images as creator_images
+from applications.zcomx.modules.fragment_caches import \
+    bump_content_version
 from applications.zcomx.modules.images_optimize import (
     CBZImagesForRelease,
 )
@@ -27,6 +29,8 @@ from applications.zcomx.modules.job_queuers import (
     ReverseSetBookCompletedQueuer,
     SetBookCompletedQueuer,
     UpdateIndiciaForReleaseQueuer,
+    queue_creator_grid,
+    queue_download_catalog,
 )
 from applications.zcomx.modules.zco import IN_PROGRESS
 
@@ -106,6 +110,8 @@ class ReleaseBook(BaseReleaser):
                 time_stamp=datetime.datetime.now(),
             )
             db.commit()
+        queue_creator_grid(creator_id=self.book.creator_id)
+        bump_content_version()
         return jobs
 
 
@@ -125,6 +131,8 @@ class UnreleaseBook(BaseReleaser):
         if self.book.twitter_post_id == IN_PROGRESS:
             data['twitter_post_id'] = None
         self.book = Book.from_updated(self.book, data)
+        queue_creator_grid(creator_id=self.book.creator_id)
+        bump_content_version()
         return []
 
 
@@ -199,6 +207,7 @@ class FileshareBook(BaseReleaser):
             fileshare_in_progress=False,
         )
         self.book = Book.from_updated(self.book, data)
+        queue_download_catalog(creator_id=self.book.creator_id)
         return []
 
 
@@ -245,4 +254,5 @@ class UnfileshareBook(BaseReleaser):
         )
 
         self.book = Book.from_updated(self.book, data)
+        queue_download_catalog(creator_id=self.book.creator_id)
         return jobs
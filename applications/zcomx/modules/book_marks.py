@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to reader book marks.
+
+A book mark is the last page no read of a book. Book marks are kept in the
+cache, memcache if configured, one entry per reader, rather than in the
+session, so setting a mark on each page turn neither writes nor locks the
+session file. Marks of logged in users are also saved in the book_mark
+table. Writes to the table are coalesced, the marks changed are saved at
+most once per FLUSH_SECONDS per reader. Marks changed since the last save
+are saved by the next set or read of the reader's marks once FLUSH_SECONDS
+have passed, so the last mark of a burst of page turns is saved when the
+reader next opens a book. Marks not saved are lost if the cache entry is
+evicted.
+
+The cache entry is updated with a read-modify-write without a compare and
+swap. Requests are no longer serialized by the session lock, so concurrent
+requests of a reader, eg two tabs, may overwrite each other's marks. The
+worst case is a stale page no.
+
+The cache is current.cache.ram, which is the MemcacheClient when memcached
+is configured (see stickon/tools.py). Without memcached the RAM cache is per
+process. The marks of logged in users are then reloaded from the book_mark
+table every RELOAD_SECONDS, after saving the marks not yet saved, so marks
+saved by other processes are seen within minutes. The marks of readers not
+logged in are only seen by the process that set them.
+"""
+import time
+from gluon import *
+from applications.zcomx.modules.records import Record
+
+LOG = current.app.logger
+
+FLUSH_SECONDS = 60
+RELOAD_SECONDS = 300
+TIME_EXPIRE = 30 * 24 * 60 * 60         # 30 days
+
+
+class BookMark(Record):
+    """Class representing a book_mark record."""
+    db_table = 'book_mark'
+
+
+class BookMarkStore():
+    """Class representing the book marks of a reader."""
+
+    def __init__(
+            self,
+            reader_key,
+            auth_user_id=None,
+            cache_model=None,
+            flush_seconds=FLUSH_SECONDS,
+            reload_seconds=None):
+        """Constructor
+
+        Args:
+            reader_key: string, key identifying the reader, eg session id.
+            auth_user_id: integer, id of auth_user record of reader. If
+                provided, marks are saved in the book_mark table.
+            cache_model: cache instance, eg cache.memcache.
+                Default current.cache.ram
+            flush_seconds: integer, minimum number of seconds between saves
+                of the marks to the book_mark table.
+            reload_seconds: integer, if provided, the marks of logged in
+                users are reloaded from the book_mark table when loaded at
+                least this many seconds ago. Use with a per process cache.
+        """
+        self.reader_key = reader_key
+        self.auth_user_id = auth_user_id
+        self.cache_model = cache_model if cache_model is not None \
+            else current.cache.ram
+        self.flush_seconds = flush_seconds
+        self.reload_seconds = reload_seconds
+
+    def _entry(self):
+        """Return the cache entry of the reader's marks. If not cached, or
+        if a reload is due, the marks are loaded from the book_mark table.
+
+        Returns:
+            dict, {
+                'dirty': list of ids of books with marks not saved,
+                'flushed_on': float, time the marks were last saved,
+                'loaded_on': float, time the marks were loaded,
+                'marks': dict, {book_id: page_no},
+            }
+        """
+        entry = self.cache_model(
+            self.cache_key, self._load, time_expire=TIME_EXPIRE)
+        if self._is_reload_due(entry):
+            flushed = dict(entry)
+            self.flush(entry=flushed)
+            entry = dict(self._load(), flushed_on=flushed['flushed_on'])
+            self.cache_model(self.cache_key, lambda: entry, time_expire=0)
+        return {
+            'dirty': list(entry['dirty']),
+            'flushed_on': entry['flushed_on'],
+            'loaded_on': entry['loaded_on'],
+            'marks': dict(entry['marks']),
+        }
+
+    def _is_flush_due(self, entry):
+        """Return whether the marks of a cache entry are due to be saved.
+
+        Args:
+            entry: dict, cache entry, see _entry()
+
+        Returns:
+            True if marks are not saved and were last saved at least
+                flush_seconds ago.
+        """
+        if not self.auth_user_id or not entry['dirty']:
+            return False
+        return time.time() - entry['flushed_on'] >= self.flush_seconds
+
+    def _is_reload_due(self, entry):
+        """Return whether the marks of a cache entry are due to be reloaded
+        from the book_mark table.
+
+        Args:
+            entry: dict, cache entry, see _entry()
+
+        Returns:
+            True if the marks were loaded at least reload_seconds ago.
+        """
+        if self.reload_seconds is None or not self.auth_user_id:
+            return False
+        return time.time() - entry['loaded_on'] >= self.reload_seconds
+
+    def _load(self):
+        """Return a cache entry with the reader's marks from the book_mark
+        table.
+
+        Returns:
+            dict, see _entry()
+        """
+        db = current.app.db
+        marks = {}
+        if self.auth_user_id:
+            query = (db.book_mark.auth_user_id == self.auth_user_id)
+            rows = db(query).select(
+                db.book_mark.book_id, db.book_mark.page_no)
+            marks = {x.book_id: x.page_no for x in rows}
+        return {
+            'dirty': [],
+            'flushed_on': 0,
+            'loaded_on': time.time(),
+            'marks': marks,
+        }
+
+    @property
+    def cache_key(self):
+        """Return the key of the cache entry of the reader's marks.
+
+        Returns:
+            string
+        """
+        return 'book_marks_{k}'.format(k=self.reader_key)
+
+    def flush(self, entry=None):
+        """Save the marks not yet saved to the book_mark table.
+
+        Args:
+            entry: dict, cache entry, see _entry(). The entry is updated but
+                not cached. If None, the cached entry is flushed and cached.
+
+        Returns:
+            integer, number of marks saved.
+        """
+        db = current.app.db
+        cache = entry is None
+        if entry is None:
+            entry = self._entry()
+        if not self.auth_user_id or not entry['dirty']:
+            return 0
+
+        for book_id in entry['dirty']:
+            db.book_mark.update_or_insert(
+                (db.book_mark.auth_user_id == self.auth_user_id)
+                & (db.book_mark.book_id == book_id),
+                auth_user_id=self.auth_user_id,
+                book_id=book_id,
+                page_no=entry['marks'][book_id],
+            )
+        db.commit()
+        count = len(entry['dirty'])
+        entry['dirty'] = []
+        entry['flushed_on'] = time.time()
+        if cache:
+            self.cache_model(self.cache_key, lambda: entry, time_expire=0)
+        return count
+
+    def page_no(self, book_id):
+        """Return the page no of the reader's mark of a book.
+
+        Marks not yet saved are saved if due, this saves the last marks of
+        a burst of sets.
+
+        Args:
+            book_id: integer, id of book
+
+        Returns:
+            integer, page no, None if the book is not marked.
+        """
+        entry = self._entry()
+        if self._is_flush_due(entry):
+            self.flush(entry=entry)
+            self.cache_model(self.cache_key, lambda: entry, time_expire=0)
+        return entry['marks'].get(book_id)
+
+    def set(self, book_id, page_no):
+        """Set the reader's mark of a book.
+
+        Args:
+            book_id: integer, id of book
+            page_no: integer, page no
+
+        Returns:
+            True if the mark changed.
+        """
+        entry = self._entry()
+        if entry['marks'].get(book_id) == page_no:
+            return False
+        entry['marks'][book_id] = page_no
+        if book_id not in entry['dirty']:
+            entry['dirty'].append(book_id)
+        if self._is_flush_due(entry):
+            self.flush(entry=entry)
+        self.cache_model(self.cache_key, lambda: entry, time_expire=0)
+        return True
+
+
+def book_mark_store():
+    """Return the book mark store of the reader of the request.
+
+    Logged in users are identified by their auth_user id, other readers
+    by their session id.
+
+    Returns:
+        BookMarkStore instance, None if the reader cannot be identified.
+    """
+    auth_user_id = current.app.auth.user_id
+    if auth_user_id:
+        reader_key = 'user_{i}'.format(i=auth_user_id)
+    elif current.response.session_id:
+        reader_key = 'session_{i}'.format(i=current.response.session_id)
+    else:
+        return None
+    reload_seconds = None
+    if not current.app.local_settings.memcached_socket:
+        reload_seconds = RELOAD_SECONDS
+    return BookMarkStore(
+        reader_key,
+        auth_user_id=auth_user_id,
+        reload_seconds=reload_seconds,
+    )
@@ -249,7 +249,13 @@ def reset_book_page_nos(page_ids, book_page_tbl=None):
         raise LookupError(
             'Invalid book_page_tbl: {t}'.format(t=str(book_page_tbl)))
 
+    # Only pages whose page_no changes are updated, so appending a page to a
+    # book doesn't rewrite every page.
+    page_nos = {x.id: x.page_no for x in db(
+        book_page_tbl.id.belongs(page_ids)).select(
+            book_page_tbl.id, book_page_tbl.page_no)}
     for count, page_id in enumerate(page_ids):
+        if page_id not in page_nos or page_nos[page_id] == count + 1:
+            continue
         page = book_page_class.from_id(page_id)
-        if page:
-            book_page_class.from_updated(page, dict(page_no=(count + 1)))
+        book_page_class.from_updated(page, dict(page_no=(count + 1)))
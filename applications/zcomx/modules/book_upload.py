@@ -23,6 +23,10 @@ class Unpacker: A class representing an unpacker, eg unrar or unzip
     class UnpackerRAR: unrar unpacker
     class UnpackerZip: unzip unpacker
 
+Archives are unpacked one entry at a time. Each image is validated and
+stored as soon as it is extracted, so scratch disk use is limited to a single
+entry rather than the whole archive.
+
 If an image is uploaded there is one UploadedImage instance and one
 book_page_tmp record.
 
@@ -41,9 +45,13 @@ from applications.zcomx.modules.books import (
     book_page_for_json,
     get_page,
 )
-from applications.zcomx.modules.image.validators import CBZValidator
+from applications.zcomx.modules.image.validators import (
+    CBZValidator,
+    InvalidImageError,
+)
 from applications.zcomx.modules.images import (
     ImageDescriptor,
+    image_url,
     is_image,
     store,
 )
@@ -154,6 +162,9 @@ class UnpackError(Exception):
 class Unpacker(TempDirectoryMixin):
     """Base unpacker class representing an unpacker, eg unrar or unzip"""
 
+    chunk_size = 1024 * 1024
+    scratch_limit = 200 * 1024 * 1024       # Max bytes of one extracted entry
+
     def __init__(self, filename):
         """Constructor
 
@@ -162,6 +173,52 @@ class Unpacker(TempDirectoryMixin):
         """
         self.filename = filename
 
+    def entries(self):
+        """Extract image files one archive entry at a time.
+
+        Each entry is written to a scratch file in the temporary directory
+        and yielded if it is an image. The scratch file is removed before the
+        next entry is extracted so at most one entry, no larger than
+        scratch_limit, is on disk at a time.
+
+        Yields:
+            string, name of extracted image file including path.
+
+        Raises:
+            UnpackError if the archive or an entry can't be read.
+        """
+        tmp_dir = self.temp_directory()
+        for name in self.entry_names():
+            basename = os.path.basename(name)
+            if not basename:
+                continue
+            scratch_filename = os.path.join(tmp_dir, basename)
+            try:
+                with open(scratch_filename, 'wb') as f:
+                    self.extract_entry(name, f)
+                if is_image(scratch_filename):
+                    yield scratch_filename
+            finally:
+                if os.path.exists(scratch_filename):
+                    os.unlink(scratch_filename)
+
+    def entry_names(self):
+        """Return the names of the archive entries in page order.
+
+        Returns:
+            list of strings
+        """
+        raise NotImplementedError()
+
+    def extract_entry(self, name, dst):
+        """Extract an archive entry.
+
+        Args:
+            name: string, name of entry in archive
+            dst: file object, the entry content is written to this.
+        """
+        raise NotImplementedError()
+
     def image_files(self):
         """Find image files amoung extracted files."""
 
@@ -175,6 +232,26 @@ class Unpacker(TempDirectoryMixin):
                     image_files.append(fullname)
         return sorted(image_files)
 
+    def _copy_limited(self, src, dst):
+        """Copy an entry stream to file, enforcing the scratch limit.
+
+        Args:
+            src: file object, entry stream to read from
+            dst: file object, to write to
+
+        Raises:
+            UnpackError if the entry is larger than scratch_limit
+        """
+        size = 0
+        while True:
+            chunk = src.read(self.chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > self.scratch_limit:
+                raise UnpackError('Archive file is too large to unpack.')
+            dst.write(chunk)
+
 
 class UnpackerRAR(Unpacker):
     """Class representing a RAR unpacker"""
@@ -187,6 +264,19 @@ class UnpackerRAR(Unpacker):
         """
         Unpacker.__init__(self, filename)
 
+    def entry_names(self):
+        # 'unrar e' extracts without paths so pages are ordered by basename.
+        with subprocess.Popen(
+                ['unrar', 'lb', self.filename],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE) as p:
+            output, errors = p.communicate()
+        if p.returncode:
+            msg = ', '.join([x for x in errors.decode().split("\n") if x])
+            raise UnpackError(msg or 'Unable to read archive.')
+        names = [x for x in output.decode().split("\n") if x]
+        return sorted(names, key=os.path.basename)
+
     def extract(self):
         """Extract files."""
         tmp_dir = self.temp_directory()
@@ -202,10 +292,28 @@ class UnpackerRAR(Unpacker):
 
         return self.image_files()
 
+    def extract_entry(self, name, dst):
+        # 'unrar p' prints the entry to stdout, -inul suppresses messages.
+        with subprocess.Popen(
+                ['unrar', 'p', '-inul', '--', self.filename, name],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE) as p:
+            try:
+                self._copy_limited(p.stdout, dst)
+            except UnpackError:
+                p.kill()
+                raise
+            p.wait()
+        if p.returncode:
+            raise UnpackError(
+                'Unable to unpack: {n}'.format(n=os.path.basename(name)))
+
 
 class UnpackerZip(Unpacker):
     """Class representing a zip unpacker"""
 
+    _zip_file = None
+
     def __init__(self, filename):
         """Constructor
 
@@ -214,6 +322,22 @@ class UnpackerZip(Unpacker):
         """
         Unpacker.__init__(self, filename)
 
+    def entries(self):
+        # Keep the archive open while entries are extracted so the central
+        # directory is read once.
+        try:
+            with zipfile.ZipFile(self.filename, allowZip64=True) as f:
+                self._zip_file = f
+                yield from Unpacker.entries(self)
+        except (IOError, RuntimeError, zipfile.BadZipfile) as err:
+            raise UnpackError(str(err)) from err
+        finally:
+            self._zip_file = None
+
+    def entry_names(self):
+        return sorted(
+            [x.filename for x in self._zip_file.infolist() if not x.is_dir()])
+
     def extract(self):
         """Extract files."""
         tmp_dir = self.temp_directory()
@@ -225,6 +349,10 @@ class UnpackerZip(Unpacker):
             raise UnpackError(str(err))
         return self.image_files()
 
+    def extract_entry(self, name, dst):
+        with self._zip_file.open(name) as src:
+            self._copy_limited(src, dst)
+
 
 class UploadedFile():
     """Base class representing a single uploaded file."""
@@ -292,6 +420,21 @@ class UploadedArchive(UploadedFile):
         """
         UploadedFile.__init__(self, filename)
 
+    def delete_book_pages(self):
+        """Delete the book pages created from the archive, including the
+        stored images of all sizes.
+        """
+        for book_page_id in self.book_page_ids:
+            if not book_page_id:
+                continue
+            try:
+                book_page = BookPageTmp.from_id(book_page_id)
+            except LookupError:
+                continue
+            book_page.upload_image().delete_all()
+            book_page.delete()
+        self.book_page_ids = []
+
     def for_json(self):
         """Return uploaded files as json appropriate for jquery-file-upload."""
         book_page_id = self.book_page_ids[0] if self.book_page_ids else 0
@@ -305,12 +448,7 @@ class UploadedArchive(UploadedFile):
             if book_page_id else None
         thumb = ''
         if cover_page:
-            thumb = URL(
-                c='images',
-                f='download',
-                args=cover_page.image,
-                vars={'size': 'web'},
-            )
+            thumb = image_url(cover_page.image, size='web')
 
         json_data = dict(
             book_page_id=book_page_id,
@@ -326,6 +464,32 @@ class UploadedArchive(UploadedFile):
             json_data['error'] = ', '.join(self.errors)
         return json_data
 
+    def load(self, book_id):
+        """Load uploaded file into database.
+
+        Archive entries are validated and stored one at a time as they are
+        extracted. If an image is invalid or an entry can't be unpacked, the
+        pages already created from the archive are deleted so the archive is
+        loaded all or nothing.
+
+        Raises:
+            InvalidImageError
+        """
+        try:
+            for image_filename in self.unpacker.entries():
+                validator = CBZValidator(image_filename)
+                validator.validate(image_descriptor=ImageDescriptor)
+                book_page_id = create_book_page(book_id, image_filename)
+                self.book_page_ids.append(book_page_id)
+        except UnpackError as err:
+            self.delete_book_pages()
+            self.errors.append(str(err))
+        except InvalidImageError:
+            self.delete_book_pages()
+            raise
+        finally:
+            self.unpacker.cleanup()
+
     def unpack(self):
         """Unpack file."""
         try:
@@ -17,14 +17,18 @@ from applications.zcomx.modules.book_pages import (
 )
 from applications.zcomx.modules.book_types import BookType
 from applications.zcomx.modules.cc_licences import CCLicence
+from applications.zcomx.modules.creator_grids import increment_creator_grid
 from applications.zcomx.modules.creators import (
     Creator,
     creator_name,
     short_url as creator_short_url,
 )
+from applications.zcomx.modules.fragment_caches import \
+    bump_content_version
 from applications.zcomx.modules.images import (
     CachedImgTag,
     ImageDescriptor,
+    image_url,
 )
 from applications.zcomx.modules.names import (
     BookName,
@@ -36,7 +40,9 @@ from applications.zcomx.modules.records import (
     Record,
     Records,
 )
+from applications.zcomx.modules.rollups import event_counts
 from applications.zcomx.modules.shell_utils import tthsum
+from applications.zcomx.modules.url_names import URL_NAME_CACHE
 from applications.zcomx.modules.zco import (
     BOOK_STATUSES,
     BOOK_STATUS_ACTIVE,
@@ -49,6 +55,13 @@ from applications.zcomx.modules.zco import (
 DEFAULT_BOOK_TYPE = 'one-shot'
 LOG = current.app.logger
 
+# Accumulated ratings of books, see update_rating()
+RATINGS = ['contribution', 'download', 'rating', 'view']
+
+# {rating: event table}, ratings whose events are archived. They are tallied
+# from the rollups, see rollups.event_counts()
+ROLLED_UP_RATINGS = {'download': 'download', 'view': 'book_view'}
+
 
 class Book(Record):
     """Class representing a book record."""
@@ -144,18 +157,9 @@ def book_page_for_json(book_page):
     filename = book_page.upload_image().original_name()
     size = ImageDescriptor(book_page.upload_image().fullname()).size_bytes()
 
-    down_url = URL(
-        c='images',
-        f='download',
-        args=book_page.image,
-    )
+    down_url = image_url(book_page.image)
 
-    thumb = URL(
-        c='images',
-        f='download',
-        args=book_page.image,
-        vars={'size': 'web'},
-    )
+    thumb = image_url(book_page.image, size='web')
 
     delete_url = URL(
         c='login',
@@ -203,53 +207,125 @@ def book_pages_as_json(book, book_page_ids=None):
     return json.dumps(dict(files=json_pages))
 
 
-def book_pages_from_tmp(book):
-    """Copy book_page_tmp records associated with book to book_page records.
+def book_pages_diff(book):
+    """Compare the book_page_tmp and book_page records associated with book.
+
+    A book_page record is copied from a book_page_tmp record keeping its id
+    and image, with the table name in the image replaced. Pages are matched
+    on those so only pages added, removed or changed during an upload session
+    are reported.
 
     Args:
         book: Book instance
+
+    Returns:
+        dict, {
+            'deletes': list of BookPage instances not found in tmp pages,
+            'inserts': list of tuples (BookPageTmp instance, dict of
+                book_page data),
+            'updates': list of tuples (BookPage instance, dict of changes),
+        }
     """
     db = current.app.db
+    live_pages = {(x.id, x.image): x for x in book.pages()}
 
-    for page in book.pages():
-        page.delete()
-
-    for page in book.tmp_pages():
-        data = page.as_dict()
-        data['image'] = page.image.replace(
+    inserts = []
+    updates = []
+    for tmp_page in book.tmp_pages():
+        data = {x: tmp_page[x] for x in db.book_page.fields}
+        data['image'] = tmp_page.image.replace(
             'book_page_tmp.image',
             'book_page.image'
         )
-        BookPage.from_add(
-            data,
-            validate=False,
-        )
+        page = live_pages.pop((data['id'], data['image']), None)
+        if page is None:
+            inserts.append((tmp_page, data))
+            continue
+        changes = {k: v for k, v in data.items() if page[k] != v}
+        if changes:
+            updates.append((page, changes))
+
+    return {
+        'deletes': list(live_pages.values()),
+        'inserts': inserts,
+        'updates': updates,
+    }
+
+
+def book_pages_from_tmp(book):
+    """Copy book_page_tmp records associated with book to book_page records.
 
-        page.copy_images(db.book_page)
+    Only the differences are applied, see book_pages_diff, so images are
+    copied for new pages only. The record changes are committed in one
+    transaction.
+
+    Args:
+        book: Book instance
+    """
+    db = current.app.db
+    diff = book_pages_diff(book)
+
+    for tmp_page, unused_data in diff['inserts']:
+        tmp_page.copy_images(db.book_page)
+
+    try:
+        for page in diff['deletes']:
+            db(db.book_page.id == page.id).delete()
+        for page, changes in diff['updates']:
+            db(db.book_page.id == page.id).update(**changes)
+        for unused_tmp_page, data in diff['inserts']:
+            db.book_page.insert(**data)
+    except Exception:
+        db.rollback()
+        raise
+    db.commit()
+
+    if diff['deletes'] or diff['updates'] or diff['inserts']:
+        bump_content_version()
 
 
 def book_pages_to_tmp(book):
     """Copy book_page records associated with book to book_page_tmp records.
 
+    The book_page_tmp records left by the previous upload session match the
+    book_page records, see book_pages_diff. Only pages that differ are
+    replaced, so images are copied for pages added or changed since, not for
+    every page of the book.
+
     Args:
         book: Book instance
     """
     db = current.app.db
+    tmp_pages = {(x.id, x.image): x for x in book.tmp_pages()}
 
-    for page in book.tmp_pages():
-        page.delete()
-
+    inserts = []
     for page in book.pages():
         data = page.as_dict()
         data['image'] = page.image.replace(
             'book_page.image',
             'book_page_tmp.image'
         )
+        tmp_page = tmp_pages.pop((data['id'], data['image']), None)
+        if tmp_page is None:
+            inserts.append((page, data))
+            continue
+        changes = {k: v for k, v in data.items() if tmp_page[k] != v}
+        if changes:
+            db(db.book_page_tmp.id == tmp_page.id).update(**changes)
+            db.commit()
+
+    # Delete before inserting, an unmatched tmp page may have the id of a
+    # book page.
+    for tmp_page in tmp_pages.values():
+        if tmp_page.image:
+            tmp_page.upload_image().delete_all()
+        tmp_page.delete()
+
+    for page, data in inserts:
         BookPageTmp.from_add(
             data,
             validate=False,
         )
-
         page.copy_images(db.book_page_tmp)
 
 
@@ -276,6 +352,8 @@ def book_tables():
     return [
         'activity_log',
         'tentative_activity_log',
+        'book_daily_rollup',
+        'book_mark',
         'book_page',
         'book_page_tmp',
         'book_view',
@@ -415,8 +493,7 @@ def cbz_url(book, **url_kwargs):
         string, url, eg
             http://zco.mx/FirstLast/MyBook-001.cbz
     """
-    creator = Creator.from_id(book.creator_id)
-    name_of_creator = creator_name(creator, use='url')
+    name_of_creator = creator_url_name(book)
     if not name_of_creator:
         return
 
@@ -553,12 +630,14 @@ def contributions_remaining_by_creator(creator):
     return total
 
 
-def contributions_target(book):
+def contributions_target(book, page_count=None):
     """Return the contributions target for the book.
 
 
     Args:
         book: Book instance
+        page_count: integer, number of pages of the book. Default
+            book.page_count()
 
     Returns:
         float, dollar amount of contributions target.
@@ -568,24 +647,33 @@ def contributions_target(book):
     if not book:
         return 0.00
 
-    amount = int((rate_per_page * book.page_count()) + 0.5)
+    if page_count is None:
+        page_count = book.page_count()
+    amount = int((rate_per_page * page_count) + 0.5)
     return amount
 
 
-def cover_image(book, size='original', img_attributes=None):
+def cover_image(
+        book,
+        size='original',
+        img_attributes=None,
+        first_page=None):
     """Return html code suitable for the cover image.
 
     Args:
         book: Book instance
         size: string, the size of the image. One of SIZES
         img_attributes: dict of attributes for IMG
+        first_page: BookPage instance, first page of book, if None, it is
+            looked up.
     """
     image = None
     if book:
-        try:
-            first_page = get_page(book, page_no='first')
-        except LookupError:
-            first_page = None
+        if first_page is None:
+            try:
+                first_page = get_page(book, page_no='first')
+            except LookupError:
+                first_page = None
 
         image = first_page.image if first_page else None
 
@@ -597,6 +685,22 @@ def cover_image(book, size='original', img_attributes=None):
     return CachedImgTag(image, size=size, attributes=attributes)()
 
 
+def creator_url_name(book, creator=None):
+    """Return the url name of the creator of a book.
+
+    Args:
+        book: Book instance
+        creator: Creator instance, creator of book. If None, the name is
+            looked up in the url name cache.
+
+    Returns:
+        string, creator name_for_url, None if the creator is not found.
+    """
+    if creator is not None:
+        return creator_name(creator, use='url')
+    return URL_NAME_CACHE.creator_name(book.creator_id)
+
+
 def default_contribute_amount(book):
     """Return the default amount for the contribute widget.
 
@@ -843,13 +947,14 @@ def follow_link(book, components=None, **attributes):
     return A(*components, **kwargs)
 
 
-def formatted_name(book, include_publication_year=True):
+def formatted_name(book, include_publication_year=True, book_type=None):
     """Return the formatted name of the book
 
     Args:
         book: Book instance
         include_publication_year: If True, the publication year is included in
             the name.
+        book_type: BookType instance, type of book, if None, it is looked up.
     """
     if not book:
         return ''
@@ -859,7 +964,7 @@ def formatted_name(book, include_publication_year=True):
         'name': book.name,
     }
 
-    number = formatted_number(book)
+    number = formatted_number(book, book_type=book_type)
     if number:
         fmt = '{name} {num}'
         data['num'] = number
@@ -870,15 +975,17 @@ def formatted_name(book, include_publication_year=True):
     return fmt.format(**data)
 
 
-def formatted_number(book):
+def formatted_number(book, book_type=None):
     """Return the number of the book formatted.
 
     Args:
         book: Book instance
+        book_type: BookType instance, type of book, if None, it is looked up.
     """
     if not book:
         return ''
-    book_type = BookType.classified_from_id(book.book_type_id)
+    if book_type is None:
+        book_type = BookType.classified_from_id(book.book_type_id)
     return book_type.formatted_number(book.number, book.of_number)
 
 
@@ -992,21 +1099,15 @@ def html_metadata(book):
     except LookupError:
         first_page = None
 
-    image_url = None
+    first_page_url = None
     if first_page:
-        image_url = URL(
-            c='images',
-            f='download',
-            args=first_page.image,
-            vars={'size': 'web'},
-            host=True,
-        )
+        first_page_url = image_url(first_page.image, size='web', host=True)
 
     return {
         'creator_name': creator.name,
         'creator_twitter': creator.twitter,
         'description': book.description,
-        'image_url': image_url,
+        'image_url': first_page_url,
         'name': formatted_name(book, include_publication_year=True),
         'type': 'book',
         'url': url(book, host=True),
@@ -1048,6 +1149,51 @@ def images(book):
     return image_names
 
 
+def increment_rating(book, rating, amount=0, count=1):
+    """Increment an accumulated rating of a book by the events logged.
+
+    The book is updated once without reading the event tables.
+
+    Args:
+        book: Book instance
+        rating: string, one of RATINGS
+        amount: float, total amount of the events, 'contribution' and
+            'rating' only.
+        count: integer, number of events.
+    """
+    db = current.app.db
+    if rating == 'contribution':
+        data = dict(
+            contributions=db.book.contributions.coalesce_zero() + amount)
+    elif rating == 'download':
+        data = dict(downloads=db.book.downloads.coalesce_zero() + count)
+    elif rating == 'rating':
+        data = dict(
+            rating_count=db.book.rating_count.coalesce_zero() + count,
+            rating_total=db.book.rating_total.coalesce_zero() + amount,
+        )
+    elif rating == 'view':
+        data = dict(views=db.book.views.coalesce_zero() + count)
+    else:
+        raise SyntaxError('Invalid rating: {r}'.format(r=rating))
+
+    db(db.book.id == book.id).update(**data)
+    if rating == 'rating':
+        # The average is set in a separate statement. The order of the SET
+        # assignments isn't fixed and MySQL applies them left to right, so
+        # in one statement it could be calculated from updated totals.
+        query = (db.book.id == book.id) & (db.book.rating_count > 0)
+        db(query).update(rating=db.book.rating_total / db.book.rating_count)
+    if rating == 'download':
+        increment_creator_grid(book.creator_id, downloads=count)
+    elif rating == 'view':
+        increment_creator_grid(book.creator_id, views=count)
+    db.commit()
+
+    if rating == 'contribution':
+        update_contributions_remaining(Book.from_id(book.id))
+
+
 def is_completed(book):
     """Determine if the book is completed.
 
@@ -1223,6 +1369,8 @@ def page_url(
         reader=None,
         embed=False,
         zbr_origin=None,
+        book=None,
+        creator=None,
         **url_kwargs):
     """Return a url suitable for the reader webpage of a book page.
 
@@ -1233,6 +1381,8 @@ def page_url(
         embed: if True add embed to url
         zbr_origin: zco book reader origin url, used by book reader
             postMessage() calles.
+        book: Book instance, book of page, if None, it is looked up.
+        creator: Creator instance, creator of book, if None, it is looked up.
         url_kwargs: dict of kwargs for URL(). Eg {'extension': False}
     Returns:
         string, url,
@@ -1240,10 +1390,10 @@ def page_url(
             (routes_out should convert it to
             http://zco.mx/First_Last/My_Book_(2014))/002
     """
-    book = Book.from_id(book_page.book_id)
+    if book is None:
+        book = Book.from_id(book_page.book_id)
 
-    creator = Creator.from_id(book.creator_id)
-    name_of_creator = creator_name(creator, use='url')
+    name_of_creator = creator_url_name(book, creator=creator)
     if not name_of_creator:
         return
 
@@ -1303,11 +1453,100 @@ def publication_year_range():
     return (1970, datetime.date.today().year + 5)
 
 
+def rating_aggregates(rating):
+    """Return the event table of a rating and the book fields tallied from
+    it.
+
+    Args:
+        rating: string, one of RATINGS
+
+    Returns:
+        tuple, (Table instance, list of (book field name, aggregate))
+    """
+    db = current.app.db
+    if rating == 'contribution':
+        return (
+            db.contribution,
+            [('contributions', db.contribution.amount.sum())],
+        )
+    if rating == 'download':
+        return (db.download, [('downloads', db.download.id.count())])
+    if rating == 'rating':
+        return (
+            db.rating,
+            [
+                ('rating', db.rating.amount.avg()),
+                ('rating_count', db.rating.id.count()),
+                ('rating_total', db.rating.amount.sum()),
+            ],
+        )
+    if rating == 'view':
+        return (db.book_view, [('views', db.book_view.id.count())])
+    raise SyntaxError('Invalid rating: {r}'.format(r=rating))
+
+
+def rating_fields(ratings=None):
+    """Return the names of the book fields accumulated from ratings.
+
+    Args:
+        ratings: list of strings, see RATINGS. Default all.
+
+    Returns:
+        list of strings
+    """
+    fields = []
+    for rating in ratings or RATINGS:
+        fields.extend([x[0] for x in rating_aggregates(rating)[1]])
+    return fields
+
+
+def rating_tallies(ratings=None, book_ids=None):
+    """Return the accumulated ratings of books tallied from the event
+    tables, one GROUP BY select per table. Ratings whose events are
+    archived are tallied from the rollups, see ROLLED_UP_RATINGS.
+
+    Args:
+        ratings: list of strings, see RATINGS. Default all.
+        book_ids: list of integers, ids of books. Default all.
+
+    Returns:
+        dict, {book_id: {book field name: value}}. Books without events are
+            not included.
+    """
+    db = current.app.db
+    tallies = {}
+    for rating in ratings or RATINGS:
+        table, aggregates = rating_aggregates(rating)
+        if rating in ROLLED_UP_RATINGS:
+            name = aggregates[0][0]
+            counts = event_counts(
+                ROLLED_UP_RATINGS[rating], book_ids=book_ids)
+            for book_id, count in counts.items():
+                tallies.setdefault(book_id, {})[name] = count
+            continue
+        if book_ids is None:
+            query = (table.book_id > 0)
+        else:
+            query = (table.book_id.belongs(book_ids))
+        rows = db(query).select(
+            table.book_id,
+            *[x[1] for x in aggregates],
+            groupby=table.book_id
+        )
+        for row in rows:
+            data = tallies.setdefault(row[table.book_id], {})
+            for name, aggregate in aggregates:
+                data[name] = row[aggregate] or 0
+    return tallies
+
+
 def read_link(
         book,
         components=None,
         page_no='first',
         embed=False,
+        book_page=None,
+        creator=None,
         **attributes):
     """Return html code suitable for a 'Read' link.
 
@@ -1316,20 +1555,25 @@ def read_link(
         components: list, passed to A(*components),  default ['Read']
         page_no: integer or string, set def get_page()
         embed: if True, set the link for the embeded page.
+        book_page: BookPage instance, page to link to, if None, it is
+            looked up from page_no.
+        creator: Creator instance, creator of book, if None, it is looked up.
         attributes: dict of attributes for A()
     """
     empty = SPAN('')
     if not book:
         return empty
 
-    try:
-        want_page = get_page(book, page_no=page_no)
-    except LookupError:
-        # if the requested page is not found, try the first page
+    want_page = book_page
+    if want_page is None:
         try:
-            want_page = get_page(book, page_no='first')
+            want_page = get_page(book, page_no=page_no)
         except LookupError:
-            return empty
+            # if the requested page is not found, try the first page
+            try:
+                want_page = get_page(book, page_no='first')
+            except LookupError:
+                return empty
 
     if not components:
         components = ['Read']
@@ -1338,7 +1582,13 @@ def read_link(
     kwargs.update(attributes)
 
     if '_href' not in attributes:
-        kwargs['_href'] = page_url(want_page, embed=embed, extension=False)
+        kwargs['_href'] = page_url(
+            want_page,
+            embed=embed,
+            book=book,
+            creator=creator,
+            extension=False
+        )
 
     return A(*components, **kwargs)
 
@@ -1356,8 +1606,7 @@ def rss_url(book, **url_kwargs):
     if not book:
         return
 
-    creator = Creator.from_id(book.creator_id)
-    name_of_creator = creator_name(creator, use='url')
+    name_of_creator = creator_url_name(book)
     if not name_of_creator:
         return
 
@@ -1492,11 +1741,9 @@ def social_media_data(book):
 
     download_url = None
     if first_page:
-        download_url = URL(
-            c='images',
-            f='download',
-            args=first_page.image,
-            vars={'size': 'web'},
+        download_url = image_url(
+            first_page.image,
+            size='web',
             host=SITE_NAME,
             scheme='https',
         )
@@ -1517,6 +1764,63 @@ def social_media_data(book):
     }
 
 
+def tally_ratings():
+    """Reconcile the accumulated ratings of all books with the event tables.
+
+    The tallies are read with one GROUP BY select per event table and only
+    books and creators whose values differ are updated.
+
+    Returns:
+        list of integers, ids of books updated.
+    """
+    db = current.app.db
+    tallies = rating_tallies()
+    zeros = dict.fromkeys(rating_fields(), 0)
+
+    page_count = db.book_page.id.count()
+    page_counts = {
+        x.book_page.book_id: x[page_count]
+        for x in db(db.book_page).select(
+            db.book_page.book_id, page_count, groupby=db.book_page.book_id)
+    }
+
+    fields = [db.book[x] for x in sorted(zeros.keys())]
+    rows = db(db.book).select(
+        db.book.id,
+        db.book.creator_id,
+        db.book.status,
+        db.book.contributions_remaining,
+        *fields
+    )
+
+    updated = []
+    creator_remaining = {}
+    for row in rows:
+        data = dict(zeros)
+        data.update(tallies.get(row.id, {}))
+        target = contributions_target(
+            row, page_count=page_counts.get(row.id, 0))
+        data['contributions_remaining'] = max(
+            target - (data['contributions'] or 0), 0.00)
+        if row.status == BOOK_STATUS_ACTIVE and row.creator_id:
+            creator_remaining[row.creator_id] = \
+                creator_remaining.get(row.creator_id, 0) + \
+                data['contributions_remaining']
+        changed = {k: v for k, v in data.items() if row[k] != v}
+        if changed:
+            db(db.book.id == row.id).update(**changed)
+            updated.append(row.id)
+
+    rows = db(db.creator).select(
+        db.creator.id, db.creator.contributions_remaining)
+    for row in rows:
+        total = creator_remaining.get(row.id, 0)
+        if row.contributions_remaining != total:
+            db(db.creator.id == row.id).update(contributions_remaining=total)
+    db.commit()
+    return updated
+
+
 def torrent_file_name(book):
     """Return the name of the torrent file for the book.
 
@@ -1583,8 +1887,7 @@ def torrent_url(book, **url_kwargs):
     if not book:
         return
 
-    creator = Creator.from_id(book.creator_id)
-    name_of_creator = creator_name(creator, use='url')
+    name_of_creator = creator_url_name(book)
     if not name_of_creator:
         return
 
@@ -1631,53 +1934,22 @@ def update_contributions_remaining(book):
 def update_rating(book, rating=None):
     """Update an accumulated rating for a book.
 
+    The rating is recounted from the event tables and the book is updated
+    once. Events increment the ratings as they are logged, see
+    increment_rating(), so this is used to reconcile them.
+
     Args
         book: Book instance
-        rating: string, one of 'contribution', 'rating', 'view'. If None,
-                all ratings are updated.
+        rating: string, one of RATINGS. If None, all ratings are updated.
     """
-    db = current.app.db
-    ratings_data = {
-        'contribution': [
-            # (book field, data field, function, format)
-            (db.book.contributions, db.contribution.amount, 'sum'),
-        ],
-        'download': [
-            (db.book.downloads, db.download.id, 'count'),
-        ],
-        'rating': [
-            (db.book.rating, db.rating.amount, 'avg'),
-        ],
-        'view': [
-            (db.book.views, db.book_view.id, 'count'),
-        ],
-    }
-
-    if rating is not None and rating not in list(ratings_data.keys()):
+    if rating is not None and rating not in RATINGS:
         raise SyntaxError('Invalid rating: {r}'.format(r=rating))
 
-    ratings = [rating] if rating is not None else list(ratings_data.keys())
-
-    rating_data = []
-    for r in ratings:
-        rating_data.extend(ratings_data[r])
-
-    query = (db.book.id == book.id)
-    for field, data_field, func in rating_data:
-        data_table = data_field.table
-        if func == 'sum':
-            tally = data_field.sum()
-        elif func == 'avg':
-            tally = data_field.avg()
-        elif func == 'count':
-            tally = data_field.count()
-        rows = db(query).select(
-            tally,
-            left=[data_table.on(data_table.book_id == db.book.id)],
-            groupby=data_table.book_id
-        ).first()
-        value = rows[tally] or 0 if rows else 0
-        book = Book.from_updated(book, {field.name: value})
+    ratings = [rating] if rating is not None else None
+    data = dict.fromkeys(rating_fields(ratings=ratings), 0)
+    data.update(
+        rating_tallies(ratings=ratings, book_ids=[book.id]).get(book.id, {}))
+    book = Book.from_updated(book, data)
 
     if rating is None or rating == 'contribution':
         update_contributions_remaining(book)
@@ -1716,11 +1988,12 @@ def upload_link(book, components=None, **attributes):
     return A(*components, **kwargs)
 
 
-def url(book, **url_kwargs):
+def url(book, creator=None, **url_kwargs):
     """Return a url suitable for the book webpage.
 
     Args:
         book: Bow instance
+        creator: Creator instance, creator of book, if None, it is looked up.
         url_kwargs: dict of kwargs for URL(). Eg {'extension': False}
     Returns:
         string, url, eg http://zco.mx/creators/index/First_Last/My_Book_(2014)
@@ -1730,8 +2003,7 @@ def url(book, **url_kwargs):
     if not book or not book.name:
         return
 
-    creator = Creator.from_id(book.creator_id)
-    name_of_creator = creator_name(creator, use='url')
+    name_of_creator = creator_url_name(book, creator=creator)
     if not name_of_creator:
         return
 
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to the creator grid.
+
+The creator_grid table holds the per creator totals shown in the
+cartoonists grid: the number of completed and ongoing books and the views
+and downloads of the books. The rows are refreshed from the book records
+by private/bin/creator_grid.py, queued when books are added, released or
+deleted. The views and downloads counters are incremented in place as book
+events are logged.
+"""
+from gluon import *
+from applications.zcomx.modules.records import Record
+
+LOG = current.app.logger
+
+
+class CreatorGrid(Record):
+    """Class representing a creator_grid record."""
+    db_table = 'creator_grid'
+
+
+def creator_grid_totals(creator_ids=None):
+    """Return the creator grid totals calculated from the book records.
+
+    Args:
+        creator_ids: list of integers, ids of creators. If None, the totals
+            of all creators are returned.
+
+    Returns:
+        list of dicts, {field: value} of creator_grid records.
+    """
+    db = current.app.db
+    completed = (db.book.release_date != None).case(1, 0).sum()
+    # Creators without books are left joined to a null book.
+    ongoing = (
+        (db.book.id != None) & (db.book.release_date == None)
+    ).case(1, 0).sum()
+    downloads = db.book.downloads.sum()
+    views = db.book.views.sum()
+
+    query = (db.creator.id.belongs(creator_ids)) \
+        if creator_ids is not None else (db.creator)
+    rows = db(query).select(
+        db.creator.id,
+        completed,
+        ongoing,
+        downloads,
+        views,
+        left=[db.book.on(db.book.creator_id == db.creator.id)],
+        groupby=db.creator.id,
+    )
+    return [
+        dict(
+            creator_id=x[db.creator.id],
+            completed=x[completed] or 0,
+            ongoing=x[ongoing] or 0,
+            downloads=x[downloads] or 0,
+            views=x[views] or 0,
+        )
+        for x in rows
+    ]
+
+
+def increment_creator_grid(creator_id, downloads=0, views=0):
+    """Increment the downloads and views of a creator_grid record. The
+    caller commits.
+
+    Args:
+        creator_id: integer, id of creator
+        downloads: integer, number of downloads to add.
+        views: integer, number of views to add.
+    """
+    db = current.app.db
+    data = {}
+    if downloads:
+        data['downloads'] = db.creator_grid.downloads.coalesce_zero() \
+            + downloads
+    if views:
+        data['views'] = db.creator_grid.views.coalesce_zero() + views
+    if not creator_id or not data:
+        return
+    db(db.creator_grid.creator_id == creator_id).update(**data)
+
+
+def refresh_creator_grid(creator_ids=None):
+    """Refresh creator_grid records from the book records.
+
+    Args:
+        creator_ids: list of integers, ids of creators. If None, the table is
+            rebuilt.
+
+    Returns:
+        integer, number of creator_grid records refreshed.
+    """
+    db = current.app.db
+    totals = creator_grid_totals(creator_ids=creator_ids)
+    if creator_ids is None:
+        db(db.creator_grid).delete()
+    else:
+        query = (db.creator_grid.creator_id.belongs(creator_ids))
+        db(query).delete()
+    if totals:
+        db.creator_grid.bulk_insert(totals)
+    db.commit()
+    LOG.debug('Refreshed creator_grid records: %s', len(totals))
+    return len(totals)
@@ -13,11 +13,15 @@ from applications.zcomx.modules.files import for_file
 from applications.zcomx.modules.images import (
     SIZES,
     filename_for_size,
+    image_url as upload_image_url,
     square_image,
 )
 from applications.zcomx.modules.job_queuers import (
     UpdateIndiciaQueuer,
     queue_create_sitemap,
+    queue_creator_grid,
+    queue_download_catalog,
+    queue_search_index,
     queue_search_prefetch,
 )
 from applications.zcomx.modules.names import (
@@ -34,6 +38,7 @@ from applications.zcomx.modules.strings import (
     replace_punctuation,
     squeeze_whitespace,
 )
+from applications.zcomx.modules.url_names import URL_NAME_CACHE
 from applications.zcomx.modules.zco import SITE_NAME
 
 LOG = current.app.logger
@@ -193,6 +198,7 @@ def add_creator(form):
         creator = Creator.from_id(creator_id)
         on_change_name(creator)
         queue_update_indicia(creator)     # Create default indicia
+        queue_creator_grid(creator_id=creator.id)
 
     queue_create_sitemap()
 
@@ -440,13 +446,7 @@ def html_metadata(creator):
 
     image_url = None
     if creator.image:
-        image_url = URL(
-            c='images',
-            f='download',
-            args=creator.image,
-            vars={'size': 'web'},
-            host=True
-        )
+        image_url = upload_image_url(creator.image, size='web', host=True)
 
     return {
         'description': creator.bio,
@@ -487,18 +487,9 @@ def image_as_json(creator, field='image'):
     except (KeyError, OSError):
         size = 0
 
-    image_url = URL(
-        c='images',
-        f='download',
-        args=creator[field],
-    )
+    image_url = upload_image_url(creator[field])
 
-    thumb = URL(
-        c='images',
-        f='download',
-        args=creator[field],
-        vars={'size': 'web'},
-    )
+    thumb = upload_image_url(creator[field], size='web')
 
     delete_url = URL(
         c='login',
@@ -557,7 +548,10 @@ def on_change_name(creator):
     update_data = names(CreatorName(creator.name), fields=db.creator.fields)
 
     updated_creator = Creator.from_updated(creator, update_data)
-    queue_search_prefetch()
+    URL_NAME_CACHE.invalidate('creator', creator.id)
+    queue_download_catalog(creator_id=creator.id)
+    queue_search_prefetch(creator_ids=[creator.id])
+    queue_search_index(creator_ids=[creator.id])
     queue_create_sitemap()
     return updated_creator
 
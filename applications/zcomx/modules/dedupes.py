@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to deduplicating repeated events.
+
+A DedupeWindow remembers keys for a number of seconds. A key seen again
+within that interval is a duplicate. Keys are kept in a bounded, per
+process LRU. If a cache model is provided, eg memcache, keys are also
+shared through it so duplicates from other processes are detected.
+"""
+import collections
+import datetime
+import threading
+import uuid
+from gluon import *
+
+LOG = current.app.logger
+
+DEFAULT_INTERVAL_SECONDS = 1800
+MAX_ENTRIES = 10000
+
+
+class DedupeWindow():
+    """Class representing a window in which repeated keys are duplicates."""
+
+    def __init__(
+            self,
+            interval_seconds=DEFAULT_INTERVAL_SECONDS,
+            max_entries=MAX_ENTRIES,
+            cache_model=None):
+        """Constructor
+
+        Args:
+            interval_seconds: integer, number of seconds a key is
+                remembered.
+            max_entries: integer, maximum number of keys kept in the LRU.
+                The least recently used keys are removed when exceeded.
+            cache_model: cache instance, eg cache.memcache, keys are shared
+                through. If None, keys are kept in this process only.
+        """
+        self.interval_seconds = interval_seconds
+        self.max_entries = max_entries
+        self.cache_model = cache_model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # {key: datetime of last time seen}
+        self._entries = collections.OrderedDict()
+
+    def _seen_shared(self, key, time_stamp):
+        """Check and record a key in the shared cache.
+
+        The shared entry holds the time stamp of the event first recorded
+        so duplicates don't extend the window.
+
+        Args:
+            key: tuple, key identifying the event.
+            time_stamp: datetime, time the event occurred.
+
+        Returns:
+            datetime, time stamp of the event recorded by another call
+                within the interval, None if the key was not recorded.
+        """
+        interval = datetime.timedelta(seconds=self.interval_seconds)
+        entry = (uuid.uuid4().hex, time_stamp)
+        cache_key = 'dedupe_{k}'.format(k='_'.join(str(x) for x in key))
+        try:
+            got = self.cache_model(
+                cache_key, lambda: entry, time_expire=self.interval_seconds)
+            if got[0] == entry[0]:
+                return None
+            if time_stamp - got[1] >= interval:
+                self.cache_model(cache_key, lambda: entry, time_expire=0)
+                return None
+        except Exception as err:        # pylint: disable=broad-except
+            # A cache outage should not prevent events from being logged.
+            LOG.error('Dedupe cache failed: %s', str(err))
+            return None
+        return got[1]
+
+    def add(self, key, time_stamp):
+        """Record a key as seen.
+
+        Args:
+            key: tuple, key identifying the event.
+            time_stamp: datetime, time the event occurred.
+        """
+        with self._lock:
+            self._entries[key] = time_stamp
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Clear the keys kept in this process and the metrics."""
+        with self._lock:
+            self._entries = collections.OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    def metrics(self):
+        """Return the window metrics.
+
+        Returns:
+            dict, {
+                'hits': integer, number of duplicates found
+                'misses': integer, number of keys not seen
+                'hit_ratio': float, hits / checks, 0.0 if no checks.
+                'size': integer, number of keys kept in this process.
+            }
+        """
+        checks = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / checks if checks else 0.0,
+            'size': len(self._entries),
+        }
+
+    def seen(self, key, time_stamp):
+        """Return whether a key was seen within the interval. If not, the
+        key is recorded as seen.
+
+        Args:
+            key: tuple, key identifying the event.
+            time_stamp: datetime, time the event occurred.
+
+        Returns:
+            True if the key is a duplicate.
+        """
+        interval = datetime.timedelta(seconds=self.interval_seconds)
+        with self._lock:
+            last_seen = self._entries.get(key)
+            duplicate = last_seen is not None \
+                and time_stamp - last_seen < interval
+            if duplicate:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if duplicate:
+            return True
+
+        if self.shared:
+            original = self._seen_shared(key, time_stamp)
+            if original is not None:
+                # The window runs from the original event.
+                self.add(key, original)
+                with self._lock:
+                    self.hits += 1
+                return True
+
+        self.add(key, time_stamp)
+        with self._lock:
+            self.misses += 1
+        return False
+
+    @property
+    def shared(self):
+        """Return whether keys are shared between processes.
+
+        Returns:
+            True if keys are shared, if False a key not seen may have been
+            seen by another process.
+        """
+        return self.cache_model is not None
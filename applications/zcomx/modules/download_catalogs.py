@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to the downloadable catalog.
+
+The downloads modal lists downloadable creators and, per creator, their
+downloadable books. Building the lists requires several lookups per book
+(including a tthsum of the cbz file for the magnet uri) so the lists are
+precomputed into json files by a queued job and served as is.
+"""
+import json
+import os
+from gluon import *
+from applications.zcomx.modules.books import (
+    cbz_url,
+    downloadable as downable_books,
+    formatted_name,
+    magnet_uri,
+    torrent_url as book_torrent_url,
+)
+from applications.zcomx.modules.creators import (
+    Creator,
+    downloadable as downable_creators,
+    torrent_url as creator_torrent_url,
+)
+from applications.zcomx.modules.files import write_atomic
+
+LOG = current.app.logger
+
+
+class DownloadCatalog():
+    """Class representing the catalog of downloadable creators and books."""
+
+    def __init__(self, base_path=None):
+        """Constructor
+
+        Args:
+            base_path: string, path where catalog json files are stored.
+                Default applications/zcomx/static/data/downloads
+        """
+        self.base_path = base_path if base_path is not None \
+            else os.path.join(
+                current.request.folder, 'static', 'data', 'downloads')
+
+    def books(self, creator):
+        """Return the downloadable books data for a creator.
+
+        Args:
+            creator: Creator instance
+
+        Returns:
+            list of dicts
+        """
+        db = current.app.db
+        book_data = []
+        for book in downable_books(
+                creator_id=creator.id, orderby=db.book.name):
+            # pylint: disable=broad-except
+            try:
+                book_data.append(
+                    {
+                        'id': book.id,
+                        'title': formatted_name(
+                            book,
+                            include_publication_year=(
+                                book.release_date is not None)
+                        ),
+                        'torrent_url': book_torrent_url(
+                            book, extension=False),
+                        'magnet_uri': magnet_uri(book),
+                        'cbz_url': cbz_url(book, extension=False),
+                    }
+                )
+            except Exception:
+                continue
+        return book_data
+
+    def books_filename(self, creator_id):
+        """Return the name of the json file for a creator's books.
+
+        Args:
+            creator_id: integer, id of creator record
+
+        Returns:
+            string, name of file including path.
+        """
+        return os.path.join(
+            self.base_path,
+            'books_{i}.json'.format(i=int(creator_id))
+        )
+
+    def creators(self):
+        """Return the downloadable creators data.
+
+        Returns:
+            list of dicts
+        """
+        db = current.app.db
+        return [
+            {
+                'id': x.id,
+                'name': x.name,
+                'torrent_url': creator_torrent_url(x, extension=False),
+            }
+            for x in downable_creators(orderby=db.creator.name_for_search)
+        ]
+
+    def creators_filename(self):
+        """Return the name of the json file for creators.
+
+        Returns:
+            string, name of file including path.
+        """
+        return os.path.join(self.base_path, 'creators.json')
+
+    def dump(self, creator_ids=None):
+        """Write catalog json files.
+
+        Args:
+            creator_ids: list of integers, ids of creators to write book
+                files for. If None, book files are written for all creators
+                with downloadable books.
+        """
+        creator_data = self.creators()
+        self._write(self.creators_filename(), 'creators', creator_data)
+
+        if creator_ids is None:
+            creator_ids = [x['id'] for x in creator_data]
+
+        for creator_id in creator_ids:
+            try:
+                creator = Creator.from_id(creator_id)
+            except LookupError:
+                LOG.error('Creator not found, id: %s', creator_id)
+                self._write(self.books_filename(creator_id), 'books', [])
+                continue
+            self._write(
+                self.books_filename(creator_id),
+                'books',
+                self.books(creator),
+            )
+
+    def load(self, filename):
+        """Return the content of a catalog json file.
+
+        Args:
+            filename: string, name of file including path.
+
+        Returns:
+            string, json content, None if the file doesn't exist.
+        """
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def load_books(self, creator_id):
+        """Return the json for a creator's books.
+
+        Args:
+            creator_id: integer, id of creator record
+
+        Returns:
+            string, json content, None if the catalog file doesn't exist.
+        """
+        try:
+            filename = self.books_filename(creator_id)
+        except (TypeError, ValueError):
+            return None
+        return self.load(filename)
+
+    def load_creators(self):
+        """Return the json for creators.
+
+        Returns:
+            string, json content, None if the catalog file doesn't exist.
+        """
+        return self.load(self.creators_filename())
+
+    def _write(self, filename, key, data):
+        """Write catalog data to file.
+
+        If there is no data, the file is removed so requests fall back to
+        live computation.
+
+        Args:
+            filename: string, name of file including path.
+            key: string, key of data in json, eg 'books'
+            data: list of dicts
+        """
+        if not data:
+            if os.path.exists(filename):
+                os.unlink(filename)
+            return
+        LOG.debug('Writing catalog file: %s', filename)
+        write_atomic(filename, as_json(key, data))
+
+
+def as_json(key, data):
+    """Return catalog data formatted as the downloads controller json.
+
+    Args:
+        key: string, key of data in json, eg 'books'
+        data: list of dicts
+
+    Returns:
+        string, json
+    """
+    return json.dumps({
+        key: data,
+        'status': 'ok',
+    })
@@ -4,23 +4,111 @@
 Classes and functions related to images.
 """
 import os
-import re
+import time
+from email.utils import parsedate_tz, mktime_tz
 from gluon import *
 from gluon.globals import Response
 from gluon.streamer import DEFAULT_CHUNK_SIZE
 from gluon.contenttype import contenttype
+from gluon.utils import unlocalised_http_header_date
 from applications.zcomx.modules.archives import TorrentArchive
 from applications.zcomx.modules.books import Book
 from applications.zcomx.modules.creators import Creator
 from applications.zcomx.modules.images import (
     filename_for_size,
+    upload_field,
     SIZES,
 )
 
 LOG = current.app.logger
 
+# Supported front-end server offload headers.
+# local_settings.download_offload: one of the keys below.
+OFFLOAD_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',     # nginx
+    'x-sendfile': 'X-Sendfile',                 # apache, lighttpd
+}
 
-class CBZDownloader(Response):
+
+class FileDownloader(Response):
+    """Base class representing a file downloader.
+
+    Handles conditional GET (ETag/Last-Modified) and, if configured,
+    offloading the file transfer to the front-end server.
+
+    Settings (private/settings.json, app group):
+        download_offload: str, one of OFFLOAD_HEADERS keys. If not set, the
+            file is streamed by the app.
+        download_offload_prefix: str, x-accel-redirect only, internal
+            location prefix mapped to the filesystem root, eg '/protected'
+    """
+
+    def offload_header(self, filename):
+        """Return the offload header for a file.
+
+        Args:
+            filename: str, absolute path of file.
+
+        Returns:
+            tuple, (header name, header value) or None if offloading is not
+                configured.
+        """
+        settings = current.app.local_settings
+        offload = (settings.download_offload or '').lower()
+        if offload not in OFFLOAD_HEADERS:
+            return None
+        value = os.path.abspath(filename)
+        if offload == 'x-accel-redirect':
+            prefix = (settings.download_offload_prefix or '').rstrip('/')
+            value = prefix + value
+        return (OFFLOAD_HEADERS[offload], value)
+
+    def stream_file(self, request, filename, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Stream a file, honouring conditional and range requests.
+
+        Args:
+            request: gluon.globals.Request instance
+            filename: str, absolute path of file.
+            chunk_size: integer, chunk size in bytes
+
+        Raises:
+            HTTP(304) if the client copy is current.
+            HTTP(200) with an offload header, if offloading is configured.
+        """
+        try:
+            stat_file = os.stat(filename)
+        except OSError:
+            raise HTTP(404)
+
+        headers = self.headers
+        etag = file_etag(stat_file)
+        last_modified = unlocalised_http_header_date(
+            time.gmtime(stat_file.st_mtime))
+        headers['ETag'] = etag
+        headers['Last-Modified'] = last_modified
+        headers['Accept-Ranges'] = 'bytes'
+
+        if is_not_modified(request, etag, stat_file.st_mtime):
+            raise HTTP(304, **{
+                'ETag': etag,
+                'Last-Modified': last_modified,
+                'Cache-Control': headers.get('Cache-Control', 'private'),
+            })
+
+        if request.env.http_if_range and request.env.http_range \
+                and request.env.http_if_range not in [etag, last_modified]:
+            # The client copy is stale, send the whole file.
+            request.env.http_range = None
+
+        offload = self.offload_header(filename)
+        if offload:
+            headers[offload[0]] = offload[1]
+            raise HTTP(200, '', **headers)
+
+        return self.stream(filename, chunk_size=chunk_size, request=request)
+
+
+class CBZDownloader(FileDownloader):
     """Class representing a cbz downloader"""
 
     def download(
@@ -55,10 +143,10 @@ class CBZDownloader(Response):
             fmt = 'attachment; filename="%s"'
             headers['Content-Disposition'] = \
                 fmt % download_filename.replace('"', '\"')
-        return self.stream(stream, chunk_size=chunk_size, request=request)
+        return self.stream_file(request, stream, chunk_size=chunk_size)
 
 
-class ImageDownloader(Response):
+class ImageDownloader(FileDownloader):
     """Class representing an image downloader"""
 
     def download(
@@ -72,6 +160,9 @@ class ImageDownloader(Response):
             streamed from a subdirectory with that name.
         request.vars.cache: boolean, if set, set response headers to
             enable caching.
+        request.vars.v: string, content version of the image, see
+            images.image_version(). If set, the url is unique to the image
+            content and the response is cached as immutable.
         """
         # pylint: disable=redefined-outer-name
         current.session.forget(current.response)
@@ -79,13 +170,8 @@ class ImageDownloader(Response):
         if not request.args:
             raise HTTP(404)
         name = request.args[-1]
-        items = re.compile(r'(?P<table>.*?)\.(?P<field>.*?)\..*').match(name)
-        if not items:
-            raise HTTP(404)
-        (t, f) = (items.group('table'), items.group('field'))
-        try:
-            field = db[t][f]
-        except AttributeError:
+        field = upload_field(name)
+        if field is None:
             raise HTTP(404)
         try:
             (filename, stream) = field.retrieve(name, nameonly=True)
@@ -108,13 +194,16 @@ class ImageDownloader(Response):
             fmt = 'attachment; filename="%s"'
             headers['Content-Disposition'] = \
                 fmt % download_filename.replace('"', '\"')
-        if request.vars.cache:
+        if request.vars.v:
+            headers['Cache-Control'] = 'max-age=315360000, public, immutable'
+            headers['Expires'] = 'Thu, 31 Dec 2037 23:59:59 GMT'
+        elif request.vars.cache:
             headers['Cache-Control'] = 'max-age=315360000, public'
             headers['Expires'] = 'Thu, 31 Dec 2037 23:59:59 GMT'
-        return self.stream(stream, chunk_size=chunk_size, request=request)
+        return self.stream_file(request, stream, chunk_size=chunk_size)
 
 
-class TorrentDownloader(Response):
+class TorrentDownloader(FileDownloader):
     """Class representing a torrent downloader"""
 
     def download(
@@ -176,4 +265,46 @@ class TorrentDownloader(Response):
             fmt = 'attachment; filename="%s"'
             headers['Content-Disposition'] = \
                 fmt % download_filename.replace('"', '\"')
-        return self.stream(stream, chunk_size=chunk_size, request=request)
+        return self.stream_file(request, stream, chunk_size=chunk_size)
+
+
+def file_etag(stat_file):
+    """Return an ETag for a file.
+
+    Args:
+        stat_file: os.stat_result instance
+
+    Returns:
+        str, quoted entity tag
+    """
+    return '"{s:x}-{m:x}"'.format(
+        s=stat_file.st_size, m=int(stat_file.st_mtime))
+
+
+def is_not_modified(request, etag, mtime):
+    """Determine if the client copy of a file is current.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 7232).
+
+    Args:
+        request: gluon.globals.Request instance
+        etag: str, entity tag of the file
+        mtime: float, file modification time, seconds since epoch
+
+    Returns:
+        True if the client copy is current.
+    """
+    if_none_match = request.env.http_if_none_match
+    if if_none_match:
+        tags = [x.strip() for x in if_none_match.split(',')]
+        weak_etag = 'W/' + etag
+        return '*' in tags or etag in tags or weak_etag in tags
+
+    if_modified_since = request.env.http_if_modified_since
+    if if_modified_since:
+        parsed = parsedate_tz(if_modified_since)
+        if parsed is None:
+            return False
+        return int(mtime) <= mktime_tz(parsed)
+
+    return False
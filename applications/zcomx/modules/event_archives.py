@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to archiving raw event records.
+
+Events older than the retention period are moved from the event tables to
+compressed monthly archive files, one json line per record, eg
+private/var/event_archives/book_view/book_view_2026-01.jsonl.gz
+
+Only events already accounted for elsewhere are archived. Book views,
+downloads and download clicks must be rolled up (see modules/rollups.py),
+the book counters are tallied from the rollups plus the events not yet
+rolled up. Download clicks must also be completed, ie logged.
+"""
+import datetime
+import gzip
+import json
+import os
+from gluon import *
+from applications.zcomx.modules.event_spools import dumps_data
+from applications.zcomx.modules.rollups import (
+    ROLLUP_NAMES,
+    high_water_mark,
+)
+
+LOG = current.app.logger
+
+ARCHIVE_TABLES = ['book_view', 'download', 'download_click']
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_RETENTION_DAYS = 120
+
+
+class EventArchiver():
+    """Class representing an archiver of the records of an event table."""
+
+    def __init__(
+            self,
+            table,
+            archive_dir=None,
+            retention_days=DEFAULT_RETENTION_DAYS,
+            batch_size=DEFAULT_BATCH_SIZE):
+        """Constructor
+
+        Args:
+            table: string, name of event table, one of ARCHIVE_TABLES
+            archive_dir: string, name of directory archive files are stored
+                in. Default applications/zcomx/private/var/event_archives
+            retention_days: integer, events older than this number of days
+                are archived.
+            batch_size: integer, number of records archived per transaction.
+        """
+        if table not in ARCHIVE_TABLES:
+            raise SyntaxError('Invalid event archive table: {t}'.format(
+                t=table))
+        self.table = table
+        self.archive_dir = archive_dir if archive_dir is not None \
+            else os.path.join(
+                current.request.folder, 'private', 'var', 'event_archives')
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+    def _write(self, rows):
+        """Append records to the monthly archive files.
+
+        Args:
+            rows: list of dicts, the records.
+
+        Returns:
+            list of strings, names of the archive files written.
+        """
+        by_month = {}
+        for row in rows:
+            month = row['time_stamp'].strftime('%Y-%m')
+            by_month.setdefault(month, []).append(row)
+
+        filenames = []
+        for month, records in sorted(by_month.items()):
+            filename = self.archive_filename(month)
+            if not os.path.exists(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            # Appending adds a gzip member, the file reads as one stream.
+            with gzip.open(filename, 'at') as f:
+                for record in records:
+                    f.write(json.dumps(dumps_data(record), sort_keys=True))
+                    f.write('\n')
+            filenames.append(filename)
+        return filenames
+
+    def archivable_query(self, as_of=None):
+        """Return the query of the archivable records.
+
+        Args:
+            as_of: datetime.datetime, records older than the retention days
+                before this are archivable. Default: datetime.datetime.now()
+
+        Returns:
+            gluon.dal.Query instance
+        """
+        db = current.app.db
+        table = db[self.table]
+        if as_of is None:
+            as_of = datetime.datetime.now()
+        cutoff = as_of - datetime.timedelta(days=self.retention_days)
+        query = (table.time_stamp < cutoff)
+        if self.table in ROLLUP_NAMES:
+            query = query & (table.id <= high_water_mark(self.table))
+        if self.table == 'download_click':
+            query = query & (table.completed == True)
+        return query
+
+    def archive(self, as_of=None):
+        """Move archivable records from the event table to the archive
+        files.
+
+        Each batch is written to the archive files before its records are
+        deleted. If interrupted, records may be archived twice but are not
+        lost.
+
+        Args:
+            as_of: datetime.datetime, records older than the retention days
+                before this are archived. Default: datetime.datetime.now()
+
+        Returns:
+            integer, number of records archived.
+        """
+        db = current.app.db
+        table = db[self.table]
+        query = self.archivable_query(as_of=as_of)
+        count = 0
+        while True:
+            rows = db(query).select(
+                orderby=table.id,
+                limitby=(0, self.batch_size),
+                cacheable=True,
+            )
+            if not rows:
+                break
+            records = [x.as_dict() for x in rows]
+            self._write(records)
+            ids = [x['id'] for x in records]
+            db(table.id.belongs(ids)).delete()
+            db.commit()
+            count += len(ids)
+            LOG.debug('Archived %s records: %s', self.table, count)
+        return count
+
+    def archive_filename(self, month):
+        """Return the name of the archive file of a month.
+
+        Args:
+            month: string, 'YYYY-MM'
+
+        Returns:
+            string, name of file including path.
+        """
+        return os.path.join(
+            self.archive_dir,
+            self.table,
+            '{t}_{m}.jsonl.gz'.format(t=self.table, m=month),
+        )
+
+
+def read_archive(filename):
+    """Generator of the records of an archive file.
+
+    Args:
+        filename: string, name of archive file.
+
+    Yields:
+        dict, the record, datetime values are strings, see dumps_data.
+    """
+    with gzip.open(filename, 'rt') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to the event spool.
+
+Book events (views, ratings and contributions) can be appended to a local
+spool file, one json line per event, rather than inserted into the
+database by the request logging them. The spool is drained by
+private/bin/drain_event_spool.py which bulk inserts the events and updates
+the book counters once per book.
+
+Only one drainer runs at a time, see EventSpool.drainer_lock. The events
+are committed before the drained file is removed. If a drainer dies between
+the two, the file is drained again by the next run and its events are
+inserted twice.
+"""
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+from gluon import *
+from applications.zcomx.modules.books import (
+    Book,
+    increment_rating,
+)
+
+LOG = current.app.logger
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_PASSES = 10
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# {table: book rating incremented by the events, see books.RATINGS}
+SPOOL_TABLES = {
+    'book_view': 'view',
+    'contribution': 'contribution',
+    'rating': 'rating',
+}
+
+
+class EventSpoolLockError(Exception):
+    """Exception class for event spool lock errors."""
+
+
+class EventSpool():
+    """Class representing a spool of book events."""
+
+    def __init__(self, filename=None):
+        """Constructor
+
+        Args:
+            filename: string, name of spool file including path.
+                Default applications/zcomx/databases/event_spool.jsonl
+        """
+        self.filename = filename if filename is not None \
+            else os.path.join(
+                current.request.folder, 'databases', 'event_spool.jsonl')
+        self.draining_filename = self.filename + '.draining'
+        self.lock_filename = self.filename + '.lock'
+        self._lock_file = None
+
+    def _insert(self, events, batch_size=DEFAULT_BATCH_SIZE):
+        """Insert events into the database.
+
+        Args:
+            events: list of dicts, {'table': str, 'data': dict}
+            batch_size: integer, number of records per bulk insert.
+
+        Returns:
+            dict, {table: number of records inserted}
+        """
+        db = current.app.db
+        by_table = {}
+        for event in events:
+            by_table.setdefault(event['table'], []).append(event['data'])
+
+        counts = {}
+        for table, records in sorted(by_table.items()):
+            for i in range(0, len(records), batch_size):
+                db[table].bulk_insert(records[i:i + batch_size])
+            counts[table] = len(records)
+        return counts
+
+    def _read(self, filename):
+        """Read the events of a spool file.
+
+        Args:
+            filename: string, name of spool file
+
+        Returns:
+            list of dicts, {'table': str, 'data': dict}
+        """
+        events = []
+        with open(filename, 'r') as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A partial line from an interrupted write.
+                    LOG.error(
+                        'Invalid event spool line %s:%s', filename, line_no)
+                    continue
+                if event.get('table') not in SPOOL_TABLES:
+                    LOG.error('Invalid event spool table: %s', event)
+                    continue
+                event['data'] = loads_data(event.get('data') or {})
+                events.append(event)
+        return events
+
+    def _take(self):
+        """Move the spool file aside to be drained.
+
+        Events appended while the spool is drained go to a new spool file.
+        A file left by an interrupted drain is drained first. The caller
+        holds the drainer lock.
+
+        Returns:
+            string, name of file to drain, None if there are no events.
+        """
+        if os.path.exists(self.draining_filename):
+            return self.draining_filename
+        if not os.path.exists(self.filename):
+            return None
+        with open(self.filename, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                os.rename(self.filename, self.draining_filename)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return self.draining_filename
+
+    def append(self, table, data):
+        """Append an event to the spool.
+
+        Args:
+            table: string, name of table the event is logged in, one of
+                SPOOL_TABLES
+            data: dict, field values of the event record.
+        """
+        if table not in SPOOL_TABLES:
+            raise SyntaxError('Invalid event spool table: {t}'.format(
+                t=table))
+        line = json.dumps(
+            {'table': table, 'data': dumps_data(data)},
+            sort_keys=True,
+        ) + '\n'
+        while True:
+            with open(self.filename, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # If the spool was taken for draining while waiting on
+                    # the lock, write to the new spool file instead.
+                    if os.path.exists(self.filename) and \
+                            os.path.samestat(
+                                os.fstat(f.fileno()), os.stat(self.filename)):
+                        f.write(line)
+                        f.flush()
+                        return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def drain(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Insert the spooled events into the database and update the
+        counters of the books they are for.
+
+        If the drainer lock is not held, it is held for the drain.
+
+        Args:
+            batch_size: integer, number of records per bulk insert.
+
+        Returns:
+            dict, {table: number of records inserted}, None if there was
+                nothing to drain.
+
+        Raises:
+            EventSpoolLockError if another drainer holds the lock.
+        """
+        if self._lock_file is None:
+            with self.drainer_lock():
+                return self.drain(batch_size=batch_size)
+
+        db = current.app.db
+        filename = self._take()
+        if filename is None:
+            return None
+
+        events = self._read(filename)
+        counts = self._insert(events, batch_size=batch_size)
+        update_counters(events)
+        db.commit()
+        os.unlink(filename)
+        return counts
+
+    @contextlib.contextmanager
+    def drainer_lock(self):
+        """Context manager holding the drainer lock, an exclusive lock on
+        the spool lock file, so only one drainer takes and drains the spool
+        at a time.
+
+        Raises:
+            EventSpoolLockError if another drainer holds the lock.
+        """
+        with open(self.lock_filename, 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError as err:
+                raise EventSpoolLockError(
+                    'Event spool is locked by another drainer: {f}'.format(
+                        f=self.lock_filename)
+                ) from err
+            self._lock_file = f
+            try:
+                yield
+            finally:
+                self._lock_file = None
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def dumps_data(data):
+    """Return event data with values converted for json.
+
+    Args:
+        data: dict, field values of the event record.
+
+    Returns:
+        dict
+    """
+    converted = {}
+    for k, v in data.items():
+        if isinstance(v, datetime.datetime):
+            v = v.strftime(DATETIME_FORMAT)
+        converted[k] = v
+    return converted
+
+
+def event_spool():
+    """Return the event spool book events are logged to, if configured.
+
+    Returns:
+        EventSpool instance, None if local_settings.event_spool is not set.
+    """
+    if not current.app.local_settings.event_spool:
+        return None
+    return EventSpool()
+
+
+def loads_data(data):
+    """Return event data read from json with values converted for the
+    database. Reverses dumps_data().
+
+    Args:
+        data: dict, field values of the event record.
+
+    Returns:
+        dict
+    """
+    converted = dict(data)
+    if converted.get('time_stamp'):
+        converted['time_stamp'] = datetime.datetime.strptime(
+            converted['time_stamp'], DATETIME_FORMAT)
+    return converted
+
+
+def update_counters(events):
+    """Update the counters of the books of events.
+
+    The counters of each book are incremented once per rating by the number
+    and total amount of its events.
+
+    Args:
+        events: list of dicts, {'table': str, 'data': dict}
+    """
+    # {(book_id, rating): [count, amount]}
+    deltas = {}
+    for event in events:
+        book_id = event['data'].get('book_id')
+        if not book_id:
+            continue
+        delta = deltas.setdefault(
+            (book_id, SPOOL_TABLES[event['table']]), [0, 0])
+        delta[0] += 1
+        delta[1] += event['data'].get('amount') or 0
+
+    for (book_id, rating), (count, amount) in sorted(deltas.items()):
+        try:
+            book = Book.from_id(book_id)
+        except LookupError:
+            continue
+        increment_rating(book, rating, amount=amount, count=count)
+
+    LOG.debug('Event spool counters updated: %s', len(deltas))
@@ -4,13 +4,19 @@ Classes and functions related to events.
 """
 import datetime
 from gluon import *
-from applications.zcomx.modules.books import update_rating
+from applications.zcomx.modules.books import increment_rating
+from applications.zcomx.modules.dedupes import DedupeWindow
 from applications.zcomx.modules.job_queuers import LogDownloadsQueuer
 from applications.zcomx.modules.records import Record
+from applications.zcomx.modules.rollups import subtract_from_rollups
 from applications.zcomx.modules.user_agents import is_bot
 
 LOG = current.app.logger
 LOG_DOWNLOADS_LIMIT = 1000
+LOG_DOWNLOADS_BATCH_SIZE = 1000
+LOGGABLE_INTERVAL_SECONDS = 1800
+
+_DOWNLOAD_CLICK_WINDOW = None
 
 
 class BookView(Record):
@@ -72,15 +78,38 @@ class BaseEvent():
 class BookEvent(BaseEvent):
     """Class representing a loggable book event"""
 
-    def __init__(self, book, user_id):
+    def __init__(self, book, user_id, spool=None):
         """Constructor
 
         Args:
             book: Book instance
             user_id: integer, id of user triggering event.
+            spool: EventSpool instance. If provided, the event is appended
+                to the spool rather than inserted, and the book counters
+                are updated when the spool is drained.
         """
         super().__init__(user_id)
         self.book = book
+        self.spool = spool
+        self.amount = None
+
+    def _insert(self, table, data):
+        """Insert the record of the event, or append it to the spool.
+
+        Args:
+            table: str, name of table
+            data: dict, field values of record
+
+        Returns:
+            integer, id of record, None if spooled.
+        """
+        if self.spool is not None:
+            self.spool.append(table, data)
+            return None
+        db = current.app.db
+        event_id = db[table].insert(**data)
+        db.commit()
+        return event_id
 
     def _log(self, value=None):
         raise NotImplementedError
@@ -95,20 +124,19 @@ class ContributionEvent(BookEvent):
     def _log(self, value=None):
         if value is None:
             return
-        db = current.app.db
         data = dict(
             auth_user_id=self.user_id or 0,
             book_id=self.book.id,
             time_stamp=datetime.datetime.now(),
             amount=value
         )
-        event_id = db.contribution.insert(**data)
-        db.commit()
-        return event_id
+        self.amount = value
+        return self._insert('contribution', data)
 
     def _post_log(self):
-        db = current.app.db
-        update_rating(self.book, rating='contribution')
+        if self.spool is not None or self.amount is None:
+            return
+        increment_rating(self.book, 'contribution', amount=self.amount)
 
 
 class DownloadEvent(BookEvent):
@@ -145,27 +173,25 @@ class RatingEvent(BookEvent):
     def _log(self, value=None):
         if value is None:
             return
-        db = current.app.db
         data = dict(
             auth_user_id=self.user_id or 0,
             book_id=self.book.id,
             time_stamp=datetime.datetime.now(),
             amount=value
         )
-        event_id = db.rating.insert(**data)
-        db.commit()
-        return event_id
+        self.amount = value
+        return self._insert('rating', data)
 
     def _post_log(self):
-        db = current.app.db
-        update_rating(self.book, rating='rating')
+        if self.spool is not None or self.amount is None:
+            return
+        increment_rating(self.book, 'rating', amount=self.amount)
 
 
 class ViewEvent(BookEvent):
     """Class representing a book view event."""
 
     def _log(self, value=None):
-        db = current.app.db
         request = current.request
 
         data = dict(
@@ -175,13 +201,12 @@ class ViewEvent(BookEvent):
             ip_address=request.client,
             is_bot=is_bot(),
         )
-        event_id = db.book_view.insert(**data)
-        db.commit()
-        return event_id
+        return self._insert('book_view', data)
 
     def _post_log(self):
-        db = current.app.db
-        update_rating(self.book, rating='view')
+        if self.spool is not None:
+            return
+        increment_rating(self.book, 'view')
 
 
 class ZcoContributionEvent(BaseEvent):
@@ -205,7 +230,47 @@ class ZcoContributionEvent(BaseEvent):
         pass
 
 
-def is_loggable(download_click_id, interval_seconds=1800):
+def delete_unloggable_downloads():
+    """Delete the download records of unloggable download clicks with one
+    delete.
+
+    Returns:
+        integer, number of download records deleted.
+    """
+    db = current.app.db
+    query = (db.download_click.loggable == False) & \
+        (db.download_click.completed == False)
+    download_query = db.download.download_click_id.belongs(
+        db(query)._select(db.download_click.id))
+    count = db(download_query).count()
+    if count:
+        subtract_from_rollups('download', download_query)
+        db(download_query).delete()
+        db.commit()
+    return count
+
+
+def download_click_window():
+    """Return the dedupe window of download clicks.
+
+    The window is shared through memcache if memcached is configured.
+
+    Returns:
+        DedupeWindow instance
+    """
+    global _DOWNLOAD_CLICK_WINDOW      # pylint: disable=global-statement
+    if _DOWNLOAD_CLICK_WINDOW is None:
+        cache_model = None
+        if current.app.local_settings.memcached_socket:
+            cache_model = getattr(current.cache, 'memcache', None)
+        _DOWNLOAD_CLICK_WINDOW = DedupeWindow(
+            interval_seconds=LOGGABLE_INTERVAL_SECONDS,
+            cache_model=cache_model,
+        )
+    return _DOWNLOAD_CLICK_WINDOW
+
+
+def is_loggable(download_click_id, interval_seconds=LOGGABLE_INTERVAL_SECONDS):
     """Determine if a download_click is loggable.
 
     Args:
@@ -221,7 +286,6 @@ def is_loggable(download_click_id, interval_seconds=1800):
             ip_address, record_table, record_id within the last
             interval_seconds seconds.
     """
-    db = current.app.db
     download_click = DownloadClick.from_id(download_click_id)
 
     if download_click.record_table == 'all':
@@ -230,24 +294,60 @@ def is_loggable(download_click_id, interval_seconds=1800):
     if download_click.is_bot:
         return False
 
-    click_as_epoch = download_click.time_stamp.strftime('%s')
+    return last_loggable_click(
+        download_click, interval_seconds=interval_seconds) is None
+
+
+def last_loggable_click(
+        download_click, interval_seconds=LOGGABLE_INTERVAL_SECONDS):
+    """Return the last loggable download click matching a download click
+    within an interval.
+
+    The time_stamp is compared with a plain range so the query can use the
+    download_click_dedupe index.
+
+    Args:
+        download_click: dict or DownloadClick instance, the click matched.
+            If it has an id, that record is excluded.
+        interval_seconds: integer, number of seconds before the click
+            matched.
 
-    # pylint: disable=line-too-long
+    Returns:
+        Row instance, with download_click id and time_stamp, None if not
+            found.
+    """
+    db = current.app.db
+    since = download_click['time_stamp'] - \
+        datetime.timedelta(seconds=interval_seconds)
     query = \
-        (db.download_click.id != download_click.id) & \
-        (db.download_click.ip_address == download_click.ip_address) & \
-        (db.download_click.auth_user_id == download_click.auth_user_id) & \
-        (db.download_click.record_table == download_click.record_table) & \
-        (db.download_click.record_id == download_click.record_id) & \
-        (db.download_click.loggable == True) & \
-        (db.download_click.time_stamp.epoch() - click_as_epoch > -1 * interval_seconds)
-    rows = db(query).select(db.download_click.id)
-    return len(rows) == 0
-
-
-def log_download_click(record_table, record_id, queue_log_downloads=True):
+        (db.download_click.ip_address == download_click['ip_address']) & \
+        (db.download_click.auth_user_id == download_click['auth_user_id']) & \
+        (db.download_click.record_table == download_click['record_table']) & \
+        (db.download_click.record_id == download_click['record_id']) & \
+        (db.download_click.time_stamp > since) & \
+        (db.download_click.loggable == True)
+    if download_click.get('id'):
+        query = query & (db.download_click.id != download_click['id'])
+    return db(query).select(
+        db.download_click.id,
+        db.download_click.time_stamp,
+        orderby=~db.download_click.time_stamp,
+        limitby=(0, 1),
+    ).first()
+
+
+def log_download_click(
+        record_table,
+        record_id,
+        queue_log_downloads=True,
+        dedupe_window=None):
     """Log a download click.
 
+    Whether the click is loggable is determined before it is inserted, see
+    is_loggable(), so the click costs one insert. Repeated clicks are found
+    in the dedupe window. If the window isn't shared between processes, a
+    click not found in it is checked in the database.
+
     Args:
         record_table: string, name of table for download_click, one of
             ['all', 'book', 'creator']
@@ -255,6 +355,8 @@ def log_download_click(record_table, record_id, queue_log_downloads=True):
             should be 0 if record_table is 'all'
         queue_log_downloads: If True, queue a job to log all downloads, ie
             convert download_click records to download records.
+        dedupe_window: DedupeWindow instance, default
+            download_click_window()
 
     Returns:
         integer, id of download_click record.
@@ -267,6 +369,9 @@ def log_download_click(record_table, record_id, queue_log_downloads=True):
         LOG.error('Invalid download_click record_table: %s', record_table)
         return 0
 
+    if dedupe_window is None:
+        dedupe_window = download_click_window()
+
     data = dict(
         ip_address=request.client,
         time_stamp=request.now,
@@ -275,29 +380,108 @@ def log_download_click(record_table, record_id, queue_log_downloads=True):
         record_id=record_id,
         is_bot=is_bot()
     )
+
+    loggable = record_table != 'all' and not data['is_bot']
+    if loggable:
+        key = (
+            data['ip_address'],
+            data['auth_user_id'],
+            data['record_table'],
+            data['record_id'],
+        )
+        if dedupe_window.seen(key, data['time_stamp']):
+            loggable = False
+        elif not dedupe_window.shared:
+            last_click = last_loggable_click(data)
+            if last_click:
+                loggable = False
+                dedupe_window.add(key, last_click.time_stamp)
+
+    data['loggable'] = loggable
+    data['completed'] = not loggable
     click_id = db.download_click.insert(**data)
     db.commit()
-    query = (db.download_click.id == click_id)
-    click_record = db(query).select(limitby=(0, 1)).first()
-    if is_loggable(click_id):
-        click_data = {
-            'loggable': True,
-            'completed': False,
-        }
-        click_record.update_record(**click_data)
-        db.commit()
 
-        if queue_log_downloads:
-            job = LogDownloadsQueuer(
-                db.job,
-                cli_options={'-r': True, '-l': str(LOG_DOWNLOADS_LIMIT)},
-            ).queue()
-            LOG.debug('Log downloads job id: %s', job.id)
-    else:
-        click_data = {
-            'loggable': False,
-            'completed': True,
-        }
-        click_record.update_record(**click_data)
-        db.commit()
+    if loggable and queue_log_downloads:
+        job = LogDownloadsQueuer(
+            db.job,
+            cli_options={'-r': True, '-l': str(LOG_DOWNLOADS_LIMIT)},
+        ).queue()
+        LOG.debug('Log downloads job id: %s', job.id)
     return click_id
+
+
+def log_download_clicks(click_ids):
+    """Log the downloads of download clicks, set-based.
+
+    The clicks are resolved to the downloadable books they are for, every
+    downloadable book for 'all' clicks, and the download records are
+    created with one INSERT ... SELECT. Books already logged for a click
+    are skipped. The clicks are marked completed with one update.
+
+    Args:
+        click_ids: list of integers, ids of download_click records.
+
+    Returns:
+        integer, number of download records created.
+    """
+    if not click_ids:
+        return 0
+    db = current.app.db
+    # pylint: disable=protected-access
+    adapter = db._adapter
+    now = adapter.represent(datetime.datetime.now(), 'datetime')
+    logged_query = (db.download.download_click_id.belongs(click_ids))
+    count_before = db(logged_query).count()
+
+    sql = """
+        INSERT INTO download (
+            download_click_id, auth_user_id, book_id, time_stamp,
+            is_active, created_on, modified_on
+        )
+        SELECT c.id, c.auth_user_id, b.id, {now}, {true}, {now}, {now}
+        FROM download_click c
+        INNER JOIN book b ON (
+            c.record_table = 'all'
+            OR (c.record_table = 'book' AND b.id = c.record_id)
+            OR (c.record_table = 'creator' AND b.creator_id = c.record_id)
+        )
+        WHERE c.id IN ({ids})
+            AND b.release_date IS NOT NULL
+            AND b.fileshare_date IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM download d
+                WHERE d.download_click_id = c.id AND d.book_id = b.id
+            )
+        ;
+    """.format(
+        now=now,
+        true=adapter.represent(True, 'boolean'),
+        ids=', '.join(str(int(x)) for x in click_ids),
+    )
+    db.executesql(sql)
+    db(db.download_click.id.belongs(click_ids)).update(completed=True)
+    db.commit()
+    return db(logged_query).count() - count_before
+
+
+def unlogged_download_click_ids(limit=None):
+    """Return the ids of download clicks waiting to be logged.
+
+    Args:
+        limit: integer, return at most this number of ids. If None, no
+            limit.
+
+    Returns:
+        list of integers, ids of download_click records in id order.
+    """
+    db = current.app.db
+    query = (db.download_click.loggable == True) & \
+        (db.download_click.completed == False)
+    limitby = (0, limit) if limit is not None else None
+    rows = db(query).select(
+        db.download_click.id,
+        orderby=db.download_click.id,
+        limitby=limitby,
+    )
+    return [x.id for x in rows]
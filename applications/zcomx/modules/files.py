@@ -3,7 +3,9 @@
 """
 Utilty classes and functions.
 """
+import os
 import re
+import tempfile
 
 
 class FileName(str):
@@ -86,3 +88,31 @@ def for_title_file(text):
         string
     """
     return TitleFileName(text).scrubbed()
+
+
+def write_atomic(filename, content, mode='w'):
+    """Write content to a file atomically.
+
+    The content is written to a temporary file in the same directory and
+    then renamed, so readers never see a partially written file.
+
+    Args:
+        filename: string, name of file including path.
+        content: str or bytes, content to write
+        mode: string, 'w' for text content, 'wb' for bytes content.
+    """
+    path = os.path.dirname(os.path.abspath(filename))
+    if not os.path.exists(path):
+        os.makedirs(path)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path, prefix='.{n}.'.format(n=os.path.basename(filename)))
+    try:
+        encoding = None if 'b' in mode else 'utf-8'
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            f.write(content)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
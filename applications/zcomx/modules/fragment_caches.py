@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to caching rendered html fragments.
+
+Cached fragments are keyed on a global content version. Jobs that change
+what is displayed (releases, uploads, rating tallies) bump the version so
+existing fragments are no longer used.
+
+The cache model is current.cache.ram which is the MemcacheClient when
+memcached is configured (see stickon/tools.py). Without memcached the RAM
+cache is per process, so a version bumped by a job is not seen by the web
+server and fragments are refreshed by expiry only.
+"""
+from gluon import *
+
+LOG = current.app.logger
+
+CONTENT_VERSION_KEY = 'content_version'
+DEFAULT_TIME_EXPIRE = 300       # seconds
+
+
+class FragmentCache():
+    """Class representing a cache of rendered html fragments."""
+
+    def __init__(
+            self,
+            cache_model=None,
+            time_expire=DEFAULT_TIME_EXPIRE,
+            version_key=CONTENT_VERSION_KEY):
+        """Constructor
+
+        Args:
+            cache_model: cache instance, eg cache.ram or cache.memcache.
+                Default current.cache.ram
+            time_expire: integer, number of seconds fragments are cached.
+            version_key: string, cache key of the version fragments are
+                keyed on.
+        """
+        self.cache_model = cache_model if cache_model is not None \
+            else current.cache.ram
+        self.time_expire = time_expire
+        self.version_key = version_key
+
+    def __call__(self, key, func):
+        """Return the fragment for key, rendering it if not cached.
+
+        Args:
+            key: string, key identifying the fragment.
+            func: callable, returns the fragment.
+
+        Returns:
+            the fragment as returned by func.
+        """
+        try:
+            versioned_key = 'fragment_{v}_{k}'.format(
+                v=content_version(
+                    cache_model=self.cache_model,
+                    version_key=self.version_key,
+                ),
+                k=key,
+            )
+            return self.cache_model(
+                versioned_key, func, time_expire=self.time_expire)
+        except Exception as err:        # pylint: disable=broad-except
+            # A cache outage should not prevent pages from rendering.
+            LOG.error('Fragment cache failed: %s', str(err))
+            return func()
+
+
+def bump_content_version(cache_model=None, version_key=CONTENT_VERSION_KEY):
+    """Increment the content version so cached fragments are not used.
+
+    Args:
+        cache_model: cache instance, default current.cache.ram
+        version_key: string, cache key of the version.
+
+    Returns:
+        integer, the new content version
+    """
+    if cache_model is None:
+        cache_model = current.cache.ram
+    try:
+        return cache_model.increment(version_key)
+    except Exception as err:        # pylint: disable=broad-except
+        LOG.error('Content version bump failed: %s', str(err))
+        return None
+
+
+def content_version(cache_model=None, version_key=CONTENT_VERSION_KEY):
+    """Return the content version.
+
+    Args:
+        cache_model: cache instance, default current.cache.ram
+        version_key: string, cache key of the version.
+
+    Returns:
+        integer, the content version
+    """
+    if cache_model is None:
+        cache_model = current.cache.ram
+    return cache_model(version_key, lambda: 0, time_expire=None)
@@ -4,6 +4,7 @@
 Classes and functions related to images.
 """
 import glob
+import hashlib
 import imghdr
 import os
 import re
@@ -172,7 +173,11 @@ class ImgTag():
 
     def url_vars(self):
         """Return the URL(..., vars=?) value."""
-        return {'size': self.size}
+        url_vars = {'size': self.size}
+        version = image_version(self.image, size=self.size)
+        if version:
+            url_vars['v'] = version
+        return url_vars
 
 
 class CachedImgTag(ImgTag):
@@ -441,6 +446,74 @@ def filename_for_size(original_filename, size):
     return new_name
 
 
+def image_url(image, size=None, **url_kwargs):
+    """Return the url for an uploaded image.
+
+    The url includes the content version of the image so the image can be
+    cached indefinitely.
+
+    Args:
+        image: string, name of image (as stored in db.field.image)
+        size: string, one of SIZES, if None, the original is used.
+        url_kwargs: dict, additional URL() keyword arguments,
+            eg host=True, scheme='https'
+
+    Returns:
+        string, url
+    """
+    url_vars = {}
+    if size:
+        url_vars['size'] = size
+    version = image_version(image, size=size)
+    if version:
+        url_vars['v'] = version
+    return URL(
+        c='images',
+        f='download',
+        args=image,
+        vars=url_vars,
+        **url_kwargs
+    )
+
+
+def image_version(image, size=None):
+    """Return the content version of an uploaded image.
+
+    The version is derived from the size and modification time of the
+    image file so it changes whenever the file is rewritten, eg resized or
+    optimized.
+
+    Args:
+        image: string, name of image (as stored in db.field.image)
+        size: string, one of SIZES, if None, the original is used.
+
+    Returns:
+        string, version, eg '3f1c0a9b2e7d'. '' if the image file is not found.
+    """
+    field = upload_field(image)
+    if field is None:
+        return ''
+
+    try:
+        fullname = UploadImage(field, image).fullname()
+    except (IOError, TypeError):
+        return ''
+
+    # Mimic ImageDownloader, fall back to original if size doesn't exist.
+    if size in SIZES and size != 'original':
+        resized = filename_for_size(fullname, size)
+        if os.path.exists(resized):
+            fullname = resized
+
+    try:
+        stat_file = os.stat(fullname)
+    except OSError:
+        return ''
+
+    signature = '{s}-{m}'.format(s=stat_file.st_size, m=stat_file.st_mtime_ns)
+    return hashlib.md5(signature.encode('utf-8')).hexdigest()[:12]
+
+
 def is_image(filename, image_types=None):
     """Determine if a file is an image.
 
@@ -691,3 +764,26 @@ def store(field, filename, resize=True, resizer=None):
 
     resize_img.cleanup()
     return stored_filename
+
+
+def upload_field(image):
+    """Return the upload field an image is stored in.
+
+    Args:
+        image: string, name of image (as stored in db.field.image)
+            eg book_page.image.801685b627e099e.300332e6a7067.jpg
+
+    Returns:
+        gluon.dal.Field instance, eg db.book_page.image, None if the field
+            cannot be determined.
+    """
+    if not image:
+        return None
+    items = re.compile(r'(?P<table>.*?)\.(?P<field>.*?)\..*').match(image)
+    if not items:
+        return None
+    db = current.app.db
+    try:
+        return db[items.group('table')][items.group('field')]
+    except (AttributeError, KeyError):
+        return None
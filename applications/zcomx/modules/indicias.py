@@ -22,6 +22,7 @@ from applications.zcomx.modules.creators import (
     short_url as creator_short_url,
 )
 from applications.zcomx.modules.images import (
+    image_url,
     on_delete_image,
     store,
 )
@@ -265,12 +266,7 @@ class BookIndiciaPage(IndiciaPage):
             f=os.path.join(*self.default_indicia_paths[1:])
         )
         if self.creator and self.creator.indicia_image:
-            img_src = URL(
-                c='images',
-                f='download',
-                args=self.creator.indicia_image,
-                vars={'size': 'web'}
-            )
+            img_src = image_url(self.creator.indicia_image, size='web')
 
         text_divs = []
 
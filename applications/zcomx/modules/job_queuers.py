@@ -19,6 +19,10 @@ PRIORITIES = [
     'purge_torrents',
     'create_sitemap',
     'search_prefetch',
+    'search_index',
+    'download_catalog',
+    'creator_grid',
+    'rollup_events',
     'optimize_original_img',
     'log_downloads',
     'delete_img',
@@ -155,6 +159,21 @@ class CreateCreatorTorrentQueuer(CreateTorrentQueuer):
     ]
 
 
+@Queuer.class_factory.register
+class CreatorGridQueuer(Queuer):
+    """Class representing a queuer for creator_grid jobs."""
+    class_factory_id = 'creator_grid'
+    program = os.path.join(Queuer.bin_path, 'creator_grid.py')
+    default_job_options = {
+        'priority': PRIORITIES.index('creator_grid'),
+        'status': 'a',
+    }
+    valid_cli_options = [
+        '-v', '-vv',
+    ]
+    queue_class = QueueWithSignal
+
+
 @Queuer.class_factory.register
 class DeleteBookQueuer(Queuer):
     """Class representing a queuer for delete_book jobs."""
@@ -170,6 +189,21 @@ class DeleteBookQueuer(Queuer):
     queue_class = QueueWithSignal
 
 
+@Queuer.class_factory.register
+class DownloadCatalogQueuer(Queuer):
+    """Class representing a queuer for download_catalog jobs."""
+    class_factory_id = 'download_catalog'
+    program = os.path.join(Queuer.bin_path, 'download_catalog.py')
+    default_job_options = {
+        'priority': PRIORITIES.index('download_catalog'),
+        'status': 'a',
+    }
+    valid_cli_options = [
+        '-v', '-vv',
+    ]
+    queue_class = QueueWithSignal
+
+
 @Queuer.class_factory.register
 class FileshareBookQueuer(Queuer):
     """Class representing a queuer for fileshare_book jobs."""
@@ -197,6 +231,8 @@ class LogDownloadsQueuer(Queuer):
         'status': 'a',
     }
     valid_cli_options = [
+        '-b', '--batch-size',
+        '--bulk',
         '-l', '--limit',
         '-r', '--requeue',
         '-v', '-vv',
@@ -336,6 +372,39 @@ class ReverseFileshareBookQueuer(FileshareBookQueuer):
     valid_cli_options.append('--reverse')
 
 
+@Queuer.class_factory.register
+class RollupEventsQueuer(Queuer):
+    """Class representing a queuer for rollup_events jobs."""
+    class_factory_id = 'rollup_events'
+    program = os.path.join(Queuer.bin_path, 'rollup_events.py')
+    default_job_options = {
+        'priority': PRIORITIES.index('rollup_events'),
+        'status': 'a',
+    }
+    valid_cli_options = [
+        '-b', '--batch-size',
+        '-v', '-vv',
+    ]
+    queue_class = QueueWithSignal
+
+
+@Queuer.class_factory.register
+class SearchIndexQueuer(Queuer):
+    """Class representing a queuer for search_index jobs."""
+    class_factory_id = 'search_index'
+    program = os.path.join(Queuer.bin_path, 'search_index.py')
+    default_job_options = {
+        'priority': PRIORITIES.index('search_index'),
+        'status': 'a',
+    }
+    valid_cli_options = [
+        '--book-id',
+        '--creator-id',
+        '-v', '-vv',
+    ]
+    queue_class = QueueWithSignal
+
+
 @Queuer.class_factory.register
 class SearchPrefetchQueuer(Queuer):
     """Class representing a queuer for search_prefetch jobs."""
@@ -346,6 +415,8 @@ class SearchPrefetchQueuer(Queuer):
         'status': 'a',
     }
     valid_cli_options = [
+        '--book-id',
+        '--creator-id',
         '-o', '--output',
         '-t', '--table',
         '-v', '-vv',
@@ -430,14 +501,85 @@ def queue_create_sitemap():
     return job
 
 
-def queue_search_prefetch():
+def queue_creator_grid(creator_id=None):
+    """Convenience function. Queues a creator grid job.
+
+    Since the job is generally not critical, apart from a log,
+    failures are ignored.
+
+    Args:
+        creator_id: integer, id of creator whose books changed. If None,
+            the creator grid is rebuilt for all creators.
+    """
+    db = current.app.db
+    cli_args = [str(creator_id)] if creator_id else []
+    job = CreatorGridQueuer(db.job, cli_args=cli_args).queue()
+    if not job:
+        LOG.error('Failed to create creator grid job')
+    return job
+
+
+def queue_download_catalog(creator_id=None):
+    """Convenience function. Queues a download catalog job.
+
+    Since the job is generally not critical, apart from a log,
+    failures are ignored.
+
+    Args:
+        creator_id: integer, id of creator whose books changed. If None,
+            the catalog is rebuilt for all creators.
+    """
+    db = current.app.db
+    cli_args = [str(creator_id)] if creator_id else []
+    job = DownloadCatalogQueuer(db.job, cli_args=cli_args).queue()
+    if not job:
+        LOG.error('Failed to create download catalog job')
+    return job
+
+
+def queue_search_index(book_ids=None, creator_ids=None):
+    """Convenience function. Queues a search index job.
+
+    Since the job is generally not critical, apart from a log,
+    failures are ignored.
+
+    Args:
+        book_ids: list of integers, ids of books that changed.
+        creator_ids: list of integers, ids of creators that changed.
+            If neither book_ids nor creator_ids are provided, the index
+            is rebuilt in full.
+    """
+    db = current.app.db
+    cli_options = {}
+    if book_ids:
+        cli_options['--book-id'] = [str(x) for x in book_ids]
+    if creator_ids:
+        cli_options['--creator-id'] = [str(x) for x in creator_ids]
+    job = SearchIndexQueuer(db.job, cli_options=cli_options).queue()
+    if not job:
+        LOG.error('Failed to create search index job')
+    return job
+
+
+def queue_search_prefetch(book_ids=None, creator_ids=None):
     """Convenience function. Queues a search prefetch job.
 
     Since the job is generally not critical, apart from a log,
     failures are ignored.
+
+    Args:
+        book_ids: list of integers, ids of books that changed.
+        creator_ids: list of integers, ids of creators that changed.
+            If neither book_ids nor creator_ids are provided, the prefetch
+            files are rebuilt in full.
     """
     db = current.app.db
-    job = SearchPrefetchQueuer(db.job).queue()
+    cli_options = {}
+    if book_ids:
+        cli_options['--book-id'] = [str(x) for x in book_ids]
+    if creator_ids:
+        cli_options['--creator-id'] = [str(x) for x in creator_ids]
+    job = SearchPrefetchQueuer(db.job, cli_options=cli_options).queue()
     if not job:
         LOG.error('Failed to create search prefetch job')
     return job
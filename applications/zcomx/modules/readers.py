@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to the book reader.
+"""
+import hashlib
+from gluon import *
+from gluon.storage import Storage
+from applications.zcomx.modules.fragment_caches import FragmentCache
+from applications.zcomx.modules.images import image_version
+from applications.zcomx.modules.indicias import BookIndiciaPage
+
+LOG = current.app.logger
+
+INDICIA_PAGE_NO_DEFAULT = 999999            # Very high number
+
+# Fields excluded from record versions. These change with every event
+# logged and don't affect the indicia.
+VOLATILE_FIELDS = [
+    'contributions',
+    'contributions_remaining',
+    'downloads',
+    'modified_by',
+    'modified_on',
+    'rating',
+    'rating_count',
+    'rating_total',
+    'views',
+]
+
+
+class ReaderPayload():
+    """Class representing the data of a book reader page.
+
+    The pages of the book are read with one select and the first and last
+    pages are taken from them. The rendered indicia page is cached keyed on
+    the versions of the book, its creator and its last page. See
+    record_version().
+    """
+
+    def __init__(self, book, creator=None, fragment_cache=None):
+        """Constructor
+
+        Args:
+            book: Book instance
+            creator: Creator instance, creator of book. Its version is part
+                of the indicia cache key.
+            fragment_cache: FragmentCache instance, cache of the rendered
+                indicia. Default FragmentCache()
+        """
+        self.book = book
+        self.creator = creator
+        self.fragment_cache = fragment_cache if fragment_cache is not None \
+            else FragmentCache()
+        self._indicia = None
+        self._pages = None
+
+    def first_page(self):
+        """Return the first page of the book.
+
+        Returns:
+            BookPage instance, None if the book has no first page.
+        """
+        for page in self.pages():
+            if page.page_no == 1:
+                return page
+        return None
+
+    def indicia(self):
+        """Return the indicia page of the book, rendering it if not cached.
+
+        Returns:
+            Storage, {
+                'content': str, html of the indicia page, '' if none.
+                'orientation': str, 'portrait' or 'landscape'
+            }
+        """
+        if self._indicia is None:
+            self._indicia = Storage(
+                self.fragment_cache(self.indicia_key(), self.render_indicia))
+        return self._indicia
+
+    def indicia_key(self):
+        """Return the key identifying the indicia in the cache.
+
+        Returns:
+            str, cache key
+        """
+        last_page = self.last_page()
+        return 'reader_indicia_{b}_{v}'.format(
+            b=self.book.id,
+            v=record_version(
+                self.book,
+                self.creator,
+                last_page.image if last_page else None,
+            ),
+        )
+
+    def last_page(self):
+        """Return the last page of the book.
+
+        Returns:
+            BookPage instance, None if the book has no pages.
+        """
+        pages = self.pages()
+        if not pages:
+            return None
+        return max(pages, key=lambda x: x.page_no)
+
+    def page_images(self):
+        """Return the images of the pages of the book, including the indicia
+        page.
+
+        Returns:
+            list of Storage instances
+        """
+        page_images = [
+            Storage({
+                'image': p.image,
+                'page_no': p.page_no,
+                'versions': {
+                    x: image_version(p.image, size=x) for x in ['cbz', 'web']
+                },
+            })
+            for p in self.pages()
+        ]
+
+        content = self.indicia().content
+        if content:
+            try:
+                indicia_page_no = max([x.page_no for x in page_images]) + 1
+            except (TypeError, ValueError):
+                indicia_page_no = INDICIA_PAGE_NO_DEFAULT
+
+            page_images.append(Storage({
+                'image': 'indicia',
+                'page_no': indicia_page_no,
+                'content': XML(content),
+            }))
+        return page_images
+
+    def pages(self):
+        """Return the pages of the book.
+
+        Returns:
+            list of BookPage instances
+        """
+        if self._pages is None:
+            self._pages = self.book.pages()
+        return self._pages
+
+    def render_indicia(self):
+        """Render the indicia page of the book.
+
+        Returns:
+            dict, see indicia()
+        """
+        orientation = 'portrait'
+        last_page = self.last_page()
+        if last_page:
+            try:
+                orientation = last_page.orientation()
+            except LookupError:
+                pass
+        if orientation != 'landscape':
+            orientation = 'portrait'
+
+        indicia = BookIndiciaPage(self.book)
+        # pylint: disable=protected-access
+        indicia._orientation = orientation
+        try:
+            content = str(indicia.render())
+        except LookupError:
+            content = ''
+        return {'content': content, 'orientation': orientation}
+
+
+def record_version(*records):
+    """Return a version identifying the values of records.
+
+    Args:
+        records: list of Record instances, or other values. Fields in
+            VOLATILE_FIELDS are ignored.
+
+    Returns:
+        str, hex digest
+    """
+    values = []
+    for record in records:
+        if hasattr(record, 'as_dict'):
+            record = sorted(
+                (k, str(v)) for k, v in record.as_dict().items()
+                if k not in VOLATILE_FIELDS
+            )
+        values.append(repr(record))
+    return hashlib.md5('|'.join(values).encode('utf-8')).hexdigest()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to rollups of book events.
+
+Book events (views, downloads and contributions) are aggregated into daily
+summaries per book in book_daily_rollup. Loggable download clicks are
+aggregated per clicked record (book, creator or all) and day in
+download_click_daily_rollup. Rollups are updated incrementally, the id of
+the last event rolled up from each event table is kept in rollup_mark.
+Reports read the rollups rather than counting the raw event records.
+Events deleted after they are rolled up must be subtracted from the
+rollups, see subtract_from_rollups().
+"""
+import datetime
+import functools
+from gluon import *
+from applications.zcomx.modules.records import Record
+
+LOG = current.app.logger
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Events younger than this are left for the next update. Events are
+# rolled up by id, this gives transactions inserting events, eg the event
+# spool drain, time to commit before ids past theirs are rolled up.
+LAG_SECONDS = 60
+
+ROLLUP_FIELDS = ['contribution_amount', 'contributions', 'downloads', 'views']
+
+# {event table: (rollup count field, rollup amount field)}
+ROLLUP_SOURCES = {
+    'book_view': ('views', None),
+    'contribution': ('contributions', 'contribution_amount'),
+    'download': ('downloads', None),
+}
+
+# Event tables rolled up, the book event tables and download_click.
+ROLLUP_NAMES = sorted(list(ROLLUP_SOURCES) + ['download_click'])
+
+
+class BookDailyRollup(Record):
+    """Class representing a book_daily_rollup record."""
+    db_table = 'book_daily_rollup'
+
+
+class DownloadClickDailyRollup(Record):
+    """Class representing a download_click_daily_rollup record."""
+    db_table = 'download_click_daily_rollup'
+
+
+class RollupMark(Record):
+    """Class representing a rollup_mark record."""
+    db_table = 'rollup_mark'
+
+
+def add_to_book_rollups(deltas):
+    """Add event counts to book_daily_rollup records. Records are created as
+    needed.
+
+    Args:
+        deltas: dict, {(book_id, day): {rollup field: value}}
+    """
+    db = current.app.db
+    if not deltas:
+        return
+
+    book_ids = sorted(set(x[0] for x in deltas))
+    days = sorted(set(x[1] for x in deltas))
+
+    query = (db.book.id.belongs(book_ids))
+    rows = db(query).select(db.book.id, db.book.creator_id)
+    creator_ids = {x.id: x.creator_id for x in rows}
+
+    query = (db.book_daily_rollup.book_id.belongs(book_ids)) & \
+        (db.book_daily_rollup.day.belongs(days))
+    rows = db(query).select(
+        db.book_daily_rollup.id,
+        db.book_daily_rollup.book_id,
+        db.book_daily_rollup.day,
+    )
+    rollup_ids = {(x.book_id, x.day): x.id for x in rows}
+
+    inserts = []
+    for key, values in sorted(deltas.items()):
+        rollup_id = rollup_ids.get(key)
+        if rollup_id:
+            data = {}
+            for field, value in values.items():
+                data[field] = db.book_daily_rollup[field] + value
+            db(db.book_daily_rollup.id == rollup_id).update(**data)
+            continue
+        data = dict(
+            book_id=key[0],
+            creator_id=creator_ids.get(key[0]),
+            day=key[1],
+        )
+        data.update(values)
+        inserts.append(data)
+
+    if inserts:
+        db.book_daily_rollup.bulk_insert(inserts)
+
+
+def add_to_click_rollups(deltas):
+    """Add click counts to download_click_daily_rollup records. Records are
+    created as needed.
+
+    Args:
+        deltas: dict, {(record_table, record_id, day): number of clicks}
+    """
+    db = current.app.db
+    if not deltas:
+        return
+
+    rollup = db.download_click_daily_rollup
+    record_ids = sorted(set(x[1] for x in deltas))
+    days = sorted(set(x[2] for x in deltas))
+    query = (rollup.record_id.belongs(record_ids)) & \
+        (rollup.day.belongs(days))
+    rows = db(query).select(
+        rollup.id,
+        rollup.record_table,
+        rollup.record_id,
+        rollup.day,
+    )
+    rollup_ids = {(x.record_table, x.record_id, x.day): x.id for x in rows}
+
+    inserts = []
+    for key, clicks in sorted(deltas.items()):
+        rollup_id = rollup_ids.get(key)
+        if rollup_id:
+            db(rollup.id == rollup_id).update(clicks=rollup.clicks + clicks)
+            continue
+        inserts.append(dict(
+            record_table=key[0],
+            record_id=key[1],
+            day=key[2],
+            clicks=clicks,
+        ))
+
+    if inserts:
+        rollup.bulk_insert(inserts)
+
+
+def book_totals(book_id, since=None):
+    """Return the rolled up event totals of a book.
+
+    Args:
+        book_id: integer, id of book
+        since: datetime.date, if provided, only days on or after this day
+            are totalled.
+
+    Returns:
+        dict, {rollup field: total}, see ROLLUP_FIELDS
+    """
+    db = current.app.db
+    query = (db.book_daily_rollup.book_id == book_id)
+    if since:
+        query = query & (db.book_daily_rollup.day >= since)
+    return rollup_totals(db.book_daily_rollup, query)
+
+
+def click_rollup_deltas(first_id, last_id, query=None):
+    """Return the loggable click counts of a range of download_click
+    records, by record and day.
+
+    Args:
+        first_id: integer, clicks with ids greater than this are counted.
+        last_id: integer, clicks with ids up to and including this are
+            counted.
+        query: gluon.dal.Query, if provided, only clicks matching this
+            are counted.
+
+    Returns:
+        dict, {(record_table, record_id, day): number of clicks}
+    """
+    db = current.app.db
+    table = db.download_click
+
+    year = table.time_stamp.year()
+    month = table.time_stamp.month()
+    day = table.time_stamp.day()
+    count = table.id.count()
+    queries = [
+        (table.id > first_id),
+        (table.id <= last_id),
+        (table.loggable == True),
+    ]
+    if query is not None:
+        queries.append(query)
+    rows = db(functools.reduce(lambda x, y: x & y, queries)).select(
+        table.record_table,
+        table.record_id,
+        year,
+        month,
+        day,
+        count,
+        groupby=table.record_table | table.record_id | year | month | day
+    )
+
+    deltas = {}
+    for row in rows:
+        if not row[table.record_table] or row[year] is None:
+            continue
+        key = (
+            row[table.record_table],
+            row[table.record_id] or 0,
+            datetime.date(row[year], row[month], row[day]),
+        )
+        deltas[key] = row[count]
+    return deltas
+
+
+def click_totals(record_table, record_id, since=None):
+    """Return the rolled up number of loggable clicks of a record.
+
+    Args:
+        record_table: string, one of 'all', 'book', 'creator'
+        record_id: integer, id of record, 0 for 'all'
+        since: datetime.date, if provided, only days on or after this day
+            are totalled.
+
+    Returns:
+        integer, number of clicks
+    """
+    db = current.app.db
+    rollup = db.download_click_daily_rollup
+    query = (rollup.record_table == record_table) & \
+        (rollup.record_id == record_id)
+    if since:
+        query = query & (rollup.day >= since)
+    clicks = rollup.clicks.sum()
+    return db(query).select(clicks).first()[clicks] or 0
+
+
+def event_counts(name, book_ids=None):
+    """Return the number of events of an event table by book.
+
+    Events up to the high-water mark are counted from the rollups, so
+    archived events are included. Events past the mark are counted from the
+    event table.
+
+    Args:
+        name: string, name of event table, one of ROLLUP_SOURCES
+        book_ids: list of integers, ids of books. Default all.
+
+    Returns:
+        dict, {book_id: number of events}. Books without events are not
+            included.
+    """
+    db = current.app.db
+    table = db[name]
+    rollup = db.book_daily_rollup
+    count_field = ROLLUP_SOURCES[name][0]
+    last_id = high_water_mark(name)
+
+    counts = {}
+    rolled_up = rollup[count_field].sum()
+    query = (rollup.book_id > 0)
+    if book_ids is not None:
+        query = (rollup.book_id.belongs(book_ids))
+    rows = db(query).select(
+        rollup.book_id, rolled_up, groupby=rollup.book_id)
+    for row in rows:
+        if row[rolled_up]:
+            counts[row[rollup.book_id]] = row[rolled_up]
+
+    count = table.id.count()
+    query = (table.id > last_id) & (table.book_id > 0)
+    if book_ids is not None:
+        query = (table.id > last_id) & (table.book_id.belongs(book_ids))
+    rows = db(query).select(table.book_id, count, groupby=table.book_id)
+    for row in rows:
+        book_id = row[table.book_id]
+        counts[book_id] = counts.get(book_id, 0) + row[count]
+    return counts
+
+
+def high_water_mark(name):
+    """Return the id of the last event rolled up from an event table.
+
+    Args:
+        name: string, name of event table, one of ROLLUP_NAMES
+
+    Returns:
+        integer, id of event, 0 if none are rolled up.
+    """
+    db = current.app.db
+    query = (db.rollup_mark.name == name)
+    row = db(query).select(db.rollup_mark.last_id, limitby=(0, 1)).first()
+    return (row.last_id or 0) if row else 0
+
+
+def rollup_deltas(name, first_id, last_id, query=None):
+    """Return the event counts of a range of events of an event table,
+    by book and day.
+
+    Args:
+        name: string, name of event table, one of ROLLUP_SOURCES
+        first_id: integer, events with ids greater than this are counted.
+        last_id: integer, events with ids up to and including this are
+            counted.
+        query: gluon.dal.Query, if provided, only events matching this
+            are counted.
+
+    Returns:
+        dict, {(book_id, day): {rollup field: value}}
+    """
+    db = current.app.db
+    table = db[name]
+    count_field, amount_field = ROLLUP_SOURCES[name]
+
+    year = table.time_stamp.year()
+    month = table.time_stamp.month()
+    day = table.time_stamp.day()
+    count = table.id.count()
+    fields = [table.book_id, year, month, day, count]
+    amount = None
+    if amount_field:
+        amount = table.amount.sum()
+        fields.append(amount)
+
+    queries = [(table.id > first_id), (table.id <= last_id)]
+    if query is not None:
+        queries.append(query)
+    rows = db(functools.reduce(lambda x, y: x & y, queries)).select(
+        *fields,
+        groupby=table.book_id | year | month | day
+    )
+
+    deltas = {}
+    for row in rows:
+        if not row[table.book_id] or row[year] is None:
+            continue
+        key = (
+            row[table.book_id],
+            datetime.date(row[year], row[month], row[day]),
+        )
+        values = {count_field: row[count]}
+        if amount_field:
+            values[amount_field] = row[amount] or 0
+        deltas[key] = values
+    return deltas
+
+
+def rollup_totals(table, query):
+    """Return the totals of rollup records.
+
+    Args:
+        table: gluon.dal.Table, book_daily_rollup
+        query: gluon.dal.Query, query of rollup records totalled.
+
+    Returns:
+        dict, {rollup field: total}, see ROLLUP_FIELDS
+    """
+    db = current.app.db
+    sums = [(x, table[x].sum()) for x in ROLLUP_FIELDS]
+    row = db(query).select(*[x[1] for x in sums]).first()
+    return {x: row[aggregate] or 0 for x, aggregate in sums}
+
+
+def set_high_water_mark(name, last_id):
+    """Set the id of the last event rolled up from an event table.
+
+    Args:
+        name: string, name of event table, one of ROLLUP_NAMES
+        last_id: integer, id of event
+    """
+    db = current.app.db
+    db.rollup_mark.update_or_insert(
+        db.rollup_mark.name == name,
+        name=name,
+        last_id=last_id,
+    )
+
+
+def subtract_from_rollups(name, query):
+    """Subtract events about to be deleted from the rollups.
+
+    Call this before deleting events, in the same transaction. Only events
+    up to the high-water mark are rolled up, events past it are ignored.
+
+    Args:
+        name: string, name of event table, one of ROLLUP_NAMES
+        query: gluon.dal.Query, query of the events deleted.
+
+    Returns:
+        integer, number of rolled up events subtracted.
+    """
+    last_id = high_water_mark(name)
+    if name == 'download_click':
+        deltas = click_rollup_deltas(0, last_id, query=query)
+        add_to_click_rollups({k: -v for k, v in deltas.items()})
+        return sum(deltas.values())
+
+    deltas = rollup_deltas(name, 0, last_id, query=query)
+    add_to_book_rollups({
+        k: {field: -value for field, value in values.items()}
+        for k, values in deltas.items()
+    })
+    count_field = ROLLUP_SOURCES[name][0]
+    return sum(x[count_field] for x in deltas.values())
+
+
+def update_rollups(names=None, batch_size=DEFAULT_BATCH_SIZE, as_of=None):
+    """Roll up the events added since the last update.
+
+    Events are rolled up in batches of ids, one transaction per batch. The
+    high-water mark of the event table is set in the same transaction so an
+    interrupted update resumes where it left off.
+
+    Args:
+        names: list of event table names, see ROLLUP_NAMES. Default all.
+        batch_size: integer, number of event ids per batch.
+        as_of: datetime.datetime, events with time stamps within LAG_SECONDS
+            of this are not rolled up. Default: datetime.datetime.now()
+
+    Returns:
+        dict, {event table name: number of events rolled up}
+    """
+    db = current.app.db
+    if as_of is None:
+        as_of = datetime.datetime.now()
+    cutoff = as_of - datetime.timedelta(seconds=LAG_SECONDS)
+
+    counts = {}
+    for name in sorted(names or ROLLUP_NAMES):
+        table = db[name]
+        maximum = table.id.max()
+        query = (table.time_stamp <= cutoff)
+        max_id = db(query).select(maximum).first()[maximum] or 0
+
+        counts[name] = 0
+        last_id = high_water_mark(name)
+        while last_id < max_id:
+            batch_last_id = min(last_id + batch_size, max_id)
+            if name == 'download_click':
+                deltas = click_rollup_deltas(last_id, batch_last_id)
+                add_to_click_rollups(deltas)
+                count = sum(deltas.values())
+            else:
+                deltas = rollup_deltas(name, last_id, batch_last_id)
+                add_to_book_rollups(deltas)
+                count_field = ROLLUP_SOURCES[name][0]
+                count = sum(x[count_field] for x in deltas.values())
+            set_high_water_mark(name, batch_last_id)
+            db.commit()
+            counts[name] += count
+            LOG.debug(
+                'Rolled up %s ids: %s - %s', name, last_id, batch_last_id)
+            last_id = batch_last_id
+    return counts
@@ -9,6 +9,7 @@ import re
 from gluon import *
 from gluon.html import A, SPAN
 from gluon.storage import Storage
+from applications.zcomx.modules.book_marks import book_mark_store
 from applications.zcomx.modules.book_pages import BookPage
 from applications.zcomx.modules.books import (
     Book,
@@ -22,23 +23,25 @@ from applications.zcomx.modules.creators import (
     Creator,
     url as creator_url,
 )
+from applications.zcomx.modules.event_spools import event_spool
 from applications.zcomx.modules.events import ViewEvent
 from applications.zcomx.modules.html.meta import (
     MetadataFactory,
     html_metadata_from_records,
 )
-from applications.zcomx.modules.indicias import BookIndiciaPage
 from applications.zcomx.modules.links import (
     BookReviewLinkSet,
     BuyBookLinkSet,
     CreatorArticleLinkSet,
     CreatorPageLinkSet,
 )
+from applications.zcomx.modules.readers import ReaderPayload
 from applications.zcomx.modules.search import (
     CompletedGrid,
     CreatorMoniesGrid,
     OngoingGrid,
 )
+from applications.zcomx.modules.url_names import URL_NAME_CACHE
 from applications.zcomx.modules.user_agents import is_bot
 from applications.zcomx.modules.zco import (
     BOOK_STATUS_DISABLED,
@@ -84,7 +87,6 @@ class Router():
         Returns:
             gluon.dal.Row representing book record
         """
-        db = current.app.db
         request = self.request
         if not self.book:
             if request.vars.book:
@@ -92,12 +94,8 @@ class Router():
                 if creator:
                     encoded_name = \
                         request.vars.book.encode('latin-1').decode('utf-8')
-                    match = encoded_name.lower()
-                    query = (db.book.creator_id == creator.id) & \
-                        (db.book.name_for_url.lower() == match)
-                    book_row = db(query).select(limitby=(0, 1)).first()
-                    if book_row:
-                        self.book = Book(book_row.as_dict())
+                    self.book = URL_NAME_CACHE.record_from_name(
+                        Book, encoded_name, creator_id=creator.id)
         return self.book
 
     def get_creator(self):
@@ -106,7 +104,6 @@ class Router():
         Returns:
             gluon.dal.Row representing creator record
         """
-        db = current.app.db
         request = self.request
         if not self.creator:
             request_vars_creator = None
@@ -137,11 +134,9 @@ class Router():
                 if not self.creator:
                     encoded_name = \
                         request_vars_creator.encode('latin-1').decode('utf-8')
-                    name = encoded_name.replace('_', ' ').lower()
-                    query = (db.creator.name_for_url.lower() == name)
-                    creator_row = db(query).select(limitby=(0, 1)).first()
-                    if creator_row:
-                        self.creator = Creator(creator_row.as_dict())
+                    name = encoded_name.replace('_', ' ')
+                    self.creator = URL_NAME_CACHE.record_from_name(
+                        Creator, name)
 
                 # Raise exception on 'SpareNN' records so 404 is returned.
                 if self.creator:
@@ -536,37 +531,14 @@ class Router():
 
         reader = self.get_reader()
 
-        page_images = [
-            Storage({'image': p.image, 'page_no': p.page_no})
-            for p in book.pages()
-        ]
-
-        # Add indicia page
-        indicia = BookIndiciaPage(book)
-        try:
-            content = indicia.render()
-        except LookupError:
-            content = ''
-
-        if content:
-            try:
-                indicia_page_no = max([x.page_no for x in page_images]) + 1
-            except (TypeError, ValueError):
-                indicia_page_no = 999999            # Very high number
-
-            page_images.append(Storage({
-                'image': 'indicia',
-                'page_no': indicia_page_no,
-                'content': content,
-            }))
+        payload = ReaderPayload(book, creator=creator)
+        page_images = payload.page_images()
 
         if not is_bot():
-            ViewEvent(book, self.auth.user_id).log()
+            ViewEvent(
+                book, self.auth.user_id, spool=event_spool()).log()
 
-        try:
-            first_page = get_page(book, page_no='first')
-        except LookupError:
-            first_page = None
+        first_page = payload.first_page()
 
         # The reader_link is the opposite of the current reader
         reader_link_text = 'scroll' if reader == 'slider' else 'slide'
@@ -579,6 +551,8 @@ class Router():
                 reader=link_url_reader,
                 embed=self.embed,
                 zbr_origin=self.zbr_origin,
+                book=book,
+                creator=creator,
             ),
             _class='btn btn-default scroller_slider_link',
             cid=request.cid
@@ -592,11 +566,11 @@ class Router():
         use_scroller_if_short_view = False
         if 'reader' not in request.vars \
                 and reader != 'scroller' \
-                and indicia.get_orientation() != 'landscape':
+                and payload.indicia().orientation != 'landscape':
             use_scroller_if_short_view = True
 
-        book_marks = Zco().book_marks
-        resume_page_no = book_marks[book.id] if book.id in book_marks else 1
+        store = book_mark_store()
+        resume_page_no = (store.page_no(book.id) if store else None) or 1
         resume_page_no = max(resume_page_no, 1)
         resume_page_no = min(resume_page_no, len(page_images))
 
@@ -2,11 +2,17 @@
 # -*- coding: utf-8 -*-
 """
 Classes and functions related to rss feeds.
+
+Feeds are cached keyed on a feed version. The version is bumped by
+process_activity_logs.py when it creates activity_log records so cached
+feeds are not used once there is new activity.
 """
 import datetime
 import os
+import time
 import gluon.contrib.rss2 as rss2
 from gluon import *
+from gluon.storage import Storage
 from applications.zcomx.modules.activity_logs import ActivityLog
 from applications.zcomx.modules.book_pages import (
     BookPage,
@@ -22,7 +28,14 @@ from applications.zcomx.modules.creators import (
     Creator,
     url as creator_url,
 )
-from applications.zcomx.modules.images import ImageDescriptor
+from applications.zcomx.modules.fragment_caches import (
+    FragmentCache,
+    bump_content_version,
+)
+from applications.zcomx.modules.images import (
+    ImageDescriptor,
+    image_url,
+)
 from applications.zcomx.modules.zco import (
     SITE_NAME,
     Zco,
@@ -30,6 +43,8 @@ from applications.zcomx.modules.zco import (
 
 LOG = current.app.logger
 
+FEED_TIME_EXPIRE = 15 * 60                        # 15 minutes
+FEED_VERSION_KEY = 'rss_feed_version'
 MINIMUM_AGE_TO_LOG_IN_SECONDS = 4 * 60 * 60       # 4 hours
 
 
@@ -46,6 +61,38 @@ class BaseRSSChannel():
         """
         self.record = record
 
+    def cache_key(self):
+        """Return the key identifying the channel feed in the cache.
+
+        Returns:
+            string, cache key
+        """
+        return 'rss_feed_{c}_{i}'.format(
+            c=self.__class__.__name__,
+            i=self.record.id if self.record else 0,
+        )
+
+    def cached_feed(self, fragment_cache=None, etag=None):
+        """Return a feed for the channel, from the cache if available.
+
+        Args:
+            fragment_cache: FragmentCache instance, the cache of feeds.
+                Default is a cache keyed on the feed version.
+            etag: str, entity tag of the feed, see validators(). If provided,
+                the feed is cached keyed on it so a change in activity
+                refreshes the feed.
+
+        Returns:
+            dict, see feed()
+        """
+        if fragment_cache is None:
+            fragment_cache = FragmentCache(
+                time_expire=FEED_TIME_EXPIRE,
+                version_key=FEED_VERSION_KEY,
+            )
+        key = etag.strip('"') if etag else self.cache_key()
+        return dict(fragment_cache(key, self.feed))
+
     def description(self):
         """Return the description for the channel.
 
@@ -64,16 +111,18 @@ class BaseRSSChannel():
         items = []
         query = self.filter_query()
         rows = db(query).select(
-            db.activity_log.id,
+            db.activity_log.ALL,
             left=[
                 db.book.on(db.book.id == db.activity_log.book_id),
             ],
             orderby=~db.activity_log.time_stamp,
         )
-        for r in rows:
-            activity_log = ActivityLog.from_id(r.id)
+        activity_logs = [ActivityLog(x.as_dict()) for x in rows]
+        records = RSSEntryRecords.from_activity_logs(activity_logs)
+        for activity_log in activity_logs:
             try:
-                entry = activity_log_as_rss_entry(activity_log).feed_item()
+                entry = activity_log_as_rss_entry(
+                    activity_log, records=records).feed_item()
             except LookupError:
                 # This may happen if a book deletion is in progress
                 # LOG.error(err)
@@ -119,6 +168,35 @@ class BaseRSSChannel():
             self.link(),
         )
 
+    def last_activity(self):
+        """Return the latest activity of the channel.
+
+        Returns:
+            Storage, {
+                'count': integer, number of activity_log records in feed
+                'id': integer, maximum activity_log id, None if no records
+                'time_stamp': datetime.datetime, maximum activity_log
+                    time_stamp, None if no records
+            }
+        """
+        db = current.app.db
+        count = db.activity_log.id.count()
+        max_id = db.activity_log.id.max()
+        max_time_stamp = db.activity_log.time_stamp.max()
+        row = db(self.filter_query()).select(
+            count,
+            max_id,
+            max_time_stamp,
+            left=[
+                db.book.on(db.book.id == db.activity_log.book_id),
+            ],
+        ).first()
+        return Storage(
+            count=row[count] or 0,
+            id=row[max_id],
+            time_stamp=row[max_time_stamp],
+        )
+
     def link(self):
         """Return the link for the channel.
 
@@ -135,6 +213,31 @@ class BaseRSSChannel():
         """
         raise NotImplementedError()
 
+    def validators(self):
+        """Return the conditional GET validators of the channel feed.
+
+        The feed only changes when activity_log records are added to, or
+        age out of, the channel, so the validators are derived from the
+        latest activity rather than the rendered feed.
+
+        Returns:
+            tuple, (etag, last_modified)
+                etag: str, quoted entity tag
+                last_modified: float, seconds since epoch of the latest
+                    activity, 0 if there is no activity.
+        """
+        activity = self.last_activity()
+        last_modified = 0
+        if activity.time_stamp:
+            last_modified = time.mktime(activity.time_stamp.timetuple())
+        etag = '"{k}-{i:x}-{n:x}-{t:x}"'.format(
+            k=self.cache_key(),
+            i=activity.id or 0,
+            n=activity.count,
+            t=int(last_modified),
+        )
+        return (etag, last_modified)
+
 
 class AllRSSChannel(BaseRSSChannel):
     """Class representing a RSS channel for all zco.mx activity."""
@@ -229,7 +332,8 @@ class CartoonistRSSChannel(BaseRSSChannel):
 class BaseRSSEntry():
     """Class representing a BaseRSSEntry"""
 
-    def __init__(self, book_page_ids, time_stamp, activity_log_id):
+    def __init__(
+            self, book_page_ids, time_stamp, activity_log_id, records=None):
         """Initializer
 
         Args:
@@ -238,18 +342,22 @@ class BaseRSSEntry():
                 activity took place.
             activity_log_id: integer, id of activity_log record the entry
                 is about.
+            records: RSSEntryRecords instance, records of the entries
+                loaded in bulk. If None, records are loaded as needed.
         """
         self.book_page_ids = book_page_ids
         self.time_stamp = time_stamp
         self.activity_log_id = activity_log_id
+        self.records = records if records is not None else RSSEntryRecords()
         if not book_page_ids:
             raise LookupError('No book page ids provided')
         self.first_page = self.first_of_pages()
         if not self.first_page:
             raise LookupError('First page not found within: {e}'.format(
                 e=self.book_page_ids))
-        self.book = Book.from_id(self.first_page.book_id)
-        self.creator = Creator.from_id(self.book.creator_id)
+        self.book = self.records.book(self.first_page.book_id)
+        self.creator = self.records.creator(self.book.creator_id)
+        self.creator_name = self.records.creator_name(self.creator)
 
     def created_on(self):
         """Return the created_on value for the entry.
@@ -267,7 +375,7 @@ class BaseRSSEntry():
         """
         return self.description_fmt().format(
             b=book_formatted_name(self.book, include_publication_year=False),
-            c=self.creator.name,
+            c=self.creator_name,
             d=datetime.datetime.strftime(self.time_stamp, '%b %d, %Y')
         )
 
@@ -286,11 +394,9 @@ class BaseRSSEntry():
         Returns
             rss2.Enclosure instance.
         """
-        url = URL(
-            c='images',
-            f='download',
-            args=self.first_page.image,
-            vars={'size': 'web'},
+        url = image_url(
+            self.first_page.image,
+            size='web',
             host=SITE_NAME,
             scheme='http',          # RSS validation suggests this
         )
@@ -327,18 +433,13 @@ class BaseRSSEntry():
         the minimum page_no value.
 
         Returns:
-            Row instance representing a book_page record.
+            BookPage instance representing a book_page record.
         """
-        db = current.app.db
-        rows = db(db.book_page.id.belongs(self.book_page_ids)).select(
-            db.book_page.id,
-            orderby=db.book_page.page_no,
-            limitby=(0, 1),
-        )
-        if not rows:
+        book_pages = self.records.book_pages(self.book_page_ids)
+        if not book_pages:
             return
 
-        return BookPage.from_id(rows[0].id)
+        return min(book_pages, key=lambda x: x.page_no)
 
     def guid(self):
         """Return a guid for the entry.
@@ -369,11 +470,11 @@ class BaseRSSEntry():
         Returns:
             string, entry title.
         """
-        pages = [BookPage.from_id(x) for x in self.book_page_ids]
+        pages = self.records.book_pages(self.book_page_ids)
         return "'{b}' {p} by {c}".format(
             b=book_formatted_name(self.book, include_publication_year=False),
             p=' '.join(AbridgedBookPageNumbers(pages).numbers()),
-            c=self.creator.name,
+            c=self.creator_name,
         )
 
 
@@ -415,12 +516,165 @@ class RSS2WithAtom(rss2.RSS2):
         )
 
 
-def activity_log_as_rss_entry(activity_log):
+class RSSEntryRecords():
+    """Class representing the records associated with rss entries.
+
+    The book pages, books and creators of the entries of a feed are loaded
+    with one select each, rather than lookups per entry.
+    """
+
+    def __init__(
+            self,
+            book_pages=None,
+            books=None,
+            creators=None,
+            creator_names=None):
+        """Constructor
+
+        Args:
+            book_pages: dict, {book_page.id: BookPage instance}, the value
+                is None if the book page doesn't exist.
+            books: dict, {book.id: Book instance}
+            creators: dict, {creator.id: Creator instance}
+            creator_names: dict, {creator.id: name of creator}
+        """
+        self._book_pages = book_pages or {}
+        self.books = books or {}
+        self.creators = creators or {}
+        self.creator_names = creator_names or {}
+
+    def book(self, book_id):
+        """Return a book.
+
+        Args:
+            book_id: integer, id of book record
+
+        Returns:
+            Book instance
+        """
+        if book_id not in self.books:
+            self.books[book_id] = Book.from_id(book_id)
+        return self.books[book_id]
+
+    def book_pages(self, book_page_ids):
+        """Return book pages.
+
+        Args:
+            book_page_ids: list of integers, ids of book_page records
+
+        Returns:
+            list of BookPage instances, in order of book_page_ids. Pages
+                that don't exist are not included.
+        """
+        missing = [x for x in book_page_ids if x not in self._book_pages]
+        if missing:
+            self._book_pages.update(self.load_book_pages(missing))
+        return [
+            self._book_pages[x] for x in book_page_ids
+            if self._book_pages[x] is not None
+        ]
+
+    def creator(self, creator_id):
+        """Return a creator.
+
+        Args:
+            creator_id: integer, id of creator record
+
+        Returns:
+            Creator instance
+        """
+        if creator_id not in self.creators:
+            self.creators[creator_id] = Creator.from_id(creator_id)
+        return self.creators[creator_id]
+
+    def creator_name(self, creator):
+        """Return the name of a creator.
+
+        Args:
+            creator: Creator instance
+
+        Returns:
+            str, the name of the creator
+        """
+        if creator.id not in self.creator_names:
+            self.creator_names[creator.id] = creator.name
+        return self.creator_names[creator.id]
+
+    @classmethod
+    def from_activity_logs(cls, activity_logs):
+        """Create instance from activity logs.
+
+        Args:
+            activity_logs: list of ActivityLog instances
+
+        Returns:
+            RSSEntryRecords instance
+        """
+        db = current.app.db
+        book_page_ids = set()
+        for activity_log in activity_logs:
+            book_page_ids.update(activity_log.book_page_ids or [])
+
+        book_pages = cls.load_book_pages(book_page_ids)
+        book_ids = {x.book_id for x in book_pages.values() if x is not None}
+
+        books = {}
+        if book_ids:
+            books = {
+                x.id: Book(x.as_dict())
+                for x in db(db.book.id.belongs(book_ids)).select()
+            }
+
+        creators = {}
+        creator_names = {}
+        creator_ids = {x.creator_id for x in books.values()}
+        if creator_ids:
+            rows = db(db.creator.id.belongs(creator_ids)).select(
+                db.creator.ALL,
+                db.auth_user.name,
+                left=[
+                    db.auth_user.on(
+                        db.creator.auth_user_id == db.auth_user.id),
+                ],
+            )
+            for row in rows:
+                creators[row.creator.id] = Creator(row.creator.as_dict())
+                creator_names[row.creator.id] = row.auth_user.name
+
+        return cls(
+            book_pages=book_pages,
+            books=books,
+            creators=creators,
+            creator_names=creator_names,
+        )
+
+    @classmethod
+    def load_book_pages(cls, book_page_ids):
+        """Load book pages with one select.
+
+        Args:
+            book_page_ids: iterable of integers, ids of book_page records
+
+        Returns:
+            dict, {book_page.id: BookPage instance}, the value is None if
+                the book page doesn't exist.
+        """
+        db = current.app.db
+        book_pages = {x: None for x in book_page_ids}
+        if book_pages:
+            query = (db.book_page.id.belongs(list(book_pages.keys())))
+            for row in db(query).select():
+                book_pages[row.id] = BookPage(row.as_dict())
+        return book_pages
+
+
+def activity_log_as_rss_entry(activity_log, records=None):
     """Factory to create a BaseRSSEntry subclass instance from an activity_log
     record.
 
     Args:
         activity_log: ActivityLog instance
+        records: RSSEntryRecords instance, see BaseRSSEntry
 
     Returns:
         BaseRSSEntry subclass instance.
@@ -429,7 +683,13 @@ def activity_log_as_rss_entry(activity_log):
         raise LookupError('activity_log has no book page ids, id {i}'.format(
             i=activity_log.id))
 
-    book_page_ids = activity_log.verified_book_page_ids()
+    if records is None:
+        records = RSSEntryRecords()
+
+    # Pages of books can be deleted after the activity log record is
+    # created. Only the ids of pages that exist are used.
+    book_page_ids = [
+        x.id for x in records.book_pages(activity_log.book_page_ids)]
     if not book_page_ids:
         fmt = 'activity_log has no verifiable book page ids, id {i}'
         raise LookupError(fmt.format(i=activity_log.id))
@@ -438,10 +698,24 @@ def activity_log_as_rss_entry(activity_log):
     return entry_class(
         book_page_ids,
         activity_log.time_stamp,
-        activity_log.id
+        activity_log.id,
+        records=records,
     )
 
 
+def bump_feed_version(cache_model=None):
+    """Increment the feed version so cached feeds are not used.
+
+    Args:
+        cache_model: cache instance, default current.cache.ram
+
+    Returns:
+        integer, the new feed version
+    """
+    return bump_content_version(
+        cache_model=cache_model, version_key=FEED_VERSION_KEY)
+
+
 def channel_from_type(channel_type, record_id=None):
     """Factory for returning a RSSChannel instance from args.
 
@@ -3,12 +3,14 @@
 """
 Search classes and functions.
 """
+import hashlib
 import string
 from functools import reduce
-from bs4 import BeautifulSoup
 from pydal.validators import urlify
 from gluon import *
 from gluon.tools import prettydate
+from applications.zcomx.modules.book_pages import BookPage
+from applications.zcomx.modules.book_types import BookType
 from applications.zcomx.modules.books import (
     Book,
     complete_link as book_complete_link,
@@ -36,6 +38,7 @@ from applications.zcomx.modules.creators import (
     url as creator_url,
 )
 from applications.zcomx.modules.images import CreatorImgTag
+from applications.zcomx.modules.search_indexes import SearchIndex
 from applications.zcomx.modules.stickon.sqlhtml import make_grid_class
 from applications.zcomx.modules.utils import (
     ClassFactory,
@@ -163,6 +166,10 @@ class Grid():
     _not_found_msg = None
 
     class_factory = ClassFactory('class_factory_id')
+
+    # Request vars a cached fragment can vary by.
+    fragment_vars = ['alpha', 'o', 'order', 'page', 'view']
+
     viewbys = {
         # name: items_per_page
         'list': {
@@ -179,7 +186,8 @@ class Grid():
             self,
             form_grid_args=None,
             queries=None,
-            default_viewby='tile'):
+            default_viewby='tile',
+            fragment_cache=None):
         """Constructor
 
         Args:
@@ -189,6 +197,10 @@ class Grid():
                 for filtering records in results.
             default_viewby: string, one of 'list', 'tile'. The default view to
                 use.
+            fragment_cache: FragmentCache instance, if provided the rendered
+                grid is cached and the grid records are only selected when
+                the cache is missed. Ignored if the request has vars other
+                than those in fragment_vars.
         """
         self.form_grid_args = form_grid_args
         self.queries = queries
@@ -207,11 +219,87 @@ class Grid():
 
         self.form_grid = None
         self._paginate = None
+        self._tile_count = 0
+        self._tile_rows = []
         self.viewby = self.request.vars.view \
             if self.request.vars.view \
             and self.request.vars.view in self.viewbys \
             else self.default_viewby
-        self._set()
+
+        self.fragment_cache = fragment_cache
+        if set(self.request.vars.keys()) - set(self.fragment_vars):
+            self.fragment_cache = None
+
+        if self.fragment_cache is None:
+            self._set()
+
+    def _render(self):
+        """Render the grid.
+
+        Returns:
+            DIV instance
+        """
+        if self.viewby == 'list':
+            paginator = None
+            if self.form_grid:
+                for component in self.form_grid.components:
+                    if isinstance(component, DIV) and str(
+                            component['_class']).startswith(
+                                'web2py_paginator'):
+                        paginator = component
+                        break
+            self.has_numeric_paginator = bool(paginator)
+
+            grid_div = DIV(
+                self.form_grid,
+                _class='grid_section row'
+            )
+
+            if self._not_found_msg is not None:
+                replace_in_elements(
+                    grid_div,
+                    'No records found',
+                    current.T(self._not_found_msg),
+                    callback=lambda x: x.add_class('not_found_msg')
+                )
+            return grid_div
+
+        paginator = self.numeric_paginator()
+        self.has_numeric_paginator = bool(paginator)
+
+        divs = []
+        tiles = []
+        rows = self.rows()
+        if rows:
+            records = TileRecords.from_rows(rows)
+            for row in rows:
+                value = self.tile_value(row)
+                tile_class = BookTile
+                if self.request.vars:
+                    if self.request.vars.o \
+                            and self.request.vars.o == 'creators':
+                        tile_class = CartoonistTile
+                    elif self.request.vars.monies:
+                        tile_class = MoniesBookTile
+                tile = tile_class(value, row, records=records)
+                tiles.append(tile.render())
+
+            divs.append(DIV(
+                tiles,
+                _class='row tile_view'
+            ))
+
+            if paginator:
+                divs.append(DIV(paginator))
+        elif self._not_found_msg is not None:
+            divs.append(DIV(
+                current.T(self._not_found_msg),
+                _class='not_found_msg'
+            ))
+        else:
+            divs.append(DIV(current.T('No records found')))
+
+        return DIV(divs, _class='grid_section')
 
     def _set(self):
         """Set the grid. """
@@ -233,14 +321,26 @@ class Grid():
             _class="nowrap",
         )
 
+        book_types = TileRecords.book_types()
+
         def book_name_rep(value, row):
             """db.book.name.represent."""
             # pylint: disable=unused-argument       # value
-            book = Book.from_id(row.book.id)
+            # The grid row has the fields needed for the name and url so
+            # no records are fetched per row.
+            book = Book(row.book.as_dict())
             return DIV(
                 A(
-                    formatted_name(book, include_publication_year=False),
-                    _href=book_url(book, extension=False),
+                    formatted_name(
+                        book,
+                        include_publication_year=False,
+                        book_type=book_types.get(book.book_type_id),
+                    ),
+                    _href=book_url(
+                        book,
+                        creator=Creator(row.creator.as_dict()),
+                        extension=False
+                    ),
                     _class="nowrap",
                 ),
                 _class="text_overflow_ellipsis grid_book_name",
@@ -270,10 +370,10 @@ class Grid():
             db.creator.contributions_remaining,
             db.creator.torrent,
             db.creator.name_for_url,
-            db.creator_grid_v.completed,
-            db.creator_grid_v.ongoing,
-            db.creator_grid_v.views,
-            db.creator_grid_v.downloads,
+            db.creator_grid.completed,
+            db.creator_grid.ongoing,
+            db.creator_grid.views,
+            db.creator_grid.downloads,
         ]
 
         visible = [str(x) for x in self.visible_fields()]
@@ -353,8 +453,8 @@ class Grid():
                 db.auth_user.on(
                     db.creator.auth_user_id == db.auth_user.id
                 ),
-                db.creator_grid_v.on(
-                    db.book.creator_id == db.creator_grid_v.creator_id),
+                db.creator_grid.on(
+                    db.book.creator_id == db.creator_grid.creator_id),
             ],
             paginate=self.viewbys[self.viewby]['items_per_page'],
             details=False,
@@ -375,23 +475,80 @@ class Grid():
         if self.form_grid_args:
             kwargs.update(self.form_grid_args)
 
+        self._paginate = kwargs['paginate']
+        self.form_grid = None
+
+        if self.viewby == 'tile':
+            # Tiles are rendered from the rows, the SQLFORM.grid html is not
+            # used, so select the rows directly.
+            self._set_tile_rows(query, kwargs)
+            return
+
         grid_class = make_grid_class(
             export='none', search='none', ui='glyphicon')
 
-        self.form_grid = None
         try:
             self.form_grid = grid_class.grid(query, **kwargs)
         except AttributeError as err:
             LOG.error('str(err): %s', str(err))
 
-        self._paginate = kwargs['paginate']
-
         if self.form_grid:
             # Remove 'None' record count if applicable.
             for count, div in enumerate(self.form_grid[0]):
                 if str(div) == '<div class="web2py_counter">None</div>':
                     del self.form_grid[0][count]
 
+    def _set_tile_rows(self, query, kwargs):
+        """Set the rows displayed in tile view.
+
+        The rows, count and order match those SQLFORM.grid would select
+        with the same parameters.
+
+        Args:
+            query: gluon.dal.Expression, query of grid
+            kwargs: dict, SQLFORM.grid parameters
+        """
+        db = self.db
+        dbset = db(query)
+        left = kwargs['left']
+        groupby = kwargs['groupby']
+
+        try:
+            if groupby:
+                sql = dbset._select(
+                    'count(*) AS count_all', left=left, groupby=groupby)
+                self._tile_count = db.executesql(
+                    'select count(*) from ({s}) _tmp;'.format(s=sql[:-1])
+                )[0][0]
+            else:
+                self._tile_count = dbset.count()
+        except Exception as err:        # pylint: disable=broad-except
+            LOG.error('Tile count failed: %s', str(err))
+            self._tile_count = 0
+            return
+
+        orderby = kwargs['orderby']
+        order = self.request.vars.order or ''
+        sortable = [str(x) for x in kwargs['fields'] if x.readable]
+        if order and order.split('~')[-1] in sortable:
+            tablename, fieldname = order.split('~')[-1].split('.', 1)
+            sort_field = db[tablename][fieldname]
+            orderby = sort_field if order[:1] != '~' else ~sort_field
+
+        limitby = None
+        if self._paginate and self._paginate < self._tile_count:
+            page = self.page_no() - 1
+            limitby = (self._paginate * page, self._paginate * (page + 1))
+
+        self._tile_rows = dbset.select(
+            *kwargs['fields'],
+            left=left,
+            orderby=orderby,
+            groupby=groupby,
+            limitby=limitby,
+            cacheable=True
+        )
+
     def alpha_paginator(self):
         """Return alpha paginator instance."""
         return AlphaPaginator(self.request)
@@ -404,6 +561,28 @@ class Grid():
         """
         return []
 
+    def fragment_key(self):
+        """Return the key identifying the rendered grid in the cache.
+
+        Returns:
+            string
+        """
+        request = self.request
+        parts = [
+            self.__class__.__name__,
+            self.viewby,
+            request.controller,
+            request.function,
+        ]
+        parts.extend(request.args or [])
+        parts.extend(
+            '{k}={v}'.format(k=x, v=request.vars[x])
+            for x in self.fragment_vars
+        )
+        digest = hashlib.md5(
+            '|'.join(str(x) for x in parts).encode('utf-8')).hexdigest()
+        return '{c}_{d}'.format(c=self.__class__.__name__, d=digest)
+
     def groupby(self):
         """Return groupby defining how report is grouped.
 
@@ -437,6 +616,60 @@ class Grid():
                 return cls._attributes[k]
         return cls.__name__.replace('Grid', '').lower()
 
+    def numeric_paginator(self):
+        """Return the numeric paginator for tile view.
+
+        The markup matches the paginator of SQLFORM.grid.
+
+        Returns:
+            DIV instance, None if all rows fit on one page.
+        """
+        paginate = self._paginate
+        if not paginate or paginate >= self._tile_count:
+            return None
+
+        request = self.request
+        npages, remainder = divmod(self._tile_count, paginate)
+        if remainder:
+            npages += 1
+        page = self.page_no() - 1
+
+        url_args = list(
+            self.form_grid_args.get('args', []) if self.form_grid_args else [])
+
+        def self_link(name, page_index):
+            link_vars = request.get_vars.copy()
+            link_vars['page'] = page_index + 1
+            return A(
+                name,
+                _href=URL(
+                    args=url_args,
+                    vars=link_vars,
+                    hash_vars=False,
+                    user_signature=True,
+                ),
+                cid=request.cid,
+            )
+
+        lis = []
+        window = 5
+        if page > window + 1:
+            lis.append(LI(self_link('<<', 0)))
+        if page > window:
+            lis.append(LI(self_link('<', page - 1)))
+        for p in range(max(0, page - window), min(page + window, npages)):
+            if p == page:
+                lis.append(
+                    LI(A(p + 1, _onclick='return false'), _class='current'))
+            else:
+                lis.append(LI(self_link(p + 1, p)))
+        if page < npages - window:
+            lis.append(LI(self_link('>', page + 1)))
+        if page < npages - window - 1:
+            lis.append(LI(self_link('>>', npages - 1)))
+
+        return DIV(UL(*lis), _class='web2py_paginator grid_header ')
+
     def order_fields(self):
         """Return list of fields used in ordering.
 
@@ -460,68 +693,40 @@ class Grid():
             fields = [~x for x in fields]
         return fields
 
-    def render(self):
-        """Render the grid."""
-        db = self.db
-
-        # extract the paginator from the grid
-        soup = BeautifulSoup(str(self.form_grid), 'html.parser')
-        paginator = soup.find(
-            'div',
-            {'class': 'web2py_paginator grid_header '}
-        )
-
-        if paginator:
-            self.has_numeric_paginator = True
+    def page_no(self):
+        """Return the page number requested.
 
-        if self.viewby == 'list':
-            grid_div = DIV(
-                self.form_grid,
-                _class='grid_section row'
-            )
-        else:
-            divs = []
-            tiles = []
-            rows = self.rows()
-            if rows:
-                for row in rows:
-                    value = self.tile_value(row)
-                    tile_class = BookTile
-                    if self.request.vars:
-                        if self.request.vars.o \
-                                and self.request.vars.o == 'creators':
-                            tile_class = CartoonistTile
-                        elif self.request.vars.monies:
-                            tile_class = MoniesBookTile
-                    tile = tile_class(value, row)
-                    tiles.append(tile.render())
-
-                divs.append(DIV(
-                    tiles,
-                    _class='row tile_view'
-                ))
-
-                if paginator:
-                    divs.append(DIV(
-                        XML(paginator)
-                    ))
-            else:
-                divs.append(DIV(current.T('No records found')))
-
-            grid_div = DIV(divs, _class='grid_section')
-
-        if self._not_found_msg is not None:
-            replace_in_elements(
-                grid_div,
-                'No records found',
-                current.T(self._not_found_msg),
-                callback=lambda x: x.add_class('not_found_msg')
-            )
+        Returns:
+            integer, page number, 1 for the first page.
+        """
+        try:
+            page = int(self.request.vars.page or 1)
+        except (TypeError, ValueError):
+            page = 1
+        return max(page, 1)
 
-        return grid_div
+    def render(self):
+        """Render the grid."""
+        if self.fragment_cache is None:
+            return self._render()
+
+        def render_fragment():
+            """Return the fragment to cache."""
+            self._set()
+            grid_div = self._render()
+            return {
+                'has_numeric_paginator': self.has_numeric_paginator,
+                'html': grid_div.xml(),
+            }
+
+        fragment = self.fragment_cache(self.fragment_key(), render_fragment)
+        self.has_numeric_paginator = fragment['has_numeric_paginator']
+        return XML(fragment['html'])
 
     def rows(self):
         """Return the rows of the grid."""
+        if self.viewby == 'tile':
+            return self._tile_rows
         return self.form_grid.rows if self.form_grid else []
 
     @classmethod
@@ -637,13 +842,15 @@ class BaseBookGrid(Grid):
             self,
             form_grid_args=None,
             queries=None,
-            default_viewby='tile'):
+            default_viewby='tile',
+            fragment_cache=None):
         """Constructor"""
         Grid.__init__(
             self,
             form_grid_args=form_grid_args,
             queries=queries,
-            default_viewby=default_viewby
+            default_viewby=default_viewby,
+            fragment_cache=fragment_cache
         )
 
     def filters(self):
@@ -697,13 +904,15 @@ class CartoonistsGrid(Grid):
             self,
             form_grid_args=None,
             queries=None,
-            default_viewby='list'):
+            default_viewby='list',
+            fragment_cache=None):
         """Constructor"""
         Grid.__init__(
             self,
             form_grid_args=form_grid_args,
             queries=queries,
-            default_viewby=default_viewby
+            default_viewby=default_viewby,
+            fragment_cache=fragment_cache
         )
 
     def filters(self):
@@ -747,10 +956,10 @@ class CartoonistsGrid(Grid):
         db = self.db
         return [
             db.auth_user.name,
-            db.creator_grid_v.completed,
-            db.creator_grid_v.ongoing,
-            db.creator_grid_v.views,
-            db.creator_grid_v.downloads,
+            db.creator_grid.completed,
+            db.creator_grid.ongoing,
+            db.creator_grid.views,
+            db.creator_grid.downloads,
         ]
 
 
@@ -809,12 +1018,16 @@ class CreatorMoniesGrid(Grid):
 
     _not_found_msg = 'No books found'
 
+    # This grid is tile only.
+    viewbys = {'tile': Grid.viewbys['tile']}
+
     def __init__(
             self,
             form_grid_args=None,
             queries=None,
             default_viewby='tile',
-            creator=None):
+            creator=None,
+            fragment_cache=None):
         """Constructor"""
         self.creator = creator
 
@@ -822,9 +1035,9 @@ class CreatorMoniesGrid(Grid):
             self,
             form_grid_args=form_grid_args,
             queries=queries,
-            default_viewby=default_viewby
+            default_viewby=default_viewby,
+            fragment_cache=fragment_cache
         )
-        self.viewby = 'tile'        # This grid is tile only.
 
     def filters(self):
         """Define query filters.
@@ -1068,13 +1281,16 @@ class SearchGrid(Grid):
             self,
             form_grid_args=None,
             queries=None,
-            default_viewby='tile'):
+            default_viewby='tile',
+            fragment_cache=None):
         """Constructor"""
+        self._ranked_book_ids = None
         Grid.__init__(
             self,
             form_grid_args=form_grid_args,
             queries=queries,
-            default_viewby=default_viewby
+            default_viewby=default_viewby,
+            fragment_cache=fragment_cache
         )
 
     def filters(self):
@@ -1087,6 +1303,15 @@ class SearchGrid(Grid):
         request = self.request
         queries = []
         if request.vars.kw:
+            book_ids = self.ranked_book_ids()
+            if book_ids is not None:
+                queries.append(
+                    (db.book.id.belongs(book_ids)) if book_ids
+                    else (db.book.id < 0)
+                )
+                return queries
+
+            # No search index, match names.
             keyword = urlify(request.vars.kw)
             queries.append(
                 (db.book.name_for_search.contains(keyword)) |
@@ -1094,6 +1319,40 @@ class SearchGrid(Grid):
             )
         return queries
 
+    def orderby(self):
+        """Return orderby defining how report is sorted.
+
+        Results of a search index match are sorted by relevance.
+
+        Returns:
+            list of gluon.dal.Field instances or string
+        """
+        book_ids = self.ranked_book_ids() if self.request.vars.kw else None
+        if not book_ids:
+            return Grid.orderby(self)
+        return 'CASE {f} {w} ELSE {n} END'.format(
+            f=str(self.db.book.id),
+            w=' '.join(
+                'WHEN {i} THEN {p}'.format(i=int(x), p=p)
+                for p, x in enumerate(book_ids)
+            ),
+            n=len(book_ids),
+        )
+
+    def ranked_book_ids(self):
+        """Return the ids of books matching the search keywords, most
+        relevant first.
+
+        Returns:
+            list of integers, None if the search index is not available.
+        """
+        if self._ranked_book_ids is None:
+            index = SearchIndex()
+            if not index.exists():
+                return None
+            self._ranked_book_ids = index.ranked_book_ids(self.request.vars.kw)
+        return self._ranked_book_ids
+
     def visible_fields(self):
         """Return list of visible fields.
 
@@ -1114,15 +1373,31 @@ class Tile():
 
     class_name = 'tile'
 
-    def __init__(self, value, row):
+    def __init__(self, value, row, records=None):
         """Constructor
 
         Args:
             value: string, value to display in footer right side.
             row: gluon.dal.Row representing row of grid
+            records: TileRecords instance, records of the grid rows loaded
+                in batches. Records not found are looked up.
         """
         self.value = value
         self.row = row
+        self.records = records if records is not None else TileRecords()
+
+    def can_receive_contributions(self):
+        """Return whether the creator of the tile can receive contributions.
+
+        Returns:
+            boolean, True if creator can receive contributions.
+        """
+        row = self.row
+        if 'book' in row and row.book.id:
+            # The creator has a book, the one in the row, so only the paypal
+            # email needs checking. This saves a query per tile.
+            return bool(row.creator and row.creator.paypal_email)
+        return can_receive_contributions(row.creator)
 
     def contribute_link(self):
         """Return the tile contribute link."""
@@ -1152,14 +1427,12 @@ class Tile():
 
     def footer_links(self):
         """Return a div for the tile footer links."""
-        row = self.row
-
         breadcrumb_lis = []
 
         def append_li(text):
             return text and breadcrumb_lis.append(LI(text))
 
-        if can_receive_contributions(row.creator):
+        if self.can_receive_contributions():
             append_li(self.contribute_link())
 
         dl_link = self.download_link()
@@ -1212,15 +1485,17 @@ class BookTile(Tile):
 
     class_name = 'book_tile'
 
-    def __init__(self, value, row):
+    def __init__(self, value, row, records=None):
         """Constructor
 
         Args:
             value: string, value to display in footer right side.
             row: gluon.dal.Row representing row of grid
+            records: TileRecords instance, see Tile
         """
-        Tile.__init__(self, value, row)
-        self.book = Book.from_id(self.row.book.id)
+        Tile.__init__(self, value, row, records=records)
+        self.book = self.records.book(self.row.book.id)
+        self._creator = None
 
     def contribute_link(self):
         """Return the tile contribute link."""
@@ -1230,6 +1505,17 @@ class BookTile(Tile):
             **dict(_class='contribute_button no_rclick_menu')
         )
 
+    @property
+    def creator(self):
+        """Return the creator of the book.
+
+        Returns:
+            Creator instance
+        """
+        if self._creator is None:
+            self._creator = self.records.creator(self.row.creator.id)
+        return self._creator
+
     def download_link(self):
         """Return the tile download link."""
         if not show_download_link(self.book):
@@ -1243,15 +1529,11 @@ class BookTile(Tile):
 
     def follow_link(self):
         """Return the tile download link."""
-        row = self.row
-
-        book = Book.from_id(row.book.id)
-        if not is_followable(book):
+        if not is_followable(self.book):
             return SPAN('')
 
-        creator = Creator.from_id(row.creator.id)
         return creator_follow_link(
-            creator,
+            self.creator,
             components=['follow'],
             **dict(_class='rss_button no_rclick_menu')
         )
@@ -1262,7 +1544,13 @@ class BookTile(Tile):
             DIV(
                 book_read_link(
                     self.book,
-                    components=[cover_image(self.book, size='web')],
+                    components=[cover_image(
+                        self.book,
+                        size='web',
+                        first_page=self.first_page(),
+                    )],
+                    book_page=self.first_page(),
+                    creator=self.creator,
                     **dict(
                         _class='book_page_image zco_book_reader',
                         _title=''
@@ -1273,11 +1561,18 @@ class BookTile(Tile):
             _class='col-sm-12 image_container',
         )
 
+    def first_page(self):
+        """Return the first page of the book.
+
+        Returns:
+            BookPage instance, None if the first page was not loaded.
+        """
+        return self.records.first_pages.get(self.book.id)
+
     def subtitle(self):
         """Return div for the tile subtitle."""
         row = self.row
-        creator = Creator.from_id(row.creator.id)
-        creator_href = creator_url(creator, extension=False)
+        creator_href = creator_url(self.creator, extension=False)
 
         return DIV(
             A(
@@ -1293,11 +1588,12 @@ class BookTile(Tile):
         row = self.row
         book_name = formatted_name(
             self.book,
-            include_publication_year=(row.book.release_date != None)
+            include_publication_year=(row.book.release_date != None),
+            book_type=self.records.book_type(self.book.book_type_id),
         )
         book_link = A(
             book_name,
-            _href=book_url(self.book, extension=False),
+            _href=book_url(self.book, creator=self.creator, extension=False),
             _title=book_name,
         )
         return DIV(
@@ -1311,15 +1607,16 @@ class CartoonistTile(Tile):
 
     class_name = 'cartoonist_tile'
 
-    def __init__(self, value, row):
+    def __init__(self, value, row, records=None):
         """Constructor
 
         Args:
             value: string, value to display in footer right side.
             row: gluon.dal.Row representing row of grid
+            records: TileRecords instance, see Tile
         """
-        Tile.__init__(self, value, row)
-        self.creator = Creator.from_id(self.row.creator.id)
+        Tile.__init__(self, value, row, records=records)
+        self.creator = self.records.creator(self.row.creator.id)
         self.creator_href = creator_url(self.creator, extension=False)
 
     def contribute_link(self):
@@ -1409,14 +1706,15 @@ class MoniesBookTile(BookTile):
 
     class_name = 'monies_book_tile'
 
-    def __init__(self, value, row):
+    def __init__(self, value, row, records=None):
         """Constructor
 
         Args:
             value: string, value to display in footer right side.
             row: gluon.dal.Row representing row of grid
+            records: TileRecords instance, see Tile
         """
-        BookTile.__init__(self, value, row)
+        BookTile.__init__(self, value, row, records=records)
 
     def contribute_link(self):
         """Return the tile contribute link."""
@@ -1435,10 +1733,11 @@ class MoniesBookTile(BookTile):
         row = self.row
         book_name = formatted_name(
             self.book,
-            include_publication_year=(row.book.release_date != None)
+            include_publication_year=(row.book.release_date != None),
+            book_type=self.records.book_type(self.book.book_type_id),
         )
 
-        if can_receive_contributions(row.creator):
+        if self.can_receive_contributions():
             inner = book_contribute_link(
                 self.book,
                 components=[book_name],
@@ -1454,9 +1753,8 @@ class MoniesBookTile(BookTile):
 
     def image(self):
         """Return a div for the tile image."""
-        row = self.row
-        img = cover_image(self.book, size='web')
-        if can_receive_contributions(row.creator):
+        img = cover_image(self.book, size='web', first_page=self.first_page())
+        if self.can_receive_contributions():
             inner = book_contribute_link(
                 self.book,
                 components=[img],
@@ -1479,6 +1777,121 @@ class MoniesBookTile(BookTile):
         return
 
 
+class TileRecords():
+    """Class representing the records associated with the rows of a grid.
+
+    The books, creators and first pages of the rows are loaded with one
+    select each, rather than a lookup per tile.
+    """
+
+    def __init__(self, books=None, creators=None, first_pages=None):
+        """Constructor
+
+        Args:
+            books: dict, {book.id: Book instance}
+            creators: dict, {creator.id: Creator instance}
+            first_pages: dict, {book.id: BookPage instance}
+        """
+        self.books = books or {}
+        self.creators = creators or {}
+        self.first_pages = first_pages or {}
+        self._book_types = None
+
+    def book(self, book_id):
+        """Return a book.
+
+        Args:
+            book_id: integer, id of book record
+
+        Returns:
+            Book instance
+        """
+        if book_id not in self.books:
+            self.books[book_id] = Book.from_id(book_id)
+        return self.books[book_id]
+
+    def book_type(self, book_type_id):
+        """Return a book type.
+
+        Args:
+            book_type_id: integer, id of book_type record
+
+        Returns:
+            BookType subclass instance, None if not found.
+        """
+        if self._book_types is None:
+            self._book_types = self.book_types()
+        return self._book_types.get(book_type_id)
+
+    @classmethod
+    def book_types(cls):
+        """Return all book types.
+
+        Returns:
+            dict, {book_type.id: BookType subclass instance}
+        """
+        db = current.app.db
+        return {
+            x.id: BookType.class_factory(x.name, x.as_dict())
+            for x in db(db.book_type).select()
+        }
+
+    def creator(self, creator_id):
+        """Return a creator.
+
+        Args:
+            creator_id: integer, id of creator record
+
+        Returns:
+            Creator instance
+        """
+        if creator_id not in self.creators:
+            self.creators[creator_id] = Creator.from_id(creator_id)
+        return self.creators[creator_id]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Create instance from grid rows.
+
+        Args:
+            rows: list of gluon.dal.Row representing rows of grid
+
+        Returns:
+            TileRecords instance
+        """
+        db = current.app.db
+        book_ids = set()
+        creator_ids = set()
+        for row in rows:
+            if 'book' in row and row.book.id:
+                book_ids.add(row.book.id)
+            if 'creator' in row and row.creator.id:
+                creator_ids.add(row.creator.id)
+
+        books = {}
+        first_pages = {}
+        if book_ids:
+            books = {
+                x.id: Book(x.as_dict())
+                for x in db(db.book.id.belongs(book_ids)).select()
+            }
+            query = (db.book_page.book_id.belongs(book_ids)) & \
+                (db.book_page.page_no == 1)
+            first_pages = {
+                x.book_id: BookPage(x.as_dict())
+                for x in db(query).select()
+            }
+
+        creators = {}
+        if creator_ids:
+            creators = {
+                x.id: Creator(x.as_dict())
+                for x in db(db.creator.id.belongs(creator_ids)).select()
+            }
+
+        return cls(books=books, creators=creators, first_pages=first_pages)
+
+
 def book_contribute_button(row):
     """Return a 'contribute' button suitable for grid row."""
     if not row:
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to the full-text search index.
+
+The index is a SQLite FTS5 database kept beside the application databases.
+It has one row per book, keyed on book id, with the book name, creator name,
+description and publication metadata text. It is updated by the
+search_index job, see private/bin/search_index.py.
+"""
+import math
+import os
+import re
+import sqlite3
+from gluon import *
+from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.indicias import BookPublicationMetadata
+
+LOG = current.app.logger
+
+
+class SearchIndex():
+    """Class representing the full-text search index of books."""
+
+    columns = ['name', 'creator', 'description', 'metadata']
+
+    # bm25 weights of columns, in order of columns.
+    weights = [10.0, 5.0, 1.0, 1.0]
+
+    def __init__(self, filename=None):
+        """Constructor
+
+        Args:
+            filename: string, name of index database file including path.
+                Default applications/zcomx/databases/search_index.sqlite
+        """
+        self.filename = filename if filename is not None \
+            else os.path.join(
+                current.request.folder, 'databases', 'search_index.sqlite')
+
+    def _connect(self, filename=None):
+        """Return a connection to the index database, creating the table if
+        necessary.
+
+        Args:
+            filename: string, name of database file, default self.filename
+
+        Returns:
+            sqlite3.Connection instance
+        """
+        conn = sqlite3.connect(filename or self.filename)
+        conn.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5'
+            "({c}, tokenize='porter unicode61');".format(
+                c=', '.join(self.columns))
+        )
+        return conn
+
+    def _index_rows(self, conn, rows):
+        """Add books to the index.
+
+        Args:
+            conn: sqlite3.Connection instance
+            rows: Rows instance, rows with book and auth_user fields.
+        """
+        sql = 'INSERT INTO book_fts (rowid, {c}) VALUES (?, {p});'.format(
+            c=', '.join(self.columns),
+            p=', '.join(['?'] * len(self.columns)),
+        )
+        conn.executemany(
+            sql,
+            ([x.book.id] + self.book_data(x) for x in rows)
+        )
+
+    def book_data(self, row):
+        """Return the indexed values of a book.
+
+        Args:
+            row: Row instance with book and auth_user fields.
+
+        Returns:
+            list of strings, in order of columns.
+        """
+        book = Book(row.book.as_dict())
+        metadata = BookPublicationMetadata.from_book(
+            book, first_publication_text='')
+        return [
+            book.name or '',
+            row.auth_user.name or '',
+            book.description or '',
+            str(metadata),
+        ]
+
+    def book_rows(self, book_ids=None):
+        """Return the rows of books to index.
+
+        Args:
+            book_ids: list of integers, ids of books. If None, all books
+                are returned.
+
+        Returns:
+            Rows instance
+        """
+        db = current.app.db
+        query = (db.book.id > 0)
+        if book_ids is not None:
+            query = (db.book.id.belongs(book_ids))
+        return db(query).select(
+            db.book.ALL,
+            db.auth_user.name,
+            left=[
+                db.creator.on(db.book.creator_id == db.creator.id),
+                db.auth_user.on(db.creator.auth_user_id == db.auth_user.id),
+            ],
+        )
+
+    def exists(self):
+        """Return whether the index database exists.
+
+        Returns:
+            True if the index database exists.
+        """
+        return os.path.exists(self.filename)
+
+    def ranked_book_ids(self, keyword, limit=500):
+        """Return the ids of books matching the keyword, most relevant first.
+
+        The relevance of the text match is boosted by the book rating and
+        views.
+
+        Args:
+            keyword: string, search keywords
+            limit: integer, maximum number of ids returned.
+
+        Returns:
+            list of integers, book ids.
+        """
+        matches = self.search(keyword, limit=limit)
+        if not matches:
+            return []
+
+        db = current.app.db
+        rows = db(db.book.id.belongs([x[0] for x in matches])).select(
+            db.book.id,
+            db.book.rating,
+            db.book.views,
+        )
+        popularity = {
+            x.id: 1.0 + 0.1 * (x.rating or 0) + 0.05 * math.log1p(x.views or 0)
+            for x in rows
+        }
+        scores = [
+            (relevance * popularity.get(book_id, 1.0), book_id)
+            for book_id, relevance in matches
+        ]
+        return [x[1] for x in sorted(scores, key=lambda x: -x[0])]
+
+    def rebuild(self):
+        """Rebuild the index for all books.
+
+        The index is built in a temporary file which replaces the index
+        database when complete.
+        """
+        path = os.path.dirname(os.path.abspath(self.filename))
+        if not os.path.exists(path):
+            os.makedirs(path)
+        tmp_filename = self.filename + '.tmp'
+        if os.path.exists(tmp_filename):
+            os.unlink(tmp_filename)
+        conn = self._connect(filename=tmp_filename)
+        try:
+            with conn:
+                self._index_rows(conn, self.book_rows())
+        finally:
+            conn.close()
+        os.replace(tmp_filename, self.filename)
+
+    def search(self, keyword, limit=500):
+        """Return the books matching the keyword.
+
+        Args:
+            keyword: string, search keywords
+            limit: integer, maximum number of results returned.
+
+        Returns:
+            list of (book id, relevance) tuples, most relevant first.
+                Relevance is a positive float.
+        """
+        expression = match_expression(keyword)
+        if not expression or not self.exists():
+            return []
+
+        sql = (
+            'SELECT rowid, bm25(book_fts, {w}) FROM book_fts'
+            ' WHERE book_fts MATCH ? ORDER BY 2 LIMIT ?;'
+        ).format(w=', '.join(str(x) for x in self.weights))
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, (expression, limit)).fetchall()
+        except sqlite3.Error as err:
+            LOG.error('Search index query failed: %s', str(err))
+            return []
+        finally:
+            conn.close()
+        # bm25 is negative, lower is more relevant.
+        return [(x[0], -x[1]) for x in rows]
+
+    def update(self, book_ids=None, creator_ids=None):
+        """Update the index for books.
+
+        Books no longer in the database are removed from the index. If the
+        index database doesn't exist, it is rebuilt for all books.
+
+        Args:
+            book_ids: list of integers, ids of books to update.
+            creator_ids: list of integers, ids of creators whose books are
+                updated.
+        """
+        if not self.exists():
+            self.rebuild()
+            return
+
+        db = current.app.db
+        ids = set(book_ids or [])
+        if creator_ids:
+            query = (db.book.creator_id.belongs(creator_ids))
+            ids.update(x.id for x in db(query).select(db.book.id))
+        if not ids:
+            return
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    'DELETE FROM book_fts WHERE rowid = ?;',
+                    ((x,) for x in ids)
+                )
+                self._index_rows(conn, self.book_rows(book_ids=list(ids)))
+        finally:
+            conn.close()
+
+
+def match_expression(keyword):
+    """Return an FTS5 match expression for search keywords.
+
+    Each word is matched as a prefix and all words must match.
+
+    Args:
+        keyword: string, search keywords
+
+    Returns:
+        string, match expression, '' if keyword has no words.
+    """
+    words = re.findall(r'\w+', keyword or '', re.UNICODE)
+    return ' '.join('"{w}"*'.format(w=x.lower()) for x in words)
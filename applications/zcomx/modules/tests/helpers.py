@@ -3,6 +3,7 @@
 """
 Unit test helper classes and functions.
 """
+import contextlib
 import datetime
 import hashlib
 import os
@@ -12,6 +13,7 @@ import glob
 import unittest
 from functools import wraps
 from PIL import Image
+from pydal.helpers.classes import ExecutionHandler
 from gluon import *
 from gluon.storage import Storage
 from applications.zcomx.modules.environ import has_terminal
@@ -21,6 +23,10 @@ from applications.zcomx.modules.images import (
     store,
 )
 from applications.zcomx.modules.records import Record
+from applications.zcomx.modules.rollups import (
+    high_water_mark,
+    set_high_water_mark,
+)
 from applications.zcomx.modules.tests.runner import LocalTestCase
 from applications.zcomx.modules.shell_utils import TempDirectoryMixin
 
@@ -289,6 +295,39 @@ class ImageTestCase(WithTestDataDirTestCase):
                         cls._uploadfolders[table][field]
 
 
+class QueryRecorder(ExecutionHandler):
+    """Execution handler recording the sql commands executed.
+
+    Usage:
+        with QueryRecorder.recording() as commands:
+            ...
+        self.assertEqual(len(commands), 2)
+    """
+
+    commands = []
+
+    def after_execute(self, command):
+        QueryRecorder.commands.append(command)
+
+    @classmethod
+    @contextlib.contextmanager
+    def recording(cls):
+        """Record the sql commands executed in the context.
+
+        Yields:
+            list of strings, the sql commands executed.
+        """
+        # pylint: disable=protected-access
+        db = current.app.db
+        cls.commands = []
+        handlers = db._adapter.execution_handlers
+        handlers.append(cls)
+        try:
+            yield cls.commands
+        finally:
+            handlers.remove(cls)
+
+
 class ResizerQuick(TempDirectoryMixin):
     """Class representing resizer for testing.
 
@@ -439,6 +478,51 @@ class WebTestCase(LocalTestCase):
     }
 
 
+class WithRollupMarksTestCase(LocalTestCase):
+    """Base class for test cases setting rollup high-water marks.
+
+    Marks set with set_rollup_mark() are restored when the test ends,
+    whether it passes or fails.
+    """
+
+    def set_rollup_mark(self, name, last_id=None):
+        """Set the high-water mark of an event table for the test.
+
+        Args:
+            name: string, name of event table, see rollups.ROLLUP_NAMES
+            last_id: integer, id of event. If None, the id of the last
+                event in the table.
+        """
+        db = current.app.db
+        query = (db.rollup_mark.name == name)
+        if db(query).count() > 0:
+            self.addCleanup(
+                self._restore_rollup_mark, name, high_water_mark(name))
+        else:
+            self.addCleanup(self._restore_rollup_mark, name, None)
+
+        if last_id is None:
+            max_id = db[name].id.max()
+            last_id = db(db[name]).select(max_id).first()[max_id] or 0
+        set_high_water_mark(name, last_id)
+        db.commit()
+
+    @staticmethod
+    def _restore_rollup_mark(name, last_id):
+        """Restore a high-water mark.
+
+        Args:
+            name: string, name of event table
+            last_id: integer, id of event. If None, the mark is removed.
+        """
+        db = current.app.db
+        if last_id is None:
+            db(db.rollup_mark.name == name).delete()
+        else:
+            set_high_water_mark(name, last_id)
+        db.commit()
+
+
 def reset_signature_timestamps(table):
     """Reset the default timestamps set on the signature fields
 
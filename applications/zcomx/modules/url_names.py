@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Classes and functions related to resolving creator and book url names.
+
+UrlNameCache is a process-wide, bidirectional cache between the
+name_for_url values of creators and books and their ids. It is used to
+build urls without looking up the creator or book record, and to route
+urls with a lookup by id rather than by lower(name_for_url).
+
+Renames in this process invalidate entries (see creators.on_change_name).
+Renames in other processes are seen when entries expire.
+"""
+import threading
+import time
+from gluon import *
+
+LOG = current.app.logger
+
+DEFAULT_TIME_EXPIRE = 300       # seconds
+MAX_ENTRIES = 50000
+
+
+class UrlNameCache():
+    """Class representing a cache of creator and book url names."""
+
+    def __init__(
+            self, time_expire=DEFAULT_TIME_EXPIRE, max_entries=MAX_ENTRIES):
+        """Constructor
+
+        Args:
+            time_expire: integer, number of seconds entries are cached.
+            max_entries: integer, maximum number of records cached. The
+                cache is cleared when exceeded.
+        """
+        self.time_expire = time_expire
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # {(table, id): (name_for_url, creator_id, expires)}
+        # creator_id is None for creator records.
+        self._by_id = {}
+        # {(table, creator_id, name_for_url.lower()): id}
+        self._by_name = {}
+
+    def _get(self, table, record_id):
+        """Return the cached entry of a record.
+
+        Args:
+            table: str, one of 'book', 'creator'
+            record_id: integer, id of record
+
+        Returns:
+            tuple, (name_for_url, creator_id) or None if not cached.
+        """
+        entry = self._by_id.get((table, record_id))
+        if entry is None or entry[2] < time.time():
+            return None
+        return (entry[0], entry[1])
+
+    def _load(self, table, query):
+        """Load records into the cache.
+
+        Args:
+            table: str, one of 'book', 'creator'
+            query: gluon.dal.Query instance, selects the records.
+
+        Returns:
+            list of integers, ids of records loaded.
+        """
+        db = current.app.db
+        fields = [db[table].id, db[table].name_for_url]
+        if table == 'book':
+            fields.append(db.book.creator_id)
+        rows = db(query).select(*fields)
+        for row in rows:
+            self.set(
+                table,
+                row.id,
+                row.name_for_url,
+                creator_id=row.creator_id if table == 'book' else None,
+            )
+        return [x.id for x in rows]
+
+    def _lookup_id(self, table, creator_id, name, query):
+        """Return the id of a record from its name, loading it if necessary.
+
+        Args:
+            table: str, one of 'book', 'creator'
+            creator_id: integer, id of creator, None for creator records.
+            name: str, name_for_url of record, case insensitive.
+            query: gluon.dal.Query instance, selects the record if not
+                cached.
+
+        Returns:
+            integer, id of record, None if not found.
+        """
+        if not name:
+            return None
+        record_id = self._by_name.get((table, creator_id, name.lower()))
+        if record_id is not None:
+            entry = self._get(table, record_id)
+            if entry and entry[0] and entry[0].lower() == name.lower():
+                self.hits += 1
+                return record_id
+        self.misses += 1
+        ids = self._load(table, query)
+        return ids[0] if ids else None
+
+    def _lookup_name(self, table, record_id):
+        """Return the cached entry of a record, loading it if necessary.
+
+        Args:
+            table: str, one of 'book', 'creator'
+            record_id: integer, id of record
+
+        Returns:
+            tuple, (name_for_url, creator_id) or None if not found.
+        """
+        if not record_id:
+            return None
+        entry = self._get(table, record_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        db = current.app.db
+        self._load(table, (db[table].id == record_id))
+        return self._get(table, record_id)
+
+    def book_creator_id(self, book_id):
+        """Return the creator id of a book.
+
+        Args:
+            book_id: integer, id of book
+
+        Returns:
+            integer, id of creator, None if the book is not found.
+        """
+        entry = self._lookup_name('book', book_id)
+        return entry[1] if entry else None
+
+    def book_id(self, creator_id, name):
+        """Return the id of a book from its name.
+
+        Args:
+            creator_id: integer, id of creator of book
+            name: str, book name_for_url, case insensitive.
+
+        Returns:
+            integer, id of book, None if not found.
+        """
+        db = current.app.db
+        query = (db.book.creator_id == creator_id) & \
+            (db.book.name_for_url.lower() == (name or '').lower())
+        return self._lookup_id('book', creator_id, name, query)
+
+    def book_name(self, book_id):
+        """Return the url name of a book.
+
+        Args:
+            book_id: integer, id of book
+
+        Returns:
+            str, book name_for_url, None if the book is not found.
+        """
+        entry = self._lookup_name('book', book_id)
+        return entry[0] if entry else None
+
+    def clear(self):
+        """Clear the cache and its metrics."""
+        with self._lock:
+            self._by_id = {}
+            self._by_name = {}
+            self.hits = 0
+            self.misses = 0
+
+    def creator_id(self, name):
+        """Return the id of a creator from its name.
+
+        Args:
+            name: str, creator name_for_url, case insensitive.
+
+        Returns:
+            integer, id of creator, None if not found.
+        """
+        db = current.app.db
+        query = (db.creator.name_for_url.lower() == (name or '').lower())
+        return self._lookup_id('creator', None, name, query)
+
+    def creator_name(self, creator_id):
+        """Return the url name of a creator.
+
+        Args:
+            creator_id: integer, id of creator
+
+        Returns:
+            str, creator name_for_url, None if the creator is not found.
+        """
+        entry = self._lookup_name('creator', creator_id)
+        return entry[0] if entry else None
+
+    def invalidate(self, table, record_id):
+        """Remove a record from the cache.
+
+        Args:
+            table: str, one of 'book', 'creator'
+            record_id: integer, id of record
+        """
+        with self._lock:
+            entry = self._by_id.pop((table, record_id), None)
+            if entry and entry[0]:
+                key = (table, entry[1], entry[0].lower())
+                if self._by_name.get(key) == record_id:
+                    del self._by_name[key]
+
+    def metrics(self):
+        """Return the cache metrics.
+
+        Returns:
+            dict, {
+                'hits': integer, number of lookups found in the cache
+                'misses': integer, number of lookups loaded from the db
+                'hit_ratio': float, hits / lookups, 0.0 if no lookups.
+                'size': integer, number of records cached.
+            }
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self._by_id),
+        }
+
+    def record_from_name(self, record_class, name, creator_id=None):
+        """Return a record from its url name.
+
+        The record is read by id. If it no longer has the name, eg it was
+        renamed in another process, the cache entry is replaced.
+
+        Args:
+            record_class: Record subclass, Book or Creator
+            name: str, name_for_url of record, case insensitive.
+            creator_id: integer, id of creator, Book records only.
+
+        Returns:
+            record_class instance, None if not found.
+        """
+        table = record_class.db_table
+        for _ in range(2):
+            if table == 'book':
+                record_id = self.book_id(creator_id, name)
+            else:
+                record_id = self.creator_id(name)
+            if record_id is None:
+                return None
+            try:
+                record = record_class.from_id(record_id)
+            except LookupError:
+                record = None
+            if record and (record.name_for_url or '').lower() == name.lower():
+                return record
+            self.invalidate(table, record_id)
+        return None
+
+    def set(self, table, record_id, name, creator_id=None):
+        """Add a record to the cache.
+
+        Args:
+            table: str, one of 'book', 'creator'
+            record_id: integer, id of record
+            name: str, name_for_url of record
+            creator_id: integer, id of creator of book, None for creator
+                records.
+        """
+        self.invalidate(table, record_id)
+        with self._lock:
+            if len(self._by_id) >= self.max_entries:
+                LOG.debug('Url name cache full, clearing: %s', self.metrics())
+                self._by_id = {}
+                self._by_name = {}
+            expires = time.time() + self.time_expire
+            self._by_id[(table, record_id)] = (name, creator_id, expires)
+            if name:
+                self._by_name[(table, creator_id, name.lower())] = record_id
+
+
+URL_NAME_CACHE = UrlNameCache()
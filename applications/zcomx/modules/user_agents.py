@@ -2,11 +2,26 @@
 # -*- coding: utf-8 -*-
 """
 User Agent classes and functions.
+
+Bot verdicts are cached per user agent string in BOT_VERDICT_CACHE. Known
+crawlers are matched with BOT_REGEX before the user agent parser is run.
 """
+import collections
+import re
+import threading
 from gluon import *
+from gluon.contrib import user_agent_parser
 from gluon.storage import Storage
 
 LOG = current.app.logger
+
+# Known crawlers. Matches are bots without running the user agent parser.
+BOT_REGEX = re.compile(
+    r'bot[/;)]|crawl|spider|slurp|facebookexternalhit|mediapartners'
+    r'|ia_archiver|\+https?://',
+    re.IGNORECASE
+)
+MAX_ENTRIES = 5000
 # pylint: disable=line-too-long
 USER_AGENTS = Storage({
     'bot': 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www. google.com/bot.html)',
@@ -14,6 +29,95 @@ USER_AGENTS = Storage({
 })
 
 
+class BotVerdictCache():
+    """Class representing a cache of user agent string bot verdicts."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        """Constructor
+
+        Args:
+            max_entries: integer, maximum number of user agent strings
+                cached. The least recently used are removed when exceeded.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # {user agent string: verdict}
+        self._verdicts = collections.OrderedDict()
+
+    def clear(self):
+        """Clear the cache and its metrics."""
+        with self._lock:
+            self._verdicts = collections.OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    def metrics(self):
+        """Return the cache metrics.
+
+        Returns:
+            dict, {
+                'hits': integer, number of verdicts found in the cache
+                'misses': integer, number of verdicts classified
+                'hit_ratio': float, hits / lookups, 0.0 if no lookups.
+                'size': integer, number of user agent strings cached.
+            }
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self._verdicts),
+        }
+
+    def verdict(self, user_agent):
+        """Return the bot verdict of a user agent string, classifying it if
+        not cached.
+
+        Args:
+            user_agent: str, http user agent string
+
+        Returns:
+            True if a bot, False if not, None if indeterminate.
+        """
+        with self._lock:
+            if user_agent in self._verdicts:
+                self._verdicts.move_to_end(user_agent)
+                self.hits += 1
+                return self._verdicts[user_agent]
+
+        verdict = classify(user_agent)
+        with self._lock:
+            self.misses += 1
+            self._verdicts[user_agent] = verdict
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+        return verdict
+
+
+def classify(user_agent):
+    """Classify a user agent string as a bot or not.
+
+    Args:
+        user_agent: str, http user agent string
+
+    Returns:
+        True if a bot, False if not, None if indeterminate.
+    """
+    if user_agent and BOT_REGEX.search(user_agent):
+        return True
+
+    try:
+        parsed = user_agent_parser.detect(user_agent or '')
+    except Exception as err:        # pylint: disable=broad-except
+        LOG.error('Bot status unknown, user agent: %s, %s', user_agent, err)
+        return None
+
+    return parsed.get('bot')
+
+
 def is_bot(indeterminate_is_bot=True):
     """Determine if the http request is a bot or not.
 
@@ -24,21 +128,10 @@ def is_bot(indeterminate_is_bot=True):
     Returns:
         True if request is from a bot (ss per user_agent_parser)
     """
-    try:
-        user_agent = current.request.user_agent()
-    except TypeError:
-        # This indicates http_user_agent is None
-        # Treat as if it is a bot.
+    verdict = BOT_VERDICT_CACHE.verdict(current.request.env.http_user_agent)
+    if verdict is None:
         return indeterminate_is_bot
+    return verdict
 
-    if not user_agent:
-        LOG.error(
-            'Bot status unknown, user agent: %s',
-            current.request.env.http_user_agent
-        )
-        return indeterminate_is_bot
-
-    if user_agent.bot is None:
-        return indeterminate_is_bot
 
-    return user_agent.bot
+BOT_VERDICT_CACHE = BotVerdictCache()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+archive_events.py
+
+Script to archive old event records.
+* Roll up book events not yet rolled up.
+* Move book_view, download and download_click records older than the
+  retention period to compressed monthly archive files.
+"""
+import argparse
+import sys
+import traceback
+from applications.zcomx.modules.argparse.actions import ManPageAction
+from applications.zcomx.modules.event_archives import (
+    ARCHIVE_TABLES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_RETENTION_DAYS,
+    EventArchiver,
+)
+from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.rollups import update_rollups
+
+VERSION = 'Version 0.1'
+
+
+def man_page():
+    """Print manual page-like help"""
+    print("""
+OVERVIEW
+    This script archives old event records so the event tables only hold
+    recent events.
+
+    Records older than the retention period are appended to compressed
+    monthly archive files, one json line per record, and deleted from the
+    event table in batches. Archive files are named:
+        private/var/event_archives/<table>/<table>_<YYYY-MM>.jsonl.gz
+
+    Book views and downloads are rolled up first. Only rolled up records
+    are archived, so rollups and book counters remain accurate. Only
+    completed download clicks are archived.
+
+USAGE
+    archive_events.py [OPTIONS]
+
+OPTIONS
+    -a DIR, --archive-dir=DIR
+        Store archive files in DIR.
+        Default: applications/zcomx/private/var/event_archives
+
+    -b SIZE, --batch-size=SIZE
+        Archive records in batches of this size. Default: {b}
+
+    -d DAYS, --days=DAYS
+        Archive records older than this number of days. Default: {d}
+
+    -h, --help
+        Print a brief help.
+
+    --man
+        Print man page-like help.
+
+    -t TABLE, --table=TABLE
+        Archive records of this table. Repeat for multiple tables.
+        Default: all of {t}
+
+    -v, --verbose
+        Print information messages to stdout.
+
+    -vv,
+        More verbose. Print debug messages to stdout.
+
+    --version
+        Print the script version.
+    """.format(
+        b=DEFAULT_BATCH_SIZE,
+        d=DEFAULT_RETENTION_DAYS,
+        t=', '.join(ARCHIVE_TABLES),
+    ))
+
+
+def main():
+    """Main processing."""
+
+    parser = argparse.ArgumentParser(prog='archive_events.py')
+
+    parser.add_argument(
+        '-a', '--archive-dir',
+        dest='archive_dir', default=None,
+        help='Store archive files in this directory.',
+    )
+    parser.add_argument(
+        '-b', '--batch-size',
+        dest='batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+        help='Archive records in batches of this size.',
+    )
+    parser.add_argument(
+        '-d', '--days',
+        dest='days', type=int, default=DEFAULT_RETENTION_DAYS,
+        help='Archive records older than this number of days.',
+    )
+    parser.add_argument(
+        '--man',
+        action=ManPageAction, dest='man', default=False,
+        callback=man_page,
+        help='Display manual page-like help and exit.',
+    )
+    parser.add_argument(
+        '-t', '--table',
+        action='append', dest='tables', default=[],
+        choices=ARCHIVE_TABLES,
+        help='Archive records of this table.',
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count', dest='verbose', default=False,
+        help='Print messages to stdout.',
+    )
+    parser.add_argument(
+        '--version',
+        action='version',
+        version=VERSION,
+        help='Print the script version.',
+    )
+
+    args = parser.parse_args()
+
+    set_cli_logging(LOG, args.verbose)
+
+    LOG.debug('Starting')
+    counts = update_rollups()
+    LOG.debug('Rolled up: %s', counts)
+    for table in args.tables or ARCHIVE_TABLES:
+        archiver = EventArchiver(
+            table,
+            archive_dir=args.archive_dir,
+            retention_days=args.days,
+            batch_size=args.batch_size,
+        )
+        count = archiver.archive()
+        LOG.info('Archived %s records: %s', table, count)
+    LOG.debug('Done')
+
+
+if __name__ == '__main__':
+    # pylint: disable=broad-except
+    try:
+        main()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
@@ -53,9 +53,15 @@ $py applications/zcomx/private/bin/queue_create_torrents.py
 __v && __md "Start: queue_check"
 $py applications/zcomx/private/bin/queue_check.py --age 30
 
+__v && __md "Start: drain_event_spool"
+$py applications/zcomx/private/bin/drain_event_spool.py
+
 __v && __md "Start: process_activity_logs"
 $py applications/zcomx/private/bin/process_activity_logs.py
 
+__v && __md "Start: rollup_events"
+$py applications/zcomx/private/bin/queue_job.py --queuer RollupEventsQueuer
+
 __v && __md "Setting permissions"
 chown -R http:http applications/zcomx/uploads
 chown -R http:http applications/zcomx/private/var
@@ -50,6 +50,9 @@ __v && __md "Start: post_ongoing_update.py"
 yesterday=$(date -d yesterday "+%Y-%m-%d")
 $py applications/zcomx/private/bin/social_media/post_ongoing_update.py -p "$yesterday"
 
+__v && __md "Start: archive_events.py"
+$py applications/zcomx/private/bin/archive_events.py
+
 __v && __md "Start: tally_book_ratings.py"
 $py applications/zcomx/private/bin/tally_book_ratings.py
 
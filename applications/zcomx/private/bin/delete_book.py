@@ -15,6 +15,9 @@ from applications.zcomx.modules.books import (
 )
 from applications.zcomx.modules.job_queuers import (
     queue_create_sitemap,
+    queue_creator_grid,
+    queue_download_catalog,
+    queue_search_index,
     queue_search_prefetch,
 )
 from applications.zcomx.modules.logger import set_cli_logging
@@ -102,7 +105,11 @@ def main():
     book_id = args.book_id
     book = Book.from_id(book_id)
     delete_records(book)
-    queue_search_prefetch()
+    queue_creator_grid(creator_id=book.creator_id)
+    queue_download_catalog(creator_id=book.creator_id)
+    queue_search_prefetch(
+        book_ids=[book.id], creator_ids=[book.creator_id])
+    queue_search_index(book_ids=[book.id])
     queue_create_sitemap()
 
     LOG.debug('Done')
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+download_catalog.py
+
+Script to build the downloadable catalog json files.
+"""
+import argparse
+import sys
+import traceback
+from applications.zcomx.modules.argparse.actions import ManPageAction
+from applications.zcomx.modules.download_catalogs import DownloadCatalog
+from applications.zcomx.modules.logger import set_cli_logging
+
+VERSION = 'Version 0.1'
+
+
+def man_page():
+    """Print manual page-like help"""
+    print("""
+OVERVIEW
+    This script creates the downloadable catalog json files used by the
+    downloads modal. The creators file is always rebuilt. Book files are
+    rebuilt for the creators provided, or all creators with downloadable
+    books if none are provided.
+
+USAGE
+    download_catalog.py [OPTIONS] [creator_id ...]
+
+OPTIONS
+    -h, --help
+        Print a brief help.
+
+    --man
+        Print man page-like help.
+
+    -v, --verbose
+        Print information messages to stdout.
+
+    -vv,
+        More verbose. Print debug messages to stdout.
+
+    --version
+        Print the script version.
+    """)
+
+
+def main():
+    """Main processing."""
+
+    parser = argparse.ArgumentParser(prog='download_catalog.py')
+
+    parser.add_argument('creator_ids', type=int, nargs='*')
+
+    parser.add_argument(
+        '--man',
+        action=ManPageAction, dest='man', default=False,
+        callback=man_page,
+        help='Display manual page-like help and exit.',
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count', dest='verbose', default=False,
+        help='Print messages to stdout.',
+    )
+    parser.add_argument(
+        '--version',
+        action='version',
+        version=VERSION,
+        help='Print the script version.',
+    )
+
+    args = parser.parse_args()
+
+    set_cli_logging(LOG, args.verbose)
+
+    LOG.debug('Starting')
+    creator_ids = args.creator_ids if args.creator_ids else None
+    DownloadCatalog().dump(creator_ids=creator_ids)
+    LOG.debug('Done')
+
+
+if __name__ == '__main__':
+    # pylint: disable=broad-except
+    try:
+        main()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
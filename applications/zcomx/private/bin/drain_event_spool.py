@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+drain_event_spool.py
+
+Script to drain the event spool.
+* Insert spooled book_view, rating and contribution records in bulk.
+* Update the view, rating and contribution counters of their books.
+"""
+import argparse
+import sys
+import traceback
+from applications.zcomx.modules.argparse.actions import ManPageAction
+from applications.zcomx.modules.event_spools import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_PASSES,
+    EventSpool,
+    EventSpoolLockError,
+)
+from applications.zcomx.modules.logger import set_cli_logging
+
+VERSION = 'Version 0.1'
+
+
+def man_page():
+    """Print manual page-like help"""
+    print("""
+OVERVIEW
+    This script drains the event spool. Book events are spooled when the
+    event_spool setting is set in private/settings.json.
+
+    The spool file is moved aside, its events are inserted into the
+    database and the counters of the books are updated. Events logged while
+    the spool is drained are added to a new spool file. The script drains
+    until the spool is empty or the maximum number of passes is reached.
+    Events left are drained by the next run.
+
+    Only one drainer runs at a time. If another drainer holds the spool
+    lock, the script exits without draining.
+
+USAGE
+    drain_event_spool.py [OPTIONS]
+
+OPTIONS
+    -b, --batch-size SIZE
+        Insert records in batches of this size. Default: {b}
+
+    -f, --file FILE
+        Drain the spool file FILE. Default:
+        applications/zcomx/databases/event_spool.jsonl
+
+    -h, --help
+        Print a brief help.
+
+    --man
+        Print man page-like help.
+
+    -p, --passes PASSES
+        Drain the spool at most this many times. Default: {p}
+
+    -v, --verbose
+        Print information messages to stdout.
+
+    -vv,
+        More verbose. Print debug messages to stdout.
+
+    --version
+        Print the script version.
+    """.format(b=DEFAULT_BATCH_SIZE, p=DEFAULT_MAX_PASSES))
+
+
+def main():
+    """Main processing."""
+
+    parser = argparse.ArgumentParser(prog='drain_event_spool.py')
+
+    parser.add_argument(
+        '-b', '--batch-size',
+        dest='batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+        help='Insert records in batches of this size.',
+    )
+    parser.add_argument(
+        '-f', '--file',
+        dest='filename', default=None,
+        help='Drain this spool file.',
+    )
+    parser.add_argument(
+        '--man',
+        action=ManPageAction, dest='man', default=False,
+        callback=man_page,
+        help='Display manual page-like help and exit.',
+    )
+    parser.add_argument(
+        '-p', '--passes',
+        dest='passes', type=int, default=DEFAULT_MAX_PASSES,
+        help='Drain the spool at most this many times.',
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count', dest='verbose', default=False,
+        help='Print messages to stdout.',
+    )
+    parser.add_argument(
+        '--version',
+        action='version',
+        version=VERSION,
+        help='Print the script version.',
+    )
+
+    args = parser.parse_args()
+
+    set_cli_logging(LOG, args.verbose)
+
+    LOG.debug('Starting')
+    spool = EventSpool(filename=args.filename)
+    try:
+        with spool.drainer_lock():
+            for unused_pass in range(args.passes):
+                counts = spool.drain(batch_size=args.batch_size)
+                if counts is None:
+                    break
+                LOG.debug('Drained: %s', counts)
+    except EventSpoolLockError as err:
+        LOG.debug(str(err))
+    LOG.debug('Done')
+
+
+if __name__ == '__main__':
+    # pylint: disable=broad-except
+    try:
+        main()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
@@ -12,14 +12,23 @@ import time
 import traceback
 from applications.zcomx.modules.argparse.actions import ManPageAction
 from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.creator_grids import refresh_creator_grid
 from applications.zcomx.modules.events import (
     Download,
     DownloadClick,
     DownloadEvent,
+    LOG_DOWNLOADS_BATCH_SIZE,
+    delete_unloggable_downloads,
+    log_download_clicks,
+    unlogged_download_click_ids,
 )
 from applications.zcomx.modules.job_queuers import \
     LogDownloadsQueuer
 from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.rollups import (
+    event_counts,
+    subtract_from_rollups,
+)
 
 VERSION = 'Version 0.1'
 
@@ -64,6 +73,7 @@ def rm_unloggables():
             download.id,
             download.book_id
         )
+        subtract_from_rollups('download', db.download.id == download.id)
         download.delete()
         # Prevent script from locking db
         count += 1
@@ -134,6 +144,63 @@ def unlogged_generator(limit=None):
             db.commit()
 
 
+def update_book_downloads():
+    """Update the downloads counter of books with the number of downloads
+    logged. Archived downloads are counted from the rollups.
+
+    Returns:
+        list of integers, ids of creators of books with downloads changed.
+    """
+    counts = event_counts('download')
+    rows = db(db.book).select(
+        db.book.id, db.book.creator_id, db.book.downloads)
+    creator_ids = set()
+    for row in rows:
+        downloads = counts.get(row.id, 0)
+        if row.downloads != downloads:
+            db(db.book.id == row.id).update(downloads=downloads)
+            creator_ids.add(row.creator_id)
+    db.commit()
+    return sorted(creator_ids)
+
+
+def log_bulk(limit=None, batch_size=LOG_DOWNLOADS_BATCH_SIZE):
+    """Log download clicks set-based, in batches.
+
+    Args:
+        limit: integer, log a maximum of this number of download clicks.
+            If None, no limit.
+        batch_size: integer, number of download clicks logged per batch.
+
+    Returns:
+        tuple: (number of clicks logged, number of downloads created)
+    """
+    start = time.time()
+    clicks = 0
+    downloads = 0
+    while limit is None or clicks < limit:
+        size = batch_size if limit is None \
+            else min(batch_size, limit - clicks)
+        click_ids = unlogged_download_click_ids(limit=size)
+        if not click_ids:
+            break
+        downloads += log_download_clicks(click_ids)
+        clicks += len(click_ids)
+        LOG.debug('Logged clicks: %s, downloads: %s', clicks, downloads)
+
+    deleted = delete_unloggable_downloads()
+    elapsed = time.time() - start
+    LOG.info(
+        'Logged %s clicks, %s downloads, deleted %s in %.2fs (%.1f clicks/s)',
+        clicks,
+        downloads,
+        deleted,
+        elapsed,
+        clicks / elapsed if elapsed else 0.0,
+    )
+    return (clicks, downloads)
+
+
 def man_page():
     """Print manual page-like help"""
     print("""
@@ -143,8 +210,19 @@ USAGE
     log_downloads.py [OPTIONS] --limit 10      # Log a maximum of 10 downloads
     log_downloads.py [OPTIONS] -l 10 --requeue # Requeue the script if more
                                                # than 10 downloads need logging.
+    log_downloads.py [OPTIONS] --bulk          # Log downloads set-based.
 
 OPTIONS
+    -b BATCH_SIZE, --batch-size=BATCH_SIZE
+        With --bulk, log download clicks in batches of BATCH_SIZE.
+        Default: {b}
+
+    --bulk
+        Log download clicks set-based. The downloads of each batch of
+        clicks are created with one INSERT ... SELECT and the clicks are
+        marked completed with one update. The number of clicks logged per
+        second is reported.
+
     -h, --help
         Print a brief help.
 
@@ -169,7 +247,7 @@ OPTIONS
 
     --version
         Print the script version.
-    """)
+    """.format(b=LOG_DOWNLOADS_BATCH_SIZE))
 
 
 def main():
@@ -177,6 +255,16 @@ def main():
 
     parser = argparse.ArgumentParser(prog='log_downloads.py')
 
+    parser.add_argument(
+        '-b', '--batch-size', type=int,
+        dest='batch_size', default=LOG_DOWNLOADS_BATCH_SIZE,
+        help='With --bulk, log download clicks in batches of this size.',
+    )
+    parser.add_argument(
+        '--bulk',
+        action='store_true', dest='bulk', default=False,
+        help='Log download clicks set-based.',
+    )
     parser.add_argument(
         '-l', '--limit', type=int,
         dest='limit', default=0,
@@ -211,37 +299,43 @@ def main():
 
     LOG.debug('Starting')
     limit = args.limit if args.limit != 0 else None
-    count = 0
-    for click_id, book_id in unlogged_generator(limit=limit):
-        log(click_id, book_id)
-        count = count + 1
-        if limit is not None and count >= limit:
-            break
-        if count % 10 == 0:
-            time.sleep(1)
-
-    rm_unloggables()
-
-    sql = """
-        UPDATE book SET downloads=(
-            SELECT count(*) from download d WHERE d.book_id = book.id
-        )
-        ;
-    """
-    db.executesql(sql)
+    if args.bulk:
+        log_bulk(limit=limit, batch_size=args.batch_size)
+    else:
+        count = 0
+        for click_id, book_id in unlogged_generator(limit=limit):
+            log(click_id, book_id)
+            count = count + 1
+            if limit is not None and count >= limit:
+                break
+            if count % 10 == 0:
+                time.sleep(1)
+
+        rm_unloggables()
+
+    creator_ids = update_book_downloads()
+    if creator_ids:
+        refresh_creator_grid(creator_ids=creator_ids)
 
     requeue = False
     if args.requeue:
-        try:
-            next(unlogged_generator(limit=1))
-        except StopIteration:
-            requeue = False
+        if args.bulk:
+            requeue = bool(unlogged_download_click_ids(limit=1))
         else:
-            requeue = True
+            try:
+                next(unlogged_generator(limit=1))
+            except StopIteration:
+                requeue = False
+            else:
+                requeue = True
     if requeue:
+        cli_options = {'-r': requeue, '-l': str(args.limit)}
+        if args.bulk:
+            cli_options['--bulk'] = True
+            cli_options['-b'] = str(args.batch_size)
         job = LogDownloadsQueuer(
             db.job,
-            cli_options={'-r': requeue, '-l': str(args.limit)},
+            cli_options=cli_options,
         ).queue()
         LOG.debug('Requeue job id: %s', job.id)
 
@@ -7,6 +7,8 @@ process_activity_logs.py
 Script to process activity_log records.
 * Create activity_log records from tentative_activity_log records.
 * Delete tentative_activity_log records converted thus.
+* Bump the rss feed version if activity_log records were created so
+  cached feeds are refreshed.
 """
 import argparse
 import sys
@@ -16,10 +18,13 @@ from applications.zcomx.modules.activity_logs import (
     ActivityLog,
     CompletedTentativeLogSet,
     MINIMUM_AGE_TO_LOG_IN_SECONDS,
+    PROCESS_BATCH_SIZE,
     PageAddedTentativeLogSet,
     TentativeLogSet,
+    process_tentative_logs,
 )
 from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.rss import bump_feed_version
 
 VERSION = 'Version 0.1'
 
@@ -27,10 +32,25 @@ VERSION = 'Version 0.1'
 def man_page():
     """Print manual page-like help"""
     print("""
+OVERVIEW
+    This script creates activity_log records from tentative_activity_log
+    records. The tentative records of a book are processed once the
+    youngest of them has the minimum age.
+
+    By default the tentative records are loaded and converted book by book.
+    With --single-pass all tentative records are loaded with one select,
+    grouped by book in memory, and the activity_log records are inserted
+    and the tentative records deleted in batched transactions. Use it to
+    process a large backlog, eg after an import.
+
 USAGE
     process_activity_logs.py [OPTIONS]
 
 OPTIONS
+    -b SIZE, --batch-size=SIZE
+        With --single-pass, process this many books per transaction.
+        Default: {b}
+
     -h, --help
         Print a brief help.
 
@@ -41,6 +61,9 @@ OPTIONS
         Tentative activity log records must have this minimum age in order
         to be processed. Age is in seconds. Default: {m}
 
+    -s, --single-pass
+        Load all tentative records in one pass and process them in batches.
+
     -v, --verbose
         Print information messages to stdout.
 
@@ -49,7 +72,7 @@ OPTIONS
 
     --version
         Print the script version.
-    """.format(m=MINIMUM_AGE_TO_LOG_IN_SECONDS))
+    """.format(b=PROCESS_BATCH_SIZE, m=MINIMUM_AGE_TO_LOG_IN_SECONDS))
 
 
 def main():
@@ -57,6 +80,11 @@ def main():
 
     parser = argparse.ArgumentParser(prog='process_activity_logs.py')
 
+    parser.add_argument(
+        '-b', '--batch-size', type=int,
+        dest='batch_size', default=PROCESS_BATCH_SIZE,
+        help='With --single-pass, number of books per transaction.',
+    )
     parser.add_argument(
         '--man',
         action=ManPageAction, dest='man', default=False,
@@ -68,6 +96,11 @@ def main():
         dest='minimum_age', default=MINIMUM_AGE_TO_LOG_IN_SECONDS,
         help='Minimum age of tentative log to process.',
     )
+    parser.add_argument(
+        '-s', '--single-pass',
+        action='store_true', dest='single_pass', default=False,
+        help='Load all tentative logs in one pass, process in batches.',
+    )
     parser.add_argument(
         '-v', '--verbose',
         action='count', dest='verbose', default=False,
@@ -85,6 +118,19 @@ def main():
     set_cli_logging(LOG, args.verbose)
 
     LOG.debug('Starting')
+    if args.single_pass:
+        created = process_tentative_logs(
+            minimum_age=args.minimum_age,
+            batch_size=args.batch_size,
+        )
+        LOG.debug('Created activity logs: %s', created)
+        if created:
+            LOG.debug('Bumping rss feed version, activity logs: %s', created)
+            bump_feed_version()
+        LOG.debug('Done')
+        return
+
+    created = 0
     logs = db(db.tentative_activity_log).select(
         db.tentative_activity_log.book_id,
         groupby=db.tentative_activity_log.book_id,
@@ -110,6 +156,7 @@ def main():
             activity_log_data = log_set.as_activity_log()
             if activity_log_data:
                 activity_log = ActivityLog.from_add(activity_log_data)
+                created += 1
                 LOG.debug(
                     'Created activity_log action: %s',
                     activity_log.action
@@ -118,6 +165,10 @@ def main():
         for tentative_activity_log in tentative_log_set.tentative_records:
             tentative_activity_log.delete()
 
+    if created:
+        LOG.debug('Bumping rss feed version, activity logs: %s', created)
+        bump_feed_version()
+
     LOG.debug('Done')
 
 
@@ -13,6 +13,7 @@ import traceback
 from applications.zcomx.modules.argparse.actions import ManPageAction
 from applications.zcomx.modules.archives import TorrentArchive
 from applications.zcomx.modules.creators import Creator
+from applications.zcomx.modules.job_queuers import queue_download_catalog
 from applications.zcomx.modules.logger import set_cli_logging
 
 VERSION = 'Version 0.1'
@@ -189,6 +190,7 @@ def main():
                 rebuild_torrent=False,
             )
             creator = Creator.from_updated(creator, data)
+            queue_download_catalog(creator_id=creator.id)
 
     count = num_books_with_cbz()
     LOG.debug('Number of books with cbz file: %s', count)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+rollup_events.py
+
+Script to roll up book events into daily summaries.
+* Add book_view, download and contribution records created since the last
+  run to the book_daily_rollup records.
+* Add loggable download_click records created since the last run to the
+  download_click_daily_rollup records.
+"""
+import argparse
+import sys
+import traceback
+from applications.zcomx.modules.argparse.actions import ManPageAction
+from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.rollups import (
+    DEFAULT_BATCH_SIZE,
+    update_rollups,
+)
+
+VERSION = 'Version 0.1'
+
+
+def man_page():
+    """Print manual page-like help"""
+    print("""
+OVERVIEW
+    This script rolls up book events into daily summaries.
+
+    Views, downloads and contributions are counted per book and day in
+    book_daily_rollup. Loggable download clicks are counted per clicked
+    record and day in download_click_daily_rollup.
+    Events are rolled up incrementally. The id of the last event rolled up
+    from each event table is kept in rollup_mark so each run only reads the
+    events created since the previous run.
+
+USAGE
+    rollup_events.py [OPTIONS]
+
+OPTIONS
+    -b, --batch-size SIZE
+        Roll up events in batches of this many ids, one transaction per
+        batch. Default: {b}
+
+    -h, --help
+        Print a brief help.
+
+    --man
+        Print man page-like help.
+
+    -v, --verbose
+        Print information messages to stdout.
+
+    -vv,
+        More verbose. Print debug messages to stdout.
+
+    --version
+        Print the script version.
+    """.format(b=DEFAULT_BATCH_SIZE))
+
+
+def main():
+    """Main processing."""
+
+    parser = argparse.ArgumentParser(prog='rollup_events.py')
+
+    parser.add_argument(
+        '-b', '--batch-size',
+        dest='batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+        help='Roll up events in batches of this many ids.',
+    )
+    parser.add_argument(
+        '--man',
+        action=ManPageAction, dest='man', default=False,
+        callback=man_page,
+        help='Display manual page-like help and exit.',
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count', dest='verbose', default=False,
+        help='Print messages to stdout.',
+    )
+    parser.add_argument(
+        '--version',
+        action='version',
+        version=VERSION,
+        help='Print the script version.',
+    )
+
+    args = parser.parse_args()
+
+    set_cli_logging(LOG, args.verbose)
+
+    LOG.debug('Starting')
+    counts = update_rollups(batch_size=args.batch_size)
+    LOG.debug('Rolled up: %s', counts)
+    LOG.debug('Done')
+
+
+if __name__ == '__main__':
+    # pylint: disable=broad-except
+    try:
+        main()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
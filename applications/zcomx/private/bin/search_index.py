@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+search_index.py
+
+Script to build or update the full-text search index.
+"""
+import argparse
+import sys
+import traceback
+from applications.zcomx.modules.argparse.actions import ManPageAction
+from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.search_indexes import SearchIndex
+
+VERSION = 'Version 0.1'
+
+
+def man_page():
+    """Print manual page-like help"""
+    print("""
+OVERVIEW
+    This script builds the full-text search index used by site search.
+
+    If book or creator ids are provided, only the books with those ids, or
+    by those creators, are updated in the index. Otherwise the index is
+    rebuilt in full.
+
+USAGE
+    search_index.py [OPTIONS]
+
+OPTIONS
+    --book-id ID
+        Update the book with this id. This option can be repeated.
+
+    --creator-id ID
+        Update the books of the creator with this id. This option can be
+        repeated.
+
+    -h, --help
+        Print a brief help.
+
+    --man
+        Print man page-like help.
+
+    -v, --verbose
+        Print information messages to stdout.
+
+    -vv,
+        More verbose. Print debug messages to stdout.
+
+    --version
+        Print the script version.
+    """)
+
+
+def main():
+    """Main processing."""
+
+    parser = argparse.ArgumentParser(prog='search_index.py')
+
+    parser.add_argument(
+        '--book-id',
+        action='append', dest='book_ids', type=int, default=None,
+        help='Update the book with this id.',
+    )
+    parser.add_argument(
+        '--creator-id',
+        action='append', dest='creator_ids', type=int, default=None,
+        help='Update the books of the creator with this id.',
+    )
+    parser.add_argument(
+        '--man',
+        action=ManPageAction, dest='man', default=False,
+        callback=man_page,
+        help='Display manual page-like help and exit.',
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count', dest='verbose', default=False,
+        help='Print messages to stdout.',
+    )
+    parser.add_argument(
+        '--version',
+        action='version',
+        version=VERSION,
+        help='Print the script version.',
+    )
+
+    args = parser.parse_args()
+
+    set_cli_logging(LOG, args.verbose)
+
+    LOG.debug('Starting')
+    index = SearchIndex()
+    if args.book_ids or args.creator_ids:
+        LOG.debug(
+            'Updating books: %s, creators: %s',
+            args.book_ids, args.creator_ids)
+        index.update(book_ids=args.book_ids, creator_ids=args.creator_ids)
+    else:
+        LOG.debug('Rebuilding index: %s', index.filename)
+        index.rebuild()
+    LOG.debug('Done')
+
+
+if __name__ == '__main__':
+    # pylint: disable=broad-except
+    try:
+        main()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
@@ -27,12 +27,25 @@ def man_page():
     """Print manual page-like help"""
     print("""
 OVERVIEW
-    This script creates search autocomplete prefetch json files.
+    This script creates search autocomplete prefetch json files. A gzip
+    compressed copy of each file, with a .gz extension, is created as well.
+
+    If book or creator ids are provided, only the entries of those records
+    are updated in the existing json files. Otherwise the files are rebuilt
+    in full.
 
 USAGE
     search_prefetch.py [OPTIONS]
 
 OPTIONS
+    --book-id ID
+        Update the entry of the book with this id in the book prefetch
+        file. This option can be repeated.
+
+    --creator-id ID
+        Update the entry of the creator with this id in the creator
+        prefetch file. This option can be repeated.
+
     -h, --help
         Print a brief help.
 
@@ -66,6 +79,16 @@ def main():
 
     parser = argparse.ArgumentParser(prog='search_prefetch.py')
 
+    parser.add_argument(
+        '--book-id',
+        action='append', dest='book_ids', type=int, default=None,
+        help='Update the entry of the book with this id.',
+    )
+    parser.add_argument(
+        '--creator-id',
+        action='append', dest='creator_ids', type=int, default=None,
+        help='Update the entry of the creator with this id.',
+    )
     parser.add_argument(
         '--man',
         action=ManPageAction, dest='man', default=False,
@@ -102,13 +125,34 @@ def main():
     LOG.debug('Starting')
 
     tables = [args.table] if args.table is not None else TABLES
+    record_ids = {
+        'book': args.book_ids,
+        'creator': args.creator_ids,
+    }
+    incremental = bool(args.book_ids or args.creator_ids)
 
     for table in tables:
         output = args.output.replace('<table>', table)
-        LOG.debug('Dumping table %s into: %s', table, output)
         completer_class = autocompleter_class(table)
-        completer = completer_class()
-        completer.dump(output)
+        if not incremental:
+            LOG.debug('Dumping table %s into: %s', table, output)
+            completer_class().dump(output)
+            continue
+        if not record_ids[table]:
+            continue
+        completer = completer_class(record_ids=record_ids[table])
+        if not os.path.exists(output):
+            LOG.debug('Dumping table %s into: %s', table, output)
+            completer.record_ids = None
+            completer.dump(output)
+            continue
+        LOG.debug(
+            'Updating table %s ids %s in: %s',
+            table,
+            record_ids[table],
+            output,
+        )
+        completer.update(output)
     LOG.debug('Done')
 
 
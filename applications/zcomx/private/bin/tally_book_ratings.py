@@ -3,8 +3,8 @@
 """
 tally_book_ratings.py
 
-Script to tally the yearly and monthly contributions, ratings, and views for
-each book.
+Script to reconcile the contributions, downloads, ratings, and views of
+each book with the event tables.
 """
 import argparse
 import os
@@ -13,10 +13,10 @@ import traceback
 from gluon import *
 from gluon.shell import env
 from applications.zcomx.modules.argparse.actions import ManPageAction
-from applications.zcomx.modules.books import (
-    Book,
-    update_rating,
-)
+from applications.zcomx.modules.books import tally_ratings
+from applications.zcomx.modules.creator_grids import refresh_creator_grid
+from applications.zcomx.modules.fragment_caches import \
+    bump_content_version
 from applications.zcomx.modules.logger import set_cli_logging
 
 VERSION = 'Version 0.1'
@@ -82,11 +82,11 @@ def main():
 
     LOG.info('Started.')
 
-    for book_id in db(db.book).select(db.book.id):
-        book = Book.from_id(book_id)
-        LOG.debug('Updating: %s', book.name)
-        update_rating(book)
+    book_ids = tally_ratings()
+    LOG.debug('Updated books: %s', book_ids)
+    refresh_creator_grid()
 
+    bump_content_version()
     LOG.info('Done.')
 
 
@@ -11,6 +11,10 @@ import traceback
 from applications.zcomx.modules.argparse.actions import ManPageAction
 from applications.zcomx.modules.books import Book
 from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.rollups import (
+    click_totals,
+    update_rollups,
+)
 
 VERSION = 'Version 0.1'
 
@@ -33,28 +37,11 @@ def check_book(book_id):
     if not rows:
         return
 
-    time_stamp = rows[0].time_stamp
+    since = rows[0].time_stamp.date()
 
-    book_count = 0
-    creator_count = 0
-    all_count = 0
-
-    query = (db.download_click.loggable == True) & \
-        (db.download_click.time_stamp >= time_stamp) & \
-        (db.download_click.record_table == 'book') & \
-        (db.download_click.record_id == book.id)
-    book_count = db(query).count()
-
-    query = (db.download_click.loggable == True) & \
-        (db.download_click.time_stamp >= time_stamp) & \
-        (db.download_click.record_table == 'creator') & \
-        (db.download_click.record_id == book.creator_id)
-    creator_count = db(query).count()
-
-    query = (db.download_click.loggable == True) & \
-        (db.download_click.time_stamp >= time_stamp) & \
-        (db.download_click.record_table == 'all')
-    all_count = db(query).count()
+    book_count = click_totals('book', book.id, since=since)
+    creator_count = click_totals('creator', book.creator_id, since=since)
+    all_count = click_totals('all', 0, since=since)
 
     count = book_count + creator_count + all_count
 
@@ -67,6 +54,14 @@ def check_book(book_id):
 def man_page():
     """Print manual page-like help"""
     print("""
+OVERVIEW
+    This script compares the download counter of each released book to the
+    loggable download clicks on the book, its creator and all books since
+    the book was completed, and prints the books that differ. Clicks are
+    counted from download_click_daily_rollup, by day, so clicks on the day
+    the book was completed but before it was completed are included. The
+    rollups are updated first.
+
 USAGE
     download_analysis.py [OPTIONS]
 
@@ -116,6 +111,8 @@ def main():
 
     set_cli_logging(LOG, args.verbose)
 
+    update_rollups()
+
     query = (db.book.release_date != None) & \
         (db.book.torrent != '')
     rows = db(query).select(db.book.id)
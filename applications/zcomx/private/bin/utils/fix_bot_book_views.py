@@ -15,6 +15,7 @@ from applications.zcomx.modules.events import (
     DownloadClick,
 )
 from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.rollups import subtract_from_rollups
 
 VERSION = 'Version 0.1'
 
@@ -34,6 +35,7 @@ def fix_book_view(download_click):
     for book_view_id in db(query).select(db.book_view.id, limitby=(0, limit)):
         book_view = BookView.from_id(book_view_id)
         LOG.info('Deleting: %s - %s', book_view.id, book_view.created_on)
+        subtract_from_rollups('book_view', db.book_view.id == book_view.id)
         book_view.delete()
 
 
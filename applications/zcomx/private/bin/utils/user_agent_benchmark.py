@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+user_agent_benchmark.py
+
+Script to benchmark bot classification of user agent strings.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import traceback
+from gluon import *
+from gluon.contrib import user_agent_parser
+from applications.zcomx.modules.argparse.actions import ManPageAction
+from applications.zcomx.modules.logger import set_cli_logging
+from applications.zcomx.modules.user_agents import (
+    BotVerdictCache,
+    classify,
+)
+
+VERSION = 'Version 0.1'
+DEFAULT_REQUESTS = 100000
+
+
+def load_user_agents(filename):
+    """Return the user agent strings of a file.
+
+    Args:
+        filename: str, name of file, one user agent string per line. Blank
+            lines and lines starting with # are ignored.
+
+    Returns:
+        list of strings
+    """
+    with open(filename, 'r') as f:
+        return [
+            x.strip() for x in f
+            if x.strip() and not x.startswith('#')
+        ]
+
+
+def man_page():
+    """Print manual page-like help"""
+    print("""
+OVERVIEW
+    This script benchmarks the bot classification of user agent strings.
+
+    A stream of requests is simulated by picking user agent strings at
+    random from a sample. Each request is classified with the user agent
+    parser, as before the verdict cache, and with the verdict cache. The
+    timings, cache hit rate and verdict counts are printed.
+
+USAGE
+    user_agent_benchmark.py [OPTIONS]
+
+OPTIONS
+    -f FILE, --file=FILE
+        Sample user agent strings from FILE, one per line.
+        Default: private/test/data/user_agents.txt
+
+    -h, --help
+        Print a brief help.
+
+    --man
+        Print man page-like help.
+
+    -n REQUESTS, --requests=REQUESTS
+        Simulate REQUESTS requests. Default: {n}
+
+    -v, --verbose
+        Print information messages to stdout.
+
+    -vv,
+        More verbose. Print debug messages to stdout.
+
+    --version
+        Print the script version.
+    """.format(n=DEFAULT_REQUESTS))
+
+
+def main():
+    """Main processing."""
+
+    parser = argparse.ArgumentParser(prog='user_agent_benchmark.py')
+
+    parser.add_argument(
+        '-f', '--file',
+        dest='filename',
+        default=os.path.join(
+            current.request.folder, 'private', 'test', 'data',
+            'user_agents.txt'),
+        help='Sample user agent strings from this file.',
+    )
+    parser.add_argument(
+        '--man',
+        action=ManPageAction, dest='man', default=False,
+        callback=man_page,
+        help='Display manual page-like help and exit.',
+    )
+    parser.add_argument(
+        '-n', '--requests', type=int,
+        dest='requests', default=DEFAULT_REQUESTS,
+        help='Number of requests simulated.',
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count', dest='verbose', default=False,
+        help='Print messages to stdout.',
+    )
+    parser.add_argument(
+        '--version',
+        action='version',
+        version=VERSION,
+        help='Print the script version'
+    )
+
+    args = parser.parse_args()
+
+    set_cli_logging(LOG, args.verbose)
+
+    user_agents = load_user_agents(args.filename)
+    if not user_agents:
+        print('No user agent strings in: {f}'.format(f=args.filename))
+        sys.exit(1)
+
+    random.seed(0)
+    stream = [random.choice(user_agents) for _ in range(args.requests)]
+
+    start = time.time()
+    for user_agent in stream:
+        user_agent_parser.detect(user_agent)
+    parser_seconds = time.time() - start
+
+    cache = BotVerdictCache()
+    start = time.time()
+    for user_agent in stream:
+        cache.verdict(user_agent)
+    cache_seconds = time.time() - start
+
+    verdicts = [classify(x) for x in user_agents]
+    metrics = cache.metrics()
+
+    print('User agent strings: {u}'.format(u=len(user_agents)))
+    print('  bots: {b}, not bots: {n}, indeterminate: {i}'.format(
+        b=verdicts.count(True),
+        n=verdicts.count(False),
+        i=verdicts.count(None),
+    ))
+    print('Requests: {r}'.format(r=args.requests))
+    print('Parser: {s:.3f}s, {u:.1f}us/request'.format(
+        s=parser_seconds,
+        u=parser_seconds * 1000000 / args.requests,
+    ))
+    print('Cache:  {s:.3f}s, {u:.1f}us/request'.format(
+        s=cache_seconds,
+        u=cache_seconds * 1000000 / args.requests,
+    ))
+    print('Cache hit ratio: {h:.4f}, size: {s}'.format(
+        h=metrics['hit_ratio'],
+        s=metrics['size'],
+    ))
+
+
+if __name__ == '__main__':
+    # pylint: disable=broad-except
+    try:
+        main()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
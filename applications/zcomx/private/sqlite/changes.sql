@@ -0,0 +1,45 @@
+-- Job queuer for the precomputed downloadable catalog.
+INSERT INTO job_queuer (code) VALUES ('download_catalog');
+
+-- Job queuer for the full-text search index.
+INSERT INTO job_queuer (code) VALUES ('search_index');
+
+-- Job queuer for the daily event rollups.
+INSERT INTO job_queuer (code) VALUES ('rollup_events');
+
+-- Index for rss feed queries and conditional GET validators.
+CREATE INDEX IF NOT EXISTS activity_log_time_stamp ON activity_log (time_stamp);
+
+-- Indexes for set-based download logging.
+CREATE INDEX IF NOT EXISTS download_download_click_id ON download (download_click_id, book_id);
+CREATE INDEX IF NOT EXISTS download_click_completed ON download_click (completed, loggable);
+
+-- Index for the download click dedupe query, see events.last_loggable_click.
+CREATE INDEX IF NOT EXISTS download_click_dedupe ON download_click (ip_address, record_table, record_id, time_stamp);
+
+-- Index for single-pass processing of tentative activity logs.
+CREATE INDEX IF NOT EXISTS tentative_activity_log_book_id ON tentative_activity_log (book_id, time_stamp);
+
+-- Indexes for the daily event rollups.
+CREATE UNIQUE INDEX IF NOT EXISTS book_daily_rollup_book_day ON book_daily_rollup (book_id, day);
+CREATE INDEX IF NOT EXISTS book_daily_rollup_day ON book_daily_rollup (day, creator_id);
+CREATE UNIQUE INDEX IF NOT EXISTS download_click_daily_rollup_record_day ON download_click_daily_rollup (record_table, record_id, day);
+CREATE UNIQUE INDEX IF NOT EXISTS rollup_mark_name ON rollup_mark (name);
+
+-- creator_grid_v is materialized as the creator_grid table. After
+-- migrating, populate it with: private/bin/creator_grid.py
+DROP VIEW IF EXISTS creator_grid_v;
+CREATE UNIQUE INDEX IF NOT EXISTS creator_grid_creator_id ON creator_grid (creator_id);
+CREATE INDEX IF NOT EXISTS creator_grid_completed ON creator_grid (completed);
+CREATE INDEX IF NOT EXISTS creator_grid_downloads ON creator_grid (downloads);
+CREATE INDEX IF NOT EXISTS creator_grid_ongoing ON creator_grid (ongoing);
+CREATE INDEX IF NOT EXISTS creator_grid_views ON creator_grid (views);
+INSERT INTO job_queuer (code) VALUES ('creator_grid');
+
+-- Indexes for archiving old event records, see archive_events.py.
+CREATE INDEX IF NOT EXISTS book_view_time_stamp ON book_view (time_stamp);
+CREATE INDEX IF NOT EXISTS download_time_stamp ON download (time_stamp);
+CREATE INDEX IF NOT EXISTS download_click_time_stamp ON download_click (time_stamp);
+
+-- Index for the book marks of logged in readers, see modules/book_marks.py.
+CREATE UNIQUE INDEX IF NOT EXISTS book_mark_auth_user_book ON book_mark (auth_user_id, book_id);
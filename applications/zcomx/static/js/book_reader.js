@@ -350,6 +350,10 @@
 
             var src = this.options.img_server + '/images/download/'
                 + div_img.data("image") + '?size=' + this.size;
+            var version = div_img.attr('data-version-' + this.size);
+            if (version) {
+                src += '&v=' + version;
+            }
 
             $('<img />').attr('src', src)
                 .addClass('book_page_img')
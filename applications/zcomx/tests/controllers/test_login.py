@@ -21,6 +21,7 @@ from applications.zcomx.modules.creators import Creator
 from applications.zcomx.modules.images import (
     ImageDescriptor,
     UploadImage,
+    image_version,
 )
 from applications.zcomx.modules.indicias import (
     BookPublicationMetadata,
@@ -1132,8 +1133,9 @@ class TestFunctions(WebTestCase):
         self.assertEqual(img['data-creator_id'], str(creator.id))
         self.assertEqual(
             img['src'],
-            '/images/download.json/{i}?cache=1&size=web'.format(
-                i=urllib.parse.quote(creator.image)
+            '/images/download.json/{i}?cache=1&size=web&v={v}'.format(
+                i=urllib.parse.quote(creator.image),
+                v=image_version(creator.image, size='web'),
             )
         )
 
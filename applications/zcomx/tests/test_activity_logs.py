@@ -15,6 +15,9 @@ from applications.zcomx.modules.activity_logs import (
     TentativeActivityLog,
     TentativeLogSet,
     UploadActivityLogger,
+    log_tentative_records,
+    process_tentative_logs,
+    tentative_logs_by_book,
 )
 
 from applications.zcomx.modules.book_pages import (
@@ -514,6 +517,103 @@ class TestUploadActivityLogger(LocalTestCase):
         self.assertEqual(len(logs), 0)
 
 
+class WithTentativeLogsTestCase(LocalTestCase):
+
+    _book = None
+    _book_page = None
+    _time_stamp = datetime.datetime(1999, 1, 31, 12, 31, 59)
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._book = self.add(Book, dict(name='test_tentative_logs'))
+        self._book_page = self.add(BookPage, dict(
+            book_id=self._book.id,
+            page_no=1,
+        ))
+
+    def add_tentative_log(self, action, days=0, book_id=None):
+        return self.add(TentativeActivityLog, dict(
+            book_id=book_id if book_id is not None else self._book.id,
+            book_page_id=self._book_page.id,
+            action=action,
+            time_stamp=self._time_stamp + datetime.timedelta(days=days),
+        ))
+
+    def activity_logs(self, book_id):
+        query = (db.activity_log.book_id == book_id)
+        logs = []
+        for row in db(query).select(orderby=db.activity_log.action):
+            logs.append(ActivityLog.from_id(row.id))
+            self._objects.append(logs[-1])
+        return logs
+
+
+class TestFunctions(WithTentativeLogsTestCase):
+
+    def test__log_tentative_records(self):
+        self.assertEqual(log_tentative_records([]), 0)
+
+        page_added = self.add_tentative_log('page added')
+        completed = self.add_tentative_log('completed', days=1)
+        tentative_records = [
+            TentativeActivityLog.from_id(page_added.id),
+            TentativeActivityLog.from_id(completed.id),
+        ]
+        got = log_tentative_records([tentative_records])
+        self.assertEqual(got, 2)
+
+        logs = self.activity_logs(self._book.id)
+        self.assertEqual(len(logs), 2)
+        self.assertEqual(logs[0].action, 'completed')
+        self.assertEqual(logs[0].time_stamp, completed.time_stamp)
+        self.assertEqual(logs[1].action, 'page added')
+        self.assertEqual(logs[1].book_page_ids, [self._book_page.id])
+        self.assertEqual(logs[1].time_stamp, page_added.time_stamp)
+
+        query = (db.tentative_activity_log.book_id == self._book.id)
+        self.assertEqual(db(query).count(), 0)
+
+    def test__process_tentative_logs(self):
+        book_2 = self.add(Book, dict(name='test__process_tentative_logs'))
+        self.add_tentative_log('page added')
+        self.add_tentative_log('page added', days=1)
+        self.add_tentative_log('completed', days=2, book_id=book_2.id)
+
+        # Records newer than as_of have a negative age and are skipped.
+        as_of = self._time_stamp + datetime.timedelta(days=2, hours=1)
+        got = process_tentative_logs(
+            minimum_age=2 * 60 * 60, batch_size=1, as_of=as_of)
+        self.assertEqual(got, 1)
+
+        logs = self.activity_logs(self._book.id)
+        self.assertEqual(len(logs), 1)
+        self.assertEqual(logs[0].action, 'page added')
+        self.assertEqual(
+            logs[0].time_stamp,
+            self._time_stamp + datetime.timedelta(days=1)
+        )
+        self.assertEqual(self.activity_logs(book_2.id), [])
+
+        # book_2 is too young, its records are kept.
+        query = (db.tentative_activity_log.book_id == book_2.id)
+        self.assertEqual(db(query).count(), 1)
+        query = (db.tentative_activity_log.book_id == self._book.id)
+        self.assertEqual(db(query).count(), 0)
+
+    def test__tentative_logs_by_book(self):
+        book_2 = self.add(Book, dict(name='test__tentative_logs_by_book'))
+        log_1 = self.add_tentative_log('page added', days=1)
+        log_2 = self.add_tentative_log('completed')
+        log_3 = self.add_tentative_log('page added', book_id=book_2.id)
+
+        got = dict(tentative_logs_by_book())
+        self.assertEqual(
+            [x.id for x in got[self._book.id]], [log_2.id, log_1.id])
+        self.assertEqual([x.id for x in got[book_2.id]], [log_3.id])
+        self.assertTrue(
+            isinstance(got[self._book.id][0], TentativeActivityLog))
+
+
 def setUpModule():
     """Set up web2py environment."""
     # pylint: disable=invalid-name
@@ -3,6 +3,8 @@
 """
 Test suite for zcomx/modules/autocomplete.py
 """
+import gzip
+import json
 import os
 import shutil
 import unittest
@@ -12,7 +14,10 @@ from applications.zcomx.modules.autocomplete import (
     BaseAutocompleter,
     BookAutocompleter,
     CreatorAutocompleter,
+    PrefixIndex,
     autocompleter_class,
+    prefix_index,
+    write_dump,
 )
 from applications.zcomx.modules.book_types import BookType
 from applications.zcomx.modules.books import Book
@@ -44,9 +49,9 @@ class DumpTestCase(LocalTestCase):
 
 
 class DubAutocompleter(BaseAutocompleter):
-    def __init__(self, keyword=''):
+    def __init__(self, keyword='', record_ids=None):
         db = current.app.db
-        super().__init__(db.book, keyword=keyword)
+        super().__init__(db.book, keyword=keyword, record_ids=record_ids)
 
     def row_to_json(self, row):
         return {'id': str(row)}
@@ -71,6 +76,8 @@ class TestBaseAutocompleter(DumpTestCase):
             content,
             '[{"id": "1"}, {"id": "2"}, {"id": "3"}]'
         )
+        with gzip.open(output + '.gz', 'rt', encoding='utf-8') as f:
+            self.assertEqual(f.read(), content)
 
     def test__filters(self):
         autocompleter = BaseAutocompleter(db.book)
@@ -78,6 +85,13 @@ class TestBaseAutocompleter(DumpTestCase):
         # No keyword
         self.assertEqual(autocompleter.filters(), [])
 
+        # With record ids
+        autocompleter = BaseAutocompleter(db.book, record_ids=[1, 2])
+        queries = autocompleter.filters()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(str(queries[0]), '("book"."id" IN (1,2))')
+        autocompleter = BaseAutocompleter(db.book)
+
         # With keyword
         autocompleter.keyword = 'Abc Def'
         queries = autocompleter.filters()
@@ -96,6 +110,35 @@ class TestBaseAutocompleter(DumpTestCase):
         autocompleter = BaseAutocompleter(db.book)
         self.assertEqual(autocompleter.id_field(), db.book.id)
 
+    def test__indexed_search(self):
+        prefetch = os.path.join(self._tmp_dir, 'books.json')
+        items = [
+            {'id': 1, 'table': 'book', 'value': 'Abc Def'},
+            {'id': 2, 'table': 'book', 'value': 'Ghi Abc'},
+            {'id': 3, 'table': 'book', 'value': 'Jkl'},
+        ]
+        with open(prefetch, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(items))
+
+        class IndexedAutocompleter(DubAutocompleter):
+            def prefetch_filename(self):
+                return prefetch
+
+        autocompleter = IndexedAutocompleter(keyword='abc')
+        self.assertEqual(autocompleter.indexed_search(), items[:2])
+        self.assertEqual(autocompleter.indexed_search(limit=1), items[:1])
+
+        # No prefetch file, falls back to search()
+        os.unlink(prefetch)
+        self.assertEqual(
+            autocompleter.indexed_search(),
+            [{'id': '1'}, {'id': '2'}, {'id': '3'}]
+        )
+        self.assertEqual(
+            autocompleter.indexed_search(limit=2),
+            [{'id': '1'}, {'id': '2'}]
+        )
+
     def test__left_join(self):
         autocompleter = BaseAutocompleter(db.book)
         self.assertEqual(autocompleter.left_join(), None)
@@ -104,6 +147,18 @@ class TestBaseAutocompleter(DumpTestCase):
         autocompleter = BaseAutocompleter(db.book)
         self.assertEqual(autocompleter.orderby(), db.book.name_for_search)
 
+    def test__prefetch_filename(self):
+        autocompleter = BaseAutocompleter(db.book)
+        self.assertTrue(
+            autocompleter.prefetch_filename().endswith(
+                'applications/zcomx/static/data/books.json')
+        )
+        autocompleter = BaseAutocompleter(db.creator)
+        self.assertTrue(
+            autocompleter.prefetch_filename().endswith(
+                'applications/zcomx/static/data/creators.json')
+        )
+
     def test__row_to_json(self):
 
         book = self.add(Book, dict(
@@ -141,6 +196,84 @@ class TestBaseAutocompleter(DumpTestCase):
         autocompleter = BaseAutocompleter(db.book)
         self.assertEqual(autocompleter.search_field(), db.book.name_for_search)
 
+    def test__update(self):
+        output = os.path.join(self._tmp_dir, 'test__update.json')
+        existing = [
+            {'id': 1, 'value': 'Aaa'},
+            {'id': 2, 'value': 'Ccc'},
+            {'id': 3, 'value': 'Eee'},
+        ]
+        write_dump(output, existing)
+
+        class UpdateAutocompleter(BaseAutocompleter):
+            def search(self):
+                results = {
+                    1: {'id': 1, 'value': 'Aaa Changed'},
+                    4: {'id': 4, 'value': 'Ddd'},
+                }
+                return [
+                    results[x] for x in sorted(self.record_ids)
+                    if x in results
+                ]
+
+            def search_rows(self):
+                # Order of a full dump
+                return [Row(id=x) for x in [2, 4, 1]]
+
+        # 1 changed, 3 removed, 4 inserted, 2 untouched
+        autocompleter = UpdateAutocompleter(db.book, record_ids=[1, 3, 4])
+        autocompleter.update(output)
+        with open(output, encoding='utf-8') as f:
+            got = json.load(f)
+        self.assertEqual(
+            got,
+            [
+                {'id': 2, 'value': 'Ccc'},
+                {'id': 4, 'value': 'Ddd'},
+                {'id': 1, 'value': 'Aaa Changed'},
+            ]
+        )
+        with gzip.open(output + '.gz', 'rt', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), got)
+
+        # A renamed record moves to the position of a full dump.
+        books = []
+        for name in ['Azbycx Aaa', 'Azbycx Ccc', 'Azbycx Eee']:
+            books.append(self.add(Book, dict(
+                name=name,
+                book_type_id=BookType.by_name('one-shot').id,
+                name_for_search=name.lower().replace(' ', '-'),
+                status=BOOK_STATUS_ACTIVE,
+            )))
+        autocompleter = BookAutocompleter(keyword='azbycx')
+        autocompleter.dump(output)
+        books[0].update_record(
+            name='Azbycx Ddd', name_for_search='azbycx-ddd')
+        db.commit()
+        autocompleter = BookAutocompleter(
+            keyword='azbycx', record_ids=[books[0].id])
+        autocompleter.update(output)
+        with open(output, encoding='utf-8') as f:
+            got = json.load(f)
+        self.assertEqual(
+            [x['value'] for x in got],
+            ['Azbycx Ccc', 'Azbycx Ddd', 'Azbycx Eee']
+        )
+        full_output = os.path.join(self._tmp_dir, 'test__update_full.json')
+        BookAutocompleter(keyword='azbycx').dump(full_output)
+        with open(full_output, encoding='utf-8') as f:
+            self.assertEqual(got, json.load(f))
+
+        # Unreadable file, all results are dumped.
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write('_invalid_json_')
+        autocompleter = DubAutocompleter(record_ids=[1])
+        autocompleter.update(output)
+        with open(output, encoding='utf-8') as f:
+            got = json.load(f)
+        self.assertEqual(got, [{'id': '1'}, {'id': '2'}, {'id': '3'}])
+        self.assertEqual(autocompleter.record_ids, [1])
+
 
 class TestBookAutocompleter(LocalTestCase):
 
@@ -373,7 +506,49 @@ class TestCreatorAutocompleter(LocalTestCase):
         self.assertEqual(autocompleter.search(), expect)
 
 
-class TestFunctions(LocalTestCase):
+class TestPrefixIndex(DumpTestCase):
+
+    _items = [
+        {'id': 1, 'table': 'book', 'value': 'Abc Def 001'},
+        {'id': 2, 'table': 'book', 'value': "Ghi's Abc 02 (of 04)"},
+        {'id': 3, 'table': 'book', 'value': 'Jkl'},
+    ]
+
+    def test____init__(self):
+        index = PrefixIndex(self._items)
+        self.assertEqual(index.items, self._items)
+
+    def test__from_file(self):
+        filename = os.path.join(self._tmp_dir, 'test__from_file.json')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._items))
+        index = PrefixIndex.from_file(filename)
+        self.assertEqual(index.items, self._items)
+
+    def test__search(self):
+        index = PrefixIndex(self._items)
+        tests = [
+            # (keyword, limit, expect ids)
+            (None, None, [1, 2, 3]),
+            ('', None, [1, 2, 3]),
+            ('', 2, [1, 2]),
+            ('abc', None, [1, 2]),
+            ('ABC', None, [1, 2]),
+            ('abc', 1, [1]),
+            ('bc', None, [1, 2]),
+            ('abc def', None, [1]),
+            ('def-001', None, [1]),
+            ('ghis', None, [2]),
+            ('02-of-04', None, [2]),
+            ('j', None, [3]),
+            ('zzz', None, []),
+        ]
+        for t in tests:
+            got = index.search(t[0], limit=t[1])
+            self.assertEqual([x['id'] for x in got], t[2])
+
+
+class TestFunctions(DumpTestCase):
 
     def test__autocompleter_class(self):
         self.assertEqual(autocompleter_class('book'), BookAutocompleter)
@@ -381,6 +556,42 @@ class TestFunctions(LocalTestCase):
         self.assertEqual(autocompleter_class('_fake_'), None)
         self.assertEqual(autocompleter_class(None), None)
 
+    def test__prefix_index(self):
+        filename = os.path.join(self._tmp_dir, 'test__prefix_index.json')
+        if os.path.exists(filename):
+            os.unlink(filename)
+        self.assertEqual(prefix_index(filename), None)
+
+        items = [{'id': 1, 'table': 'book', 'value': 'Abc'}]
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(items))
+        index = prefix_index(filename)
+        self.assertEqual(index.items, items)
+        # The index is reused while the file is unchanged.
+        self.assertTrue(prefix_index(filename) is index)
+
+        # The index is reloaded when the file changes.
+        items.append({'id': 2, 'table': 'book', 'value': 'Def'})
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(items))
+        index_2 = prefix_index(filename)
+        self.assertFalse(index_2 is index)
+        self.assertEqual(index_2.items, items)
+
+        # Invalid json
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('_invalid_json_')
+        self.assertEqual(prefix_index(filename), None)
+
+    def test__write_dump(self):
+        output = os.path.join(self._tmp_dir, 'test__write_dump.json')
+        items = [{'id': 1, 'table': 'book', 'value': 'Abc'}]
+        write_dump(output, items)
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), items)
+        with gzip.open(output + '.gz', 'rt', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), items)
+
 
 def setUpModule():
     """Set up web2py environment."""
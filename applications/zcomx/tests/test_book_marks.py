@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/book_marks.py
+"""
+import time
+import unittest
+from gluon import *
+from gluon.storage import Storage
+from applications.zcomx.modules.book_marks import (
+    BookMark,
+    BookMarkStore,
+    RELOAD_SECONDS,
+    book_mark_store,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+
+
+class WithStoreTestCase(LocalTestCase):
+
+    _auth_user_id = -1
+    _stores = []
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._stores = []
+
+    def tearDown(self):
+        for store in self._stores:
+            store.cache_model(store.cache_key, None)
+        query = (db.book_mark.auth_user_id == self._auth_user_id)
+        db(query).delete()
+        db.commit()
+
+    def store(self, auth_user_id=None, flush_seconds=60, reload_seconds=None):
+        store = BookMarkStore(
+            'test_book_marks_{i}'.format(i=auth_user_id),
+            auth_user_id=auth_user_id,
+            cache_model=current.cache.ram,
+            flush_seconds=flush_seconds,
+            reload_seconds=reload_seconds,
+        )
+        self._stores.append(store)
+        return store
+
+
+class TestBookMark(LocalTestCase):
+    pass            # Record subclass
+
+
+class TestBookMarkStore(WithStoreTestCase):
+
+    def test____init__(self):
+        store = BookMarkStore('test_book_marks')
+        self.assertEqual(store.auth_user_id, None)
+        self.assertEqual(store.cache_model, current.cache.ram)
+        self.assertEqual(store.reload_seconds, None)
+
+    def test___entry(self):
+        store = self.store()
+        entry = store._entry()
+        self.assertTrue(entry.pop('loaded_on') <= time.time())
+        self.assertEqual(entry, {'dirty': [], 'flushed_on': 0, 'marks': {}})
+
+        # The entry returned is a copy.
+        entry = store._entry()
+        entry['marks'][1] = 2
+        self.assertEqual(store._entry()['marks'], {})
+
+        # Marks saved by other processes are seen once reloaded.
+        store = self.store(
+            auth_user_id=self._auth_user_id, reload_seconds=300)
+        store.set(-2, 3)            # Flushed, first set
+        store.set(-3, 4)            # Coalesced
+        query = (db.book_mark.auth_user_id == self._auth_user_id) & \
+            (db.book_mark.book_id == -2)
+        db(query).update(page_no=5)
+        db.commit()
+        self.assertEqual(store._entry()['marks'], {-2: 3, -3: 4})
+
+        entry = store._entry()
+        entry['loaded_on'] -= store.reload_seconds
+        store.cache_model(store.cache_key, lambda: entry, time_expire=0)
+        entry = store._entry()
+        # Marks not saved are saved before reloading.
+        self.assertEqual(entry['marks'], {-2: 5, -3: 4})
+        self.assertEqual(entry['dirty'], [])
+        self.assertTrue(entry['flushed_on'] > 0)
+
+    def test___is_reload_due(self):
+        entry = {'dirty': [], 'flushed_on': 0, 'loaded_on': 0, 'marks': {}}
+        store = self.store(auth_user_id=self._auth_user_id)
+        self.assertFalse(store._is_reload_due(entry))
+
+        store = self.store(reload_seconds=300)
+        self.assertFalse(store._is_reload_due(entry))
+
+        store = self.store(
+            auth_user_id=self._auth_user_id, reload_seconds=300)
+        self.assertTrue(store._is_reload_due(entry))
+        self.assertFalse(
+            store._is_reload_due(dict(entry, loaded_on=time.time())))
+
+    def test___is_flush_due(self):
+        entry = {'dirty': [-2], 'flushed_on': 0, 'marks': {-2: 3}}
+        store = self.store()
+        self.assertFalse(store._is_flush_due(entry))
+
+        store = self.store(auth_user_id=self._auth_user_id)
+        self.assertTrue(store._is_flush_due(entry))
+        self.assertFalse(store._is_flush_due(dict(entry, dirty=[])))
+        self.assertFalse(
+            store._is_flush_due(dict(entry, flushed_on=time.time())))
+
+    def test___load(self):
+        store = self.store()
+        entry = store._load()
+        self.assertTrue(entry.pop('loaded_on') <= time.time())
+        self.assertEqual(entry, {'dirty': [], 'flushed_on': 0, 'marks': {}})
+
+        book_mark = self.add(BookMark, dict(
+            auth_user_id=self._auth_user_id,
+            book_id=-2,
+            page_no=3,
+        ))
+        store = self.store(auth_user_id=self._auth_user_id)
+        self.assertEqual(store._load()['marks'], {-2: 3})
+        self.assertEqual(book_mark.page_no, 3)
+
+    def test__cache_key(self):
+        store = BookMarkStore('abc')
+        self.assertEqual(store.cache_key, 'book_marks_abc')
+
+    def test__flush(self):
+        store = self.store()
+        store.set(-2, 3)
+        self.assertEqual(store.flush(), 0)
+
+        store = self.store(auth_user_id=self._auth_user_id)
+        self.assertEqual(store.flush(), 0)
+        store.set(-2, 3)            # Flushed, first set
+        store.set(-2, 4)            # Coalesced
+        store.set(-3, 5)            # Coalesced
+        query = (db.book_mark.auth_user_id == self._auth_user_id)
+        rows = db(query).select(orderby=db.book_mark.book_id)
+        self.assertEqual([(x.book_id, x.page_no) for x in rows], [(-2, 3)])
+        self.assertEqual(store._entry()['dirty'], [-2, -3])
+
+        self.assertEqual(store.flush(), 2)
+        rows = db(query).select(orderby=db.book_mark.book_id)
+        self.assertEqual(
+            [(x.book_id, x.page_no) for x in rows], [(-3, 5), (-2, 4)])
+        self.assertEqual(store._entry()['dirty'], [])
+
+    def test__page_no(self):
+        store = self.store()
+        self.assertEqual(store.page_no(-2), None)
+        store.set(-2, 3)
+        self.assertEqual(store.page_no(-2), 3)
+
+        # The last mark of a burst is saved on read once due.
+        store = self.store(auth_user_id=self._auth_user_id)
+        store.set(-2, 3)            # Flushed, first set
+        store.set(-2, 4)            # Coalesced, last of the burst
+        self.assertEqual(store.page_no(-2), 4)
+        query = (db.book_mark.auth_user_id == self._auth_user_id)
+        rows = db(query).select()
+        self.assertEqual([(x.book_id, x.page_no) for x in rows], [(-2, 3)])
+        self.assertEqual(store._entry()['dirty'], [-2])
+
+        entry = store._entry()
+        entry['flushed_on'] -= store.flush_seconds
+        store.cache_model(store.cache_key, lambda: entry, time_expire=0)
+        self.assertEqual(store.page_no(-2), 4)
+        rows = db(query).select()
+        self.assertEqual([(x.book_id, x.page_no) for x in rows], [(-2, 4)])
+        self.assertEqual(store._entry()['dirty'], [])
+
+    def test__set(self):
+        store = self.store()
+        self.assertTrue(store.set(-2, 3))
+        self.assertFalse(store.set(-2, 3))
+        self.assertTrue(store.set(-2, 4))
+        self.assertEqual(store._entry()['marks'], {-2: 4})
+
+        # Marks are flushed when due.
+        store = self.store(auth_user_id=self._auth_user_id, flush_seconds=0)
+        store.set(-2, 3)
+        store.set(-2, 4)
+        query = (db.book_mark.auth_user_id == self._auth_user_id)
+        rows = db(query).select()
+        self.assertEqual([(x.book_id, x.page_no) for x in rows], [(-2, 4)])
+        self.assertEqual(store._entry()['dirty'], [])
+
+
+class TestFunctions(LocalTestCase):
+
+    def test__book_mark_store(self):
+        auth = current.app.auth
+        response = current.response
+        save_user = auth.user
+        save_session_id = response.session_id
+
+        def restore():
+            auth.user = save_user
+            response.session_id = save_session_id
+
+        self.addCleanup(restore)
+        reload_seconds = None \
+            if current.app.local_settings.memcached_socket else RELOAD_SECONDS
+
+        # Reader not identified
+        auth.user = None
+        response.session_id = None
+        self.assertEqual(book_mark_store(), None)
+
+        # Reader not logged in
+        response.session_id = '_test_session_'
+        store = book_mark_store()
+        self.assertTrue(isinstance(store, BookMarkStore))
+        self.assertEqual(store.cache_key, 'book_marks_session__test_session_')
+        self.assertEqual(store.auth_user_id, None)
+        self.assertEqual(store.reload_seconds, reload_seconds)
+
+        # Logged in user
+        auth.user = Storage(id=-1)
+        store = book_mark_store()
+        self.assertEqual(store.cache_key, 'book_marks_user_-1')
+        self.assertEqual(store.auth_user_id, -1)
+        self.assertEqual(store.reload_seconds, reload_seconds)
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
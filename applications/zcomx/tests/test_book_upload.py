@@ -3,9 +3,11 @@
 """
 Test suite for zcomx/modules/book_upload.py
 """
+import io
 import os
 import shutil
 import unittest
+import zipfile
 from gluon.storage import Storage
 from applications.zcomx.modules.book_upload import \
     BookPageUploader, \
@@ -23,6 +25,7 @@ from applications.zcomx.modules.book_upload import \
     create_book_page
 from applications.zcomx.modules.books import Book
 from applications.zcomx.modules.image.validators import InvalidImageError
+from applications.zcomx.modules.images import SIZES
 from applications.zcomx.modules.tests.helpers import \
     ImageTestCase, \
     WithTestDataDirTestCase, \
@@ -130,6 +133,23 @@ class TestUnpacker(WithTestDataDirTestCase):
         # pylint: disable=protected-access
         self.assertEqual(unpacker._temp_directory, None)
 
+    def test__entries(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = Unpacker(filename)
+        self.assertRaises(NotImplementedError, list, unpacker.entries())
+        unpacker.cleanup()
+
+    def test__entry_names(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = Unpacker(filename)
+        self.assertRaises(NotImplementedError, unpacker.entry_names)
+
+    def test__extract_entry(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = Unpacker(filename)
+        self.assertRaises(
+            NotImplementedError, unpacker.extract_entry, 'name', None)
+
     def test__image_files(self):
         filename = os.path.join(self._test_data_dir, 'sampler.cbz')
         unpacker = Unpacker(filename)
@@ -150,6 +170,25 @@ class TestUnpacker(WithTestDataDirTestCase):
         self.assertEqual(files, expect)
         unpacker.cleanup()
 
+    def test___copy_limited(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = Unpacker(filename)
+        unpacker.chunk_size = 4
+        unpacker.scratch_limit = 10
+
+        dst = io.BytesIO()
+        # pylint: disable=protected-access
+        unpacker._copy_limited(io.BytesIO(b'0123456789'), dst)
+        self.assertEqual(dst.getvalue(), b'0123456789')
+
+        dst = io.BytesIO()
+        self.assertRaises(
+            UnpackError,
+            unpacker._copy_limited,
+            io.BytesIO(b'0123456789a'),
+            dst
+        )
+
 
 class TestUnpackerRAR(WithTestDataDirTestCase):
     def test____init__(self):
@@ -157,6 +196,43 @@ class TestUnpackerRAR(WithTestDataDirTestCase):
         unpacker = UnpackerRAR(filename)
         self.assertTrue(unpacker)
 
+    def test__entries(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbr')
+        unpacker = UnpackerRAR(filename)
+        tmp_dir = unpacker.temp_directory()
+        img_names = []
+        for image_filename in unpacker.entries():
+            self.assertTrue(os.path.exists(image_filename))
+            # Only one entry is extracted at a time.
+            self.assertEqual(
+                os.listdir(tmp_dir), [os.path.basename(image_filename)])
+            img_names.append(os.path.basename(image_filename))
+        self.assertEqual(os.listdir(tmp_dir), [])
+        expect = [
+            'audio.png',
+            'default.png',
+            'image.png',
+            'msword.png',
+            'pdf.png',
+            'rtf.png',
+            'text.png',
+            'video.png'
+        ]
+        self.assertEqual(img_names, expect)
+        unpacker.cleanup()
+
+        unpacker = UnpackerRAR('/fake/path/to/file.cbr')
+        self.assertRaises(UnpackError, list, unpacker.entries())
+        unpacker.cleanup()
+
+    def test__entry_names(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbr')
+        unpacker = UnpackerRAR(filename)
+        names = unpacker.entry_names()
+        basenames = [os.path.basename(x) for x in names]
+        self.assertEqual(basenames, sorted(basenames))
+        self.assertTrue('audio.png' in basenames)
+
     def test__extract(self):
         filename = os.path.join(self._test_data_dir, 'sampler.cbr')
         unpacker = UnpackerRAR(filename)
@@ -175,6 +251,21 @@ class TestUnpackerRAR(WithTestDataDirTestCase):
         self.assertEqual(img_names, expect)
         unpacker.cleanup()
 
+    def test__extract_entry(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbr')
+        unpacker = UnpackerRAR(filename)
+        name = [
+            x for x in unpacker.entry_names()
+            if os.path.basename(x) == 'audio.png'
+        ][0]
+        dst = io.BytesIO()
+        unpacker.extract_entry(name, dst)
+        self.assertTrue(dst.getvalue().startswith(b'\x89PNG'))
+
+        unpacker.scratch_limit = 10
+        self.assertRaises(
+            UnpackError, unpacker.extract_entry, name, io.BytesIO())
+
 
 class TestUnpackerZip(WithTestDataDirTestCase):
     def test____init__(self):
@@ -182,6 +273,42 @@ class TestUnpackerZip(WithTestDataDirTestCase):
         unpacker = UnpackerZip(filename)
         self.assertTrue(unpacker)
 
+    def test__entries(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = UnpackerZip(filename)
+        tmp_dir = unpacker.temp_directory()
+        img_names = []
+        for image_filename in unpacker.entries():
+            # Only one entry is extracted at a time.
+            self.assertEqual(
+                os.listdir(tmp_dir), [os.path.basename(image_filename)])
+            img_names.append(os.path.basename(image_filename))
+        self.assertEqual(os.listdir(tmp_dir), [])
+        self.assertEqual(img_names, ['001.png', '002.png', '003.png'])
+        unpacker.cleanup()
+
+        unpacker = UnpackerZip(filename)
+        unpacker.scratch_limit = 10
+        self.assertRaises(UnpackError, list, unpacker.entries())
+        unpacker.cleanup()
+
+        filename = os.path.join(self._test_data_dir, 'sampler.cbr')
+        unpacker = UnpackerZip(filename)
+        self.assertRaises(UnpackError, list, unpacker.entries())
+        unpacker.cleanup()
+
+    def test__entry_names(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = UnpackerZip(filename)
+        # pylint: disable=protected-access
+        with zipfile.ZipFile(filename) as f:
+            unpacker._zip_file = f
+            # Directory entries are excluded.
+            self.assertEqual(
+                unpacker.entry_names(),
+                ['samples/001.png', 'samples/002.png', 'samples/003.png']
+            )
+
     def test__extract(self):
         filename = os.path.join(self._test_data_dir, 'sampler.cbz')
         unpacker = UnpackerZip(filename)
@@ -190,6 +317,28 @@ class TestUnpackerZip(WithTestDataDirTestCase):
         self.assertEqual(img_names, ['001.png', '002.png', '003.png'])
         unpacker.cleanup()
 
+    def test__extract_entry(self):
+        filename = os.path.join(self._test_data_dir, 'sampler.cbz')
+        unpacker = UnpackerZip(filename)
+        # pylint: disable=protected-access
+        with zipfile.ZipFile(filename) as f:
+            unpacker._zip_file = f
+            dst = io.BytesIO()
+            unpacker.extract_entry('samples/001.png', dst)
+            self.assertEqual(
+                dst.getvalue(), f.read('samples/001.png'))
+            self.assertTrue(dst.getvalue().startswith(b'\x89PNG'))
+
+            unpacker.scratch_limit = 10
+            self.assertRaises(
+                UnpackError,
+                unpacker.extract_entry,
+                'samples/001.png',
+                io.BytesIO()
+            )
+            self.assertRaises(
+                KeyError, unpacker.extract_entry, 'fake.png', io.BytesIO())
+
 
 class TestUploadedFile(ImageTestCase):
     def test____init__(self):
@@ -266,7 +415,7 @@ class TestUploadedFile(ImageTestCase):
             self.assertRaises(InvalidImageError, uploaded.validate_images)
 
 
-class TestUploadedArchive(WithTestDataDirTestCase):
+class TestUploadedArchive(ImageTestCase):
 
     def test____init__(self):
         filename = os.path.join(self._test_data_dir, 'sampler.cbr')
@@ -274,6 +423,31 @@ class TestUploadedArchive(WithTestDataDirTestCase):
         self.assertTrue(uploaded)
         self.assertEqual(uploaded.filename, filename)
 
+    def test__delete_book_pages(self):
+        book = self.add(Book, dict(name='test__delete_book_pages'))
+        filename = os.path.join(self._test_data_dir, 'sampler.cbr')
+        uploaded = UploadedArchive(filename)
+        uploaded.delete_book_pages()            # No pages, handled
+        self.assertEqual(uploaded.book_page_ids, [])
+
+        uploaded.book_page_ids = [
+            create_book_page(book.id, self._prep_image('file.jpg')),
+            None,
+        ]
+        pages = book.tmp_pages()
+        self.assertEqual(len(pages), 1)
+        upload_image = pages[0].upload_image()
+        image_filenames = [
+            upload_image.fullname(size=x) for x in SIZES
+        ]
+        self.assertTrue(os.path.exists(image_filenames[0]))
+
+        uploaded.delete_book_pages()
+        self.assertEqual(uploaded.book_page_ids, [])
+        self.assertEqual(book.tmp_pages(), [])
+        for image_filename in image_filenames:
+            self.assertFalse(os.path.exists(image_filename))
+
     def test__for_json(self):
         filename = os.path.join(self._test_data_dir, 'sampler.cbr')
         uploaded = UploadedArchive(filename)
@@ -281,6 +455,67 @@ class TestUploadedArchive(WithTestDataDirTestCase):
         self.assertEqual(json['name'], 'sampler.cbr')
         self.assertEqual(json['size'], 17105)
 
+    @skip_if_quick
+    def test__load(self):
+        book = self.add(Book, dict(name='test__load'))
+
+        def create_cbz(name, image_dimensions):
+            cbz_filename = os.path.join(self._image_dir, name)
+            with zipfile.ZipFile(cbz_filename, 'w') as z:
+                for count, dims in enumerate(image_dimensions):
+                    image_filename = self._create_image(
+                        'page_{c:02d}.jpg'.format(c=count), dims)
+                    z.write(image_filename, os.path.basename(image_filename))
+            return cbz_filename
+
+        # Test valid archive, pages are created in order.
+        filename = create_cbz('valid.cbz', [(1600, 1600), (1600, 2000)])
+        uploaded = UploadedArchive(filename)
+        uploaded.unpacker = UnpackerZip(filename)
+        uploaded.load(book.id)
+        self.assertEqual(uploaded.errors, [])
+        self.assertEqual(len(uploaded.book_page_ids), 2)
+        pages = book.tmp_pages()
+        self.assertEqual(
+            [x.id for x in pages], uploaded.book_page_ids)
+        for page in pages:
+            self._objects.append(page)
+
+        # Test invalid image, pages already created are removed.
+        book = self.add(Book, dict(name='test__load_invalid'))
+        filename = create_cbz('invalid.cbz', [(1600, 1600), (100, 100)])
+        uploaded = UploadedArchive(filename)
+        uploaded.unpacker = UnpackerZip(filename)
+        self.assertRaises(InvalidImageError, uploaded.load, book.id)
+        self.assertEqual(uploaded.book_page_ids, [])
+        self.assertEqual(book.tmp_pages(), [])
+
+        # Test entry exceeding scratch limit.
+        filename = create_cbz('too_large.cbz', [(1600, 1600)])
+        uploaded = UploadedArchive(filename)
+        uploaded.unpacker = UnpackerZip(filename)
+        uploaded.unpacker.scratch_limit = 10
+        uploaded.load(book.id)
+        self.assertEqual(
+            uploaded.errors, ['Archive file is too large to unpack.'])
+        self.assertEqual(book.tmp_pages(), [])
+
+        # Test entry exceeding scratch limit after pages are created, pages
+        # already created are removed.
+        filename = create_cbz('partial.cbz', [(1600, 1600), (1600, 2000)])
+        with zipfile.ZipFile(filename) as z:
+            limit = max(x.file_size for x in z.infolist())
+        with zipfile.ZipFile(filename, 'a') as z:
+            z.writestr('zz_too_large.txt', b'0' * (limit + 1))
+        uploaded = UploadedArchive(filename)
+        uploaded.unpacker = UnpackerZip(filename)
+        uploaded.unpacker.scratch_limit = limit
+        uploaded.load(book.id)
+        self.assertEqual(
+            uploaded.errors, ['Archive file is too large to unpack.'])
+        self.assertEqual(uploaded.book_page_ids, [])
+        self.assertEqual(book.tmp_pages(), [])
+
     def test__unpack(self):
         filename = os.path.join(self._test_data_dir, 'sampler.cbr')
         uploaded = UploadedArchive(filename)
@@ -7,6 +7,7 @@ import datetime
 import functools
 import json
 import os
+import re
 import unittest
 import urllib.parse
 from bs4 import BeautifulSoup
@@ -21,9 +22,11 @@ from applications.zcomx.modules.book_types import BookType
 from applications.zcomx.modules.books import (
     Book,
     DEFAULT_BOOK_TYPE,
+    RATINGS,
     book_name,
     book_page_for_json,
     book_pages_as_json,
+    book_pages_diff,
     book_pages_from_tmp,
     book_pages_to_tmp,
     book_pages_years,
@@ -40,6 +43,7 @@ from applications.zcomx.modules.books import (
     contributions_remaining_by_creator,
     contributions_target,
     cover_image,
+    creator_url_name,
     default_contribute_amount,
     defaults,
     delete_link,
@@ -54,6 +58,7 @@ from applications.zcomx.modules.books import (
     get_page,
     html_metadata,
     images,
+    increment_rating,
     is_completed,
     is_downloadable,
     is_followable,
@@ -65,6 +70,9 @@ from applications.zcomx.modules.books import (
     page_url,
     publication_months,
     publication_year_range,
+    rating_aggregates,
+    rating_fields,
+    rating_tallies,
     read_link,
     rss_url,
     set_status,
@@ -73,6 +81,7 @@ from applications.zcomx.modules.books import (
     short_url,
     show_download_link,
     social_media_data,
+    tally_ratings,
     torrent_file_name,
     torrent_link,
     torrent_url,
@@ -86,14 +95,26 @@ from applications.zcomx.modules.creators import (
     AuthUser,
     Creator,
 )
-from applications.zcomx.modules.events import Contribution
+from applications.zcomx.modules.events import (
+    BookView,
+    Contribution,
+    Rating,
+)
 from applications.zcomx.modules.images import (
     SIZES,
+    image_version,
     store,
 )
+from applications.zcomx.modules.rollups import (
+    BookDailyRollup,
+    subtract_from_rollups,
+    update_rollups,
+)
 from applications.zcomx.modules.tests.helpers import (
     ImageTestCase,
+    QueryRecorder,
     ResizerQuick,
+    WithRollupMarksTestCase,
     skip_if_quick,
 )
 from applications.zcomx.modules.tests.mock import DateMock
@@ -213,7 +234,8 @@ class TestBook(WithObjectsTestCase):
         self.assertEqual(pages[0].page_no, 1)
 
 
-class TestFunctions(WithObjectsTestCase, ImageTestCase):
+class TestFunctions(
+        WithObjectsTestCase, ImageTestCase, WithRollupMarksTestCase):
     # pylint: disable=too-many-public-methods
 
     def test__book_name(self):
@@ -245,10 +267,13 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
             resizer=ResizerQuick
         )
 
-        down_url = urllib.parse.quote(
+        image_path = urllib.parse.quote(
             '/images/download/{img}'.format(img=self._book_page.image)
         )
-        thumb = down_url + '?size=web'
+        down_url = image_path + '?v={v}'.format(
+            v=image_version(self._book_page.image))
+        thumb = image_path + '?size=web&v={v}'.format(
+            v=image_version(self._book_page.image, size='web'))
         fmt = '/login/book_pages_handler/{bid}?book_page_id={pid}'
         delete_url = fmt.format(
             bid=self._book_page.book_id,
@@ -311,6 +336,72 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
         self.assertEqual(len(data['files']), 1)
         self.assertEqual(data['files'][0]['name'], 'portrait.png')
 
+    def test__book_pages_diff(self):
+        book = self.add(Book, dict(name='test__book_pages_diff'))
+
+        timestamps = dict(
+            created_on='2020-11-18 18:20:35',
+            updated_on='2020-11-18 18:20:40',
+        )
+
+        tmp_page_1 = self.add(BookPageTmp, dict(
+            book_id=book.id,
+            page_no=1,
+            image='book_page_tmp.image.aaa.111.jpg',
+            **timestamps
+        ))
+        tmp_page_2 = self.add(BookPageTmp, dict(
+            book_id=book.id,
+            page_no=2,
+            image='book_page_tmp.image.bbb.222.jpg',
+            **timestamps
+        ))
+
+        # No live pages, all tmp pages are inserted.
+        diff = book_pages_diff(book)
+        self.assertEqual(diff['deletes'], [])
+        self.assertEqual(diff['updates'], [])
+        self.assertEqual(
+            [x[0].id for x in diff['inserts']],
+            [tmp_page_1.id, tmp_page_2.id]
+        )
+        data = diff['inserts'][0][1]
+        self.assertEqual(data['id'], tmp_page_1.id)
+        self.assertEqual(data['image'], 'book_page.image.aaa.111.jpg')
+
+        # Live page matching tmp page 1 with a different page_no, live page
+        # not found in tmp pages.
+        page_1 = self.add(BookPage, dict(
+            id=tmp_page_1.id,
+            book_id=book.id,
+            page_no=2,
+            image='book_page.image.aaa.111.jpg',
+            **timestamps
+        ))
+        page_3 = self.add(BookPage, dict(
+            book_id=book.id,
+            page_no=3,
+            image='book_page.image.ccc.333.jpg',
+            **timestamps
+        ))
+
+        diff = book_pages_diff(book)
+        self.assertEqual([x.id for x in diff['deletes']], [page_3.id])
+        self.assertEqual(
+            [x[0].id for x in diff['inserts']], [tmp_page_2.id])
+        self.assertEqual(len(diff['updates']), 1)
+        self.assertEqual(diff['updates'][0][0].id, page_1.id)
+        self.assertEqual(diff['updates'][0][1], {'page_no': 1})
+
+        # Matching pages are not reported.
+        db(db.book_page.id == page_1.id).update(
+            page_no=1,
+            updated_on=tmp_page_1.updated_on,
+        )
+        db.commit()
+        diff = book_pages_diff(book)
+        self.assertEqual(diff['updates'], [])
+
     @skip_if_quick
     def test__book_pages_from_tmp(self):
         book = self.add(Book, dict(name='test__book_pages_from_tmp'))
@@ -377,6 +468,24 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
                 sized_fullname = new_fullname.replace('original', size)
                 self.assertTrue(os.path.exists(sized_fullname))
 
+        # Test incremental update: remove the first page, swap order.
+        # Unchanged pages are not recreated, their images not recopied.
+        kept_fullname = fullnames[1].replace(
+            'book_page_tmp.image',
+            'book_page.image'
+        )
+        os.utime(kept_fullname, (0, 0))
+        book_page_tmps[0].delete()
+        BookPageTmp.from_updated(book_page_tmps[1], dict(page_no=1))
+
+        book_pages_from_tmp(book)
+
+        pages = book.pages()
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0].id, book_page_tmps[1].id)
+        self.assertEqual(pages[0].page_no, 1)
+        self.assertEqual(os.stat(kept_fullname).st_mtime, 0)
+
     @skip_if_quick
     def test__book_pages_to_tmp(self):
         book = self.add(Book, dict(name='test__book_pages_to_tmp'))
@@ -443,6 +552,43 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
                 sized_fullname = new_fullname.replace('original', size)
                 self.assertTrue(os.path.exists(sized_fullname))
 
+        # Matching tmp pages are kept, their images are not copied again.
+        tmp_fullname = tmp_pages[0].upload_image().fullname(size='web')
+        os.unlink(tmp_fullname)
+        book_pages_to_tmp(book)
+        self.assertEqual(
+            [x.id for x in book.tmp_pages()], [x.id for x in tmp_pages])
+        self.assertFalse(os.path.exists(tmp_fullname))
+
+        # Changed pages are updated, unmatched tmp pages are replaced.
+        BookPage.from_updated(book_pages[0], dict(page_no=3))
+        tmp_image = store(
+            db.book_page_tmp.image,
+            self._prep_image('cbz_plus.jpg', to_name='file_3.jpg')
+        )
+        tmp_page = BookPageTmp.from_updated(
+            tmp_pages[1], dict(image=tmp_image), validate=False)
+        tmp_fullname = tmp_page.upload_image().fullname()
+        abandoned = self.add(BookPageTmp, dict(
+            book_id=book.id,
+            page_no=4,
+        ))
+        book_pages_to_tmp(book)
+        got = book.tmp_pages()
+        self.assertEqual(
+            sorted([(x.id, x.page_no) for x in got]),
+            sorted([(book_pages[0].id, 3), (book_pages[1].id, 2)])
+        )
+        self.assertFalse(abandoned.id in [x.id for x in got])
+        self.assertFalse(os.path.exists(tmp_fullname))
+        for page in got:
+            self._objects.append(page)
+            self.assertEqual(
+                page.image,
+                BookPage.from_id(page.id).image.replace(
+                    'book_page.image', 'book_page_tmp.image')
+            )
+
     def test__book_pages_years(self):
         book = self.add(Book, dict(name='test__book_pages_years'))
 
@@ -926,6 +1072,9 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
             self._set_pages(book, t[0])
             self.assertEqual(contributions_target(book), t[1])
 
+        # Page count provided
+        self.assertEqual(contributions_target(book, page_count=5), 50.00)
+
     def test__cover_image(self):
 
         placeholder = \
@@ -956,6 +1105,24 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
             '<img alt="" src="/images/download/book_page.image.page_trees.png?cache=1&size=original" />'
         )
 
+    def test__creator_url_name(self):
+        creator = self.add(Creator, dict(
+            email='test__creator_url_name@example.com',
+            name_for_url='FirstLast',
+        ))
+        book = self.add(Book, dict(
+            name='test__creator_url_name',
+            creator_id=creator.id,
+        ))
+        self.assertEqual(creator_url_name(book), 'FirstLast')
+        self.assertEqual(
+            creator_url_name(book, creator=Creator(name_for_url='Other')),
+            'Other'
+        )
+
+        book = Book(dict(creator_id=-1))
+        self.assertEqual(creator_url_name(book), None)
+
     def test__default_contribute_amount(self):
         book = self.add(Book, dict(name='test__default_contribute_amount'))
 
@@ -1603,6 +1770,61 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
         db.commit()
         self.assertEqual(sorted(images(book)), ['a.1.jpg', 'b.2.jpg'])
 
+    def test__increment_rating(self):
+        book = self.add(Book, dict(
+            name='test__increment_rating',
+            contributions=0,
+            contributions_remaining=0,
+            downloads=0,
+            rating=0,
+            rating_count=0,
+            rating_total=0,
+            views=None,
+        ))
+        self._set_pages(book, 10)
+
+        increment_rating(book, 'view')
+        increment_rating(book, 'view', count=2)
+        increment_rating(book, 'download')
+        increment_rating(book, 'rating', amount=2)
+        increment_rating(book, 'rating', amount=7, count=2)
+        self.add(Contribution, dict(book_id=book.id, amount=12.50))
+        increment_rating(book, 'contribution', amount=12.50)
+
+        book = Book.from_id(book.id)
+        self.assertEqual(book.views, 3)
+        self.assertEqual(book.downloads, 1)
+        self.assertEqual(book.rating_count, 3)
+        self.assertAlmostEqual(book.rating_total, 9)
+        self.assertAlmostEqual(book.rating, 3)
+        self.assertAlmostEqual(book.contributions, 12.50)
+        self.assertAlmostEqual(book.contributions_remaining, 87.50)
+
+        self.assertRaises(SyntaxError, increment_rating, book, '_invalid_')
+
+        # The average is not set in the statement incrementing the totals.
+        # MySQL applies SET assignments in order, so it would be calculated
+        # from the new totals if they were assigned first.
+        with QueryRecorder.recording() as commands:
+            increment_rating(book, 'rating', amount=6)
+        updates = [
+            x for x in commands
+            if x.lstrip().upper().startswith('UPDATE')
+        ]
+
+        def sets(field, command):
+            regex = r'[\s,]["`]?{f}["`]?\s*='.format(f=field)
+            return re.search(regex, command) is not None
+
+        rating_updates = [x for x in updates if sets('rating', x)]
+        self.assertEqual(len(rating_updates), 1)
+        self.assertFalse(sets('rating_count', rating_updates[0]))
+        self.assertFalse(sets('rating_total', rating_updates[0]))
+        book = Book.from_id(book.id)
+        self.assertEqual(book.rating_count, 4)
+        self.assertAlmostEqual(book.rating_total, 15)
+        self.assertAlmostEqual(book.rating, 3.75)
+
     def test__is_completed(self):
         now = datetime.datetime.now()
         tests = [
@@ -2001,6 +2223,56 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
         self.assertEqual(start, 1970)
         self.assertEqual(end, datetime.date.today().year + 5)
 
+    def test__rating_aggregates(self):
+        table, aggregates = rating_aggregates('rating')
+        self.assertEqual(table, db.rating)
+        self.assertEqual(
+            [x[0] for x in aggregates],
+            ['rating', 'rating_count', 'rating_total']
+        )
+        table, aggregates = rating_aggregates('view')
+        self.assertEqual(table, db.book_view)
+        self.assertEqual([x[0] for x in aggregates], ['views'])
+        self.assertRaises(SyntaxError, rating_aggregates, '_invalid_')
+
+    def test__rating_fields(self):
+        self.assertEqual(
+            rating_fields(),
+            [
+                'contributions',
+                'downloads',
+                'rating',
+                'rating_count',
+                'rating_total',
+                'views',
+            ]
+        )
+        self.assertEqual(rating_fields(ratings=['view']), ['views'])
+        self.assertEqual(len(RATINGS), 4)
+
+    def test__rating_tallies(self):
+        book = self.add(Book, dict(name='test__rating_tallies'))
+        book_2 = self.add(Book, dict(name='test__rating_tallies_2'))
+        self.add(BookView, dict(book_id=book.id))
+        self.add(BookView, dict(book_id=book.id))
+        self.add(BookView, dict(book_id=book_2.id))
+        self.add(Rating, dict(book_id=book.id, amount=2))
+        self.add(Rating, dict(book_id=book.id, amount=5))
+
+        got = rating_tallies(book_ids=[book.id, book_2.id])
+        self.assertEqual(got[book.id]['views'], 2)
+        self.assertEqual(got[book.id]['rating_count'], 2)
+        self.assertAlmostEqual(got[book.id]['rating_total'], 7)
+        self.assertAlmostEqual(got[book.id]['rating'], 3.5)
+        self.assertFalse('contributions' in got[book.id])
+        self.assertEqual(got[book_2.id], {'views': 1})
+
+        got = rating_tallies(ratings=['view'], book_ids=[book.id])
+        self.assertEqual(got, {book.id: {'views': 2}})
+
+        got = rating_tallies(ratings=['view'])
+        self.assertEqual(got[book_2.id], {'views': 1})
+
     def test__read_link(self):
         empty = '<span></span>'
 
@@ -2273,6 +2545,51 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
         expect['cover_image_name'] = 'book_page.image.aaa.000.jpg'
         self.assertEqual(social_media_data(book), expect)
 
+    def test__tally_ratings(self):
+        creator = self.add(Creator, dict(email='test__tally_ratings@a.com'))
+        book = self.add(Book, dict(
+            name='test__tally_ratings',
+            creator_id=creator.id,
+            status=BOOK_STATUS_ACTIVE,
+        ))
+        self._set_pages(book, 10)
+        update_rating(book)
+        self.assertEqual(tally_ratings().count(book.id), 0)
+
+        book_view = self.add(BookView, dict(book_id=book.id))
+        self.add(Rating, dict(book_id=book.id, amount=4))
+        self.add(Contribution, dict(book_id=book.id, amount=25.00))
+        self.assertEqual(tally_ratings().count(book.id), 1)
+
+        book = Book.from_id(book.id)
+        self.assertEqual(book.views, 1)
+        self.assertEqual(book.rating_count, 1)
+        self.assertAlmostEqual(book.rating, 4)
+        self.assertAlmostEqual(book.contributions, 25.00)
+        self.assertAlmostEqual(book.contributions_remaining, 75.00)
+        creator = Creator.from_id(creator.id)
+        self.assertAlmostEqual(creator.contributions_remaining, 75.00)
+
+        # Reconciled, nothing to update
+        self.assertEqual(tally_ratings().count(book.id), 0)
+
+        # Rolled up views deleted are subtracted from the rollups.
+        self.set_rollup_mark('book_view', book_view.id - 1)
+        update_rollups(
+            names=['book_view'],
+            as_of=datetime.datetime.now() + datetime.timedelta(minutes=5),
+        )
+        query = (db.book_daily_rollup.book_id == book.id)
+        self._objects.append(BookDailyRollup.from_query(query))
+        self.assertEqual(tally_ratings().count(book.id), 0)
+
+        subtract_from_rollups('book_view', db.book_view.id == book_view.id)
+        book_view.delete()
+        self.assertEqual(tally_ratings().count(book.id), 1)
+        book = Book.from_id(book.id)
+        self.assertEqual(book.views, 0)
+        self.assertEqual(tally_ratings().count(book.id), 0)
+
     def test__torrent_file_name(self):
         self.assertEqual(torrent_file_name(None), None)
 
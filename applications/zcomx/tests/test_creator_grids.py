@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/creator_grids.py
+"""
+import datetime
+import unittest
+from gluon import *
+from applications.zcomx.modules.books import (
+    Book,
+    increment_rating,
+)
+from applications.zcomx.modules.creator_grids import (
+    CreatorGrid,
+    creator_grid_totals,
+    increment_creator_grid,
+    refresh_creator_grid,
+)
+from applications.zcomx.modules.creators import Creator
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class WithCreatorTestCase(LocalTestCase):
+
+    _creator = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._creator = self.add(Creator, dict(
+            email='test_creator_grids@gmail.com'))
+
+    def add_book(self, **kwargs):
+        data = dict(
+            name='test_creator_grids',
+            creator_id=self._creator.id,
+            release_date=None,
+            downloads=0,
+            views=0,
+        )
+        data.update(kwargs)
+        return self.add(Book, data)
+
+    def creator_grid(self):
+        query = (db.creator_grid.creator_id == self._creator.id)
+        rows = db(query).select()
+        if not rows:
+            return None
+        grid = CreatorGrid.from_id(rows.first().id)
+        self._objects.append(grid)
+        return grid
+
+
+class TestCreatorGrid(LocalTestCase):
+    pass            # Record subclass
+
+
+class TestFunctions(WithCreatorTestCase):
+
+    def test__creator_grid_totals(self):
+        got = creator_grid_totals(creator_ids=[self._creator.id])
+        self.assertEqual(got, [{
+            'creator_id': self._creator.id,
+            'completed': 0,
+            'ongoing': 0,
+            'downloads': 0,
+            'views': 0,
+        }])
+
+        self.add_book(downloads=2, views=10)
+        self.add_book(
+            release_date=datetime.date(2015, 1, 31), downloads=3, views=5)
+        self.add_book(
+            release_date=datetime.date(2016, 1, 31), downloads=1, views=1)
+        got = creator_grid_totals(creator_ids=[self._creator.id])
+        self.assertEqual(got, [{
+            'creator_id': self._creator.id,
+            'completed': 2,
+            'ongoing': 1,
+            'downloads': 6,
+            'views': 16,
+        }])
+
+        self.assertEqual(creator_grid_totals(creator_ids=[]), [])
+        got = creator_grid_totals()
+        self.assertTrue(self._creator.id in [x['creator_id'] for x in got])
+
+    def test__increment_creator_grid(self):
+        book = self.add_book(downloads=2, views=10)
+        refresh_creator_grid(creator_ids=[self._creator.id])
+
+        increment_creator_grid(self._creator.id, downloads=1, views=2)
+        increment_creator_grid(self._creator.id)
+        increment_creator_grid(0, views=2)
+        grid = self.creator_grid()
+        self.assertEqual(grid.downloads, 3)
+        self.assertEqual(grid.views, 12)
+
+        # Book events increment the grid.
+        increment_rating(book, 'view', count=3)
+        increment_rating(book, 'download')
+        grid = self.creator_grid()
+        self.assertEqual(grid.downloads, 4)
+        self.assertEqual(grid.views, 15)
+
+    def test__refresh_creator_grid(self):
+        self.assertEqual(refresh_creator_grid(creator_ids=[]), 0)
+
+        self.add_book(views=10)
+        got = refresh_creator_grid(creator_ids=[self._creator.id])
+        self.assertEqual(got, 1)
+        grid = self.creator_grid()
+        self.assertEqual(grid.ongoing, 1)
+        self.assertEqual(grid.completed, 0)
+        self.assertEqual(grid.views, 10)
+
+        # Refreshing replaces the record.
+        self.add_book(release_date=datetime.date(2015, 1, 31), views=5)
+        refresh_creator_grid(creator_ids=[self._creator.id])
+        query = (db.creator_grid.creator_id == self._creator.id)
+        self.assertEqual(db(query).count(), 1)
+        grid = self.creator_grid()
+        self.assertEqual(grid.ongoing, 1)
+        self.assertEqual(grid.completed, 1)
+        self.assertEqual(grid.views, 15)
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -806,6 +806,12 @@ class TestFunctions(ImageTestCase):
             updated_creator.name_for_search, 'test-on-change-name')
         self.assertEqual(updated_creator.name_for_url, 'TestOnChangeName')
 
+        commands = [x.command for x in tracker.diff()]
+        self.assertTrue(
+            'download_catalog.py {i}'.format(i=creator.id) in
+            ' '.join(commands)
+        )
+
         for record in tracker.diff():
             job = Job.from_id(record.id)
             self._objects.append(job)
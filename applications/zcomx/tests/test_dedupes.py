@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/dedupes.py
+"""
+import datetime
+import unittest
+from gluon import *
+from gluon.cache import CacheInRam
+from applications.zcomx.modules.dedupes import (
+    DEFAULT_INTERVAL_SECONDS,
+    DedupeWindow,
+    MAX_ENTRIES,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+
+
+class TestDedupeWindow(LocalTestCase):
+
+    _now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+    def test____init__(self):
+        window = DedupeWindow()
+        self.assertEqual(window.interval_seconds, DEFAULT_INTERVAL_SECONDS)
+        self.assertEqual(window.max_entries, MAX_ENTRIES)
+        self.assertEqual(window.cache_model, None)
+
+    def test___seen_shared(self):
+        cache = CacheInRam(request=current.request)
+        cache.clear(regex='^dedupe_')
+        window = DedupeWindow(interval_seconds=60, cache_model=cache)
+        later = self._now + datetime.timedelta(seconds=30)
+        self.assertEqual(window._seen_shared(('a', 1), self._now), None)
+        self.assertEqual(window._seen_shared(('a', 1), later), self._now)
+        self.assertEqual(window._seen_shared(('a', 2), later), None)
+
+        # Another process
+        window_2 = DedupeWindow(interval_seconds=60, cache_model=cache)
+        self.assertEqual(window_2._seen_shared(('a', 1), later), self._now)
+
+        # Past the window of the recorded event, the event is recorded.
+        later = self._now + datetime.timedelta(seconds=60)
+        self.assertEqual(window_2._seen_shared(('a', 1), later), None)
+        self.assertEqual(window._seen_shared(('a', 1), later), later)
+        cache.clear(regex='^dedupe_')
+
+    def test__add(self):
+        window = DedupeWindow(max_entries=2)
+        window.add(('a',), self._now)
+        window.add(('b',), self._now)
+        window.add(('a',), self._now)
+        window.add(('c',), self._now)
+        # Least recently used is removed.
+        self.assertEqual(list(window._entries.keys()), [('a',), ('c',)])
+
+    def test__clear(self):
+        window = DedupeWindow()
+        window.seen(('a',), self._now)
+        window.seen(('a',), self._now)
+        window.clear()
+        self.assertEqual(
+            window.metrics(),
+            {'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'size': 0}
+        )
+
+    def test__metrics(self):
+        window = DedupeWindow()
+        window.seen(('a',), self._now)
+        window.seen(('a',), self._now)
+        window.seen(('a',), self._now)
+        window.seen(('b',), self._now)
+        self.assertEqual(
+            window.metrics(),
+            {'hits': 2, 'misses': 2, 'hit_ratio': 0.5, 'size': 2}
+        )
+
+    def test__seen(self):
+        window = DedupeWindow(interval_seconds=60)
+        self.assertFalse(window.seen(('a', 1), self._now))
+        later = self._now + datetime.timedelta(seconds=59)
+        self.assertTrue(window.seen(('a', 1), later))
+        self.assertFalse(window.seen(('a', 2), later))
+
+        # Duplicates don't extend the window.
+        later = self._now + datetime.timedelta(seconds=60)
+        self.assertFalse(window.seen(('a', 1), later))
+
+        # Shared
+        cache = CacheInRam(request=current.request)
+        cache.clear(regex='^dedupe_')
+        window = DedupeWindow(interval_seconds=60, cache_model=cache)
+        window_2 = DedupeWindow(interval_seconds=60, cache_model=cache)
+        self.assertFalse(window.seen(('a', 1), self._now))
+        self.assertTrue(window_2.seen(('a', 1), self._now))
+        self.assertEqual(window_2.metrics()['size'], 1)
+        cache.clear(regex='^dedupe_')
+
+        # Shared duplicates don't extend the window.
+        window = DedupeWindow(interval_seconds=60, cache_model=cache)
+        window_2 = DedupeWindow(interval_seconds=60, cache_model=cache)
+        self.assertFalse(window.seen(('a', 1), self._now))
+        later = self._now + datetime.timedelta(seconds=30)
+        self.assertTrue(window_2.seen(('a', 1), later))
+        self.assertEqual(window_2._entries[('a', 1)], self._now)
+        later = self._now + datetime.timedelta(seconds=61)
+        self.assertFalse(window_2.seen(('a', 1), later))
+        self.assertEqual(
+            window_2.metrics(),
+            {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'size': 1}
+        )
+        cache.clear(regex='^dedupe_')
+
+    def test__shared(self):
+        self.assertFalse(DedupeWindow().shared)
+        cache = CacheInRam(request=current.request)
+        self.assertTrue(DedupeWindow(cache_model=cache).shared)
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/download_catalogs.py
+"""
+import json
+import os
+import shutil
+import unittest
+from applications.zcomx.modules.creators import Creator
+from applications.zcomx.modules.download_catalogs import (
+    DownloadCatalog,
+    as_json,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class TestDownloadCatalog(LocalTestCase):
+
+    _tmp_dir = '/tmp/test_download_catalogs'
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        if not os.path.exists(self._tmp_dir):
+            os.makedirs(self._tmp_dir)
+
+    def tearDown(self):
+        if os.path.exists(self._tmp_dir):
+            shutil.rmtree(self._tmp_dir)
+
+    def test____init__(self):
+        catalog = DownloadCatalog()
+        self.assertTrue(
+            catalog.base_path.endswith('static/data/downloads'))
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        self.assertEqual(catalog.base_path, self._tmp_dir)
+
+    def test__books(self):
+        creator = self.add(Creator, dict(email='test__books@gmail.com'))
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        self.assertEqual(catalog.books(creator), [])
+
+    def test__books_filename(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        self.assertEqual(
+            catalog.books_filename(123),
+            os.path.join(self._tmp_dir, 'books_123.json')
+        )
+        self.assertEqual(
+            catalog.books_filename('123'),
+            os.path.join(self._tmp_dir, 'books_123.json')
+        )
+        self.assertRaises(ValueError, catalog.books_filename, '../abc')
+
+    def test__creators(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        creators = catalog.creators()
+        self.assertTrue(isinstance(creators, list))
+        for creator in creators:
+            self.assertEqual(
+                sorted(creator.keys()), ['id', 'name', 'torrent_url'])
+
+    def test__creators_filename(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        self.assertEqual(
+            catalog.creators_filename(),
+            os.path.join(self._tmp_dir, 'creators.json')
+        )
+
+    def test__dump(self):
+        creator = self.add(Creator, dict(email='test__dump@gmail.com'))
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+
+        # Creator without downloadable books has no books file.
+        books_filename = catalog.books_filename(creator.id)
+        with open(books_filename, 'w', encoding='utf-8') as f:
+            f.write('stale')
+        catalog.dump(creator_ids=[creator.id])
+        self.assertFalse(os.path.exists(books_filename))
+
+        if catalog.creators():
+            self.assertTrue(os.path.exists(catalog.creators_filename()))
+            data = json.loads(catalog.load_creators())
+            self.assertEqual(data['status'], 'ok')
+
+    def test__load(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        filename = os.path.join(self._tmp_dir, 'test__load.json')
+        self.assertEqual(catalog.load(filename), None)
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('{"a": 1}')
+        self.assertEqual(catalog.load(filename), '{"a": 1}')
+
+    def test__load_books(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        self.assertEqual(catalog.load_books(123), None)
+        self.assertEqual(catalog.load_books('_fake_'), None)
+        catalog._write(catalog.books_filename(123), 'books', [{'id': 1}])
+        self.assertEqual(
+            json.loads(catalog.load_books(123)),
+            {'books': [{'id': 1}], 'status': 'ok'}
+        )
+
+    def test__load_creators(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        self.assertEqual(catalog.load_creators(), None)
+        catalog._write(catalog.creators_filename(), 'creators', [{'id': 1}])
+        self.assertEqual(
+            json.loads(catalog.load_creators()),
+            {'creators': [{'id': 1}], 'status': 'ok'}
+        )
+
+    def test___write(self):
+        catalog = DownloadCatalog(base_path=self._tmp_dir)
+        filename = os.path.join(self._tmp_dir, 'test___write.json')
+        catalog._write(filename, 'books', [{'id': 1}])
+        with open(filename, 'r', encoding='utf-8') as f:
+            self.assertEqual(
+                json.loads(f.read()),
+                {'books': [{'id': 1}], 'status': 'ok'}
+            )
+
+        # No data removes the file.
+        catalog._write(filename, 'books', [])
+        self.assertFalse(os.path.exists(filename))
+        # Removing a file that doesn't exist is handled.
+        catalog._write(filename, 'books', [])
+        self.assertFalse(os.path.exists(filename))
+
+
+class TestFunctions(LocalTestCase):
+
+    def test__as_json(self):
+        self.assertEqual(
+            json.loads(as_json('books', [{'id': 1}])),
+            {'books': [{'id': 1}], 'status': 'ok'}
+        )
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,11 +4,16 @@
 Test suite for zcomx/modules/downloaders.py
 """
 import os
+import time
 import unittest
 from gluon import *
 from gluon.html import DIV, IMG
 from gluon.http import HTTP
-from gluon.storage import List
+from gluon.storage import (
+    List,
+    Storage,
+)
+from gluon.utils import unlocalised_http_header_date
 from applications.zcomx.modules.archives import TorrentArchive
 from applications.zcomx.modules.books import Book
 from applications.zcomx.modules.creators import (
@@ -17,8 +22,11 @@ from applications.zcomx.modules.creators import (
 )
 from applications.zcomx.modules.downloaders import (
     CBZDownloader,
+    FileDownloader,
     ImageDownloader,
     TorrentDownloader,
+    file_etag,
+    is_not_modified,
 )
 from applications.zcomx.modules.images import (
     UploadImage,
@@ -117,6 +125,99 @@ class TestCBZDownloader(LocalTestCase):
             test_http([book.id], dict(status=404))
 
 
+class TestFileDownloader(LocalTestCase):
+
+    _filename = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._filename = '/tmp/test_file_downloader.txt'
+        with open(self._filename, 'w', encoding='utf-8') as f:
+            f.write('0123456789')
+        super().setUp()
+
+    def tearDown(self):
+        if os.path.exists(self._filename):
+            os.unlink(self._filename)
+        super().tearDown()
+
+    def test__offload_header(self):
+        local_settings = current.app.local_settings
+        save_offload = local_settings.download_offload
+        save_prefix = local_settings.download_offload_prefix
+
+        downloader = FileDownloader()
+        local_settings.download_offload = None
+        self.assertEqual(downloader.offload_header(self._filename), None)
+
+        local_settings.download_offload = '_fake_'
+        self.assertEqual(downloader.offload_header(self._filename), None)
+
+        local_settings.download_offload = 'x-sendfile'
+        self.assertEqual(
+            downloader.offload_header(self._filename),
+            ('X-Sendfile', self._filename)
+        )
+
+        local_settings.download_offload = 'X-Accel-Redirect'
+        local_settings.download_offload_prefix = '/protected/'
+        self.assertEqual(
+            downloader.offload_header(self._filename),
+            ('X-Accel-Redirect', '/protected' + self._filename)
+        )
+
+        local_settings.download_offload = save_offload
+        local_settings.download_offload_prefix = save_prefix
+
+    def test__stream_file(self):
+        local_settings = current.app.local_settings
+        save_offload = local_settings.download_offload
+        etag = file_etag(os.stat(self._filename))
+
+        def get_http(env):
+            downloader = FileDownloader()
+            request = Storage({'env': Storage(env)})
+            try:
+                downloader.stream_file(request, self._filename)
+            except HTTP as http:
+                return http
+            self.fail('HTTP not raised')
+            return None
+
+        local_settings.download_offload = None
+        http = get_http({})
+        self.assertEqual(http.status, 200)
+        self.assertEqual(http.headers['ETag'], etag)
+        self.assertEqual(http.headers['Content-Length'], '10')
+
+        http = get_http({'http_if_none_match': etag})
+        self.assertEqual(http.status, 304)
+
+        http = get_http({'http_range': 'bytes=2-5'})
+        self.assertEqual(http.status, 206)
+        self.assertEqual(http.headers['Content-Length'], '4')
+
+        # Stale If-Range, whole file is sent.
+        http = get_http({
+            'http_range': 'bytes=2-5',
+            'http_if_range': '"_stale_"',
+        })
+        self.assertEqual(http.status, 200)
+
+        local_settings.download_offload = 'x-sendfile'
+        http = get_http({})
+        self.assertEqual(http.status, 200)
+        self.assertEqual(http.headers['X-Sendfile'], self._filename)
+        self.assertTrue('Content-Length' not in http.headers)
+
+        local_settings.download_offload = save_offload
+
+        downloader = FileDownloader()
+        request = Storage({'env': Storage({})})
+        self.assertRaisesHTTP(
+            404, downloader.stream_file, request, '/tmp/_fake_file_')
+
+
 class TestImageDownloader(WithObjectsTestCase, ImageTestCase):
 
     @skip_if_quick
@@ -265,6 +366,42 @@ class TestTorrentDownloader(LocalTestCase):
         test_http(['creator', invalid_record_id], dict(status=404))
 
 
+class TestFunctions(LocalTestCase):
+
+    def test__file_etag(self):
+        stat_file = Storage({'st_size': 255, 'st_mtime': 1500000000.5})
+        self.assertEqual(file_etag(stat_file), '"ff-59682f00"')
+
+    def test__is_not_modified(self):
+        etag = '"ff-59682f00"'
+        mtime = 1500000000
+        modified = unlocalised_http_header_date(time.gmtime(mtime))
+        older = unlocalised_http_header_date(time.gmtime(mtime - 60))
+
+        tests = [
+            # (env, expect)
+            ({}, False),
+            ({'http_if_none_match': etag}, True),
+            ({'http_if_none_match': 'W/' + etag}, True),
+            ({'http_if_none_match': '"abc", ' + etag}, True),
+            ({'http_if_none_match': '*'}, True),
+            ({'http_if_none_match': '"abc"'}, False),
+            ({'http_if_modified_since': modified}, True),
+            ({'http_if_modified_since': older}, False),
+            ({'http_if_modified_since': '_invalid_'}, False),
+            (
+                {
+                    'http_if_none_match': '"abc"',
+                    'http_if_modified_since': modified,
+                },
+                False
+            ),
+        ]
+        for t in tests:
+            request = Storage({'env': Storage(t[0])})
+            self.assertEqual(is_not_modified(request, etag, mtime), t[1])
+
+
 def setUpModule():
     """Set up web2py environment."""
     # pylint: disable=invalid-name
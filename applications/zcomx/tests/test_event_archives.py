@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/event_archives.py
+"""
+import datetime
+import os
+import shutil
+import unittest
+from gluon import *
+from applications.zcomx.modules.event_archives import (
+    EventArchiver,
+    read_archive,
+)
+from applications.zcomx.modules.events import (
+    BookView,
+    DownloadClick,
+)
+from applications.zcomx.modules.tests.helpers import \
+    WithRollupMarksTestCase
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+
+
+class WithArchiveTestCase(WithRollupMarksTestCase):
+
+    _as_of = datetime.datetime(1999, 6, 1)
+    _time_stamp = datetime.datetime(1999, 1, 31, 12, 31, 59)
+    _tmp_dir = '/tmp/test_event_archives'
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        if not os.path.exists(self._tmp_dir):
+            os.makedirs(self._tmp_dir)
+
+    def tearDown(self):
+        if os.path.exists(self._tmp_dir):
+            shutil.rmtree(self._tmp_dir)
+
+    def add_click(self, **kwargs):
+        data = dict(
+            ip_address='127.0.0.1',
+            time_stamp=self._time_stamp,
+            record_table='book',
+            record_id=-1,
+            completed=True,
+        )
+        data.update(kwargs)
+        return self.add(DownloadClick, data)
+
+    def archiver(self, table='download_click'):
+        return EventArchiver(
+            table,
+            archive_dir=self._tmp_dir,
+            retention_days=30,
+            batch_size=2,
+        )
+
+
+class TestEventArchiver(WithArchiveTestCase):
+
+    def test____init__(self):
+        archiver = EventArchiver('book_view')
+        self.assertTrue(archiver.archive_dir.endswith(
+            'private/var/event_archives'))
+        self.assertRaises(SyntaxError, EventArchiver, 'book')
+
+    def test___write(self):
+        archiver = self.archiver()
+        rows = [
+            {'id': 1, 'time_stamp': self._time_stamp},
+            {'id': 2, 'time_stamp': datetime.datetime(1999, 2, 1)},
+        ]
+        got = archiver._write(rows)
+        self.assertEqual(got, [
+            archiver.archive_filename('1999-01'),
+            archiver.archive_filename('1999-02'),
+        ])
+
+        # Appends to existing files.
+        archiver._write(rows[:1])
+        records = list(read_archive(got[0]))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0], {
+            'id': 1,
+            'time_stamp': '1999-01-31T12:31:59.000000',
+        })
+
+    def test__archivable_query(self):
+        archiver = self.archiver()
+        click = self.add_click()
+        self.add_click(completed=False)
+        last_click = self.add_click(time_stamp=self._as_of)
+
+        # Download clicks must be rolled up.
+        self.set_rollup_mark('download_click', click.id - 1)
+        query = archiver.archivable_query(as_of=self._as_of)
+        self.assertEqual(db(query).count(), 0)
+
+        self.set_rollup_mark('download_click', last_click.id)
+        query = archiver.archivable_query(as_of=self._as_of)
+        ids = [x.id for x in db(query).select(db.download_click.id)]
+        self.assertEqual(ids, [click.id])
+
+        # Book views must be rolled up.
+        book_view = self.add(BookView, dict(
+            book_id=-1,
+            time_stamp=self._time_stamp,
+        ))
+        archiver = self.archiver(table='book_view')
+        self.set_rollup_mark('book_view', book_view.id - 1)
+        query = archiver.archivable_query(as_of=self._as_of)
+        self.assertEqual(db(query).count(), 0)
+        self.set_rollup_mark('book_view', book_view.id)
+        query = archiver.archivable_query(as_of=self._as_of)
+        self.assertEqual(db(query).count(), 1)
+
+    def test__archive(self):
+        archiver = self.archiver()
+        clicks = [
+            self.add_click(),
+            self.add_click(),
+            self.add_click(time_stamp=datetime.datetime(1999, 2, 1)),
+            self.add_click(completed=False),
+        ]
+        self.set_rollup_mark('download_click', clicks[-1].id)
+        got = archiver.archive(as_of=self._as_of)
+        self.assertEqual(got, 3)
+
+        ids = [x.id for x in clicks]
+        query = (db.download_click.id.belongs(ids))
+        self.assertEqual(
+            [x.id for x in db(query).select(db.download_click.id)],
+            [clicks[3].id]
+        )
+
+        records = list(read_archive(archiver.archive_filename('1999-01')))
+        self.assertEqual(
+            [x['id'] for x in records], [clicks[0].id, clicks[1].id])
+        self.assertEqual(records[0]['record_table'], 'book')
+        records = list(read_archive(archiver.archive_filename('1999-02')))
+        self.assertEqual([x['id'] for x in records], [clicks[2].id])
+
+        self.assertEqual(archiver.archive(as_of=self._as_of), 0)
+
+    def test__archive_filename(self):
+        archiver = self.archiver()
+        self.assertEqual(
+            archiver.archive_filename('2026-01'),
+            os.path.join(
+                self._tmp_dir,
+                'download_click',
+                'download_click_2026-01.jsonl.gz'
+            )
+        )
+
+
+class TestFunctions(WithArchiveTestCase):
+
+    def test__read_archive(self):
+        archiver = self.archiver()
+        filenames = archiver._write([{'id': 1, 'time_stamp': self._as_of}])
+        self.assertEqual(
+            list(read_archive(filenames[0])),
+            [{'id': 1, 'time_stamp': '1999-06-01T00:00:00.000000'}]
+        )
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/event_spools.py
+"""
+import datetime
+import os
+import shutil
+import unittest
+from gluon import *
+from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.event_spools import (
+    EventSpool,
+    EventSpoolLockError,
+    dumps_data,
+    event_spool,
+    loads_data,
+    update_counters,
+)
+from applications.zcomx.modules.events import (
+    BookView,
+    Contribution,
+    Rating,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+
+
+class WithSpoolTestCase(LocalTestCase):
+
+    _tmp_dir = '/tmp/test_event_spools'
+    _book = None
+    _filename = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        if not os.path.exists(self._tmp_dir):
+            os.makedirs(self._tmp_dir)
+        self._filename = os.path.join(self._tmp_dir, 'event_spool.jsonl')
+        self._book = self.add(Book, dict(
+            name='Test Event Spools',
+            contributions=0,
+            rating=0,
+            views=0,
+        ))
+
+    def tearDown(self):
+        if os.path.exists(self._tmp_dir):
+            shutil.rmtree(self._tmp_dir)
+
+    def event(self, **kwargs):
+        data = dict(
+            auth_user_id=0,
+            book_id=self._book.id,
+            time_stamp=datetime.datetime(2026, 1, 2, 3, 4, 5, 6),
+        )
+        data.update(kwargs)
+        return data
+
+    def track(self, record_class):
+        query = (db[record_class.db_table].book_id == self._book.id)
+        for row in db(query).select():
+            self._objects.append(record_class.from_id(row.id))
+
+
+class TestEventSpool(WithSpoolTestCase):
+
+    def test____init__(self):
+        spool = EventSpool()
+        self.assertTrue(
+            spool.filename.endswith('databases/event_spool.jsonl'))
+        spool = EventSpool(filename=self._filename)
+        self.assertEqual(spool.filename, self._filename)
+        self.assertEqual(spool.draining_filename, self._filename + '.draining')
+        self.assertEqual(spool.lock_filename, self._filename + '.lock')
+
+    def test___insert(self):
+        spool = EventSpool(filename=self._filename)
+        events = [
+            {'table': 'book_view', 'data': self.event()},
+            {'table': 'book_view', 'data': self.event()},
+            {'table': 'rating', 'data': self.event(amount=4)},
+        ]
+        got = spool._insert(events, batch_size=1)
+        self.track(BookView)
+        self.track(Rating)
+        self.assertEqual(got, {'book_view': 2, 'rating': 1})
+        query = (db.book_view.book_id == self._book.id)
+        self.assertEqual(db(query).count(), 2)
+
+    def test___read(self):
+        spool = EventSpool(filename=self._filename)
+        spool.append('book_view', self.event())
+        with open(self._filename, 'a') as f:
+            f.write('{"table": "book_v\n')
+            f.write('{"table": "_fake_", "data": {}}\n')
+            f.write('\n')
+        got = spool._read(self._filename)
+        self.assertEqual(len(got), 1)
+        self.assertEqual(got[0]['table'], 'book_view')
+        self.assertEqual(got[0]['data'], self.event())
+
+    def test___take(self):
+        spool = EventSpool(filename=self._filename)
+        self.assertEqual(spool._take(), None)
+
+        spool.append('book_view', self.event())
+        self.assertEqual(spool._take(), spool.draining_filename)
+        self.assertFalse(os.path.exists(self._filename))
+        self.assertTrue(os.path.exists(spool.draining_filename))
+
+        # Leftover draining file is taken first.
+        spool.append('book_view', self.event())
+        self.assertEqual(spool._take(), spool.draining_filename)
+        self.assertTrue(os.path.exists(self._filename))
+
+    def test__append(self):
+        spool = EventSpool(filename=self._filename)
+        spool.append('book_view', self.event())
+        spool.append('rating', self.event(amount=5))
+        with open(self._filename, 'r') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue('"2026-01-02T03:04:05.000006"' in lines[0])
+
+        self.assertRaises(
+            SyntaxError, spool.append, 'download', self.event())
+
+        # Spool taken for draining, appends go to a new file.
+        spool._take()
+        spool.append('book_view', self.event())
+        self.assertEqual(len(spool._read(self._filename)), 1)
+        self.assertEqual(len(spool._read(spool.draining_filename)), 2)
+
+    def test__drain(self):
+        spool = EventSpool(filename=self._filename)
+        self.assertEqual(spool.drain(), None)
+
+        spool.append('book_view', self.event())
+        spool.append('book_view', self.event())
+        spool.append('book_view', self.event())
+        spool.append('rating', self.event(amount=4))
+        spool.append('contribution', self.event(amount=2.5))
+        got = spool.drain()
+        self.track(BookView)
+        self.track(Contribution)
+        self.track(Rating)
+        self.assertEqual(
+            got, {'book_view': 3, 'contribution': 1, 'rating': 1})
+        self.assertFalse(os.path.exists(spool.draining_filename))
+
+        book = Book.from_id(self._book.id)
+        self.assertEqual(book.views, 3)
+        self.assertEqual(book.rating, 4)
+        self.assertEqual(book.contributions, 2.5)
+        self.assertEqual(spool.drain(), None)
+
+        # Another drainer holds the lock, the spool is not drained.
+        spool.append('book_view', self.event())
+        other_spool = EventSpool(filename=self._filename)
+        with other_spool.drainer_lock():
+            self.assertRaises(EventSpoolLockError, spool.drain)
+        self.assertTrue(os.path.exists(self._filename))
+        self.assertFalse(os.path.exists(spool.draining_filename))
+
+        # Drains under a lock held for the run.
+        with spool.drainer_lock():
+            got = spool.drain()
+            self.track(BookView)
+            self.assertEqual(got, {'book_view': 1})
+            self.assertEqual(spool.drain(), None)
+
+    def test__drainer_lock(self):
+        spool = EventSpool(filename=self._filename)
+        other_spool = EventSpool(filename=self._filename)
+        with spool.drainer_lock():
+            self.assertTrue(os.path.exists(spool.lock_filename))
+            self.assertTrue(spool._lock_file is not None)
+            try:
+                with other_spool.drainer_lock():
+                    self.fail('Lock acquired by second drainer')
+            except EventSpoolLockError:
+                pass
+        self.assertEqual(spool._lock_file, None)
+
+        # Released, the lock can be acquired again.
+        with other_spool.drainer_lock():
+            self.assertTrue(other_spool._lock_file is not None)
+
+
+class TestEventSpoolLockError(LocalTestCase):
+    def test_parent_init(self):
+        msg = 'This is an error message.'
+        try:
+            raise EventSpoolLockError(msg)
+        except EventSpoolLockError as err:
+            self.assertEqual(str(err), msg)
+        else:
+            self.fail('EventSpoolLockError not raised')
+
+
+class TestFunctions(WithSpoolTestCase):
+
+    def test__dumps_data(self):
+        data = self.event(ip_address='127.0.0.1')
+        self.assertEqual(
+            dumps_data(data),
+            {
+                'auth_user_id': 0,
+                'book_id': self._book.id,
+                'ip_address': '127.0.0.1',
+                'time_stamp': '2026-01-02T03:04:05.000006',
+            }
+        )
+
+    def test__event_spool(self):
+        local_settings = current.app.local_settings
+        save_event_spool = local_settings.event_spool
+        local_settings.event_spool = False
+        self.assertEqual(event_spool(), None)
+        local_settings.event_spool = True
+        self.assertTrue(isinstance(event_spool(), EventSpool))
+        local_settings.event_spool = save_event_spool
+
+    def test__loads_data(self):
+        data = self.event(ip_address='127.0.0.1')
+        self.assertEqual(loads_data(dumps_data(data)), data)
+        self.assertEqual(loads_data({'book_id': 1}), {'book_id': 1})
+
+    def test__update_counters(self):
+        events = [
+            {'table': 'book_view', 'data': self.event()},
+            {'table': 'book_view', 'data': self.event()},
+            {'table': 'book_view', 'data': self.event(book_id=0)},
+        ]
+        update_counters(events)
+        book = Book.from_id(self._book.id)
+        self.assertEqual(book.views, 2)
+
+        # Ratings are averaged with the running totals.
+        update_counters([
+            {'table': 'rating', 'data': self.event(amount=3)},
+            {'table': 'rating', 'data': self.event(amount=4)},
+        ])
+        update_counters([{'table': 'rating', 'data': self.event(amount=5)}])
+        book = Book.from_id(self._book.id)
+        self.assertEqual(book.rating, 4)
+        self.assertEqual(book.rating_count, 3)
+        self.assertEqual(book.rating_total, 12)
+        self.assertEqual(book.views, 2)
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
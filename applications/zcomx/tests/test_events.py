@@ -4,6 +4,8 @@
 Test suite for zcomx/modules/events.py
 """
 import datetime
+import os
+import shutil
 import unittest
 from gluon import *
 from applications.zcomx.modules.book_pages import BookPage
@@ -11,7 +13,12 @@ from applications.zcomx.modules.books import (
     Book,
     update_rating,
 )
-from applications.zcomx.modules.creators import AuthUser
+from applications.zcomx.modules.creators import (
+    AuthUser,
+    Creator,
+)
+from applications.zcomx.modules.dedupes import DedupeWindow
+from applications.zcomx.modules.event_spools import EventSpool
 from applications.zcomx.modules.events import (
     BaseEvent,
     BookEvent,
@@ -21,12 +28,18 @@ from applications.zcomx.modules.events import (
     Download,
     DownloadClick,
     DownloadEvent,
+    LOGGABLE_INTERVAL_SECONDS,
     Rating,
     RatingEvent,
     ViewEvent,
     ZcoContributionEvent,
+    delete_unloggable_downloads,
+    download_click_window,
     is_loggable,
+    last_loggable_click,
     log_download_click,
+    log_download_clicks,
+    unlogged_download_click_ids,
 )
 from applications.zcomx.modules.user_agents import USER_AGENTS
 from applications.zcomx.modules.tests.runner import LocalTestCase
@@ -86,6 +99,34 @@ class TestBookEvent(EventTestCase):
         event = BookEvent(self._book, self._user.id)
         self.assertTrue(event)
         self.assertEqual(event.book.name, self._book.name)
+        self.assertEqual(event.spool, None)
+
+    def test___insert(self):
+        data = dict(
+            auth_user_id=self._user.id,
+            book_id=self._book.id,
+            time_stamp=datetime.datetime.now(),
+        )
+        event = BookEvent(self._book, self._user.id)
+        event_id = event._insert('book_view', data)
+        view = BookView.from_id(event_id)
+        self._objects.append(view)
+        self.assertEqual(view.book_id, self._book.id)
+
+        tmp_dir = '/tmp/test_events'
+        if not os.path.exists(tmp_dir):
+            os.makedirs(tmp_dir)
+        spool = EventSpool(filename=os.path.join(tmp_dir, 'spool.jsonl'))
+        event = BookEvent(self._book, self._user.id, spool=spool)
+        self.assertEqual(event._insert('book_view', data), None)
+        self.assertEqual(len(spool._read(spool.filename)), 1)
+
+        # Spooled events don't update counters when logged.
+        update_rating(self._book)
+        ViewEvent(self._book, self._user.id, spool=spool).log()
+        book = Book.from_id(self._book.id)       # Re-load
+        self.assertEqual(book.views, 0)
+        shutil.rmtree(tmp_dir)
 
 
 class TestContributionEvent(EventTestCase):
@@ -262,6 +303,31 @@ class TestZcoContributionEvent(EventTestCase):
 
 
 class TestFunctions(LocalTestCase):
+
+    def test__delete_unloggable_downloads(self):
+        click = self.add(DownloadClick, dict(
+            record_table='book',
+            loggable=False,
+            completed=False,
+        ))
+        click_2 = self.add(DownloadClick, dict(
+            record_table='book',
+            loggable=True,
+            completed=False,
+        ))
+        download = Download.from_add(dict(download_click_id=click.id))
+        download_2 = self.add(Download, dict(download_click_id=click_2.id))
+
+        self.assertTrue(delete_unloggable_downloads() >= 1)
+        self.assertRaises(LookupError, Download.from_id, download.id)
+        self.assertEqual(Download.from_id(download_2.id), download_2)
+
+    def test__download_click_window(self):
+        window = download_click_window()
+        self.assertTrue(isinstance(window, DedupeWindow))
+        self.assertEqual(window.interval_seconds, LOGGABLE_INTERVAL_SECONDS)
+        self.assertTrue(download_click_window() is window)
+
     def test__is_loggable(self):
         now = request.now
 
@@ -365,6 +431,33 @@ class TestFunctions(LocalTestCase):
         set_time_stamp(download_click_2, 6)
         self.assertTrue(is_loggable(download_click_2.id, interval_seconds=5))
 
+    def test__last_loggable_click(self):
+        now = request.now
+        data = dict(
+            ip_address='111.111.111.444',
+            auth_user_id=1,
+            record_table='book',
+            record_id=444,
+            is_bot=False,
+            loggable=True,
+            time_stamp=now - datetime.timedelta(seconds=60),
+        )
+        click = self.add(DownloadClick, dict(data))
+
+        data['time_stamp'] = now
+        got = last_loggable_click(data)
+        self.assertEqual(got.id, click.id)
+        self.assertEqual(got.time_stamp, click.time_stamp)
+
+        # Outside interval
+        self.assertEqual(last_loggable_click(data, interval_seconds=30), None)
+
+        # The click itself is excluded.
+        self.assertEqual(last_loggable_click(click), None)
+
+        data['record_id'] = 555
+        self.assertEqual(last_loggable_click(data), None)
+
     def test__log_download_click(self):
         test_ip = '000.111.111.333'
         current.session._user_agent = None
@@ -375,7 +468,9 @@ class TestFunctions(LocalTestCase):
         db(query).delete()
         db.commit()
 
-        click_id = log_download_click('book', 0, queue_log_downloads=False)
+        window = DedupeWindow()
+        click_id = log_download_click(
+            'book', 0, queue_log_downloads=False, dedupe_window=window)
         download_click = DownloadClick.from_id(click_id)
         self.assertTrue(download_click)
         self.assertEqual(download_click.ip_address, test_ip)
@@ -383,17 +478,107 @@ class TestFunctions(LocalTestCase):
         self.assertEqual(download_click.completed, False)
         self._objects.append(download_click)
 
-        click_id_2 = log_download_click('book', 0, queue_log_downloads=False)
+        click_id_2 = log_download_click(
+            'book', 0, queue_log_downloads=False, dedupe_window=window)
         download_click_2 = DownloadClick.from_id(click_id_2)
         self.assertEqual(download_click_2.ip_address, test_ip)
         self.assertEqual(download_click_2.loggable, False)
         self.assertEqual(download_click_2.completed, True)
         self._objects.append(download_click_2)
+        self.assertEqual(window.metrics()['hits'], 1)
+
+        # Not in the window, found in the database.
+        click_id_3 = log_download_click(
+            'book', 0, queue_log_downloads=False, dedupe_window=DedupeWindow())
+        download_click_3 = DownloadClick.from_id(click_id_3)
+        self.assertEqual(download_click_3.loggable, False)
+        self._objects.append(download_click_3)
+
+        # Other records are loggable.
+        click_id_4 = log_download_click(
+            'creator', 0, queue_log_downloads=False, dedupe_window=window)
+        download_click_4 = DownloadClick.from_id(click_id_4)
+        self.assertEqual(download_click_4.loggable, True)
+        self._objects.append(download_click_4)
 
         # Test invalid record_table.
         got = log_download_click('_invalid_', 0, queue_log_downloads=False)
         self.assertEqual(got, 0)
 
+    def test__log_download_clicks(self):
+        today = datetime.date.today()
+        creator = self.add(Creator, dict(
+            email='test__log_download_clicks@example.com'))
+        book = self.add(Book, dict(
+            name='test__log_download_clicks',
+            creator_id=creator.id,
+            release_date=today,
+            fileshare_date=today,
+        ))
+        book_2 = self.add(Book, dict(
+            name='test__log_download_clicks_2',
+            creator_id=creator.id,
+            release_date=today,
+            fileshare_date=today,
+        ))
+        # Not downloadable
+        self.add(Book, dict(
+            name='test__log_download_clicks_3',
+            creator_id=creator.id,
+            release_date=today,
+        ))
+        book_click = self.add(DownloadClick, dict(
+            record_table='book',
+            record_id=book.id,
+            loggable=True,
+            completed=False,
+        ))
+        creator_click = self.add(DownloadClick, dict(
+            record_table='creator',
+            record_id=creator.id,
+            loggable=True,
+            completed=False,
+        ))
+        click_ids = [book_click.id, creator_click.id]
+
+        self.assertEqual(log_download_clicks(click_ids), 3)
+        query = (db.download.download_click_id.belongs(click_ids))
+        for row in db(query).select(db.download.id):
+            self._objects.append(Download.from_id(row.id))
+        self.assertEqual(
+            sorted(
+                (x.download_click_id, x.book_id)
+                for x in db(query).select()
+            ),
+            sorted([
+                (book_click.id, book.id),
+                (creator_click.id, book.id),
+                (creator_click.id, book_2.id),
+            ])
+        )
+        for click_id in click_ids:
+            self.assertEqual(DownloadClick.from_id(click_id).completed, True)
+
+        # Logged clicks aren't logged again.
+        self.assertEqual(log_download_clicks(click_ids), 0)
+        self.assertEqual(log_download_clicks([]), 0)
+
+    def test__unlogged_download_click_ids(self):
+        click = self.add(DownloadClick, dict(
+            record_table='book',
+            loggable=True,
+            completed=False,
+        ))
+        self.add(DownloadClick, dict(
+            record_table='book',
+            loggable=True,
+            completed=True,
+        ))
+        got = unlogged_download_click_ids()
+        self.assertTrue(click.id in got)
+        self.assertEqual(got, sorted(got))
+        self.assertEqual(len(unlogged_download_click_ids(limit=1)), 1)
+
 def set_pages(obj, book, num_of_pages):
     """Create pages for a book."""
     while book.page_count() < num_of_pages:
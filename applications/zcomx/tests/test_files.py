@@ -3,12 +3,15 @@
 """
 Test suite for zcomx/modules/files.py
 """
+import os
+import shutil
 import unittest
 from applications.zcomx.modules.files import (
     FileName,
     TitleFileName,
     for_file,
     for_title_file,
+    write_atomic,
 )
 from applications.zcomx.modules.tests.runner import LocalTestCase
 # pylint: disable=missing-docstring
@@ -153,6 +156,31 @@ class TestFunctions(LocalTestCase):
     def test__for_title_file(self):
         self.assertEqual(for_title_file('a?: b>.t/xt'), 'a - b.txt')
 
+    def test__write_atomic(self):
+        tmp_dir = '/tmp/test_write_atomic'
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        filename = os.path.join(tmp_dir, 'sub', 'file.json')
+
+        # Path is created as needed
+        write_atomic(filename, '{"a": 1}')
+        with open(filename, encoding='utf-8') as f:
+            self.assertEqual(f.read(), '{"a": 1}')
+
+        # Existing file is replaced
+        write_atomic(filename, '{"b": 2}')
+        with open(filename, encoding='utf-8') as f:
+            self.assertEqual(f.read(), '{"b": 2}')
+
+        write_atomic(filename, b'bytes', mode='wb')
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), b'bytes')
+
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(os.path.dirname(filename)), ['file.json'])
+
+        shutil.rmtree(tmp_dir)
+
 
 def setUpModule():
     """Set up web2py environment."""
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/fragment_caches.py
+"""
+import unittest
+from gluon import *
+from gluon.cache import CacheInRam
+from applications.zcomx.modules.fragment_caches import (
+    CONTENT_VERSION_KEY,
+    DEFAULT_TIME_EXPIRE,
+    FragmentCache,
+    bump_content_version,
+    content_version,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class WithCacheTestCase(LocalTestCase):
+    """Class representing a test case using a ram cache."""
+
+    _cache = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._cache = CacheInRam(request=current.request)
+        self._cache(CONTENT_VERSION_KEY, None)
+
+    def tearDown(self):
+        self._cache(CONTENT_VERSION_KEY, None)
+        self._cache('_version_', None)
+        self._cache.clear(regex='^fragment_')
+
+
+class TestFragmentCache(WithCacheTestCase):
+
+    def test____init__(self):
+        fragment_cache = FragmentCache()
+        self.assertEqual(fragment_cache.cache_model, current.cache.ram)
+        self.assertEqual(fragment_cache.time_expire, DEFAULT_TIME_EXPIRE)
+        self.assertEqual(fragment_cache.version_key, CONTENT_VERSION_KEY)
+
+        fragment_cache = FragmentCache(
+            cache_model=self._cache, time_expire=5, version_key='_version_')
+        self.assertEqual(fragment_cache.cache_model, self._cache)
+        self.assertEqual(fragment_cache.time_expire, 5)
+        self.assertEqual(fragment_cache.version_key, '_version_')
+
+    def test____call__(self):
+        calls = []
+
+        def render():
+            calls.append(1)
+            return '<div>{c}</div>'.format(c=len(calls))
+
+        fragment_cache = FragmentCache(cache_model=self._cache)
+        self.assertEqual(fragment_cache('key', render), '<div>1</div>')
+        self.assertEqual(fragment_cache('key', render), '<div>1</div>')
+        self.assertEqual(len(calls), 1)
+
+        # Different key
+        self.assertEqual(fragment_cache('key_2', render), '<div>2</div>')
+        self.assertEqual(len(calls), 2)
+
+        # Bumping the content version invalidates fragments.
+        bump_content_version(cache_model=self._cache)
+        self.assertEqual(fragment_cache('key', render), '<div>3</div>')
+        self.assertEqual(fragment_cache('key', render), '<div>3</div>')
+        self.assertEqual(len(calls), 3)
+
+        # Bumping another version doesn't.
+        bump_content_version(cache_model=self._cache, version_key='_version_')
+        self.assertEqual(fragment_cache('key', render), '<div>3</div>')
+        self.assertEqual(len(calls), 3)
+
+
+class TestFunctions(WithCacheTestCase):
+
+    def test__bump_content_version(self):
+        self.assertEqual(bump_content_version(cache_model=self._cache), 1)
+        self.assertEqual(bump_content_version(cache_model=self._cache), 2)
+        self.assertEqual(content_version(cache_model=self._cache), 2)
+
+        self.assertEqual(
+            bump_content_version(
+                cache_model=self._cache, version_key='_version_'),
+            1
+        )
+        self.assertEqual(content_version(cache_model=self._cache), 2)
+
+    def test__content_version(self):
+        self.assertEqual(content_version(cache_model=self._cache), 0)
+        bump_content_version(cache_model=self._cache)
+        self.assertEqual(content_version(cache_model=self._cache), 1)
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,12 +31,15 @@ from applications.zcomx.modules.images import (
     SIZES,
     UploadImage,
     filename_for_size,
+    image_url,
+    image_version,
     is_image,
     optimize,
     rename,
     scrub_extension_for_store,
     square_image,
     store,
+    upload_field,
 )
 from applications.zcomx.modules.tests.helpers import (
     FileTestCase,
@@ -354,6 +357,18 @@ class TestImgTag(WithObjectsTestCase, ImageTestCase):
         img_tag.size = '_fake_'
         self.assertEqual(img_tag.url_vars(), {'size': '_fake_'})
 
+        filename = self._prep_image('cbz_plus.jpg', to_name='file.jpg')
+        self._set_image(
+            db.creator.image, self._creator, filename, resizer=ResizerQuick)
+        img_tag = ImgTag(self._creator.image, size='web')
+        self.assertEqual(
+            img_tag.url_vars(),
+            {
+                'size': 'web',
+                'v': image_version(self._creator.image, size='web'),
+            }
+        )
+
 
 class TestResizeImg(ImageTestCase, WithObjectsTestCase, FileTestCase):
 
@@ -805,6 +820,58 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
             got = filename_for_size(t[0], t[1])
             self.assertEqual(got, t[2])
 
+    def test__image_url(self):
+        filename = self._prep_image('cbz_plus.jpg', to_name='file.jpg')
+        self._set_image(
+            db.creator.image, self._creator, filename, resizer=ResizerQuick)
+        image = self._creator.image
+
+        got = image_url(image)
+        self.assertEqual(
+            got,
+            '/images/download/{i}?v={v}'.format(
+                i=image, v=image_version(image))
+        )
+
+        got = image_url(image, size='web', host='zco.mx', scheme='https')
+        self.assertTrue(got.startswith(
+            'https://zco.mx/images/download/' + image + '?'))
+        self.assertTrue('size=web' in got)
+        self.assertTrue('v=' + image_version(image, size='web') in got)
+
+    def test__image_version(self):
+        filename = self._prep_image('cbz_plus.jpg', to_name='file.jpg')
+        self._set_image(
+            db.creator.image, self._creator, filename, resizer=ResizerQuick)
+        image = self._creator.image
+
+        version = image_version(image)
+        self.assertRegex(version, r'^[0-9a-f]{12}$')
+        self.assertEqual(image_version(image), version)     # Stable
+
+        web_version = image_version(image, size='web')
+        self.assertRegex(web_version, r'^[0-9a-f]{12}$')
+
+        # Rewriting the file changes the version.
+        up_image = UploadImage(db.creator.image, image)
+        fullname = up_image.fullname(size='web')
+        stat_file = os.stat(fullname)
+        os.utime(
+            fullname,
+            ns=(stat_file.st_atime_ns, stat_file.st_mtime_ns + 1000000000)
+        )
+        self.assertNotEqual(image_version(image, size='web'), web_version)
+
+        # Missing size falls back to original
+        up_image.delete('cbz')
+        self.assertEqual(image_version(image, size='cbz'), version)
+
+        # Invalid
+        self.assertEqual(image_url('_fake_'), '/images/download/_fake_')
+        self.assertEqual(image_version(None), '')
+        self.assertEqual(image_version('_fake_'), '')
+        self.assertEqual(image_version('_fake_.image.aaa.bbb.jpg'), '')
+
     def test__is_image(self):
         # Test common image types.
         original_filename = os.path.join(self._image_dir, 'original.jpg')
@@ -991,6 +1058,21 @@ class TestFunctions(WithObjectsTestCase, ImageTestCase):
         got = store(db.book_page.image, working_image, resizer=ResizerQuick)
         self.assertTrue(re_store.match(got))
 
+    def test__upload_field(self):
+        tests = [
+            # (image, expect)
+            (None, None),
+            ('', None),
+            ('_fake_', None),
+            ('_fake_.image.aaa.bbb.jpg', None),
+            ('creator._fake_.aaa.bbb.jpg', None),
+            ('creator.image.aaa.bbb.jpg', db.creator.image),
+            ('book_page.image.aaa.bbb.jpg', db.book_page.image),
+        ]
+        for t in tests:
+            # Field == Field returns a Query, compare identity instead.
+            self.assertTrue(upload_field(t[0]) is t[1])
+
 
 def setUpModule():
     """Set up web2py environment."""
@@ -20,8 +20,10 @@ from applications.zcomx.modules.job_queuers import (
     CreateCreatorTorrentQueuer,
     CreateSiteMapQueuer,
     CreateTorrentQueuer,
+    CreatorGridQueuer,
     DeleteBookQueuer,
     DeleteImgQueuer,
+    DownloadCatalogQueuer,
     FileshareBookQueuer,
     LogDownloadsQueuer,
     NotifyP2PQueuer,
@@ -36,11 +38,16 @@ from applications.zcomx.modules.job_queuers import (
     QueueWithSignal,
     ReverseFileshareBookQueuer,
     ReverseSetBookCompletedQueuer,
+    RollupEventsQueuer,
+    SearchIndexQueuer,
     SearchPrefetchQueuer,
     SetBookCompletedQueuer,
     UpdateIndiciaQueuer,
     UpdateIndiciaForReleaseQueuer,
     queue_create_sitemap,
+    queue_creator_grid,
+    queue_download_catalog,
+    queue_search_index,
     queue_search_prefetch,
 )
 from applications.zcomx.modules.tests.runner import LocalTestCase
@@ -185,6 +192,30 @@ class TestCreateTorrentQueuer(LocalTestCase):
         )
 
 
+class TestCreatorGridQueuer(LocalTestCase):
+
+    def test_queue(self):
+        queuer = CreatorGridQueuer(
+            db.job,
+            job_options={'status': 'd'},
+            cli_options={},
+            cli_args=['123'],
+        )
+        tracker = TableTracker(db.job)
+        job = queuer.queue()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.priority,
+            PRIORITIES.index('creator_grid')
+        )
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/creator_grid.py 123'
+        )
+
+
 class TestDeleteBookQueuer(LocalTestCase):
 
     def test_queue(self):
@@ -226,6 +257,31 @@ class TestDeleteImgQueuer(LocalTestCase):
         )
 
 
+class TestDownloadCatalogQueuer(LocalTestCase):
+
+    def test_queue(self):
+        queuer = DownloadCatalogQueuer(
+            db.job,
+            job_options={'status': 'd'},
+            cli_options={'-vv': True},
+            cli_args=[str(123)],
+        )
+        tracker = TableTracker(db.job)
+        job = queuer.queue()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.priority,
+            PRIORITIES.index('download_catalog')
+        )
+        # pylint: disable=line-too-long
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/download_catalog.py -vv 123'
+        )
+
+
 class TestFileshareBookQueuer(LocalTestCase):
 
     def test_queue(self):
@@ -498,6 +554,55 @@ class TestReverseSetBookCompletedQueuer(LocalTestCase):
         )
 
 
+class TestRollupEventsQueuer(LocalTestCase):
+
+    def test_queue(self):
+        queuer = RollupEventsQueuer(
+            db.job,
+            job_options={'status': 'd'},
+            cli_options={'-b': '500'},
+            cli_args=[],
+        )
+        tracker = TableTracker(db.job)
+        job = queuer.queue()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.priority,
+            PRIORITIES.index('rollup_events')
+        )
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/rollup_events.py -b 500'
+        )
+
+
+class TestSearchIndexQueuer(LocalTestCase):
+
+    def test_queue(self):
+        queuer = SearchIndexQueuer(
+            db.job,
+            job_options={'status': 'd'},
+            cli_options={'--book-id': ['1', '2']},
+            cli_args=[],
+        )
+        tracker = TableTracker(db.job)
+        job = queuer.queue()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.priority,
+            PRIORITIES.index('search_index')
+        )
+        # pylint: disable=line-too-long
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/search_index.py --book-id 1 --book-id 2'
+        )
+
+
 class TestSearchPrefetchQueuer(LocalTestCase):
 
     def test_queue(self):
@@ -596,6 +701,66 @@ class TestFunctions(LocalTestCase):
             'applications/zcomx/private/bin/create_sitemap.py -o applications/zcomx/static/sitemap.xml'
         )
 
+    def test__queue_creator_grid(self):
+        tracker = TableTracker(db.job)
+        job = queue_creator_grid()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/creator_grid.py'
+        )
+
+        job = queue_creator_grid(creator_id=123)
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/creator_grid.py 123'
+        )
+
+    def test__queue_download_catalog(self):
+        tracker = TableTracker(db.job)
+        job = queue_download_catalog()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/download_catalog.py'
+        )
+
+        tracker = TableTracker(db.job)
+        job = queue_download_catalog(creator_id=123)
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/download_catalog.py 123'
+        )
+
+    def test__queue_search_index(self):
+        tracker = TableTracker(db.job)
+        job = queue_search_index()
+        self.assertFalse(tracker.had(job))
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/search_index.py'
+        )
+
+        job = queue_search_index(book_ids=[1], creator_ids=[2, 3])
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        # pylint: disable=line-too-long
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/search_index.py --book-id 1 --creator-id 2 --creator-id 3'
+        )
+
     def test__queue_search_prefetch(self):
         tracker = TableTracker(db.job)
         job = queue_search_prefetch()
@@ -608,6 +773,15 @@ class TestFunctions(LocalTestCase):
             'applications/zcomx/private/bin/search_prefetch.py'
         )
 
+        job = queue_search_prefetch(book_ids=[1, 2], creator_ids=[3])
+        self.assertTrue(tracker.has(job))
+        self._objects.append(job)
+        # pylint: disable=line-too-long
+        self.assertEqual(
+            job.command,
+            'applications/zcomx/private/bin/search_prefetch.py --book-id 1 --book-id 2 --creator-id 3'
+        )
+
 
 class TestIntegrityChecks(LocalTestCase):
 
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/readers.py
+"""
+import unittest
+from gluon import *
+from gluon.cache import CacheInRam
+from applications.zcomx.modules.book_pages import BookPage
+from applications.zcomx.modules.book_types import BookType
+from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.creators import (
+    AuthUser,
+    Creator,
+)
+from applications.zcomx.modules.fragment_caches import FragmentCache
+from applications.zcomx.modules.images import store
+from applications.zcomx.modules.readers import (
+    INDICIA_PAGE_NO_DEFAULT,
+    ReaderPayload,
+    record_version,
+)
+from applications.zcomx.modules.tests.helpers import (
+    ImageTestCase,
+    ResizerQuick,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class WithObjectsTestCase(LocalTestCase):
+
+    _book = None
+    _book_page = None
+    _book_page_2 = None
+    _cache = None
+    _creator = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        auth_user = self.add(AuthUser, dict(name='First Last'))
+        self._creator = self.add(Creator, dict(
+            auth_user_id=auth_user.id,
+            email='test_readers@example.com',
+            name_for_url='FirstLast',
+        ))
+        self._book = self.add(Book, dict(
+            name='Test Readers',
+            number=1,
+            book_type_id=BookType.by_name('ongoing').id,
+            creator_id=self._creator.id,
+            name_for_url='TestReaders-001',
+        ))
+        self._book_page_2 = self.add(BookPage, dict(
+            book_id=self._book.id,
+            page_no=2,
+        ))
+        self._book_page = self.add(BookPage, dict(
+            book_id=self._book.id,
+            page_no=1,
+        ))
+        self._cache = CacheInRam(request=current.request)
+        super().setUp()
+
+    def tearDown(self):
+        self._cache.clear(regex='^fragment_')
+        super().tearDown()
+
+    def payload(self):
+        return ReaderPayload(
+            self._book,
+            creator=self._creator,
+            fragment_cache=FragmentCache(cache_model=self._cache),
+        )
+
+
+class TestReaderPayload(WithObjectsTestCase, ImageTestCase):
+
+    def test____init__(self):
+        payload = ReaderPayload(self._book)
+        self.assertEqual(payload.book, self._book)
+        self.assertEqual(payload.creator, None)
+        self.assertTrue(isinstance(payload.fragment_cache, FragmentCache))
+
+    def test__first_page(self):
+        payload = self.payload()
+        self.assertEqual(payload.first_page().id, self._book_page.id)
+
+        book = self.add(Book, dict(name='test__first_page'))
+        self.assertEqual(ReaderPayload(book).first_page(), None)
+
+    def test__indicia(self):
+        calls = []
+        payload = self.payload()
+        render_indicia = payload.render_indicia
+
+        def counted():
+            calls.append(1)
+            return render_indicia()
+
+        payload.render_indicia = counted
+        got = payload.indicia()
+        self.assertTrue('indicia_preview_section' in got.content)
+        self.assertEqual(got.orientation, 'portrait')
+        self.assertEqual(len(calls), 1)
+
+        # Cached
+        payload_2 = self.payload()
+        payload_2.render_indicia = counted
+        self.assertEqual(payload_2.indicia(), got)
+        self.assertEqual(len(calls), 1)
+
+        # Counters don't change the version, the book name does.
+        self._book = Book.from_updated(self._book, dict(views=99))
+        payload_3 = self.payload()
+        payload_3.render_indicia = counted
+        payload_3.indicia()
+        self.assertEqual(len(calls), 1)
+
+        self._book = Book.from_updated(self._book, dict(name='Renamed'))
+        payload_4 = self.payload()
+        payload_4.render_indicia = counted
+        payload_4.indicia()
+        self.assertEqual(len(calls), 2)
+
+    def test__indicia_key(self):
+        payload = self.payload()
+        key = payload.indicia_key()
+        self.assertTrue(
+            key.startswith('reader_indicia_{b}_'.format(b=self._book.id)))
+        self.assertEqual(self.payload().indicia_key(), key)
+
+        self._creator = Creator.from_updated(
+            self._creator, dict(paypal_email='test@example.com'))
+        self.assertNotEqual(self.payload().indicia_key(), key)
+
+    def test__last_page(self):
+        payload = self.payload()
+        self.assertEqual(payload.last_page().id, self._book_page_2.id)
+
+        book = self.add(Book, dict(name='test__last_page'))
+        self.assertEqual(ReaderPayload(book).last_page(), None)
+
+    def test__page_images(self):
+        got = self.payload().page_images()
+        self.assertEqual([x.page_no for x in got], [1, 2, 3])
+        self.assertEqual(got[2].image, 'indicia')
+        self.assertTrue('indicia_preview_section' in str(got[2].content))
+        self.assertEqual(sorted(got[0].versions.keys()), ['cbz', 'web'])
+
+        # Book without pages
+        book = self.add(Book, dict(
+            name='test__page_images',
+            creator_id=self._creator.id,
+        ))
+        payload = ReaderPayload(
+            book, fragment_cache=FragmentCache(cache_model=self._cache))
+        got = payload.page_images()
+        self.assertEqual(len(got), 1)
+        self.assertEqual(got[0].page_no, INDICIA_PAGE_NO_DEFAULT)
+
+    def test__pages(self):
+        payload = self.payload()
+        got = payload.pages()
+        self.assertEqual(
+            [x.id for x in got],
+            [self._book_page.id, self._book_page_2.id]
+        )
+        # Loaded once
+        self.assertTrue(payload.pages() is got)
+
+    def test__render_indicia(self):
+        got = self.payload().render_indicia()
+        self.assertEqual(sorted(got.keys()), ['content', 'orientation'])
+        self.assertEqual(got['orientation'], 'portrait')
+
+        landscape_filename = store(
+            db.book_page.image,
+            self._prep_image('landscape.png'),
+            resizer=ResizerQuick
+        )
+        self._book_page_2 = BookPage.from_updated(
+            self._book_page_2, dict(image=landscape_filename))
+        got = self.payload().render_indicia()
+        self.assertEqual(got['orientation'], 'landscape')
+        self.assertTrue('landscape' in got['content'])
+
+
+class TestFunctions(WithObjectsTestCase):
+
+    def test__record_version(self):
+        version = record_version(self._book, self._creator, 'image.jpg')
+        self.assertEqual(len(version), 32)
+        self.assertEqual(
+            record_version(self._book, self._creator, 'image.jpg'), version)
+        self.assertNotEqual(
+            record_version(self._book, self._creator, 'image_2.jpg'), version)
+        self.assertNotEqual(
+            record_version(self._book, None, 'image.jpg'), version)
+
+        book = Book(dict(self._book.as_dict(), views=100, rating=5))
+        self.assertEqual(
+            record_version(book, self._creator, 'image.jpg'), version)
+        book = Book(dict(self._book.as_dict(), name='_new_name_'))
+        self.assertNotEqual(
+            record_version(book, self._creator, 'image.jpg'), version)
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/rollups.py
+"""
+import datetime
+import unittest
+from gluon import *
+from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.creators import Creator
+from applications.zcomx.modules.events import (
+    BookView,
+    Contribution,
+    DownloadClick,
+)
+from applications.zcomx.modules.rollups import (
+    BookDailyRollup,
+    DownloadClickDailyRollup,
+    RollupMark,
+    add_to_book_rollups,
+    add_to_click_rollups,
+    book_totals,
+    click_rollup_deltas,
+    click_totals,
+    event_counts,
+    high_water_mark,
+    rollup_deltas,
+    rollup_totals,
+    set_high_water_mark,
+    subtract_from_rollups,
+    update_rollups,
+)
+from applications.zcomx.modules.tests.helpers import \
+    WithRollupMarksTestCase
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class WithRollupsTestCase(WithRollupMarksTestCase):
+
+    _book = None
+    _creator = None
+    _day = datetime.date(1999, 1, 31)
+    _time_stamp = datetime.datetime(1999, 1, 31, 12, 31, 59)
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._creator = self.add(Creator, dict(email='test_rollups@gmail.com'))
+        self._book = self.add(Book, dict(
+            name='test_rollups',
+            creator_id=self._creator.id,
+        ))
+
+    def add_clicks(self, count, loggable=True, record_table='book'):
+        clicks = []
+        for _ in range(count):
+            clicks.append(self.add(DownloadClick, dict(
+                ip_address='127.0.0.1',
+                time_stamp=self._time_stamp,
+                record_table=record_table,
+                record_id=self._book.id,
+                loggable=loggable,
+            )))
+        return clicks
+
+    def add_events(self, record_class, count, days=0, amount=None):
+        events = []
+        for _ in range(count):
+            data = dict(
+                book_id=self._book.id,
+                time_stamp=self._time_stamp + datetime.timedelta(days=days),
+            )
+            if amount is not None:
+                data['amount'] = amount
+            events.append(self.add(record_class, data))
+        return events
+
+    def book_rollups(self):
+        query = (db.book_daily_rollup.book_id == self._book.id)
+        rollups = []
+        for row in db(query).select(orderby=db.book_daily_rollup.day):
+            rollups.append(BookDailyRollup.from_id(row.id))
+            self._objects.append(rollups[-1])
+        return rollups
+
+    def click_rollups(self):
+        rollup = db.download_click_daily_rollup
+        query = (rollup.record_id == self._book.id)
+        rollups = []
+        orderby = rollup.record_table | rollup.day
+        for row in db(query).select(orderby=orderby):
+            rollups.append(DownloadClickDailyRollup.from_id(row.id))
+            self._objects.append(rollups[-1])
+        return rollups
+
+
+class TestBookDailyRollup(LocalTestCase):
+    pass            # Record subclass
+
+
+class TestDownloadClickDailyRollup(LocalTestCase):
+    pass            # Record subclass
+
+
+class TestRollupMark(LocalTestCase):
+    pass            # Record subclass
+
+
+class TestFunctions(WithRollupsTestCase):
+
+    def test__add_to_book_rollups(self):
+        add_to_book_rollups({})
+        self.assertEqual(self.book_rollups(), [])
+
+        day_2 = self._day + datetime.timedelta(days=1)
+        add_to_book_rollups({
+            (self._book.id, self._day): {'views': 2},
+            (self._book.id, day_2): {
+                'contributions': 1, 'contribution_amount': 5.0},
+        })
+        add_to_book_rollups({
+            (self._book.id, self._day): {'views': 3, 'downloads': 1},
+        })
+        rollups = self.book_rollups()
+        self.assertEqual(len(rollups), 2)
+        self.assertEqual(rollups[0].day, self._day)
+        self.assertEqual(rollups[0].creator_id, self._creator.id)
+        self.assertEqual(rollups[0].views, 5)
+        self.assertEqual(rollups[0].downloads, 1)
+        self.assertEqual(rollups[0].contributions, 0)
+        self.assertEqual(rollups[1].day, day_2)
+        self.assertEqual(rollups[1].contributions, 1)
+        self.assertEqual(rollups[1].contribution_amount, 5.0)
+
+    def test__add_to_click_rollups(self):
+        add_to_click_rollups({})
+        self.assertEqual(self.click_rollups(), [])
+
+        day_2 = self._day + datetime.timedelta(days=1)
+        add_to_click_rollups({
+            ('book', self._book.id, self._day): 2,
+            ('book', self._book.id, day_2): 1,
+        })
+        add_to_click_rollups({
+            ('book', self._book.id, self._day): 3,
+            ('creator', self._book.id, self._day): 4,
+        })
+        rollups = self.click_rollups()
+        self.assertEqual(
+            [(x.record_table, x.day, x.clicks) for x in rollups],
+            [
+                ('book', self._day, 5),
+                ('book', day_2, 1),
+                ('creator', self._day, 4),
+            ]
+        )
+
+    def test__book_totals(self):
+        self.assertEqual(
+            book_totals(self._book.id),
+            {
+                'contribution_amount': 0,
+                'contributions': 0,
+                'downloads': 0,
+                'views': 0,
+            }
+        )
+        day_2 = self._day + datetime.timedelta(days=1)
+        add_to_book_rollups({
+            (self._book.id, self._day): {'views': 2, 'downloads': 1},
+            (self._book.id, day_2): {'views': 3},
+        })
+        self.book_rollups()
+        got = book_totals(self._book.id)
+        self.assertEqual(got['views'], 5)
+        self.assertEqual(got['downloads'], 1)
+        got = book_totals(self._book.id, since=day_2)
+        self.assertEqual(got['views'], 3)
+        self.assertEqual(got['downloads'], 0)
+
+    def test__click_rollup_deltas(self):
+        clicks = self.add_clicks(2)
+        clicks.extend(self.add_clicks(1, record_table='creator'))
+        clicks.extend(self.add_clicks(1, loggable=False))
+        first_id = clicks[0].id - 1
+        last_id = clicks[-1].id
+        self.assertEqual(
+            click_rollup_deltas(first_id, last_id),
+            {
+                ('book', self._book.id, self._day): 2,
+                ('creator', self._book.id, self._day): 1,
+            }
+        )
+        self.assertEqual(click_rollup_deltas(first_id, first_id + 1), {
+            ('book', self._book.id, self._day): 1,
+        })
+        self.assertEqual(click_rollup_deltas(last_id, last_id), {})
+
+        query = (db.download_click.record_table == 'creator')
+        self.assertEqual(
+            click_rollup_deltas(first_id, last_id, query=query),
+            {('creator', self._book.id, self._day): 1}
+        )
+
+    def test__click_totals(self):
+        self.assertEqual(click_totals('book', self._book.id), 0)
+        day_2 = self._day + datetime.timedelta(days=1)
+        add_to_click_rollups({
+            ('book', self._book.id, self._day): 2,
+            ('book', self._book.id, day_2): 3,
+            ('creator', self._book.id, self._day): 4,
+        })
+        self.click_rollups()
+        self.assertEqual(click_totals('book', self._book.id), 5)
+        self.assertEqual(click_totals('book', self._book.id, since=day_2), 3)
+        self.assertEqual(click_totals('creator', self._book.id), 4)
+
+    def test__event_counts(self):
+        self.set_rollup_mark('book_view')
+
+        self.assertEqual(
+            event_counts('book_view', book_ids=[self._book.id]), {})
+
+        # Events past the mark are counted from the event table, events up
+        # to the mark from the rollups.
+        self.add_events(BookView, 2)
+        add_to_book_rollups({
+            (self._book.id, self._day): {'views': 5},
+        })
+        self.book_rollups()
+        self.assertEqual(
+            event_counts('book_view', book_ids=[self._book.id]),
+            {self._book.id: 7}
+        )
+        self.assertEqual(event_counts('book_view')[self._book.id], 7)
+        self.assertEqual(event_counts('book_view', book_ids=[]), {})
+
+    def test__high_water_mark(self):
+        self.assertEqual(high_water_mark('_test_'), 0)
+        set_high_water_mark('_test_', 123)
+        self._objects.append(RollupMark.from_key({'name': '_test_'}))
+        self.assertEqual(high_water_mark('_test_'), 123)
+
+    def test__rollup_deltas(self):
+        views = self.add_events(BookView, 2)
+        views.extend(self.add_events(BookView, 1, days=1))
+        first_id = min(x.id for x in views) - 1
+        last_id = max(x.id for x in views)
+        got = rollup_deltas('book_view', first_id, last_id)
+        self.assertEqual(
+            got,
+            {
+                (self._book.id, self._day): {'views': 2},
+                (self._book.id, self._day + datetime.timedelta(days=1)): {
+                    'views': 1},
+            }
+        )
+        self.assertEqual(rollup_deltas('book_view', last_id, last_id), {})
+
+        query = (db.book_view.id == views[-1].id)
+        got = rollup_deltas('book_view', first_id, last_id, query=query)
+        self.assertEqual(
+            got,
+            {
+                (self._book.id, self._day + datetime.timedelta(days=1)): {
+                    'views': 1},
+            }
+        )
+
+        contributions = self.add_events(Contribution, 2, amount=2.5)
+        got = rollup_deltas(
+            'contribution',
+            contributions[0].id - 1,
+            contributions[-1].id,
+        )
+        self.assertEqual(
+            got,
+            {
+                (self._book.id, self._day): {
+                    'contributions': 2, 'contribution_amount': 5.0},
+            }
+        )
+
+    def test__rollup_totals(self):
+        add_to_book_rollups({
+            (self._book.id, self._day): {'views': 2},
+        })
+        self.book_rollups()
+        query = (db.book_daily_rollup.book_id == self._book.id)
+        got = rollup_totals(db.book_daily_rollup, query)
+        self.assertEqual(got['views'], 2)
+        self.assertEqual(got['contribution_amount'], 0)
+        self.assertEqual(sorted(got.keys()), [
+            'contribution_amount', 'contributions', 'downloads', 'views'])
+
+    def test__set_high_water_mark(self):
+        set_high_water_mark('_test_', 1)
+        set_high_water_mark('_test_', 2)
+        query = (db.rollup_mark.name == '_test_')
+        self.assertEqual(db(query).count(), 1)
+        mark = RollupMark.from_key({'name': '_test_'})
+        self._objects.append(mark)
+        self.assertEqual(mark.last_id, 2)
+
+    def test__subtract_from_rollups(self):
+        # Only events up to the high-water mark are subtracted.
+        views = self.add_events(BookView, 3)
+        self.set_rollup_mark('book_view', views[1].id)
+        add_to_book_rollups({
+            (self._book.id, self._day): {'views': 2},
+        })
+        query = (db.book_view.book_id == self._book.id)
+        self.assertEqual(subtract_from_rollups('book_view', query), 2)
+        rollups = self.book_rollups()
+        self.assertEqual(len(rollups), 1)
+        self.assertEqual(rollups[0].views, 0)
+
+        clicks = self.add_clicks(2)
+        self.set_rollup_mark('download_click', clicks[-1].id)
+        add_to_click_rollups({
+            ('book', self._book.id, self._day): 2,
+        })
+        query = (db.download_click.id == clicks[0].id)
+        self.assertEqual(subtract_from_rollups('download_click', query), 1)
+        self.assertEqual(click_totals('book', self._book.id), 1)
+        self.click_rollups()
+
+    def test__update_rollups(self):
+        names = ['book_view', 'download_click']
+        for name in names:
+            self.set_rollup_mark(name)
+
+        self.add_events(BookView, 3)
+        self.add_clicks(2)
+        self.add_clicks(1, loggable=False)
+        got = update_rollups(names=names, batch_size=2)
+        self.assertEqual(got, {'book_view': 3, 'download_click': 2})
+        rollups = self.book_rollups()
+        self.assertEqual(len(rollups), 1)
+        self.assertEqual(rollups[0].views, 3)
+        rollups = self.click_rollups()
+        self.assertEqual(len(rollups), 1)
+        self.assertEqual(rollups[0].clicks, 2)
+
+        # Nothing new to roll up.
+        got = update_rollups(names=names)
+        self.assertEqual(got, {'book_view': 0, 'download_click': 0})
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
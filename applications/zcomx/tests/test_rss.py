@@ -6,12 +6,14 @@ Test suite for zcomx/modules/rss.py
 import io
 import datetime
 import re
+import time
 import unittest
 import urllib.parse
 from xml.sax import saxutils
 from xml.etree import ElementTree as element_tree
 import gluon.contrib.rss2 as rss2
 from gluon import *
+from gluon.cache import CacheInRam
 from applications.zcomx.modules.activity_logs import ActivityLog
 from applications.zcomx.modules.book_pages import BookPage
 from applications.zcomx.modules.book_types import BookType
@@ -20,8 +22,16 @@ from applications.zcomx.modules.creators import (
     AuthUser,
     Creator,
 )
-from applications.zcomx.modules.images import store
+from applications.zcomx.modules.fragment_caches import (
+    FragmentCache,
+    content_version,
+)
+from applications.zcomx.modules.images import (
+    image_version,
+    store,
+)
 from applications.zcomx.modules.rss import (
+    FEED_VERSION_KEY,
     AllRSSChannel,
     BaseRSSChannel,
     BaseRSSEntry,
@@ -30,13 +40,16 @@ from applications.zcomx.modules.rss import (
     CompletedRSSEntry,
     PageAddedRSSEntry,
     RSS2WithAtom,
+    RSSEntryRecords,
     activity_log_as_rss_entry,
+    bump_feed_version,
     channel_from_type,
     entry_class_from_action,
     rss_serializer_with_image,
 )
 from applications.zcomx.modules.tests.helpers import (
     ImageTestCase,
+    QueryRecorder,
     ResizerQuick,
 )
 from applications.zcomx.modules.tests.runner import LocalTestCase
@@ -164,6 +177,56 @@ class TestBaseRSSChannel(WithObjectsTestCase, ImageTestCase):
         channel = BaseRSSChannel()
         self.assertTrue(channel)
 
+    def test__cache_key(self):
+        channel = DubRSSChannel()
+        self.assertEqual(channel.cache_key(), 'rss_feed_DubRSSChannel_0')
+
+        channel = CartoonistRSSChannel(self._creator)
+        self.assertEqual(
+            channel.cache_key(),
+            'rss_feed_CartoonistRSSChannel_{i}'.format(i=self._creator.id)
+        )
+
+    def test__cached_feed(self):
+        self.set_book_page_image()
+        cache_model = CacheInRam(request=current.request)
+        cache_model(FEED_VERSION_KEY, None)
+        fragment_cache = FragmentCache(
+            cache_model=cache_model, version_key=FEED_VERSION_KEY)
+
+        channel = DubRSSChannel()
+        # pylint: disable=protected-access
+        channel._filter_query = (db.activity_log.id == self._activity_log.id)
+        got = channel.cached_feed(fragment_cache=fragment_cache)
+        self.assertEqual(got['description'], 'My dub RSS channel.')
+        self.assertEqual(len(got['entries']), 1)
+
+        # Cached feed is used.
+        channel._filter_query = (db.activity_log.id < 0)
+        got = channel.cached_feed(fragment_cache=fragment_cache)
+        self.assertEqual(len(got['entries']), 1)
+
+        # Bumping the feed version refreshes the feed.
+        bump_feed_version(cache_model=cache_model)
+        got = channel.cached_feed(fragment_cache=fragment_cache)
+        self.assertEqual(len(got['entries']), 0)
+
+        # Feeds are cached keyed on the etag.
+        channel._filter_query = (db.activity_log.id == self._activity_log.id)
+        got = channel.cached_feed(
+            fragment_cache=fragment_cache, etag='"_etag_"')
+        self.assertEqual(len(got['entries']), 1)
+        channel._filter_query = (db.activity_log.id < 0)
+        got = channel.cached_feed(
+            fragment_cache=fragment_cache, etag='"_etag_"')
+        self.assertEqual(len(got['entries']), 1)
+        got = channel.cached_feed(
+            fragment_cache=fragment_cache, etag='"_etag_2_"')
+        self.assertEqual(len(got['entries']), 0)
+
+        cache_model(FEED_VERSION_KEY, None)
+        cache_model.clear(regex='^fragment_')
+
     def test__description(self):
         channel = BaseRSSChannel()
         self.assertRaises(NotImplementedError, channel.description)
@@ -197,11 +260,12 @@ class TestBaseRSSChannel(WithObjectsTestCase, ImageTestCase):
 
         enclosure = entry['enclosure']
         self.assertTrue(isinstance(enclosure, rss2.Enclosure))
-        fmt = 'http://zco.mx/images/download/{i}?size=web'
+        fmt = 'http://zco.mx/images/download/{i}?size=web&v={v}'
         self.assertEqual(
             enclosure.url,
             fmt.format(
-                i=urllib.parse.quote(self._book_page.image)
+                i=urllib.parse.quote(self._book_page.image),
+                v=image_version(self._book_page.image, size='web'),
             )
         )
         self.assertEqual(enclosure.length, 14727)
@@ -314,6 +378,27 @@ class TestBaseRSSChannel(WithObjectsTestCase, ImageTestCase):
             '/path/to/channel'
         )
 
+    def test__last_activity(self):
+        channel = DubRSSChannel()
+        # pylint: disable=protected-access
+        channel._filter_query = (db.activity_log.id < 0)
+        got = channel.last_activity()
+        self.assertEqual(got, {'count': 0, 'id': None, 'time_stamp': None})
+
+        activity_log_2 = self.add(ActivityLog, dict(
+            book_id=self._book.id,
+            book_page_ids=[self._book_page_2.id],
+            action='page added',
+            time_stamp=datetime.datetime(2000, 1, 1, 0, 0, 0),
+        ))
+        channel._filter_query = \
+            (db.activity_log.book_id == self._book.id)
+        got = channel.last_activity()
+        self.assertEqual(got.count, 2)
+        self.assertEqual(got.id, activity_log_2.id)
+        self.assertEqual(
+            got.time_stamp, datetime.datetime(2000, 1, 1, 0, 0, 0))
+
     def test__link(self):
         channel = BaseRSSChannel()
         self.assertRaises(NotImplementedError, channel.link)
@@ -322,6 +407,39 @@ class TestBaseRSSChannel(WithObjectsTestCase, ImageTestCase):
         channel = BaseRSSChannel()
         self.assertRaises(NotImplementedError, channel.title)
 
+    def test__validators(self):
+        channel = DubRSSChannel()
+        # pylint: disable=protected-access
+        channel._filter_query = (db.activity_log.id < 0)
+        etag, last_modified = channel.validators()
+        self.assertEqual(etag, '"rss_feed_DubRSSChannel_0-0-0-0"')
+        self.assertEqual(last_modified, 0)
+
+        channel._filter_query = (db.activity_log.id == self._activity_log.id)
+        etag, last_modified = channel.validators()
+        self.assertEqual(
+            last_modified,
+            time.mktime(self._activity_log_time_stamp.timetuple())
+        )
+        self.assertEqual(
+            etag,
+            '"rss_feed_DubRSSChannel_0-{i:x}-1-{t:x}"'.format(
+                i=self._activity_log.id, t=int(last_modified))
+        )
+
+        # New activity changes the etag.
+        activity_log_2 = self.add(ActivityLog, dict(
+            book_id=self._book.id,
+            book_page_ids=[self._book_page_2.id],
+            action='page added',
+            time_stamp=self._activity_log_time_stamp,
+        ))
+        channel._filter_query = (db.activity_log.id.belongs(
+            [self._activity_log.id, activity_log_2.id]))
+        etag_2, last_modified_2 = channel.validators()
+        self.assertNotEqual(etag_2, etag)
+        self.assertEqual(last_modified_2, last_modified)
+
 
 class TestBaseRSSEntry(WithObjectsTestCase, ImageTestCase):
     def test____init__(self):
@@ -369,11 +487,12 @@ class TestBaseRSSEntry(WithObjectsTestCase, ImageTestCase):
         )
         enclosure = entry.enclosure()
         self.assertTrue(isinstance(enclosure, rss2.Enclosure))
-        fmt = 'http://zco.mx/images/download/{i}?size=web'
+        fmt = 'http://zco.mx/images/download/{i}?size=web&v={v}'
         self.assertEqual(
             enclosure.url,
             fmt.format(
-                i=urllib.parse.quote(self._book_page.image)
+                i=urllib.parse.quote(self._book_page.image),
+                v=image_version(self._book_page.image, size='web'),
             )
         )
         self.assertEqual(enclosure.length, 14727)
@@ -722,6 +841,89 @@ class TestRSS2WithAtom(LocalTestCase):
         )
 
 
+class TestRSSEntryRecords(WithObjectsTestCase):
+
+    def test____init__(self):
+        records = RSSEntryRecords()
+        self.assertEqual(records.books, {})
+        self.assertEqual(records.creators, {})
+        self.assertEqual(records.creator_names, {})
+
+    def test__book(self):
+        records = RSSEntryRecords()
+        self.assertEqual(records.book(self._book.id), self._book)
+        self.assertTrue(self._book.id in records.books)
+        self.assertRaises(LookupError, records.book, -1)
+
+    def test__book_pages(self):
+        records = RSSEntryRecords()
+        ids = [self._book_page_2.id, -1, self._book_page.id]
+        got = records.book_pages(ids)
+        self.assertEqual(
+            [x.id for x in got],
+            [self._book_page_2.id, self._book_page.id]
+        )
+        self.assertTrue(isinstance(got[0], BookPage))
+
+        # Pages are loaded once.
+        with QueryRecorder.recording() as commands:
+            got = records.book_pages(ids)
+        self.assertEqual(len(commands), 0)
+        self.assertEqual(len(got), 2)
+
+    def test__creator(self):
+        records = RSSEntryRecords()
+        self.assertEqual(records.creator(self._creator.id), self._creator)
+        self.assertTrue(self._creator.id in records.creators)
+
+    def test__creator_name(self):
+        records = RSSEntryRecords()
+        self.assertEqual(records.creator_name(self._creator), 'First Last')
+
+        records = RSSEntryRecords(creator_names={self._creator.id: 'Cached'})
+        self.assertEqual(records.creator_name(self._creator), 'Cached')
+
+    def test__from_activity_logs(self):
+        activity_log_2 = self.add(ActivityLog, dict(
+            book_id=self._book.id,
+            book_page_ids=[self._book_page_2.id, -1],
+            action='page added',
+            time_stamp=self._activity_log_time_stamp,
+        ))
+
+        with QueryRecorder.recording() as commands:
+            records = RSSEntryRecords.from_activity_logs(
+                [self._activity_log, activity_log_2])
+        # book pages, books, creators
+        self.assertEqual(len(commands), 3)
+
+        self.assertEqual(list(records.books.keys()), [self._book.id])
+        self.assertEqual(list(records.creators.keys()), [self._creator.id])
+        self.assertEqual(
+            records.creator_names, {self._creator.id: 'First Last'})
+
+        with QueryRecorder.recording() as commands:
+            got = records.book_pages(
+                [self._book_page.id, self._book_page_2.id, -1])
+        self.assertEqual(len(commands), 0)
+        self.assertEqual(
+            [x.id for x in got],
+            [self._book_page.id, self._book_page_2.id]
+        )
+
+        records = RSSEntryRecords.from_activity_logs([])
+        self.assertEqual(records.books, {})
+
+    def test__load_book_pages(self):
+        got = RSSEntryRecords.load_book_pages(
+            [self._book_page.id, -1])
+        self.assertEqual(sorted(got.keys()), sorted([self._book_page.id, -1]))
+        self.assertEqual(got[self._book_page.id].id, self._book_page.id)
+        self.assertEqual(got[-1], None)
+
+        self.assertEqual(RSSEntryRecords.load_book_pages([]), {})
+
+
 class TestFunctions(WithObjectsTestCase):
 
     def test__activity_log_as_rss_entry(self):
@@ -751,6 +953,25 @@ class TestFunctions(WithObjectsTestCase):
 
         self.assertEqual(got.book_page_ids, old_book_page_ids)
 
+        # Test with records.
+        records = RSSEntryRecords.from_activity_logs([self._activity_log])
+        got = activity_log_as_rss_entry(
+            ActivityLog(self._activity_log.as_dict()), records=records)
+        self.assertEqual(got.book_page_ids, old_book_page_ids)
+        self.assertEqual(got.records, records)
+
+    def test__bump_feed_version(self):
+        cache_model = CacheInRam(request=current.request)
+        cache_model(FEED_VERSION_KEY, None)
+        self.assertEqual(bump_feed_version(cache_model=cache_model), 1)
+        self.assertEqual(bump_feed_version(cache_model=cache_model), 2)
+        self.assertEqual(
+            content_version(
+                cache_model=cache_model, version_key=FEED_VERSION_KEY),
+            2
+        )
+        cache_model(FEED_VERSION_KEY, None)
+
     def test__channel_from_type(self):
         # Invalid channel
         self.assertRaises(SyntaxError, channel_from_type, '_fake_')
@@ -9,6 +9,7 @@ import urllib.parse
 from bs4 import BeautifulSoup
 from pydal.objects import Row
 from gluon import *
+from gluon.cache import CacheInRam
 from gluon.storage import Storage
 from applications.zcomx.modules.book_pages import BookPage
 from applications.zcomx.modules.books import (
@@ -23,6 +24,8 @@ from applications.zcomx.modules.creators import (
     Creator,
     creator_name,
 )
+from applications.zcomx.modules.fragment_caches import FragmentCache
+from applications.zcomx.modules.images import image_version
 from applications.zcomx.modules.search import (
     AlphaPaginator,
     BookTile,
@@ -40,6 +43,7 @@ from applications.zcomx.modules.search import (
     OngoingGrid,
     SearchGrid,
     Tile,
+    TileRecords,
     book_contribute_button,
     complete_link,
     creator_contribute_button,
@@ -55,6 +59,7 @@ from applications.zcomx.modules.search import (
     read_link,
     upload_link,
 )
+from applications.zcomx.modules.tests.helpers import QueryRecorder
 from applications.zcomx.modules.tests.runner import LocalTestCase
 from applications.zcomx.modules.zco import BOOK_STATUS_ACTIVE
 # pylint: disable=missing-docstring
@@ -78,9 +83,13 @@ class SubGrid(Grid):
         'book_contribute',
     ]
 
-    def __init__(self, form_grid_args=None):
+    def __init__(self, form_grid_args=None, fragment_cache=None):
         """Constructor"""
-        Grid.__init__(self, form_grid_args=form_grid_args)
+        Grid.__init__(
+            self,
+            form_grid_args=form_grid_args,
+            fragment_cache=fragment_cache
+        )
 
     def visible_fields(self):
         db = self.db
@@ -210,7 +219,9 @@ class TestGrid(LocalTestCase):
         self.assertEqual(grid._attributes['field'], 'name')
         self.assertTrue('header_label' in grid._attributes)
 
-        self.assertTrue(grid.form_grid)
+        # Tile view selects rows directly, without SQLFORM.grid.
+        self.assertEqual(grid.viewby, 'tile')
+        self.assertEqual(grid.form_grid, None)
         query = (db.book.status == BOOK_STATUS_ACTIVE)
         rows = db(query).select(
             db.book.id,
@@ -218,7 +229,20 @@ class TestGrid(LocalTestCase):
                 db.creator.on(db.book.creator_id == db.creator.id)
             ]
         )
-        self.assertEqual(len(grid.form_grid.rows), len(rows))
+        self.assertEqual(len(grid.rows()), len(rows))
+        self.assertEqual(grid._tile_count, len(rows))
+
+        # List view uses SQLFORM.grid.
+        env = globals()
+        request = env['request']
+        request.vars.view = 'list'
+        try:
+            grid = SubGrid(form_grid_args=args)
+        finally:
+            del request.vars['view']
+        self.assertEqual(grid.viewby, 'list')
+        self.assertTrue(grid.form_grid)
+        self.assertEqual(len(grid.rows()), len(rows))
 
     def test_class_factory(self):
         tests = [
@@ -242,6 +266,22 @@ class TestGrid(LocalTestCase):
         grid = SubGrid()
         self.assertEqual(grid.filters(), [])
 
+    def test__fragment_key(self):
+        env = globals()
+        request = env['request']
+        for key in list(request.vars.keys()):
+            del request.vars[key]
+        grid = SubGrid()
+        key = grid.fragment_key()
+        self.assertTrue(key.startswith('SubGrid_'))
+        self.assertEqual(SubGrid().fragment_key(), key)
+
+        request.vars.page = '2'
+        try:
+            self.assertNotEqual(SubGrid().fragment_key(), key)
+        finally:
+            del request.vars['page']
+
     def test__groupby(self):
         grid = SubGrid()
         self.assertEqual(grid.groupby(), db.book.id)
@@ -297,6 +337,24 @@ class TestGrid(LocalTestCase):
 
         SubGrid._attributes = save_attributes
 
+    def test__numeric_paginator(self):
+        # All rows on one page
+        grid = SubGrid(form_grid_args={'paginate': 999999})
+        self.assertEqual(grid.numeric_paginator(), None)
+
+        grid = SubGrid(form_grid_args={'paginate': 1})
+        # pylint: disable=protected-access
+        self.assertTrue(grid._tile_count > 1)
+        paginator = grid.numeric_paginator()
+        soup = BeautifulSoup(str(paginator), 'html.parser')
+        div = soup.div
+        self.assertEqual(div['class'], ['web2py_paginator', 'grid_header'])
+        lis = div.ul.find_all('li')
+        self.assertEqual(lis[0]['class'], ['current'])
+        self.assertEqual(lis[0].a.string, '1')
+        self.assertEqual(lis[1].a.string, '2')
+        self.assertTrue('page=2' in lis[1].a['href'])
+
     def test__order_fields(self):
         grid = SubGrid()
         order_fields = grid.order_fields()
@@ -326,6 +384,26 @@ class TestGrid(LocalTestCase):
 
         grid._attributes['order_dir'] = 'DESC'          # reset
 
+    def test__page_no(self):
+        env = globals()
+        request = env['request']
+        grid = SubGrid()
+        tests = [
+            # (page var, expect)
+            (None, 1),
+            ('', 1),
+            ('3', 3),
+            ('0', 1),
+            ('-2', 1),
+            ('abc', 1),
+        ]
+        try:
+            for t in tests:
+                request.vars.page = t[0]
+                self.assertEqual(grid.page_no(), t[1])
+        finally:
+            del request.vars['page']
+
     def test__render(self):
         grid = SubGrid()
         grid_div = grid.render()
@@ -337,6 +415,41 @@ class TestGrid(LocalTestCase):
         div_2 = div.div
         self.assertEqual(div_2['class'], ['row', 'tile_view'])
 
+        # Test the number of queries doesn't depend on the number of tiles.
+        grid = SubGrid()
+        self.assertTrue(len(grid.rows()) > 1)
+        with QueryRecorder.recording() as commands:
+            grid.render()
+        # books, first pages, creators, book types
+        self.assertTrue(len(commands) <= 4)
+
+        # Test fragment cache.
+        env = globals()
+        request = env['request']
+        for key in list(request.vars.keys()):
+            del request.vars[key]
+        cache_model = CacheInRam(request=request)
+        cache_model.clear(regex='^fragment_')
+        fragment_cache = FragmentCache(cache_model=cache_model)
+        grid = SubGrid(fragment_cache=fragment_cache)
+        html = grid.render().xml()
+        self.assertTrue('tile_view' in str(html))
+
+        grid = SubGrid(fragment_cache=fragment_cache)
+        with QueryRecorder.recording() as commands:
+            self.assertEqual(grid.render().xml(), html)
+        self.assertEqual(len(commands), 0)
+        self.assertEqual(grid.rows(), [])
+
+        # Unsupported request vars, cache is not used.
+        request.vars.kw = 'abc'
+        try:
+            grid = SubGrid(fragment_cache=fragment_cache)
+            self.assertEqual(grid.fragment_cache, None)
+        finally:
+            del request.vars['kw']
+        cache_model.clear(regex='^fragment_')
+
     def test__rows(self):
         grid = SubGrid()
         rows = grid.rows()
@@ -344,7 +457,7 @@ class TestGrid(LocalTestCase):
         self.assertEqual(len(rows), grid._paginate)
         self.assertEqual(
             sorted(rows[0].keys()),
-            ['auth_user', 'book', 'creator', 'creator_grid_v']
+            ['auth_user', 'book', 'creator', 'creator_grid']
         )
 
     def test__set_field(self):
@@ -577,10 +690,10 @@ class TestCartoonistsGrid(LocalTestCase):
             grid.visible_fields(),
             [
                 db.auth_user.name,
-                db.creator_grid_v.completed,
-                db.creator_grid_v.ongoing,
-                db.creator_grid_v.views,
-                db.creator_grid_v.downloads,
+                db.creator_grid.completed,
+                db.creator_grid.ongoing,
+                db.creator_grid.views,
+                db.creator_grid.downloads,
             ]
         )
 
@@ -808,7 +921,11 @@ class TestMoniesBookTile(TileTestCase):
         first_image = urllib.parse.quote(first.image)
         self.assertEqual(
             img['src'],
-            '/images/download/{i}?cache=1&size=web'.format(i=first_image))
+            '/images/download/{i}?cache=1&size=web&v={v}'.format(
+                i=first_image,
+                v=image_version(first.image, size='web'),
+            )
+        )
 
         # Test: can contribute = False
         self._row.creator.paypal_email = None
@@ -829,7 +946,10 @@ class TestMoniesBookTile(TileTestCase):
         first_image = urllib.parse.quote(first.image)
         self.assertEqual(
             img['src'],
-            '/images/download/{i}?cache=1&size=web'.format(i=first_image)
+            '/images/download/{i}?cache=1&size=web&v={v}'.format(
+                i=first_image,
+                v=image_version(first.image, size='web'),
+            )
         )
 
         # Restore
@@ -901,6 +1021,50 @@ class TestSearchGrid(LocalTestCase):
         request.vars.kw = 'keyword'
         self.assertEqual(len(grid.filters()), 1)
 
+        # Search index results
+        # pylint: disable=protected-access
+        grid._ranked_book_ids = [3, 1]
+        queries = grid.filters()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(str(queries[0]), '("book"."id" IN (3,1))')
+
+        grid._ranked_book_ids = []
+        queries = grid.filters()
+        self.assertEqual(str(queries[0]), '("book"."id" < 0)')
+        del request.vars['kw']
+
+    def test__orderby(self):
+        env = globals()
+        request = env['request']
+        grid = SearchGrid()
+        self.assertEqual(
+            [str(x) for x in grid.orderby()],
+            [
+                '"book"."page_added_on" DESC',
+                '"book"."number" DESC',
+                '"book"."id" DESC',
+            ]
+        )
+
+        request.vars.kw = 'keyword'
+        # pylint: disable=protected-access
+        grid._ranked_book_ids = [3, 1]
+        self.assertEqual(
+            grid.orderby(),
+            'CASE book.id WHEN 3 THEN 0 WHEN 1 THEN 1 ELSE 2 END'
+        )
+        del request.vars['kw']
+
+    def test__ranked_book_ids(self):
+        env = globals()
+        request = env['request']
+        request.vars.kw = 'keyword'
+        grid = SearchGrid()
+        # pylint: disable=protected-access
+        grid._ranked_book_ids = [3, 1]
+        self.assertEqual(grid.ranked_book_ids(), [3, 1])
+        del request.vars['kw']
+
     def test__visible_fields(self):
         grid = SearchGrid()
         self.assertEqual(
@@ -919,6 +1083,17 @@ class TestTile(TileTestCase):
     def test____init__(self):
         tile = Tile(self._value, self._row)
         self.assertTrue(tile)
+        self.assertTrue(isinstance(tile.records, TileRecords))
+
+    def test__can_receive_contributions(self):
+        tile = Tile(self._value, self._row)
+        self.assertFalse(tile.can_receive_contributions())
+
+        creator = Row(self._row.creator.as_dict())
+        creator.paypal_email = 'test@example.com'
+        row = Row({'book': self._row.book, 'creator': creator})
+        tile = Tile(self._value, row)
+        self.assertTrue(tile.can_receive_contributions())
 
     def test__contribute_link(self):
         tile = Tile(self._value, self._row)
@@ -1013,6 +1188,24 @@ class TestBookTile(TileTestCase):
     def test____init__(self):
         tile = BookTile(self._value, self._row)
         self.assertTrue(tile)
+        self.assertEqual(tile.book.id, self._row.book.id)
+
+        records = TileRecords.from_rows([self._row])
+        tile = BookTile(self._value, self._row, records=records)
+        self.assertTrue(tile.book is records.books[self._row.book.id])
+
+    def test__creator(self):
+        tile = BookTile(self._value, self._row)
+        self.assertEqual(tile.creator.id, self._row.creator.id)
+
+    def test__first_page(self):
+        tile = BookTile(self._value, self._row)
+        self.assertEqual(tile.first_page(), None)
+
+        records = TileRecords.from_rows([self._row])
+        tile = BookTile(self._value, self._row, records=records)
+        first_page = get_page(tile.book, page_no='first')
+        self.assertEqual(tile.first_page().id, first_page.id)
 
     def test__contribute_link(self):
         tile = BookTile(self._value, self._row)
@@ -1192,7 +1385,10 @@ class TestBookTile(TileTestCase):
         self.assertEqual(img['alt'], '')
         self.assertEqual(
             img['src'],
-            '/images/download/{i}?cache=1&size=web'.format(i=first_image)
+            '/images/download/{i}?cache=1&size=web&v={v}'.format(
+                i=first_image,
+                v=image_version(first.image, size='web'),
+            )
         )
 
     def test_render(self):
@@ -1571,6 +1767,50 @@ class TestCartoonistTile(TileTestCase):
         self.assertEqual(anchor.string, self._row.auth_user.name)
 
 
+class TestTileRecords(TileTestCase):
+
+    def test____init__(self):
+        records = TileRecords()
+        self.assertEqual(records.books, {})
+        self.assertEqual(records.creators, {})
+        self.assertEqual(records.first_pages, {})
+
+    def test__book(self):
+        records = TileRecords()
+        book = records.book(self._row.book.id)
+        self.assertEqual(book.id, self._row.book.id)
+        self.assertTrue(records.book(self._row.book.id) is book)
+
+    def test__book_type(self):
+        records = TileRecords()
+        book_type = records.book_type(self._row.book.book_type_id)
+        self.assertEqual(book_type.id, self._row.book.book_type_id)
+        self.assertEqual(records.book_type(-1), None)
+
+    def test__book_types(self):
+        book_types = TileRecords.book_types()
+        self.assertEqual(len(book_types), db(db.book_type).count())
+
+    def test__creator(self):
+        records = TileRecords()
+        creator = records.creator(self._row.creator.id)
+        self.assertEqual(creator.id, self._row.creator.id)
+        self.assertTrue(records.creator(self._row.creator.id) is creator)
+
+    def test__from_rows(self):
+        records = TileRecords.from_rows([])
+        self.assertEqual(records.books, {})
+
+        records = TileRecords.from_rows([self._row])
+        self.assertEqual(list(records.books.keys()), [self._row.book.id])
+        self.assertEqual(
+            list(records.creators.keys()), [self._row.creator.id])
+        self.assertEqual(
+            list(records.first_pages.keys()), [self._row.book.id])
+        self.assertEqual(
+            records.first_pages[self._row.book.id].page_no, 1)
+
+
 class TestFunctions(LocalTestCase):
     _auth_user = None
     _book = None
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/search_indexes.py
+"""
+import os
+import shutil
+import unittest
+from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.creators import (
+    AuthUser,
+    Creator,
+)
+from applications.zcomx.modules.search_indexes import (
+    SearchIndex,
+    match_expression,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class WithIndexTestCase(LocalTestCase):
+
+    _tmp_dir = '/tmp/test_search_indexes'
+    _auth_user = None
+    _book = None
+    _book_2 = None
+    _creator = None
+    _filename = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        if not os.path.exists(self._tmp_dir):
+            os.makedirs(self._tmp_dir)
+        self._filename = os.path.join(self._tmp_dir, 'search_index.sqlite')
+
+        self._auth_user = self.add(AuthUser, dict(name='Zyxwvu Artist'))
+        self._creator = self.add(Creator, dict(
+            auth_user_id=self._auth_user.id,
+            email='test_search_indexes@example.com',
+        ))
+        self._book = self.add(Book, dict(
+            name='Qwertyuiop Adventures',
+            creator_id=self._creator.id,
+            description='A story about asdfghjkl mountains.',
+            rating=0,
+            views=0,
+        ))
+        self._book_2 = self.add(Book, dict(
+            name='Asdfghjkl Tales',
+            creator_id=self._creator.id,
+            description='',
+            rating=5,
+            views=1000,
+        ))
+
+    def tearDown(self):
+        if os.path.exists(self._tmp_dir):
+            shutil.rmtree(self._tmp_dir)
+
+    def index(self):
+        index = SearchIndex(filename=self._filename)
+        index.rebuild()
+        return index
+
+
+class TestSearchIndex(WithIndexTestCase):
+
+    def test____init__(self):
+        index = SearchIndex()
+        self.assertTrue(
+            index.filename.endswith('databases/search_index.sqlite'))
+        index = SearchIndex(filename=self._filename)
+        self.assertEqual(index.filename, self._filename)
+
+    def test__book_data(self):
+        index = SearchIndex(filename=self._filename)
+        row = index.book_rows(book_ids=[self._book.id]).first()
+        data = index.book_data(row)
+        self.assertEqual(len(data), len(index.columns))
+        self.assertEqual(data[0], 'Qwertyuiop Adventures')
+        self.assertEqual(data[1], 'Zyxwvu Artist')
+        self.assertEqual(data[2], 'A story about asdfghjkl mountains.')
+
+    def test__book_rows(self):
+        index = SearchIndex(filename=self._filename)
+        rows = index.book_rows(book_ids=[self._book.id, self._book_2.id])
+        self.assertEqual(
+            sorted(x.book.id for x in rows),
+            sorted([self._book.id, self._book_2.id])
+        )
+        self.assertEqual(rows.first().auth_user.name, 'Zyxwvu Artist')
+
+        rows = index.book_rows()
+        self.assertEqual(len(rows), db(db.book).count())
+
+    def test__exists(self):
+        index = SearchIndex(filename=self._filename)
+        self.assertFalse(index.exists())
+        index.rebuild()
+        self.assertTrue(index.exists())
+
+    def test__ranked_book_ids(self):
+        index = self.index()
+        # Both books match, book 2 is more popular.
+        self.assertEqual(
+            index.ranked_book_ids('asdfghjkl'),
+            [self._book_2.id, self._book.id]
+        )
+        self.assertEqual(index.ranked_book_ids('qwertyuiop'), [self._book.id])
+        self.assertEqual(index.ranked_book_ids('_no_match_'), [])
+
+    def test__rebuild(self):
+        index = SearchIndex(filename=self._filename)
+        index.rebuild()
+        self.assertTrue(os.path.exists(self._filename))
+        self.assertFalse(os.path.exists(self._filename + '.tmp'))
+        got = [x[0] for x in index.search('qwertyuiop')]
+        self.assertEqual(got, [self._book.id])
+
+    def test__search(self):
+        index = SearchIndex(filename=self._filename)
+        # No index
+        self.assertEqual(index.search('qwertyuiop'), [])
+
+        index.rebuild()
+        # Name matches rank higher than description matches.
+        got = index.search('asdfghjkl')
+        self.assertEqual([x[0] for x in got], [self._book_2.id, self._book.id])
+        self.assertTrue(got[0][1] > got[1][1] > 0)
+
+        # Prefix and creator name match
+        got = index.search('qwerty zyxwvu')
+        self.assertEqual([x[0] for x in got], [self._book.id])
+
+        self.assertEqual(index.search(''), [])
+        self.assertEqual(index.search('asdfghjkl', limit=1)[0][0],
+                         self._book_2.id)
+
+    def test__update(self):
+        index = SearchIndex(filename=self._filename)
+        # No index, index is rebuilt.
+        index.update(book_ids=[self._book.id])
+        self.assertTrue(index.exists())
+
+        self._book = Book.from_updated(
+            self._book, dict(name='Poiuytrewq Adventures'))
+        self.assertEqual(
+            [x[0] for x in index.search('poiuytrewq')], [])
+        index.update(book_ids=[self._book.id])
+        self.assertEqual(
+            [x[0] for x in index.search('poiuytrewq')], [self._book.id])
+        self.assertEqual(index.search('qwertyuiop'), [])
+
+        # Creator name change
+        AuthUser.from_updated(self._auth_user, dict(name='Mnbvcx Artist'))
+        index.update(creator_ids=[self._creator.id])
+        self.assertEqual(
+            sorted(x[0] for x in index.search('mnbvcx')),
+            sorted([self._book.id, self._book_2.id])
+        )
+
+        # Deleted book
+        book_id = self._book_2.id
+        self._book_2.delete()
+        self._objects.remove(self._book_2)
+        index.update(book_ids=[book_id])
+        self.assertEqual(
+            [x[0] for x in index.search('mnbvcx')], [self._book.id])
+
+
+class TestFunctions(LocalTestCase):
+
+    def test__match_expression(self):
+        tests = [
+            # (keyword, expect)
+            (None, ''),
+            ('', ''),
+            ('  ', ''),
+            ('abc', '"abc"*'),
+            ('Abc Def', '"abc"* "def"*'),
+            ('"abc" OR (def*)', '"abc"* "or"* "def"*'),
+            ("Fred's", '"fred"* "s"*'),
+        ]
+        for t in tests:
+            self.assertEqual(match_expression(t[0]), t[1])
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
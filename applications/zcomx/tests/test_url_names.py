@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test suite for zcomx/modules/url_names.py
+"""
+import time
+import unittest
+from applications.zcomx.modules.books import Book
+from applications.zcomx.modules.creators import Creator
+from applications.zcomx.modules.url_names import (
+    DEFAULT_TIME_EXPIRE,
+    MAX_ENTRIES,
+    URL_NAME_CACHE,
+    UrlNameCache,
+)
+from applications.zcomx.modules.tests.runner import LocalTestCase
+# pylint: disable=missing-docstring
+
+
+class WithObjectsTestCase(LocalTestCase):
+
+    _book = None
+    _creator = None
+
+    # pylint: disable=invalid-name
+    def setUp(self):
+        self._creator = self.add(Creator, dict(
+            email='test_url_names@example.com',
+            name_for_url='TestUrlNames',
+        ))
+        self._book = self.add(Book, dict(
+            name='Test Url Names',
+            creator_id=self._creator.id,
+            name_for_url='TestUrlNames-001',
+        ))
+
+
+class TestUrlNameCache(WithObjectsTestCase):
+
+    def test____init__(self):
+        cache = UrlNameCache()
+        self.assertEqual(cache.time_expire, DEFAULT_TIME_EXPIRE)
+        self.assertEqual(cache.max_entries, MAX_ENTRIES)
+        self.assertEqual(cache.metrics()['size'], 0)
+
+        cache = UrlNameCache(time_expire=5, max_entries=10)
+        self.assertEqual(cache.time_expire, 5)
+        self.assertEqual(cache.max_entries, 10)
+
+    def test__book_creator_id(self):
+        cache = UrlNameCache()
+        self.assertEqual(
+            cache.book_creator_id(self._book.id), self._creator.id)
+        self.assertEqual(cache.book_creator_id(-1), None)
+
+    def test__book_id(self):
+        cache = UrlNameCache()
+        got = cache.book_id(self._creator.id, 'TestUrlNames-001')
+        self.assertEqual(got, self._book.id)
+        self.assertEqual(cache.metrics()['misses'], 1)
+
+        # Case insensitive, from cache
+        got = cache.book_id(self._creator.id, 'testurlnames-001')
+        self.assertEqual(got, self._book.id)
+        self.assertEqual(cache.metrics()['hits'], 1)
+
+        self.assertEqual(cache.book_id(-1, 'TestUrlNames-001'), None)
+        self.assertEqual(cache.book_id(self._creator.id, '_fake_'), None)
+        self.assertEqual(cache.book_id(self._creator.id, None), None)
+
+    def test__book_name(self):
+        cache = UrlNameCache()
+        self.assertEqual(cache.book_name(self._book.id), 'TestUrlNames-001')
+        self.assertEqual(cache.book_name(-1), None)
+
+    def test__clear(self):
+        cache = UrlNameCache()
+        cache.creator_name(self._creator.id)
+        cache.creator_name(self._creator.id)
+        cache.clear()
+        self.assertEqual(
+            cache.metrics(),
+            {'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'size': 0}
+        )
+
+    def test__creator_id(self):
+        cache = UrlNameCache()
+        self.assertEqual(cache.creator_id('TestUrlNames'), self._creator.id)
+        self.assertEqual(cache.creator_id('testurlnames'), self._creator.id)
+        self.assertEqual(cache.metrics()['hits'], 1)
+        self.assertEqual(cache.creator_id('_fake_'), None)
+
+    def test__creator_name(self):
+        cache = UrlNameCache()
+        self.assertEqual(cache.creator_name(self._creator.id), 'TestUrlNames')
+        self.assertEqual(cache.creator_name(self._creator.id), 'TestUrlNames')
+        self.assertEqual(cache.metrics()['misses'], 1)
+        self.assertEqual(cache.metrics()['hits'], 1)
+        self.assertEqual(cache.creator_name(None), None)
+
+        # Expired entries are reloaded.
+        cache = UrlNameCache(time_expire=-1)
+        cache.creator_name(self._creator.id)
+        cache.creator_name(self._creator.id)
+        self.assertEqual(cache.metrics()['misses'], 2)
+
+    def test__invalidate(self):
+        cache = UrlNameCache()
+        cache.creator_name(self._creator.id)
+        self._creator = Creator.from_updated(
+            self._creator, dict(name_for_url='TestUrlNames2'))
+        self.assertEqual(cache.creator_name(self._creator.id), 'TestUrlNames')
+
+        cache.invalidate('creator', self._creator.id)
+        self.assertEqual(
+            cache.creator_name(self._creator.id), 'TestUrlNames2')
+        self.assertEqual(cache.creator_id('TestUrlNames2'), self._creator.id)
+        self.assertEqual(cache.creator_id('TestUrlNames'), None)
+
+        # Not cached
+        cache.invalidate('book', -1)
+
+    def test__metrics(self):
+        cache = UrlNameCache()
+        self.assertEqual(
+            cache.metrics(),
+            {'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'size': 0}
+        )
+        cache.book_name(self._book.id)
+        cache.book_name(self._book.id)
+        cache.book_name(self._book.id)
+        cache.book_name(self._book.id)
+        self.assertEqual(
+            cache.metrics(),
+            {'hits': 3, 'misses': 1, 'hit_ratio': 0.75, 'size': 1}
+        )
+
+    def test__record_from_name(self):
+        cache = UrlNameCache()
+        got = cache.record_from_name(Creator, 'testurlnames')
+        self.assertEqual(got, self._creator)
+        got = cache.record_from_name(
+            Book, 'TestUrlNames-001', creator_id=self._creator.id)
+        self.assertEqual(got, self._book)
+
+        self.assertEqual(cache.record_from_name(Creator, '_fake_'), None)
+        self.assertEqual(
+            cache.record_from_name(Book, 'TestUrlNames-001', creator_id=-1),
+            None
+        )
+
+        # Renamed in another process, the cached name is stale.
+        self._book = Book.from_updated(
+            self._book, dict(name_for_url='TestUrlNames-002'))
+        got = cache.record_from_name(
+            Book, 'TestUrlNames-001', creator_id=self._creator.id)
+        self.assertEqual(got, None)
+        got = cache.record_from_name(
+            Book, 'TestUrlNames-002', creator_id=self._creator.id)
+        self.assertEqual(got, self._book)
+
+    def test__set(self):
+        cache = UrlNameCache(max_entries=2)
+        cache.set('creator', -1, 'Fake')
+        cache.set('book', -2, 'FakeBook', creator_id=-1)
+        self.assertEqual(cache.creator_id('fake'), -1)
+        self.assertEqual(cache.book_id(-1, 'fakebook'), -2)
+        self.assertEqual(cache.metrics()['size'], 2)
+
+        # Replacing an entry removes the old name.
+        cache.set('creator', -1, 'Fake2')
+        self.assertEqual(cache.creator_id('fake2'), -1)
+        self.assertEqual(cache.metrics()['size'], 2)
+
+        # Full cache is cleared.
+        cache.set('creator', -3, 'Fake3')
+        self.assertEqual(cache.metrics()['size'], 1)
+
+        cache = UrlNameCache(time_expire=60)
+        before = time.time()
+        cache.set('creator', -1, 'Fake')
+        # pylint: disable=protected-access
+        expires = cache._by_id[('creator', -1)][2]
+        self.assertTrue(before + 60 <= expires <= time.time() + 60)
+
+
+class TestConstants(LocalTestCase):
+
+    def test_constants(self):
+        self.assertTrue(isinstance(URL_NAME_CACHE, UrlNameCache))
+
+
+def setUpModule():
+    """Set up web2py environment."""
+    # pylint: disable=invalid-name
+    LocalTestCase.set_env(globals())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,15 +7,82 @@ import unittest
 from gluon import *
 from gluon.globals import Request
 from applications.zcomx.modules.user_agents import (
+    BOT_VERDICT_CACHE,
+    BotVerdictCache,
+    MAX_ENTRIES,
     USER_AGENTS,
+    classify,
     is_bot,
 )
 from applications.zcomx.modules.tests.runner import LocalTestCase
 # pylint: disable=missing-docstring
 
 
+class TestBotVerdictCache(LocalTestCase):
+
+    def test____init__(self):
+        cache = BotVerdictCache()
+        self.assertEqual(cache.max_entries, MAX_ENTRIES)
+        self.assertEqual(cache.metrics()['size'], 0)
+
+    def test__clear(self):
+        cache = BotVerdictCache()
+        cache.verdict(USER_AGENTS.bot)
+        cache.verdict(USER_AGENTS.bot)
+        cache.clear()
+        self.assertEqual(
+            cache.metrics(),
+            {'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'size': 0}
+        )
+
+    def test__metrics(self):
+        cache = BotVerdictCache()
+        cache.verdict(USER_AGENTS.bot)
+        cache.verdict(USER_AGENTS.bot)
+        cache.verdict(USER_AGENTS.bot)
+        cache.verdict(USER_AGENTS.non_bot)
+        self.assertEqual(
+            cache.metrics(),
+            {'hits': 2, 'misses': 2, 'hit_ratio': 0.5, 'size': 2}
+        )
+
+    def test__verdict(self):
+        cache = BotVerdictCache(max_entries=2)
+        self.assertEqual(cache.verdict(USER_AGENTS.bot), True)
+        self.assertEqual(cache.verdict(USER_AGENTS.non_bot), False)
+        self.assertEqual(cache.verdict(None), None)
+        self.assertEqual(cache.metrics()['size'], 2)
+        self.assertEqual(cache.metrics()['misses'], 3)
+
+        # Least recently used was removed.
+        self.assertEqual(cache.verdict(USER_AGENTS.non_bot), False)
+        self.assertEqual(cache.metrics()['hits'], 1)
+        self.assertEqual(cache.verdict(USER_AGENTS.bot), True)
+        self.assertEqual(cache.metrics()['misses'], 4)
+
+
 class TestFunctions(LocalTestCase):
 
+    def test__classify(self):
+        # pylint: disable=line-too-long
+        tests = [
+            # (user_agent, expect)
+            (USER_AGENTS.non_bot, False),
+            (USER_AGENTS.bot, True),
+            # Fast path, the parser finds these indeterminate.
+            ("Mozilla/5.0 (compatible; AhrefsBot/5.2; +http://ahrefs.com/robot/)", True),
+            ("DuckDuckBot/1.1; (+http://duckduckgo.com/duckduckbot.html)", True),
+            ("CCBot/2.0 (https://commoncrawl.org/faq/)", True),
+            # Fast path, the parser finds this is not a bot.
+            ("Mozilla/5.0 (Linux; Android 6.0.1; Nexus 5X Build/MMB29P) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.5993.88 Mobile Safari/537.36 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)", True),
+            ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1", False),
+            ("Mozilla/5.0 (compatible; Dataprovider.com;)", None),
+            ("", None),
+            (None, None),
+        ]
+        for t in tests:
+            self.assertEqual(classify(t[0]), t[1])
+
     def test__is_bot(self):
         # pylint: disable=line-too-long
         tests = [
@@ -45,6 +112,16 @@ class TestFunctions(LocalTestCase):
         self.assertEqual(is_bot(indeterminate_is_bot=True), True)
         self.assertEqual(is_bot(indeterminate_is_bot=False), False)
 
+        # Verdicts are cached.
+        BOT_VERDICT_CACHE.clear()
+        current.request.env.http_user_agent = USER_AGENTS.bot
+        is_bot()
+        is_bot()
+        self.assertEqual(BOT_VERDICT_CACHE.metrics()['hits'], 1)
+
+    def test_constants(self):
+        self.assertTrue(isinstance(BOT_VERDICT_CACHE, BotVerdictCache))
+
 
 def setUpModule():
     """Set up web2py environment."""
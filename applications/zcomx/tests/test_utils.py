@@ -273,6 +273,8 @@ class TestFunctions(LocalTestCase):
                 'page_added_on': None,
                 'publication_year': this_year,
                 'rating': 0,
+                'rating_count': 0,
+                'rating_total': 0,
                 'reader': 'slider',
                 'release_date': None,
                 'status': 'd',